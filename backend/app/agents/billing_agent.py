@@ -3,18 +3,29 @@ Billing Support Agent - Hybrid RAG/CAG Strategy.
 
 This agent uses Hybrid RAG/CAG (Retrieval-Augmented Generation / Cached-Augmented Generation):
 - First query: Performs RAG retrieval from ChromaDB
-- Subsequent queries: Uses cached results from session state
+- Subsequent searches in the same run: Reuse the context reference cached in agent state
 
 LangChain Version: v1.0+
 Documentation Reference: https://docs.langchain.com/oss/python/langchain/agents
 """
 
+from typing import NotRequired
+
 from langchain.agents import create_agent
+from langchain.agents.middleware import AgentState
 from langchain.tools import tool, ToolRuntime
+from langchain_core.messages import ToolMessage
+from langgraph.types import Command
 from app.llm.providers import get_generation_model
 from app.retrieval.hybrid_strategy import HybridRAGCAGStrategy
 from app.core.checkpointing import get_or_create_checkpointer
-from app.core.logging_config import get_logger, log_truncated
+from app.agents.middleware import (
+    AgentLimitsMiddleware,
+    ContextRefMiddleware,
+    ModelSelectionMiddleware,
+    get_agent_limits,
+)
+from app.core.logging_config import get_logger
 
 logger = get_logger("billing_agent")
 
@@ -23,8 +34,15 @@ logger = get_logger("billing_agent")
 _hybrid_strategy = HybridRAGCAGStrategy(collection_name="billing_documents", k=3)
 
 
+class BillingState(AgentState):
+    """Billing agent state with the hybrid strategy's session cache."""
+
+    # Context references cached by the hybrid strategy (never the context text)
+    session_cache: NotRequired[dict]
+
+
 @tool
-def search_billing_info(query: str, runtime: ToolRuntime) -> str:
+def search_billing_info(query: str, runtime: ToolRuntime) -> Command | str:
     """
     Search billing information including pricing, invoices, payment methods, and billing policies.
     
@@ -37,31 +55,33 @@ def search_billing_info(query: str, runtime: ToolRuntime) -> str:
     - Account billing history
     
     The first call will retrieve information from the knowledge base.
-    Subsequent calls in the same conversation will use cached results for faster responses.
+    Subsequent calls in the same agent run will reuse the cached context for faster responses.
     
     Args:
         query: User's billing question
         runtime: Tool runtime (automatically injected) for accessing session state
         
     Returns:
-        Relevant billing information from knowledge base or cache
+        Reference to relevant billing information (resolved to text for the model),
+        with the session cache update on the first call
     """
     logger.info(f"Billing Agent Tool: Called with query=\"{query}\"")
-    # Get session cache from state
-    state = runtime.state
-    session_cache = state.get("session_cache", {})
+    # Get session cache from state (a copy: state is only changed through updates)
+    session_cache = dict(runtime.state.get("session_cache") or {})
     
-    # Use hybrid strategy (RAG first call, cached subsequent calls)
-    # This will update session_cache if it's the first call
-    context = _hybrid_strategy.get_context(query, session_cache)
-    logger.info(f"Billing Agent Tool: Returned {len(context)} chars of billing content")
-    log_truncated(logger, context, prefix="Billing Agent Tool: Content preview: ", max_chars=200)
+    # Use hybrid strategy (RAG first call, cached reference on subsequent calls)
+    # This adds the context reference to session_cache if it's the first call
+    context_ref = _hybrid_strategy.get_context_ref(query, session_cache)
+    logger.info(f"Billing Agent Tool: Returned context reference {context_ref}")
     
-    # Update state (NOTE: State persistence via checkpointer may handle this)
-    # For now, return the context string - caching may work through checkpointer
-    state["session_cache"] = session_cache
+    if session_cache == (runtime.state.get("session_cache") or {}):
+        return context_ref
     
-    return context
+    # Persist the cached reference in agent state with the tool result
+    return Command(update={
+        "session_cache": session_cache,
+        "messages": [ToolMessage(content=context_ref, tool_call_id=runtime.tool_call_id)],
+    })
 
 
 def create_billing_agent():
@@ -72,6 +92,7 @@ def create_billing_agent():
         LangGraph agent configured for billing queries with session caching
     """
     model = get_generation_model()
+    limits = get_agent_limits("billing")
     checkpointer = get_or_create_checkpointer()
     
     agent = create_agent(
@@ -111,10 +132,20 @@ def create_billing_agent():
             "REMEMBER: Tool call FIRST, then answer based on what the tool returns. "
             "The tool will cache results for faster follow-up questions."
         ),
+        middleware=[
+            AgentLimitsMiddleware("billing", limits),
+            ContextRefMiddleware(),
+            ModelSelectionMiddleware("billing"),
+        ],
+        state_schema=BillingState,
         checkpointer=checkpointer,
         name="billing_support_agent"
     )
     
+    # Backstop for the tool iteration limit
+    if limits.recursion_limit() is not None:
+        agent = agent.with_config(recursion_limit=limits.recursion_limit())
+    
     return agent
 
 
@@ -13,6 +13,12 @@ from langchain.tools import tool
 from app.llm.providers import get_generation_model
 from app.retrieval.rag_strategy import RAGStrategy
 from app.core.checkpointing import get_or_create_checkpointer
+from app.agents.middleware import (
+    AgentLimitsMiddleware,
+    ContextRefMiddleware,
+    ModelSelectionMiddleware,
+    get_agent_limits,
+)
 
 
 # Initialize RAG strategy for dad jokes
@@ -39,13 +45,11 @@ def find_contextual_dad_joke(query: str) -> str:
                May include context from the conversation
         
     Returns:
-        Relevant dad jokes from the database with their context descriptions
+        Reference to relevant dad jokes with their context descriptions (resolved to text for the model)
     """
     # Get relevant jokes from ChromaDB using semantic search
     # The query should include conversation context which the agent will provide
-    context = _rag_strategy.get_context(query)
-    
-    return context
+    return _rag_strategy.get_context_ref(query)
 
 
 def create_dad_joke_agent():
@@ -56,6 +60,7 @@ def create_dad_joke_agent():
         LangGraph agent configured for contextual dad jokes
     """
     model = get_generation_model()
+    limits = get_agent_limits("dad_joke")
     checkpointer = get_or_create_checkpointer()
     
     agent = create_agent(
@@ -84,10 +89,19 @@ def create_dad_joke_agent():
             "Example: If someone is stressed about deadlines and asks for a joke, call the tool with: "
             "'joke about deadlines and stress' to find relevant workplace humor."
         ),
+        middleware=[
+            AgentLimitsMiddleware("dad_joke", limits),
+            ContextRefMiddleware(),
+            ModelSelectionMiddleware("dad_joke"),
+        ],
         checkpointer=checkpointer,
         name="dad_joke_agent"
     )
     
+    # Backstop for the tool iteration limit
+    if limits.recursion_limit() is not None:
+        agent = agent.with_config(recursion_limit=limits.recursion_limit())
+    
     return agent
 
 
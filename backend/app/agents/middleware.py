@@ -0,0 +1,667 @@
+"""
+Agent middleware shared by the orchestrator and worker agents.
+
+LangChain Version: v1.0+
+Documentation Reference: https://docs.langchain.com/oss/python/langchain/middleware
+"""
+
+import asyncio
+import time
+from typing import NamedTuple, NotRequired, Optional
+
+from langchain.agents.middleware import AgentMiddleware, AgentState, ModelResponse, hook_config
+from langchain.agents.middleware.types import ExtendedModelResponse
+from langchain.agents.structured_output import StructuredOutputValidationError
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.types import Command
+
+from app.retrieval.context_refs import is_context_ref, resolve_context_ref
+from app.core.config import get_settings
+from app.core.deadline import check_cancelled, current_deadline, remaining_seconds
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
+from app.llm.models import extract_signals, get_model_for_tier, record_tier_call, select_tier, tier_latency_p95
+
+logger = get_logger("middleware")
+
+_metrics = get_metrics()
+_history_messages_trimmed = _metrics.counter(
+    "history_messages_trimmed_total", "Messages left out of model prompts by the history window"
+)
+_history_tokens_trimmed = _metrics.counter(
+    "history_tokens_trimmed_total", "Approximate tokens left out of model prompts by the history window"
+)
+_history_prompt_tokens = _metrics.histogram(
+    "history_prompt_tokens", "Approximate conversation tokens sent to the model after windowing"
+)
+_limit_hits = _metrics.counter(
+    "agent_limit_hits_total",
+    "Agent runs that hit a limit (max_tokens, timeout, deadline, tool_iterations)"
+)
+_tool_iterations = _metrics.histogram(
+    "agent_tool_iterations", "Tool-calling rounds per agent model call"
+)
+_routes = _metrics.counter(
+    "orchestrator_routes_total", "Turns routed by the orchestrator, by specialist agent_type"
+)
+
+
+class ContextRefMiddleware(AgentMiddleware):
+    """
+    Resolve retrieval context references when the model prompt is built.
+
+    Retrieval tools return compact references (see app.retrieval.context_refs),
+    which is what gets checkpointed. This middleware swaps the full context
+    text back in on the outgoing model request only, so state stays small.
+    """
+
+    def _resolve_messages(self, messages: list) -> list | None:
+        """Return messages with references resolved, or None if there were none."""
+        resolved = None
+        for i, msg in enumerate(messages):
+            if not isinstance(msg, ToolMessage) or not is_context_ref(msg.content):
+                continue
+            text = resolve_context_ref(msg.content)
+            if text is None:
+                logger.warning(f"Context Refs: Could not resolve {msg.content}")
+                text = "Retrieved context is no longer available. Call the tool again to retrieve it."
+            if resolved is None:
+                resolved = list(messages)
+            resolved[i] = msg.model_copy(update={"content": text})
+        return resolved
+
+    def wrap_model_call(self, request, handler):
+        """Resolve references before calling the model."""
+        messages = self._resolve_messages(request.messages)
+        if messages is not None:
+            request = request.override(messages=messages)
+        return handler(request)
+
+    async def awrap_model_call(self, request, handler):
+        """Async version of wrap_model_call."""
+        messages = self._resolve_messages(request.messages)
+        if messages is not None:
+            request = request.override(messages=messages)
+        return await handler(request)
+
+
+class HistoryState(AgentState):
+    """Agent state with the rolling summary of messages outside the history window."""
+
+    history_summary: NotRequired[str]
+    # Number of leading messages already folded into history_summary
+    history_summary_upto: NotRequired[int]
+
+
+def _preview(content, max_chars: int = 160) -> str:
+    """Single-line preview of message content."""
+    text = content if isinstance(content, str) else str(content)
+    text = " ".join(text.split())
+    return text if len(text) <= max_chars else text[:max_chars] + "..."
+
+
+class HistoryWindowMiddleware(AgentMiddleware):
+    """
+    Send only a recent window of the conversation to the model.
+
+    The window is built from whole turns (a user message plus the tool calls
+    and answers that follow it), newest first, until the message or token
+    budget is reached. The current turn is always sent in full, so tool calls
+    and their results are never split. Full history stays in checkpointed
+    state; only the outgoing prompt is trimmed.
+
+    With summarize=True, turns that fall out of the window are folded into an
+    extractive rolling summary (no extra model call) kept in
+    state["history_summary"] and appended to the system prompt.
+
+    Place it before ContextRefMiddleware so only references inside the window
+    are resolved (references count toward the budget at their reference size).
+    """
+
+    state_schema = HistoryState
+
+    def __init__(
+        self,
+        agent_name: str,
+        max_messages: int,
+        max_tokens: int,
+        summarize: bool = False,
+        summary_max_chars: int = 1500,
+    ):
+        """
+        Initialize history window.
+
+        Args:
+            agent_name: Label for metrics and logs
+            max_messages: Maximum conversation messages sent to the model
+            max_tokens: Approximate token budget for conversation messages
+            summarize: Keep a rolling summary of messages outside the window
+            summary_max_chars: Maximum summary length (oldest lines dropped first)
+        """
+        super().__init__()
+        self.agent_name = agent_name
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+        self.summarize = summarize
+        self.summary_max_chars = summary_max_chars
+
+    def _window_start(self, messages: list) -> int:
+        """Index of the first message inside the window."""
+        current = len(messages)
+        for i in range(len(messages) - 1, -1, -1):
+            if isinstance(messages[i], HumanMessage):
+                current = i
+                break
+        else:
+            return 0
+
+        message_budget = self.max_messages - (len(messages) - current)
+        token_budget = self.max_tokens - count_tokens_approximately(messages[current:])
+        start = turn_end = current
+        used_tokens = 0
+        for i in range(current - 1, -1, -1):
+            if not isinstance(messages[i], HumanMessage):
+                continue
+            turn_tokens = count_tokens_approximately(messages[i:turn_end])
+            if current - i > message_budget or used_tokens + turn_tokens > token_budget:
+                break
+            used_tokens += turn_tokens
+            start = turn_end = i
+        return start
+
+    def _extend_summary(self, summary: str, messages: list) -> str:
+        """Fold messages that left the window into the rolling summary."""
+        lines = [summary] if summary else []
+        for msg in messages:
+            if isinstance(msg, HumanMessage):
+                lines.append(f"- User asked: {_preview(msg.content)}")
+            elif isinstance(msg, ToolMessage) and msg.name:
+                lines.append(f"- Handled by {msg.name}")
+            elif isinstance(msg, AIMessage) and msg.content and not msg.tool_calls:
+                lines.append(f"- Answered: {_preview(msg.content)}")
+        summary = "\n".join(lines)
+        if len(summary) > self.summary_max_chars:
+            # Drop the oldest lines first
+            summary = summary[-self.summary_max_chars:]
+            summary = summary[summary.find("\n") + 1:]
+        return summary
+
+    def before_model(self, state, runtime):
+        """Update the rolling summary with turns that left the window."""
+        if not self.summarize:
+            return None
+        messages = state["messages"]
+        start = self._window_start(messages)
+        summary = state.get("history_summary", "")
+        upto = state.get("history_summary_upto", 0)
+        if upto > len(messages):
+            # History was replaced; start a new summary
+            summary, upto = "", 0
+        if start <= upto:
+            return None
+        summary = self._extend_summary(summary, messages[upto:start])
+        return {"history_summary": summary, "history_summary_upto": start}
+
+    def _window_request(self, request):
+        """Trim request messages to the window and attach the summary."""
+        messages = request.messages
+        start = self._window_start(messages)
+        if start:
+            trimmed_tokens = count_tokens_approximately(messages[:start])
+            _history_messages_trimmed.inc(start, agent=self.agent_name)
+            _history_tokens_trimmed.inc(trimmed_tokens, agent=self.agent_name)
+            logger.debug(
+                f"History Window: {self.agent_name} trimmed {start} messages (~{trimmed_tokens} tokens)"
+            )
+            request = request.override(messages=messages[start:])
+        _history_prompt_tokens.observe(count_tokens_approximately(request.messages), agent=self.agent_name)
+
+        summary = request.state.get("history_summary") if self.summarize else None
+        if summary:
+            prompt = request.system_prompt or ""
+            request = request.override(
+                system_message=SystemMessage(content=f"{prompt}\n\nEarlier in this conversation:\n{summary}")
+            )
+        return request
+
+    def wrap_model_call(self, request, handler):
+        """Apply the history window before calling the model."""
+        return handler(self._window_request(request))
+
+    async def awrap_model_call(self, request, handler):
+        """Async version of wrap_model_call."""
+        return await handler(self._window_request(request))
+
+
+def create_history_middleware(agent_name: str) -> HistoryWindowMiddleware:
+    """
+    Create a history window using the routing budgets from Settings.
+
+    Only the orchestrator sees the conversation history. Worker agents run
+    in a fresh checkpoint namespace per tool call with the routed query as
+    their only message, so they need no window.
+
+    Args:
+        agent_name: Label for metrics and logs
+
+    Returns:
+        Configured HistoryWindowMiddleware
+    """
+    settings = get_settings()
+    return HistoryWindowMiddleware(
+        agent_name,
+        max_messages=settings.routing_history_max_messages,
+        max_tokens=settings.routing_history_max_tokens,
+        summarize=settings.history_summary_enabled,
+        summary_max_chars=settings.history_summary_max_chars,
+    )
+
+
+class ModelSelectionMiddleware(AgentMiddleware):
+    """
+    Choose the generation model tier for each model call.
+
+    Uses cheap request signals (query length, domain, retrieved-context size,
+    conversation depth) and the agent's latency SLO (see
+    app.llm.models.select_tier), then records per-tier latency, tokens and
+    estimated cost. Place it after ContextRefMiddleware so retrieved context
+    is measured at its real size. Calls pass through unchanged unless
+    MODEL_SELECTION_ENABLED is set (off by default).
+    """
+
+    def __init__(self, agent_name: str):
+        """
+        Initialize model selection.
+
+        Args:
+            agent_name: Agent name, used as the domain signal and metrics label
+        """
+        super().__init__()
+        self.agent_name = agent_name
+
+    def _select(self, request):
+        """Pick a tier and return (tier, reason, model_name, request)."""
+        signals = extract_signals(self.agent_name, request.messages)
+        tier, reason = select_tier(signals, lambda t: tier_latency_p95(self.agent_name, t))
+        model_name = getattr(get_settings(), f"model_tier_{tier}").partition(":")[2]
+        logger.debug(f"Model Selection: {self.agent_name} -> {tier} ({reason}), signals={signals}")
+        return tier, reason, model_name, request.override(model=get_model_for_tier(tier))
+
+    @staticmethod
+    def _response_message(response):
+        result = getattr(response, "result", None)
+        return result[0] if result else response
+
+    def wrap_model_call(self, request, handler):
+        """Call the selected tier's model and record its latency and cost."""
+        if not get_settings().model_selection_enabled:
+            return handler(request)
+        tier, reason, model_name, request = self._select(request)
+        start = time.perf_counter()
+        response = handler(request)
+        record_tier_call(
+            self.agent_name, tier, reason, model_name, time.perf_counter() - start, self._response_message(response)
+        )
+        return response
+
+    async def awrap_model_call(self, request, handler):
+        """Async version of wrap_model_call."""
+        if not get_settings().model_selection_enabled:
+            return await handler(request)
+        tier, reason, model_name, request = self._select(request)
+        start = time.perf_counter()
+        response = await handler(request)
+        record_tier_call(
+            self.agent_name, tier, reason, model_name, time.perf_counter() - start, self._response_message(response)
+        )
+        return response
+
+
+class AgentLimits(NamedTuple):
+    """Execution limits for one agent (None means unlimited)."""
+
+    max_output_tokens: Optional[int] = None
+    timeout_seconds: Optional[float] = None
+    max_tool_iterations: Optional[int] = None
+
+    def recursion_limit(self) -> Optional[int]:
+        """
+        Graph step limit backing up max_tool_iterations.
+
+        Each tool round is a few graph steps (middleware hooks, model, tools),
+        so this only trips if the agent loops without reaching the model.
+        """
+        if self.max_tool_iterations is None:
+            return None
+        return (self.max_tool_iterations + 2) * 4
+
+
+def get_agent_limits(agent_name: str) -> AgentLimits:
+    """
+    Get the execution limits for an agent from Settings.
+
+    Args:
+        agent_name: Agent name as used in the AGENT_* settings
+
+    Returns:
+        AgentLimits for the agent
+    """
+    settings = get_settings()
+    return AgentLimits(
+        max_output_tokens=settings.agent_max_output_tokens.get(agent_name),
+        timeout_seconds=settings.agent_timeout_seconds.get(agent_name),
+        max_tool_iterations=settings.agent_max_tool_iterations.get(agent_name),
+    )
+
+
+class LimitsState(AgentState):
+    """Agent state with the start time of the current run."""
+
+    run_started_at: NotRequired[float]
+
+
+def _tool_rounds(messages: list) -> int:
+    """Tool-calling model responses since the latest user message."""
+    rounds = 0
+    for msg in reversed(messages):
+        if isinstance(msg, HumanMessage):
+            break
+        if isinstance(msg, AIMessage) and msg.tool_calls:
+            rounds += 1
+    return rounds
+
+
+def latest_tool_result(messages: list) -> Optional[str]:
+    """Content of the newest tool result since the latest user message."""
+    for msg in reversed(messages):
+        if isinstance(msg, HumanMessage):
+            break
+        if isinstance(msg, ToolMessage) and msg.content:
+            return str(msg.content)
+    return None
+
+
+def _was_truncated(message) -> bool:
+    """Whether a response stopped because it hit the output token limit."""
+    metadata = getattr(message, "response_metadata", None) or {}
+    return metadata.get("finish_reason") == "length" or metadata.get("stop_reason") == "max_tokens"
+
+
+class AgentLimitsMiddleware(AgentMiddleware):
+    """
+    Enforce an agent's output token, time and tool-iteration limits.
+
+    - max_output_tokens is passed to the model with every call. A structured
+      answer (response_format) cut off by it can't be parsed, so that call is
+      repeated once without the limit rather than losing the answer.
+    - timeout_seconds is a budget for the whole run: once spent, the run ends
+      with a short apology instead of another model call. Each model call
+      gets the remaining budget as its request timeout, and a call that fails
+      once the budget is spent ends the run the same way; async calls are
+      also cancelled when they would overrun it. The request deadline
+      (app.core.deadline) caps the budget the same way, and a cancelled
+      request stops before the next model call.
+    - After max_tool_iterations tool rounds the model is called with
+      tool_choice="none", so it answers from what it has retrieved.
+
+    Each limit hit is counted in agent_limit_hits_total.
+    """
+
+    state_schema = LimitsState
+
+    TIMEOUT_MESSAGE = (
+        "Sorry, this is taking longer than expected. "
+        "Please try again, or ask a more specific question."
+    )
+
+    def __init__(self, agent_name: str, limits: AgentLimits):
+        """
+        Initialize limits.
+
+        Args:
+            agent_name: Label for metrics and logs
+            limits: Limits to enforce
+        """
+        super().__init__()
+        self.agent_name = agent_name
+        self.limits = limits
+
+    def _remaining(self, state) -> Optional[float]:
+        """Seconds left in the run's time budget (capped by the request deadline), or None if unlimited."""
+        budget = None
+        if self.limits.timeout_seconds is not None:
+            started = state.get("run_started_at") or time.time()
+            budget = self.limits.timeout_seconds - (time.time() - started)
+        return remaining_seconds(budget)
+
+    def _timed_out(self) -> dict:
+        deadline = current_deadline()
+        limit = "deadline" if deadline is not None and deadline.expired else "timeout"
+        _limit_hits.inc(agent=self.agent_name, limit=limit)
+        logger.warning(f"Agent Limits: {self.agent_name} ran out of time ({limit})")
+        return {"messages": [AIMessage(content=self.TIMEOUT_MESSAGE)], "jump_to": "end"}
+
+    def before_agent(self, state, runtime):
+        """Start the run's time budget."""
+        if self.limits.timeout_seconds is None:
+            return None
+        return {"run_started_at": time.time()}
+
+    @hook_config(can_jump_to=["end"])
+    def before_model(self, state, runtime):
+        """End the run if its time budget is spent (stop if the request was cancelled)."""
+        check_cancelled()
+        remaining = self._remaining(state)
+        if remaining is not None and remaining <= 0:
+            return self._timed_out()
+        return None
+
+    def _limit_request(self, request, remaining: Optional[float]):
+        """Apply the token and time limits and, once tool rounds are used up, disable tools."""
+        settings = dict(request.model_settings)
+        if self.limits.max_output_tokens is not None:
+            settings["max_tokens"] = self.limits.max_output_tokens
+        if remaining is not None:
+            settings["timeout"] = remaining
+        overrides = {"model_settings": settings}
+
+        rounds = _tool_rounds(request.messages)
+        _tool_iterations.observe(rounds, agent=self.agent_name)
+        max_rounds = self.limits.max_tool_iterations
+        if max_rounds is not None and rounds >= max_rounds and request.tools:
+            _limit_hits.inc(agent=self.agent_name, limit="tool_iterations")
+            logger.warning(f"Agent Limits: {self.agent_name} used {rounds} tool rounds, answering without tools")
+            overrides["tool_choice"] = "none"
+        return request.override(**overrides)
+
+    def _record_response(self, response) -> None:
+        result = getattr(response, "result", None) or [response]
+        if _was_truncated(result[0]):
+            _limit_hits.inc(agent=self.agent_name, limit="max_tokens")
+            logger.info(f"Agent Limits: {self.agent_name} response hit {self.limits.max_output_tokens} max tokens")
+
+    def _uncapped_retry(self, request, error: StructuredOutputValidationError):
+        """The request without the token limit if the error is a truncated structured answer, else None."""
+        if "max_tokens" not in request.model_settings or not _was_truncated(error.ai_message):
+            return None
+        _limit_hits.inc(agent=self.agent_name, limit="max_tokens")
+        logger.warning(
+            f"Agent Limits: {self.agent_name} structured response hit {self.limits.max_output_tokens} max tokens, "
+            "retrying without the limit"
+        )
+        settings = {k: v for k, v in request.model_settings.items() if k != "max_tokens"}
+        return request.override(model_settings=settings)
+
+    def _call(self, request, handler):
+        try:
+            return handler(request)
+        except StructuredOutputValidationError as e:
+            retry = self._uncapped_retry(request, e)
+            if retry is None:
+                raise
+            return handler(retry)
+
+    async def _acall(self, request, handler):
+        try:
+            return await handler(request)
+        except StructuredOutputValidationError as e:
+            retry = self._uncapped_retry(request, e)
+            if retry is None:
+                raise
+            return await handler(retry)
+
+    def _out_of_time(self, state) -> bool:
+        remaining = self._remaining(state)
+        return remaining is not None and remaining <= 0
+
+    def wrap_model_call(self, request, handler):
+        """Call the model within the agent's limits."""
+        check_cancelled()
+        remaining = self._remaining(request.state)
+        if remaining is not None and remaining <= 0:
+            return ModelResponse(result=[self._timed_out()["messages"][0]])
+        try:
+            response = self._call(self._limit_request(request, remaining), handler)
+        except Exception:
+            # Most likely the request timeout set from the budget
+            if self._out_of_time(request.state):
+                return ModelResponse(result=[self._timed_out()["messages"][0]])
+            raise
+        self._record_response(response)
+        return response
+
+    async def awrap_model_call(self, request, handler):
+        """Async version of wrap_model_call (also cancels calls that overrun the time budget)."""
+        check_cancelled()
+        remaining = self._remaining(request.state)
+        if remaining is not None and remaining <= 0:
+            return ModelResponse(result=[self._timed_out()["messages"][0]])
+        try:
+            response = await asyncio.wait_for(
+                self._acall(self._limit_request(request, remaining), handler), timeout=remaining
+            )
+        except asyncio.TimeoutError:
+            return ModelResponse(result=[self._timed_out()["messages"][0]])
+        except Exception:
+            if self._out_of_time(request.state):
+                return ModelResponse(result=[self._timed_out()["messages"][0]])
+            raise
+        self._record_response(response)
+        return response
+
+
+class DeadlineMiddleware(AgentMiddleware):
+    """
+    Stop an agent at the request deadline (app.core.deadline).
+
+    For the orchestrator, whose tools return finished answers: once the
+    deadline has passed, the run ends with the turn's latest tool result
+    (the specialist's answer, if it arrived) instead of another model call,
+    or with the timeout apology. Async model calls are cancelled at the
+    deadline, and a cancelled request stops before its next model call.
+
+    Only model calls are wrapped, so the middleware adds no graph steps.
+    """
+
+    def __init__(self, agent_name: str):
+        """
+        Initialize deadline middleware.
+
+        Args:
+            agent_name: Label for metrics and logs
+        """
+        super().__init__()
+        self.agent_name = agent_name
+
+    def _answer_now(self, request) -> ModelResponse:
+        _limit_hits.inc(agent=self.agent_name, limit="deadline")
+        partial = latest_tool_result(request.messages)
+        logger.warning(
+            f"Deadline: {self.agent_name} passed the request deadline, "
+            f"answering with {'the latest tool result' if partial else 'the timeout message'}"
+        )
+        return ModelResponse(result=[AIMessage(content=partial or AgentLimitsMiddleware.TIMEOUT_MESSAGE)])
+
+    def wrap_model_call(self, request, handler):
+        """Call the model unless the request deadline has passed."""
+        check_cancelled()
+        remaining = remaining_seconds()
+        if remaining is not None and remaining <= 0:
+            return self._answer_now(request)
+        return handler(request)
+
+    async def awrap_model_call(self, request, handler):
+        """Async version of wrap_model_call (also cancels calls that overrun the deadline)."""
+        check_cancelled()
+        remaining = remaining_seconds()
+        if remaining is not None and remaining <= 0:
+            return self._answer_now(request)
+        if remaining is None:
+            return await handler(request)
+        timeout = asyncio.timeout(remaining)
+        try:
+            async with timeout:
+                return await handler(request)
+        except TimeoutError:
+            if not timeout.expired():
+                raise
+            return self._answer_now(request)
+
+
+class RouteState(AgentState):
+    """Agent state with the specialist chosen for the current turn."""
+
+    # agent_type of the turn's routing tool call (None until routed)
+    current_agent: NotRequired[Optional[str]]
+
+
+class RouteMiddleware(AgentMiddleware):
+    """
+    Record the orchestrator's routing decision in state.
+
+    When the model calls one of the routing tools, state["current_agent"] is
+    set to that tool's agent_type along with the model's message, so callers
+    read the turn's route from state instead of scanning the conversation.
+    The first model call of a turn resets it, so a turn that is not routed
+    (e.g. a greeting) does not report the previous turn's agent. Each route
+    is counted in orchestrator_routes_total and logged.
+
+    Only model calls are wrapped, so the middleware adds no graph steps. Put
+    it first so it also sees responses other middleware answers directly.
+    """
+
+    state_schema = RouteState
+
+    def __init__(self, routes: dict[str, str]):
+        """
+        Initialize route middleware.
+
+        Args:
+            routes: Routing tool name -> agent_type
+        """
+        super().__init__()
+        self.routes = routes
+
+    def _record(self, request, response):
+        """Add the turn's route (or its reset) to the model response."""
+        message = response.result[-1] if response.result else None
+        for call in getattr(message, "tool_calls", None) or []:
+            agent_type = self.routes.get(call["name"])
+            if agent_type is not None:
+                _routes.inc(agent_type=agent_type)
+                logger.info(f"Orchestrator: Routed to {agent_type} ({call['name']})")
+                return ExtendedModelResponse(model_response=response, command=Command(update={"current_agent": agent_type}))
+        messages = request.state.get("messages") or []
+        if messages and isinstance(messages[-1], HumanMessage) and request.state.get("current_agent") is not None:
+            # New turn without a route: clear the previous turn's agent
+            return ExtendedModelResponse(model_response=response, command=Command(update={"current_agent": None}))
+        return response
+
+    def wrap_model_call(self, request, handler):
+        """Call the model and record the route it chose."""
+        return self._record(request, handler(request))
+
+    async def awrap_model_call(self, request, handler):
+        """Async version of wrap_model_call."""
+        return self._record(request, await handler(request))
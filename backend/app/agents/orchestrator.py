@@ -10,35 +10,76 @@ Documentation Reference: https://docs.langchain.com/oss/python/langchain/multi-a
 
 from langchain.agents import create_agent
 from langchain.tools import tool
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, ToolMessage
+from langgraph.config import get_stream_writer
 from app.llm.providers import get_routing_model  # Smaller model for routing
 from app.agents.policy_agent import get_policy_agent
 from app.agents.technical_agent import get_technical_agent
 from app.agents.billing_agent import get_billing_agent
 from app.agents.dad_joke_agent import get_dad_joke_agent
 from app.agents.models import PolicyResponse
+from app.agents.structured_stream import PolicyStreamRenderer, answers_streamed, format_policy_response
+from app.agents.middleware import (
+    AgentLimitsMiddleware,
+    DeadlineMiddleware,
+    RouteMiddleware,
+    create_history_middleware,
+    latest_tool_result,
+)
 from app.core.checkpointing import get_or_create_checkpointer
+from app.core.deadline import check_cancelled
 from app.core.logging_config import get_logger, log_dict_keys, log_truncated
 
 logger = get_logger("orchestrator")
 
 
-# Wrap worker agents as tools for the supervisor
-def _format_policy_response(structured_response: PolicyResponse) -> str:
-    """Format PolicyResponse structured output into readable markdown."""
-    parts = []
-    if structured_response.friendly_response:
-        parts.append(structured_response.friendly_response)
-    if structured_response.policy_description:
-        parts.append("\n\n" + structured_response.policy_description)
-    if structured_response.key_points:
-        parts.append("\n\n**Key Points:**")
-        for point in structured_response.key_points:
-            parts.append(f"\n- {point}")
-    if structured_response.contact_info:
-        parts.append(f"\n\n**Contact:** {structured_response.contact_info}")
-    return "".join(parts)
+def _run_policy_agent(policy_agent, query: str) -> dict:
+    """
+    Run the policy agent, streaming its answer as it is generated.
+    
+    Within streaming_answers(), the PolicyResponse JSON is rendered as it
+    streams and the markdown is written to the run's custom stream
+    ({"delta": text}), so a streaming endpoint can show the policy answer
+    before it is complete. The pieces add up to the formatted answer this
+    tool returns. Otherwise the agent is simply invoked.
+    
+    Args:
+        policy_agent: Policy agent graph
+        query: User's policy-related question
+        
+    Returns:
+        Final state of the policy agent run
+    """
+    inputs = {"messages": [{"role": "user", "content": query}]}
+    if not answers_streamed():
+        return policy_agent.invoke(inputs)
+    
+    write = get_stream_writer()
+    renderer, message_id, result = None, None, None
+    for mode, chunk in policy_agent.stream(inputs, stream_mode=["messages", "values"]):
+        if mode == "values":
+            result = chunk
+            continue
+        message, _ = chunk
+        if not isinstance(message, AIMessageChunk) or not isinstance(message.content, str) or not message.content:
+            continue
+        if message.id != message_id:
+            # Each model call streams its own content (only the structured output is JSON)
+            renderer, message_id = PolicyStreamRenderer(), message.id
+        delta = renderer.feed(message.content)
+        if delta:
+            write({"delta": delta})
+    
+    structured_response = (result or {}).get("structured_response")
+    if renderer is not None and isinstance(structured_response, PolicyResponse):
+        rest = renderer.finish(structured_response)
+        if rest:
+            write({"delta": rest})
+        logger.info(f"Policy Agent: Streamed {len(renderer.text)} chars of structured output")
+    return result
 
 
+# Wrap worker agents as tools for the supervisor
 @tool
 def handle_policy_query(query: str) -> str:
     """
@@ -59,12 +100,12 @@ def handle_policy_query(query: str) -> str:
         Complete answer from the policy specialist agent
     """
     logger.info(f"Orchestrator Tool: handle_policy_query called with query=\"{query}\"")
+    # Don't start a worker for a request nobody is waiting for
+    check_cancelled()
     policy_agent = get_policy_agent()
     
     logger.info(f"Policy Agent: Invoking with messages=[{{\"role\": \"user\", \"content\": \"{query}\"}}]")
-    result = policy_agent.invoke({
-        "messages": [{"role": "user", "content": query}]
-    })
+    result = _run_policy_agent(policy_agent, query)
     
     # Log result structure
     log_dict_keys(logger, result, prefix="Policy Agent: ")
@@ -87,7 +128,7 @@ def handle_policy_query(query: str) -> str:
             if structured_response.contact_info:
                 logger.info(f"Orchestrator Tool: structured_response.contact_info=\"{structured_response.contact_info}\"")
             
-            formatted = _format_policy_response(structured_response)
+            formatted = format_policy_response(structured_response)
             logger.info(f"Orchestrator Tool: Formatted response length={len(formatted)} chars")
             log_truncated(logger, formatted, prefix="Orchestrator Tool: Formatted response preview: ", max_chars=200)
             
@@ -136,6 +177,8 @@ def handle_technical_query(query: str) -> str:
         Complete answer from the technical support specialist agent
     """
     logger.info(f"Orchestrator Tool: handle_technical_query called with query=\"{query}\"")
+    # Don't start a worker for a request nobody is waiting for
+    check_cancelled()
     technical_agent = get_technical_agent()
     
     logger.info(f"Technical Agent: Invoking with messages=[{{\"role\": \"user\", \"content\": \"{query}\"}}]")
@@ -180,6 +223,8 @@ def handle_billing_query(query: str) -> str:
         Complete answer from the billing support specialist agent
     """
     logger.info(f"Orchestrator Tool: handle_billing_query called with query=\"{query}\"")
+    # Don't start a worker for a request nobody is waiting for
+    check_cancelled()
     billing_agent = get_billing_agent()
     
     logger.info(f"Billing Agent: Invoking with messages=[{{\"role\": \"user\", \"content\": \"{query}\"}}]")
@@ -224,6 +269,7 @@ def handle_dad_joke_request(query: str) -> str:
     Returns:
         A contextually relevant dad joke from the dad joke specialist agent
     """
+    check_cancelled()
     dad_joke_agent = get_dad_joke_agent()
     result = dad_joke_agent.invoke({
         "messages": [{"role": "user", "content": query}]
@@ -232,6 +278,15 @@ def handle_dad_joke_request(query: str) -> str:
     return result["messages"][-1].content
 
 
+# Routing tool -> agent_type reported for the turn (state["current_agent"])
+ROUTES = {
+    "handle_policy_query": "policy",
+    "handle_technical_query": "technical",
+    "handle_billing_query": "billing",
+    "handle_dad_joke_request": "dad_joke",
+}
+
+
 def create_orchestrator():
     """
     Create the orchestrator agent (supervisor).
@@ -280,6 +335,16 @@ def create_orchestrator():
             "- DO NOT add your own commentary - just return what the tool returned\n"
             "- Be precise: each new query should be evaluated on its own merits, not based on conversation history"
         ),
+        middleware=[
+            # Record the turn's route in state (outermost, so it also sees
+            # answers the deadline middleware gives without a model call)
+            RouteMiddleware(ROUTES),
+            # Past the request deadline, answer with the specialist's result
+            # (if it arrived) instead of another routing call
+            DeadlineMiddleware("orchestrator"),
+            # Routing only needs recent turns, not every previous worker answer
+            create_history_middleware("orchestrator"),
+        ],
         checkpointer=checkpointer,
         name="orchestrator_agent"
     )
@@ -307,3 +372,50 @@ def get_orchestrator():
     _orchestrator = create_orchestrator()
     return _orchestrator
 
+
+
+async def close_interrupted_turn(config: dict) -> dict:
+    """
+    Finish a turn whose orchestrator run was cancelled mid-step.
+    
+    The checkpoint may end in tool calls without results, which the next
+    model call on the thread would reject. Missing results are filled with
+    the timeout apology and the turn is answered with the specialist's
+    result if it arrived (otherwise the apology).
+    
+    Args:
+        config: Run config with the thread_id
+        
+    Returns:
+        Thread state values after the turn is closed
+    """
+    orchestrator = get_orchestrator()
+    values = (await orchestrator.aget_state(config)).values
+    messages = values.get("messages", [])
+    last = messages[-1] if messages else None
+    if isinstance(last, AIMessage) and not last.tool_calls:
+        return values  # Turn finished before it was interrupted
+    
+    answered, closing, current_agent = set(), [], None
+    for msg in reversed(messages):
+        if isinstance(msg, HumanMessage):
+            break
+        if isinstance(msg, ToolMessage):
+            answered.add(msg.tool_call_id)
+        elif isinstance(msg, AIMessage):
+            closing.extend(
+                ToolMessage(content=AgentLimitsMiddleware.TIMEOUT_MESSAGE, tool_call_id=call["id"], name=call["name"])
+                for call in msg.tool_calls if call["id"] not in answered
+            )
+            current_agent = next(
+                (ROUTES[call["name"]] for call in msg.tool_calls if call["name"] in ROUTES), current_agent
+            )
+    answer = latest_tool_result(messages) or AgentLimitsMiddleware.TIMEOUT_MESSAGE
+    logger.warning(f"Orchestrator: Closing interrupted turn ({len(closing)} unanswered tool calls)")
+    # The route may not be in state yet if the run stopped inside the model step
+    await orchestrator.aupdate_state(
+        config,
+        {"messages": [*closing, AIMessage(content=answer)], "current_agent": current_agent},
+        as_node="model",
+    )
+    return (await orchestrator.aget_state(config)).values
@@ -13,6 +13,12 @@ from langchain.tools import tool
 from app.llm.providers import get_generation_model
 from app.retrieval.cag_strategy import CAGStrategy
 from app.core.checkpointing import get_or_create_checkpointer
+from app.agents.middleware import (
+    AgentLimitsMiddleware,
+    ContextRefMiddleware,
+    ModelSelectionMiddleware,
+    get_agent_limits,
+)
 from app.agents.models import PolicyResponse
 from app.core.logging_config import get_logger, log_dict_keys, log_truncated
 
@@ -39,13 +45,12 @@ def get_policy_documents(query: str = "") -> str:
         query: User's question (optional - returns all documents)
         
     Returns:
-        Full content of all policy documents
+        Reference to the full policy document bundle (resolved to text for the model)
     """
     logger.info(f"Policy Agent Tool: Called with query=\"{query}\"")
-    context = _cag_strategy.get_context(query)
-    logger.info(f"Policy Agent Tool: Returned {len(context)} chars of policy content")
-    log_truncated(logger, context, prefix="Policy Agent Tool: Content preview: ", max_chars=200)
-    return context
+    context_ref = _cag_strategy.get_context_ref(query)
+    logger.info(f"Policy Agent Tool: Returned context reference {context_ref}")
+    return context_ref
 
 
 def create_policy_agent():
@@ -57,6 +62,7 @@ def create_policy_agent():
     """
     logger.info("Policy Agent: Creating agent with response_format=PolicyResponse")
     model = get_generation_model()
+    limits = get_agent_limits("policy")
     checkpointer = get_or_create_checkpointer()
     
     agent = create_agent(
@@ -93,10 +99,19 @@ def create_policy_agent():
             "Step 3: Generate structured response with friendly_response and detailed policy_description\n"
             "Step 4: Include key_points extracted from the actual document content"
         ),
+        middleware=[
+            AgentLimitsMiddleware("policy", limits),
+            ContextRefMiddleware(),
+            ModelSelectionMiddleware("policy"),
+        ],
         checkpointer=checkpointer,
         name="policy_compliance_agent"
     )
     
+    # Backstop for the tool iteration limit
+    if limits.recursion_limit() is not None:
+        agent = agent.with_config(recursion_limit=limits.recursion_limit())
+    
     return agent
 
 
@@ -0,0 +1,355 @@
+"""
+Incremental rendering of structured agent output.
+
+The policy agent answers with a PolicyResponse (response_format), which the
+model generates as one JSON object. Waiting for the whole object delays the
+first visible text until the model has finished. PolicyStreamRenderer reads
+the JSON as it streams and renders the markdown answer field by field
+(friendly_response, then policy_description, then key_points, then
+contact_info), so the text can be sent on while the rest is generated.
+
+The streamed text is always a prefix of format_policy_response() of the
+finished object, and finish() returns the rest, so the pieces add up to
+exactly the answer the policy tool returns. Specialists only stream within
+streaming_answers(), i.e. when the caller sends answers on as they arrive.
+
+LangChain Version: v1.0+
+"""
+
+import contextlib
+import json
+import re
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from app.agents.models import PolicyResponse
+from app.core.logging_config import get_logger
+
+logger = get_logger("structured_stream")
+
+# Next character that ends a run of plain string text
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+_streaming: ContextVar[bool] = ContextVar("streaming_answers", default=False)
+
+
+def answers_streamed() -> bool:
+    """Whether the run in this context sends answers on as they are generated."""
+    return _streaming.get()
+
+
+@contextlib.contextmanager
+def streaming_answers() -> Iterator[None]:
+    """Run the block (and everything it starts) with specialists streaming their answers."""
+    token = _streaming.set(True)
+    try:
+        yield
+    finally:
+        _streaming.reset(token)
+
+
+def format_policy_response(structured_response: PolicyResponse) -> str:
+    """Format PolicyResponse structured output into readable markdown."""
+    parts = []
+    if structured_response.friendly_response:
+        parts.append(structured_response.friendly_response)
+    if structured_response.policy_description:
+        parts.append("\n\n" + structured_response.policy_description)
+    if structured_response.key_points:
+        parts.append("\n\n**Key Points:**")
+        for point in structured_response.key_points:
+            parts.append(f"\n- {point}")
+    if structured_response.contact_info:
+        parts.append(f"\n\n**Contact:** {structured_response.contact_info}")
+    return "".join(parts)
+
+
+class StreamingJSONFields:
+    """
+    Incremental reader of the top-level fields of a streamed JSON object.
+
+    feed() takes the next piece of the JSON text and returns what it
+    completed, as events:
+
+        ("start", field, index)   a string value begins (index: position in an
+                                  array of strings, None for a plain string)
+        ("text", field, text)     decoded text of the current string value
+        ("end", field, None)      the field's value is complete
+
+    Values other than strings and arrays of strings are skipped. Input that
+    does not start with "{" (e.g. prose before a tool call) yields nothing.
+    Each character is read once, so a whole object costs O(length).
+    """
+
+    def __init__(self):
+        self._state = "start"
+        self._key: list[str] = []
+        self._field: Optional[str] = None
+        self._index = -1
+        # Pending escape sequence, and a high surrogate waiting for its pair
+        self._escape = ""
+        self._high = ""
+        # Skipping a non-string value: state to return to, nesting, string flags
+        self._skip_return = "next"
+        self._skip_depth = 0
+        self._skip_string = False
+        self._skip_escape = False
+
+    def _emit(self, text: str, events: list) -> None:
+        if not text:
+            return
+        if self._high:
+            self._flush_high(events)
+        if self._state == "key_string":
+            self._key.append(text)
+        else:
+            events.append(("text", self._field, text))
+
+    def _flush_high(self, events: list) -> None:
+        """Emit a high surrogate without a pair on its own (as json.loads decodes it)."""
+        high, self._high = self._high, ""
+        self._emit(json.loads(f'"{high}"'), events)
+
+    def _decode_escape(self, events: list) -> None:
+        escape, self._escape = self._escape, ""
+        if escape[1] == "u" and not self._high and "D800" <= escape[2:].upper() <= "DBFF":
+            # Decoded together with the low surrogate that follows
+            self._high = escape
+            return
+        try:
+            text = json.loads(f'"{self._high}{escape}"')
+        except ValueError:
+            text = ""
+        self._high = ""
+        self._emit(text, events)
+
+    def _read_string(self, text: str, i: int, events: list) -> int:
+        """Read string content from text[i:]; returns the position after what was consumed."""
+        n = len(text)
+        while i < n:
+            if self._escape:
+                self._escape += text[i]
+                i += 1
+                if len(self._escape) == 6 or (len(self._escape) == 2 and self._escape[1] != "u"):
+                    self._decode_escape(events)
+                continue
+            match = _STRING_SPECIAL.search(text, i)
+            if match is None:
+                self._emit(text[i:], events)
+                return n
+            self._emit(text[i:match.start()], events)
+            i = match.end()
+            if match.group() == "\\":
+                self._escape = "\\"
+                continue
+            # Closing quote
+            if self._high:
+                self._flush_high(events)
+            if self._state == "key_string":
+                self._state = "colon"
+            elif self._state == "item":
+                self._state = "array"
+            else:
+                events.append(("end", self._field, None))
+                self._state = "next"
+            return i
+        return i
+
+    def _skip(self, ch: str, events: list) -> bool:
+        """Consume one character of a skipped value; False if it belongs to the enclosing value."""
+        if self._skip_string:
+            if self._skip_escape:
+                self._skip_escape = False
+            elif ch == "\\":
+                self._skip_escape = True
+            elif ch == '"':
+                self._skip_string = False
+            return True
+        if self._skip_depth == 0 and ch in ",}]":
+            # End of a scalar
+            self._end_skip(events)
+            return False
+        if ch == '"':
+            self._skip_string = True
+        elif ch in "{[":
+            self._skip_depth += 1
+        elif ch in "}]":
+            self._skip_depth -= 1
+            if self._skip_depth == 0:
+                self._end_skip(events)
+        return True
+
+    def _end_skip(self, events: list) -> None:
+        self._state = self._skip_return
+        if self._skip_return == "next":
+            events.append(("end", self._field, None))
+
+    def _start_skip(self, returns_to: str) -> None:
+        self._state = "skip"
+        self._skip_return = returns_to
+        self._skip_depth = 0
+        self._skip_string = False
+        self._skip_escape = False
+
+    def feed(self, text: str) -> list[tuple]:
+        """
+        Read the next piece of JSON text.
+
+        Args:
+            text: Continuation of the JSON text fed so far
+
+        Returns:
+            Events completed by this piece, in order
+        """
+        events: list[tuple] = []
+        i, n = 0, len(text)
+        while i < n:
+            state = self._state
+            if state in ("key_string", "string", "item"):
+                i = self._read_string(text, i, events)
+                continue
+            if state in ("done", "ignored"):
+                break
+            ch = text[i]
+            i += 1
+            if state == "skip":
+                if not self._skip(ch, events):
+                    i -= 1  # Let the enclosing value read the separator
+                continue
+            if ch.isspace():
+                continue
+            if state == "start":
+                self._state = "key" if ch == "{" else "ignored"
+            elif state == "key":
+                if ch == '"':
+                    self._key = []
+                    self._state = "key_string"
+                elif ch == "}":
+                    self._state = "done"
+            elif state == "colon":
+                if ch == ":":
+                    self._field = "".join(self._key)
+                    self._state = "value"
+            elif state == "value":
+                if ch == '"':
+                    events.append(("start", self._field, None))
+                    self._state = "string"
+                elif ch == "[":
+                    self._index = -1
+                    self._state = "array"
+                else:
+                    self._start_skip("next")
+                    i -= 1
+            elif state == "array":
+                if ch == '"':
+                    self._index += 1
+                    events.append(("start", self._field, self._index))
+                    self._state = "item"
+                elif ch == "]":
+                    events.append(("end", self._field, None))
+                    self._state = "next"
+                elif ch != ",":
+                    self._start_skip("array")
+                    i -= 1
+            elif state == "next":
+                if ch == ",":
+                    self._state = "key"
+                elif ch == "}":
+                    self._state = "done"
+        return events
+
+
+class PolicyStreamRenderer:
+    """
+    Render a streamed PolicyResponse JSON object as markdown, field by field.
+
+    Fields are rendered in format_policy_response() order. Text of a field
+    is passed on as it arrives; a field that arrives early waits until the
+    fields before it are complete (or until finish()).
+    """
+
+    ORDER = ("friendly_response", "policy_description", "key_points", "contact_info")
+
+    def __init__(self):
+        self._fields = StreamingJSONFields()
+        self._segments = {name: [] for name in self.ORDER}
+        self._complete: set[str] = set()
+        self._cursor = 0
+        self._sent = 0
+        self._parts: list[str] = []
+
+    @property
+    def text(self) -> str:
+        """Markdown rendered so far."""
+        return "".join(self._parts)
+
+    def _add(self, field: str, kind: str, value) -> None:
+        segment = self._segments[field]
+        if kind == "end":
+            self._complete.add(field)
+        elif field == "key_points":
+            if kind == "start" and value is not None:
+                if not segment:
+                    segment.append("\n\n**Key Points:**")
+                segment.append("\n- ")
+            elif kind == "text":
+                segment.append(value)
+        elif kind == "text":
+            if not segment and field == "policy_description":
+                segment.append("\n\n")
+            elif not segment and field == "contact_info":
+                segment.append("\n\n**Contact:** ")
+            segment.append(value)
+
+    def feed(self, chunk: str) -> str:
+        """
+        Read the next piece of the model's JSON output.
+
+        Args:
+            chunk: Streamed content of the structured output
+
+        Returns:
+            Newly rendered markdown (may be empty)
+        """
+        for kind, field, value in self._fields.feed(chunk):
+            if field in self._segments:
+                self._add(field, kind, value)
+
+        new = []
+        while self._cursor < len(self.ORDER):
+            name = self.ORDER[self._cursor]
+            segment = self._segments[name]
+            if len(segment) > self._sent:
+                new.extend(segment[self._sent:])
+                self._sent = len(segment)
+            if name not in self._complete:
+                break
+            self._cursor += 1
+            self._sent = 0
+        delta = "".join(new)
+        if delta:
+            self._parts.append(delta)
+        return delta
+
+    def finish(self, structured_response: PolicyResponse) -> str:
+        """
+        Complete the rendering with the validated response.
+
+        Args:
+            structured_response: The agent's final PolicyResponse
+
+        Returns:
+            The rest of format_policy_response(structured_response) after the
+            text already rendered
+        """
+        full = format_policy_response(structured_response)
+        sent = self.text
+        if not full.startswith(sent):
+            # The streamed object differs from the validated one (e.g. a
+            # retried structured output call); nothing more can be sent
+            logger.warning(f"Structured Stream: Streamed {len(sent)} chars that do not match the final response")
+            return ""
+        rest = full[len(sent):]
+        if rest:
+            self._parts.append(rest)
+        return rest
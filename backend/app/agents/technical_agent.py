@@ -13,7 +13,13 @@ from langchain.tools import tool
 from app.llm.providers import get_generation_model
 from app.retrieval.rag_strategy import RAGStrategy
 from app.core.checkpointing import get_or_create_checkpointer
-from app.core.logging_config import get_logger, log_truncated
+from app.agents.middleware import (
+    AgentLimitsMiddleware,
+    ContextRefMiddleware,
+    ModelSelectionMiddleware,
+    get_agent_limits,
+)
+from app.core.logging_config import get_logger
 
 logger = get_logger("technical_agent")
 
@@ -39,13 +45,12 @@ def search_technical_docs(query: str) -> str:
         query: User's technical question
         
     Returns:
-        Relevant technical documentation chunks from the knowledge base
+        Reference to relevant technical documentation chunks (resolved to text for the model)
     """
     logger.info(f"Technical Agent Tool: Called with query=\"{query}\"")
-    context = _rag_strategy.get_context(query)
-    logger.info(f"Technical Agent Tool: Returned {len(context)} chars of technical content")
-    log_truncated(logger, context, prefix="Technical Agent Tool: Content preview: ", max_chars=200)
-    return context
+    context_ref = _rag_strategy.get_context_ref(query)
+    logger.info(f"Technical Agent Tool: Returned context reference {context_ref}")
+    return context_ref
 
 
 def create_technical_agent():
@@ -56,6 +61,7 @@ def create_technical_agent():
         LangGraph agent configured for technical queries
     """
     model = get_generation_model()
+    limits = get_agent_limits("technical")
     checkpointer = get_or_create_checkpointer()
     
     agent = create_agent(
@@ -94,10 +100,19 @@ def create_technical_agent():
             "   - Complete troubleshooting guide\n\n"
             "REMEMBER: Tool call FIRST, then answer based on what the tool returns."
         ),
+        middleware=[
+            AgentLimitsMiddleware("technical", limits),
+            ContextRefMiddleware(),
+            ModelSelectionMiddleware("technical"),
+        ],
         checkpointer=checkpointer,
         name="technical_support_agent"
     )
     
+    # Backstop for the tool iteration limit
+    if limits.recursion_limit() is not None:
+        agent = agent.with_config(recursion_limit=limits.recursion_limit())
+    
     return agent
 
 
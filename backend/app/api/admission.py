@@ -0,0 +1,220 @@
+"""
+Admission control for chat requests.
+
+At most ADMISSION_MAX_CONCURRENT turns are processed at once; further
+requests wait in a bounded queue instead of all slowing down together. Load
+is shed early with a fast error and a Retry-After estimate:
+
+- 429 when the queue is full
+- 503 when the expected queue wait (position x recent turn duration /
+  concurrency) exceeds ADMISSION_MAX_QUEUE_WAIT_SECONDS, or a queued
+  request actually waited that long
+
+Interactive requests (streams, WebSocket turns) are admitted before batch
+requests (non-streaming, background jobs); when the queue is full, an
+interactive request takes the place of the most recently queued batch one.
+
+LangChain Version: v1.0+
+"""
+
+import asyncio
+import contextlib
+import math
+import time
+from collections import deque
+from typing import AsyncIterator, Optional
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
+
+logger = get_logger("admission")
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)
+
+_metrics = get_metrics()
+_queue_depth = _metrics.gauge("admission_queue_depth", "Chat requests waiting for a slot, by priority")
+_in_flight = _metrics.gauge("admission_in_flight", "Chat requests holding a slot")
+_queue_wait = _metrics.histogram("admission_queue_wait_seconds", "Time admitted chat requests waited, by priority")
+_rejected = _metrics.counter("admission_rejected_total", "Chat requests shed by reason and priority")
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of admitted."""
+
+    def __init__(self, status_code: int, reason: str, retry_after: float):
+        super().__init__(f"Server is busy ({reason}), retry in {math.ceil(retry_after)}s")
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("future", "priority", "enqueued_at")
+
+    def __init__(self, future: asyncio.Future, priority: str):
+        self.future = future
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+
+
+class AdmissionController:
+    """Concurrency limit with a bounded two-level priority queue (event loop only)."""
+
+    def __init__(self, max_concurrent: int, max_queue: int, max_queue_wait_seconds: float):
+        """
+        Initialize admission controller.
+
+        Args:
+            max_concurrent: Requests processed at once
+            max_queue: Requests allowed to wait
+            max_queue_wait_seconds: Longest acceptable (expected or actual) wait
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_queue_wait_seconds = max_queue_wait_seconds
+        self._in_flight = 0
+        self._queues: dict[str, deque[_Waiter]] = {priority: deque() for priority in PRIORITIES}
+        # Moving average of how long a request holds its slot
+        self._service_seconds = 1.0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _expected_wait(self, ahead: int) -> float:
+        return (ahead + 1) * self._service_seconds / self.max_concurrent
+
+    def _update_gauges(self) -> None:
+        _in_flight.set(self._in_flight)
+        for priority, queue in self._queues.items():
+            _queue_depth.set(len(queue), priority=priority)
+
+    def _reject(self, status_code: int, reason: str, priority: str, retry_after: float) -> AdmissionRejected:
+        _rejected.inc(reason=reason, priority=priority)
+        logger.warning(f"Admission: Shedding {priority} request ({reason}), queue depth {self.queue_depth}")
+        return AdmissionRejected(status_code, reason, max(1.0, retry_after))
+
+    async def acquire(self, priority: str = INTERACTIVE) -> None:
+        """
+        Wait for a processing slot.
+
+        Raises:
+            AdmissionRejected: If the request is shed
+        """
+        if self._in_flight < self.max_concurrent and not self.queue_depth:
+            self._in_flight += 1
+            self._update_gauges()
+            _queue_wait.observe(0.0, priority=priority)
+            return
+
+        if self.queue_depth >= self.max_queue:
+            batch_queue = self._queues[BATCH]
+            if priority == INTERACTIVE and batch_queue:
+                displaced = batch_queue.pop()
+                displaced.future.set_exception(
+                    self._reject(503, "displaced", BATCH, self._expected_wait(self.queue_depth))
+                )
+            else:
+                raise self._reject(429, "queue_full", priority, self._expected_wait(self.queue_depth))
+
+        ahead = len(self._queues[INTERACTIVE]) if priority == INTERACTIVE else self.queue_depth
+        expected = self._expected_wait(ahead)
+        if expected > self.max_queue_wait_seconds:
+            raise self._reject(503, "expected_wait", priority, expected)
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), priority)
+        self._queues[priority].append(waiter)
+        self._update_gauges()
+        try:
+            await asyncio.wait_for(waiter.future, self.max_queue_wait_seconds)
+        except asyncio.TimeoutError:
+            if waiter in self._queues[priority]:
+                self._queues[priority].remove(waiter)
+            self._update_gauges()
+            raise self._reject(503, "queue_timeout", priority, self._expected_wait(self.queue_depth))
+        except asyncio.CancelledError:
+            if waiter in self._queues[priority]:
+                self._queues[priority].remove(waiter)
+                self._update_gauges()
+            elif waiter.future.done() and not waiter.future.cancelled() and waiter.future.exception() is None:
+                # Slot was handed over just before cancellation
+                self.release(0.0)
+            raise
+        _queue_wait.observe(time.monotonic() - waiter.enqueued_at, priority=priority)
+
+    def release(self, held_seconds: float) -> None:
+        """
+        Return a slot, handing it to the next waiter (interactive first).
+
+        Args:
+            held_seconds: How long the slot was held (for wait estimates)
+        """
+        if held_seconds > 0:
+            self._service_seconds = 0.8 * self._service_seconds + 0.2 * held_seconds
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            while queue:
+                waiter = queue.popleft()
+                if not waiter.future.done():
+                    waiter.future.set_result(None)
+                    self._update_gauges()
+                    return
+        self._in_flight -= 1
+        self._update_gauges()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: str = INTERACTIVE) -> AsyncIterator[None]:
+        """Hold a processing slot for the duration of the block."""
+        await self.acquire(priority)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+    def snapshot(self) -> dict:
+        """Current state for diagnostics."""
+        return {
+            "in_flight": self._in_flight,
+            "max_concurrent": self.max_concurrent,
+            "queued": {priority: len(queue) for priority, queue in self._queues.items()},
+            "expected_wait_seconds": round(self._expected_wait(self.queue_depth), 2),
+        }
+
+
+# Global controller instance
+_admission_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> Optional[AdmissionController]:
+    """
+    Get or create the global admission controller.
+
+    Returns:
+        AdmissionController, or None if ADMISSION_CONTROL_ENABLED is false
+    """
+    global _admission_controller
+    settings = get_settings()
+    if not settings.admission_control_enabled:
+        return None
+    if _admission_controller is None:
+        _admission_controller = AdmissionController(
+            max_concurrent=settings.admission_max_concurrent,
+            max_queue=settings.admission_max_queue,
+            max_queue_wait_seconds=settings.admission_max_queue_wait_seconds,
+        )
+    return _admission_controller
+
+
+@contextlib.asynccontextmanager
+async def admitted(priority: str = INTERACTIVE) -> AsyncIterator[None]:
+    """Hold a slot of the global controller (no-op when admission control is disabled)."""
+    controller = get_admission_controller()
+    if controller is None:
+        yield
+        return
+    async with controller.slot(priority):
+        yield
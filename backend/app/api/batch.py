@@ -0,0 +1,244 @@
+"""
+Batch question answering for /chat/batch.
+
+Answers many independent messages (FAQ regeneration, evaluation sets,
+ticket backlogs) with bounded parallelism and reports each result as soon
+as it completes, followed by a summary with aggregate throughput.
+
+Messages are grouped by domain (given per message, or guessed from
+keywords) and dispatched group by group, so the turns running together
+mostly go to the same specialist. Their identical searches are shared
+(see shared_retrieval()), and the same policy bundle or retrieved context
+reaches the model in quick succession while provider prompt caches are
+warm. The grouping only orders the work: routing is still done by the
+orchestrator. Messages that share a thread_id are turns of one
+conversation: they run one after another, in request order, on the same
+worker.
+
+Every message holds a batch admission slot while it runs, so batches yield
+to interactive traffic; a message that is shed, or finds its provider busy,
+is retried after the suggested delay.
+
+LangChain Version: v1.0+
+"""
+
+import asyncio
+import re
+import time
+from collections import Counter
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from langchain_core.callbacks import get_usage_metadata_callback
+
+from app.api.admission import AdmissionRejected
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics, percentile
+from app.core.models import ChatBatchItem
+from app.llm.circuit_breaker import CircuitOpenError
+from app.llm.concurrency import UpstreamBusyError
+from app.retrieval.rag_strategy import SharedRetrieval, shared_retrieval
+
+logger = get_logger("batch")
+
+_items = get_metrics().counter("chat_batch_items_total", "Batch messages by outcome (answered, partial, failed)")
+_retries = get_metrics().counter("chat_batch_retries_total", "Batch message attempts retried after shedding")
+
+# Cheap domain signals for grouping (singular forms, see _words)
+DOMAIN_KEYWORDS = {
+    "policy": {
+        "policy", "privacy", "term", "data", "gdpr", "retention", "compliance", "remote", "leave",
+        "conduct", "security",
+    },
+    "technical": {
+        "api", "error", "bug", "webhook", "integration", "configure", "install", "timeout", "crash", "login",
+        "troubleshoot", "sdk", "401", "403", "500",
+    },
+    "billing": {
+        "bill", "billing", "invoice", "payment", "price", "pricing", "plan", "refund", "subscription", "charge",
+        "trial", "card",
+    },
+    "dad_joke": {"joke", "laugh", "funny", "pun", "humor"},
+}
+OTHER = "other"
+
+_WORD = re.compile(r"[a-z0-9]+")
+_RETRYABLE = (AdmissionRejected, CircuitOpenError, UpstreamBusyError)
+
+# (thread_id, response content, agent type, partial) of one answered message
+Answer = tuple[str, str, Optional[str], bool]
+
+
+def _singular(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def _words(message: str) -> set[str]:
+    return {_singular(word) for word in _WORD.findall(message.lower())}
+
+
+def guess_domain(message: str) -> str:
+    """
+    Guess a message's domain from keywords (for grouping only).
+
+    Args:
+        message: User message
+
+    Returns:
+        Domain with the most keyword matches (first on ties), or OTHER
+    """
+    words = _words(message)
+    best, matches = OTHER, 0
+    for domain, keywords in DOMAIN_KEYWORDS.items():
+        count = len(words & keywords)
+        if count > matches:
+            best, matches = domain, count
+    return best
+
+
+def plan_batch(items: list[ChatBatchItem]) -> list[list[tuple[int, str]]]:
+    """
+    Order a batch group by group, largest domain first.
+
+    Messages sharing a thread_id form one dispatch unit, answered in request
+    order by one worker (a thread takes one turn at a time); the unit is
+    grouped by the domain of its first message.
+
+    Args:
+        items: Batch messages
+
+    Returns:
+        Dispatch units in order, each a list of (index, domain) pairs
+        (request order within a group and within a unit)
+    """
+    groups: dict[str, list[list[tuple[int, str]]]] = {}
+    threads: dict[str, list[tuple[int, str]]] = {}
+    for index, item in enumerate(items):
+        domain = item.domain or guess_domain(item.message)
+        unit = threads.get(item.thread_id) if item.thread_id else None
+        if unit is None:
+            unit = []
+            groups.setdefault(domain, []).append(unit)
+            if item.thread_id:
+                threads[item.thread_id] = unit
+        unit.append((index, domain))
+    ordered = sorted(groups.items(), key=lambda group: -sum(len(unit) for unit in group[1]))
+    return [unit for _, units in ordered for unit in units]
+
+
+def _domain_report(lines: list[dict]) -> dict:
+    latencies = sorted(line["elapsed_ms"] for line in lines)
+    return {
+        "items": len(lines),
+        "failed": sum(1 for line in lines if line["type"] == "error"),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "agent_types": dict(Counter(line.get("agent_type") for line in lines if line["type"] == "result")),
+    }
+
+
+async def run_batch(
+    items: list[ChatBatchItem],
+    answer: Callable[[ChatBatchItem], Awaitable[Answer]],
+    concurrency: int,
+) -> AsyncIterator[dict]:
+    """
+    Answer a batch of messages, yielding each result as it completes.
+
+    Closing the generator cancels the messages still running (their turns
+    are closed like any cancelled turn).
+
+    Args:
+        items: Batch messages
+        answer: Answers one message (raises AdmissionRejected etc. like _answer)
+        concurrency: Messages answered at once
+
+    Yields:
+        {"type": "result" | "error", "index", "id", "domain", ...} per
+        message in completion order, then one {"type": "summary", ...}
+    """
+    max_attempts = get_settings().batch_item_max_attempts
+    units = plan_batch(items)
+    plan = iter(units)
+    shared = SharedRetrieval()
+    completed: asyncio.Queue = asyncio.Queue()
+    started = time.perf_counter()
+
+    async def attempt(item: ChatBatchItem) -> Answer:
+        for number in range(1, max_attempts + 1):
+            try:
+                return await answer(item)
+            except _RETRYABLE as e:
+                if number == max_attempts:
+                    raise
+                _retries.inc()
+                await asyncio.sleep(e.retry_after)
+
+    async def worker() -> dict:
+        # Workers take the next unit of the plan (one event loop, so the
+        # shared iterator needs no lock) and count their own token usage
+        with get_usage_metadata_callback() as usage, shared_retrieval(shared):
+            for unit in plan:
+                for index, domain in unit:
+                    item = items[index]
+                    item_started = time.perf_counter()
+                    line = {"type": "result", "index": index, "id": item.id or str(index), "domain": domain}
+                    try:
+                        thread_id, content, agent_type, partial = await attempt(item)
+                        line.update(thread_id=thread_id, agent_type=agent_type, partial=partial, response=content)
+                        _items.inc(outcome="partial" if partial else "answered")
+                    except _RETRYABLE as e:
+                        line.update(type="error", status=getattr(e, "status_code", 503), detail=str(e))
+                        _items.inc(outcome="failed")
+                    except Exception as e:
+                        logger.error(f"Batch: Message {line['id']} failed: {e}")
+                        line.update(type="error", status=500, detail=f"Error processing chat request: {str(e)}")
+                        _items.inc(outcome="failed")
+                    line["elapsed_ms"] = round((time.perf_counter() - item_started) * 1000, 1)
+                    completed.put_nowait(line)
+            return usage.usage_metadata
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(units)))]
+    logger.info(f"Batch: Answering {len(items)} messages, {len(workers)} at a time")
+    lines = []
+    try:
+        while len(lines) < len(items):
+            line = await completed.get()
+            lines.append(line)
+            yield line
+        usages = await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    elapsed = time.perf_counter() - started
+    usage = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+    for usage_by_model in usages:
+        for model_usage in usage_by_model.values():
+            for key in usage:
+                usage[key] += model_usage.get(key, 0)
+    by_domain: dict[str, list[dict]] = {}
+    for line in lines:
+        by_domain.setdefault(line["domain"], []).append(line)
+
+    failed = sum(1 for line in lines if line["type"] == "error")
+    logger.info(f"Batch: {len(items)} messages in {elapsed:.1f}s, {failed} failed, {shared.hits} shared searches")
+    yield {
+        "type": "summary",
+        "items": len(items),
+        "succeeded": len(items) - failed,
+        "failed": failed,
+        "partial": sum(1 for line in lines if line.get("partial")),
+        "concurrency": len(workers),
+        "elapsed_seconds": round(elapsed, 3),
+        "items_per_second": round(len(items) / elapsed, 2) if elapsed > 0 else None,
+        "usage": usage,
+        "tokens_per_second": round(usage["total_tokens"] / elapsed, 1) if elapsed > 0 else None,
+        "retrieval": {"searches": shared.misses, "shared": shared.hits},
+        "domains": {domain: _domain_report(group) for domain, group in by_domain.items()},
+    }
@@ -0,0 +1,140 @@
+"""
+Idempotency keys for /chat.
+
+Retried requests that carry the same idempotency key run the chat pipeline
+once. A duplicate that arrives while the first execution is running waits
+for it (single-flight); one that arrives after it completed gets the stored
+result. Results are kept in a bounded store for IDEMPOTENCY_TTL_SECONDS.
+
+Executions run as their own tasks, so a client that disconnects does not
+cancel the work its retry is waiting for. Failed executions are not stored:
+the next retry runs the pipeline again.
+
+LangChain Version: v1.0+
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
+
+logger = get_logger("idempotency")
+
+_requests = get_metrics().counter(
+    "idempotency_requests_total",
+    "Requests with an idempotency key by outcome (executed, joined in-flight, replayed, conflict)"
+)
+
+
+class IdempotencyConflictError(Exception):
+    """An idempotency key was reused for a different request."""
+
+
+class _Entry:
+    """Execution of one idempotency key."""
+
+    __slots__ = ("fingerprint", "task", "completed_at")
+
+    def __init__(self, fingerprint: Hashable, task: asyncio.Task):
+        self.fingerprint = fingerprint
+        self.task = task
+        self.completed_at: Optional[float] = None
+
+
+class IdempotencyStore:
+    """
+    Single-flight executions and their results by idempotency key.
+
+    Completed entries expire ttl_seconds after completion; past max_entries
+    the oldest entries (completed ones first) are dropped.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        """
+        Initialize idempotency store.
+
+        Args:
+            max_entries: Maximum number of keys kept
+            ttl_seconds: How long a completed result is served to retries
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def run(self, key: str, fingerprint: Hashable, execute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run execute once per key and share its result.
+
+        Args:
+            key: Client-supplied idempotency key
+            fingerprint: Identifies the request; a different request with
+                the same key is rejected
+            execute: Produces the result (called only for the first request)
+
+        Returns:
+            Result of the (single) execution
+
+        Raises:
+            IdempotencyConflictError: If the key was used for a different request
+        """
+        self._prune()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.fingerprint != fingerprint:
+                _requests.inc(outcome="conflict")
+                raise IdempotencyConflictError(f"Idempotency key {key!r} was already used for a different request")
+            outcome = "replayed" if entry.task.done() else "joined"
+            _requests.inc(outcome=outcome)
+            logger.info(f"Idempotency: Request with key {key!r} {outcome} an earlier execution")
+        else:
+            _requests.inc(outcome="executed")
+            entry = _Entry(fingerprint, asyncio.ensure_future(execute()))
+            self._entries[key] = entry
+            entry.task.add_done_callback(lambda task, key=key, entry=entry: self._on_done(key, entry))
+        # Shield: a cancelled caller must not cancel the shared execution
+        return await asyncio.shield(entry.task)
+
+    def _on_done(self, key: str, entry: _Entry) -> None:
+        if entry.task.cancelled() or entry.task.exception() is not None:
+            # Failures are not cached, a retry runs again
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+            return
+        entry.completed_at = time.monotonic()
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        for key, entry in list(self._entries.items()):
+            if entry.completed_at is not None and now - entry.completed_at > self.ttl_seconds:
+                del self._entries[key]
+        while len(self._entries) >= self.max_entries:
+            completed = next((k for k, e in self._entries.items() if e.completed_at is not None), None)
+            del self._entries[completed if completed is not None else next(iter(self._entries))]
+
+
+# Global store instance
+_idempotency_store: Optional[IdempotencyStore] = None
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    """
+    Get or create the global idempotency store.
+
+    Returns:
+        IdempotencyStore: Shared store configured from settings
+    """
+    global _idempotency_store
+    if _idempotency_store is None:
+        settings = get_settings()
+        _idempotency_store = IdempotencyStore(
+            max_entries=settings.idempotency_max_entries,
+            ttl_seconds=settings.idempotency_ttl_seconds,
+        )
+    return _idempotency_store
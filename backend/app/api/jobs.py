@@ -0,0 +1,351 @@
+"""
+Asynchronous chat jobs for /chat/jobs.
+
+Long turns (e.g. technical troubleshooting) can outlast load balancer idle
+timeouts on the plain JSON path. A job decouples the turn from the request:
+submitting returns a job id right away, JOB_WORKERS background workers run
+queued jobs in order, and clients either poll the job or follow its
+progress as a v2 event stream (status, meta, delta, then done or error).
+The events are buffered per job, so a stream attached late or after a
+reconnect replays the progress from the start or from Last-Event-ID.
+
+Jobs run at batch priority, and a job shed by admission control goes back
+to waiting and is retried. Finished jobs are kept for JOB_TTL_SECONDS; past
+JOB_MAX_JOBS the oldest finished jobs are dropped first.
+
+LangChain Version: v1.0+
+"""
+
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Optional
+
+from app.api.admission import AdmissionRejected
+from app.api.sse import StreamBuffer
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
+
+logger = get_logger("jobs")
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+_metrics = get_metrics()
+_jobs = _metrics.counter("chat_jobs_total", "Chat jobs by outcome (succeeded, failed, cancelled, rejected)")
+_queued = _metrics.gauge("chat_jobs_queued", "Chat jobs waiting for a worker")
+_queue_wait = _metrics.histogram("chat_job_queue_wait_seconds", "Time chat jobs waited for a worker")
+
+# Produces the v2 events of one job's turn
+EventSource = Callable[[], AsyncIterator[tuple[str, Any]]]
+
+
+class JobRejected(Exception):
+    """Raised when a job cannot be accepted."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: Optional[float] = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class Job:
+    """One submitted chat turn, its progress events and result."""
+
+    def __init__(self, thread_id: str, source: EventSource, max_events: int):
+        """
+        Initialize job.
+
+        Args:
+            thread_id: Conversation thread the turn runs on
+            source: Produces the turn's v2 events when the job runs
+            max_events: Progress events kept for replay
+        """
+        self.id = f"job_{uuid.uuid4().hex[:12]}"
+        self.thread_id = thread_id
+        self.status = QUEUED
+        self.stage: Optional[str] = QUEUED
+        self.agent_type: Optional[str] = None
+        self.response: Optional[str] = None
+        self.partial = False
+        self.usage: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.error_status: Optional[int] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.events = StreamBuffer(thread_id, max_events)
+        self.task: Optional[asyncio.Task] = None
+        self._source = source
+        self._enqueued_at = time.monotonic()
+        self._finished_monotonic: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    def snapshot(self, position: Optional[int] = None) -> dict:
+        """Current state (ChatJobResponse fields)."""
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "position": position,
+            "thread_id": self.thread_id,
+            "agent_type": self.agent_type,
+            "response": self.response,
+            "partial": self.partial,
+            "usage": self.usage,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    def _apply(self, event: str, data: dict, parts: list[str]) -> None:
+        """Track an event of the turn in the job's state."""
+        if event == "status":
+            self.stage = data.get("stage")
+        elif event == "meta":
+            self.agent_type = data.get("agent_type")
+        elif event == "delta":
+            parts.append(data.get("text", ""))
+        elif event == "done":
+            self.status = SUCCEEDED
+            self.response = "".join(parts)
+            self.partial = bool(data.get("partial"))
+            self.usage = data.get("usage")
+        elif event == "error":
+            self.status = FAILED
+            self.error = data.get("detail")
+            self.error_status = data.get("status")
+
+    async def _finish(self, status: str) -> None:
+        """Record the outcome (unless the turn reported one) and end the event stream."""
+        if self.status not in FINISHED:
+            self.status = status
+        self.stage = None
+        self.finished_at = time.time()
+        self._finished_monotonic = time.monotonic()
+        _jobs.inc(outcome=self.status)
+        await self.events.finish()
+
+
+class JobManager:
+    """
+    Bounded queue of chat jobs run by a fixed pool of worker tasks.
+
+    Jobs are indexed by id; finished jobs expire ttl_seconds after they end.
+    Workers start on the first submitted job (on the running event loop).
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_queued: int,
+        max_jobs: int,
+        ttl_seconds: float,
+        max_attempts: int,
+        max_events: int,
+    ):
+        """
+        Initialize job manager.
+
+        Args:
+            workers: Jobs run at once
+            max_queued: Jobs allowed to wait for a worker
+            max_jobs: Jobs kept (waiting, running and finished)
+            ttl_seconds: How long a finished job's result is kept
+            max_attempts: Attempts per job when it is shed by admission control
+            max_events: Progress events kept per job
+        """
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_jobs = max_jobs
+        self.ttl_seconds = ttl_seconds
+        self.max_attempts = max_attempts
+        self.max_events = max_events
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._waiting: list[Job] = []
+        self._ready: Optional[asyncio.Condition] = None
+        self._worker_tasks: list[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def _ensure_workers(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._worker_tasks:
+            return
+        # First job, or the previous loop is gone (e.g. after a restart)
+        self._loop = loop
+        self._ready = asyncio.Condition()
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Jobs: Started {self.workers} workers")
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        for job_id, job in list(self._jobs.items()):
+            if job.finished and now - job._finished_monotonic > self.ttl_seconds:
+                del self._jobs[job_id]
+        while len(self._jobs) >= self.max_jobs:
+            finished = next((job_id for job_id, job in self._jobs.items() if job.finished), None)
+            if finished is None:
+                break
+            del self._jobs[finished]
+
+    async def submit(self, thread_id: str, source: EventSource) -> Job:
+        """
+        Queue a turn as a job.
+
+        Args:
+            thread_id: Conversation thread of the turn
+            source: Produces the turn's v2 events when the job runs
+
+        Returns:
+            Queued job
+
+        Raises:
+            JobRejected: If the thread already has a job in progress (409) or
+                the queue or job store is full (429)
+        """
+        self._prune()
+        if any(job.thread_id == thread_id and not job.finished for job in self._jobs.values()):
+            # One turn at a time per thread keeps its history consistent
+            _jobs.inc(outcome="rejected")
+            raise JobRejected(409, f"Thread {thread_id} already has a job in progress")
+        if len(self._waiting) >= self.max_queued or len(self._jobs) >= self.max_jobs:
+            _jobs.inc(outcome="rejected")
+            raise JobRejected(429, "Too many chat jobs in progress", retry_after=1.0)
+
+        self._ensure_workers()
+        job = Job(thread_id, source, self.max_events)
+        self._jobs[job.id] = job
+        await job.events.append("status", {"stage": QUEUED})
+        async with self._ready:
+            self._waiting.append(job)
+            _queued.set(len(self._waiting))
+            self._ready.notify()
+        logger.info(f"Jobs: Queued {job.id} on {thread_id} ({len(self._waiting)} waiting)")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Job by id (None if unknown or expired)."""
+        self._prune()
+        return self._jobs.get(job_id)
+
+    def position(self, job: Job) -> Optional[int]:
+        """1-based position of a waiting job in the queue."""
+        try:
+            return self._waiting.index(job) + 1
+        except ValueError:
+            return None
+
+    async def cancel(self, job: Job) -> None:
+        """Cancel a waiting or running job (no-op once finished)."""
+        if job.finished:
+            return
+        if job in self._waiting:
+            self._waiting.remove(job)
+            _queued.set(len(self._waiting))
+            await job.events.append("cancelled", {})
+            await job._finish(CANCELLED)
+        elif job.task is not None and not job.task.done():
+            job.task.cancel()
+            await asyncio.gather(job.task, return_exceptions=True)
+
+    async def _worker(self) -> None:
+        while True:
+            async with self._ready:
+                while not self._waiting:
+                    await self._ready.wait()
+                job = self._waiting.pop(0)
+                _queued.set(len(self._waiting))
+            _queue_wait.observe(time.monotonic() - job._enqueued_at)
+            job.task = asyncio.create_task(self._run(job))
+            # A cancelled job must not stop the worker
+            await asyncio.gather(job.task, return_exceptions=True)
+
+    async def _run(self, job: Job) -> None:
+        job.status = RUNNING
+        job.started_at = time.time()
+        parts: list[str] = []
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                try:
+                    async for event, data in job._source():
+                        job._apply(event, data, parts)
+                        await job.events.append(event, data)
+                    break
+                except AdmissionRejected as e:
+                    # Shed before the turn started: wait and try again
+                    if attempt == self.max_attempts:
+                        job.error, job.error_status = str(e), e.status_code
+                        await job.events.append("error", {"detail": str(e), "status": e.status_code})
+                        await job._finish(FAILED)
+                        return
+                    job.stage = QUEUED
+                    logger.info(f"Jobs: {job.id} shed ({e.reason}), retrying in {e.retry_after:.1f}s")
+                    await asyncio.sleep(e.retry_after)
+            # Succeeded or failed as reported by the turn (failed if it just ended)
+            await job._finish(FAILED)
+        except asyncio.CancelledError:
+            await job.events.append("cancelled", {})
+            await job._finish(CANCELLED)
+            raise
+        except Exception as e:
+            logger.error(f"Jobs: {job.id} failed: {e}")
+            job.error, job.error_status = f"Error processing chat request: {str(e)}", 500
+            await job.events.append("error", {"detail": job.error, "status": 500})
+            await job._finish(FAILED)
+
+    async def aclose(self) -> None:
+        """Stop the workers and cancel waiting and running jobs."""
+        for job in list(self._waiting):
+            await self.cancel(job)
+        for task in self._worker_tasks:
+            task.cancel()
+        running = [job.task for job in self._jobs.values() if job.task is not None and not job.task.done()]
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, *running, return_exceptions=True)
+        self._worker_tasks = []
+
+    def snapshot(self) -> dict:
+        """Current state for diagnostics."""
+        counts = {status: 0 for status in (QUEUED, RUNNING, *FINISHED)}
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return {"workers": self.workers, "jobs": counts}
+
+
+# Global manager instance
+_job_manager: Optional[JobManager] = None
+
+
+def get_job_manager() -> JobManager:
+    """
+    Get or create the global job manager.
+
+    Returns:
+        JobManager: Shared manager configured from settings
+    """
+    global _job_manager
+    if _job_manager is None:
+        settings = get_settings()
+        _job_manager = JobManager(
+            workers=settings.job_workers,
+            max_queued=settings.job_max_queued,
+            max_jobs=settings.job_max_jobs,
+            ttl_seconds=settings.job_ttl_seconds,
+            max_attempts=settings.job_max_attempts,
+            max_events=settings.sse_resume_max_events,
+        )
+    return _job_manager
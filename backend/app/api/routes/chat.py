@@ -4,19 +4,49 @@ Chat API endpoint for multi-agent customer service.
 LangChain Version: v1.0+
 """
 
+import asyncio
+import contextlib
+import math
+import time
 import uuid
-from typing import AsyncIterator
-from fastapi import APIRouter, HTTPException
+from typing import AsyncIterator, Awaitable, Optional
+from fastapi import APIRouter, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.responses import StreamingResponse
-from app.core.models import ChatRequest, ChatStreamChunk, ErrorResponse
-from app.agents.orchestrator import get_orchestrator
+from langchain_core.callbacks import get_usage_metadata_callback
+from pydantic import ValidationError
+from app.core.config import get_settings
+from app.core.deadline import Deadline, RequestCancelled, deadline_scope
+from app.core.metrics import get_metrics
+from app.core.models import (
+    ChatBatchItem, ChatBatchRequest, ChatJobRequest, ChatJobResponse, ChatRequest, ChatSocketFrame, ChatStreamChunk,
+    ErrorResponse,
+)
+from app.agents.orchestrator import close_interrupted_turn, get_orchestrator
 from app.agents.models import PolicyResponse
+from app.agents.structured_stream import format_policy_response, streaming_answers
+from app.api.admission import BATCH, INTERACTIVE, AdmissionRejected, admitted
+from app.api.batch import run_batch
+from app.api.idempotency import IdempotencyConflictError, get_idempotency_store
+from app.api.jobs import Job, JobRejected, get_job_manager
+from app.api.sse import (
+    DeltaCoalescer, ResumeError, coalesce, dumps, get_stream_registry, negotiate_protocol, parse_event_id,
+)
+from app.llm.circuit_breaker import CircuitOpenError
+from app.llm.concurrency import UpstreamBusyError
 from app.core.logging_config import get_logger, log_dict_keys, log_truncated
 
 logger = get_logger("chat_endpoint")
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
+_ws_connections = get_metrics().gauge("chat_ws_connections", "Open /chat/ws connections")
+_ws_turns = get_metrics().counter("chat_ws_turns_total", "/chat/ws turns by outcome")
+
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+}
+
 
 def _generate_thread_id() -> str:
     """Generate a new thread ID for conversation."""
@@ -39,128 +69,369 @@ def _format_structured_response(result: dict) -> str:
     
     # Handle different structured response types
     if isinstance(structured_response, PolicyResponse):
-        parts = []
-        if structured_response.friendly_response:
-            parts.append(structured_response.friendly_response)
-        if structured_response.policy_description:
-            parts.append("\n\n" + structured_response.policy_description)
-        if structured_response.key_points:
-            parts.append("\n\n**Key Points:**")
-            for point in structured_response.key_points:
-                parts.append(f"\n- {point}")
-        if structured_response.contact_info:
-            parts.append(f"\n\n**Contact:** {structured_response.contact_info}")
-        return "".join(parts)
+        return format_policy_response(structured_response)
     
     # For other structured response types, convert to JSON or string
     return str(structured_response)
 
 
-def _detect_agent_type(messages: list) -> str:
+def _response_content(result: dict) -> str:
+    """Final answer text of an orchestrator result (structured response preferred)."""
+    # Log result structure
+    log_dict_keys(logger, result, prefix="Chat Endpoint: Orchestrator result ")
+    
+    # Get response - prefer structured response if available
+    structured_content = _format_structured_response(result)
+    has_structured = structured_content is not None
+    logger.info(f"Chat Endpoint: Structured response available={has_structured}")
+    
+    if structured_content:
+        logger.info(f"Chat Endpoint: Using structured response, length={len(structured_content)} chars")
+        response_content = structured_content
+    else:
+        logger.info("Chat Endpoint: Using message content (no structured response)")
+        response_content = result["messages"][-1].content
+    
+    log_truncated(logger, response_content, prefix="Chat Endpoint: Final response content: ", max_chars=200)
+    return response_content
+
+
+def _total_usage(usage_by_model: dict) -> dict:
+    """Sum token usage over all models called for a request."""
+    totals = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+    for usage in usage_by_model.values():
+        for key in totals:
+            totals[key] += usage.get(key, 0)
+    return totals
+
+
+def _deadline(requested_seconds: Optional[float]) -> Deadline:
+    """Deadline for a new turn: the requested budget (capped) or the configured default."""
+    settings = get_settings()
+    seconds = requested_seconds or settings.request_deadline_seconds
+    return Deadline(min(seconds, settings.request_max_deadline_seconds) if seconds else None)
+
+
+def _hard_timeout(deadline: Deadline) -> Optional[float]:
+    """Seconds until a turn still running past its deadline is cancelled outright."""
+    remaining = deadline.remaining()
+    if remaining is None:
+        return None
+    return max(0.0, remaining) + get_settings().request_deadline_grace_seconds
+
+
+async def _answer(
+    message: str, thread_id: str, config: dict, priority: str, deadline: Deadline
+) -> tuple[str, str, Optional[str], bool]:
     """
-    Detect which agent type handled the query based on tool calls.
+    Run the orchestrator for one user message.
+    
+    Past the deadline the agents answer with what they have; a run still
+    going request_deadline_grace_seconds later is cancelled and its turn
+    closed with a fallback answer.
     
     Args:
-        messages: List of messages from agent response
-        
+        message: User message
+        thread_id: Conversation thread ID
+        config: Run config with the thread_id
+        priority: Admission priority (INTERACTIVE or BATCH)
+        deadline: Deadline of the turn
+    
     Returns:
-        Agent type string (policy, technical, billing, dad_joke) or None
-    """
-    # Look for tool calls in messages (reverse order to get most recent)
-    for msg in reversed(messages):
-        # Check if message has tool_calls attribute (OpenAI format)
-        if hasattr(msg, 'tool_calls') and msg.tool_calls:
-            for tool_call in msg.tool_calls:
-                tool_name = tool_call.get('name', '').lower()
-                # Exact match first, then substring match
-                if 'handle_policy_query' in tool_name or ('policy' in tool_name and 'query' in tool_name):
-                    return "policy"
-                elif 'handle_technical_query' in tool_name or ('technical' in tool_name and 'query' in tool_name):
-                    return "technical"
-                elif 'handle_billing_query' in tool_name or ('billing' in tool_name and 'query' in tool_name):
-                    return "billing"
-                elif 'handle_dad_joke' in tool_name or 'dad_joke' in tool_name:
-                    return "dad_joke"
+        (thread_id, response content, agent type, partial)
+    
+    Raises:
+        AdmissionRejected: If the request is shed under load
+    """
+    # Get orchestrator agent
+    orchestrator = get_orchestrator()
+    
+    # Invoke orchestrator with user message (async so the event loop and
+    # async checkpointer methods are not blocked)
+    async with admitted(priority):
+        logger.info("Chat Endpoint: Invoking orchestrator")
+        with deadline_scope(deadline):
+            hard_timeout = asyncio.timeout(_hard_timeout(deadline))
+            try:
+                async with hard_timeout:
+                    result = await orchestrator.ainvoke({"messages": [{"role": "user", "content": message}]}, config)
+            except TimeoutError:
+                if not hard_timeout.expired():
+                    raise
+                deadline.cancel("deadline")
+                logger.warning("Chat Endpoint: Turn still running past its deadline, cancelled")
+                result = await close_interrupted_turn(config)
+            except asyncio.CancelledError:
+                deadline.cancel("cancelled")
+                await close_interrupted_turn(config)
+                raise
+    
+    response_content = _response_content(result)
+    
+    agent_type = result.get("current_agent")
+    logger.info(f"Chat Endpoint: Detected agent_type={agent_type}")
+    return thread_id, response_content, agent_type, deadline.expired
+
+
+async def _unless_disconnected(http_request: Request, deadline: Deadline, work: Awaitable):
+    """
+    Await work, cancelling it (and its upstream calls) if the client disconnects first.
+    
+    Raises:
+        RequestCancelled: If the client disconnected
+    """
+    task = asyncio.ensure_future(work)
+    interval = get_settings().disconnect_poll_interval_seconds
+    try:
+        while not task.done():
+            await asyncio.wait({task}, timeout=interval)
+            if not task.done() and await http_request.is_disconnected():
+                logger.info("Chat Endpoint: Client disconnected, cancelling the turn")
+                deadline.cancel("disconnected")
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                raise RequestCancelled("disconnected")
+        return task.result()
+    finally:
+        task.cancel()
+
+
+async def _under_deadline(events: AsyncIterator, deadline: Deadline) -> AsyncIterator:
+    """
+    Pass events through from a source that runs under a deadline.
+    
+    The source runs in its own task with the deadline in its context, so it
+    can be cancelled wherever it is waiting and the hard timeout never fires
+    inside the consumer's code.
+    
+    Raises:
+        asyncio.TimeoutError: If the source is still running past the hard timeout
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    end = object()
+    
+    async def produce():
+        with deadline_scope(deadline):
+            try:
+                async for item in events:
+                    queue.put_nowait(item)
+            finally:
+                queue.put_nowait(end)
+    
+    task = asyncio.create_task(produce())
+    loop = asyncio.get_running_loop()
+    timeout = _hard_timeout(deadline)
+    expires_at = loop.time() + timeout if timeout is not None else None
+    try:
+        while True:
+            remaining = max(0.0, expires_at - loop.time()) if expires_at is not None else None
+            # asyncio.timeout rather than wait_for, which can swallow a
+            # cancellation that arrives together with the next event
+            async with asyncio.timeout(remaining):
+                item = await queue.get()
+            if item is end:
+                await task  # Raises the source's error, if any
+                return
+            yield item
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+async def _release_after(slot: contextlib.AsyncExitStack, events: AsyncIterator) -> AsyncIterator:
+    """Pass events through, releasing the admission slot when they end."""
+    async with slot:
+        async for item in events:
+            yield item
+
+
+async def _v2_events(
+    message: str, thread_id: str, config: dict, deadline: Deadline
+) -> AsyncIterator[tuple[str, dict]]:
+    """
+    Run the orchestrator and produce its answer as protocol v2 events.
+    
+    Status events follow the orchestrator's steps: routing (choosing a
+    specialist), retrieving (specialist running) and composing (final
+    answer). Specialists that stream their answer (the policy agent's
+    structured output) send deltas while they are still generating; the
+    orchestrator's final message only adds what they did not already send.
+    Failures after the stream started are sent as an error event.
+    An answer cut short by the deadline ends with a done event marked
+    "partial"; cancelling the consumer cancels the run.
+    
+    Yields:
+        (event, data) pairs, framed and buffered by the stream registry
+    """
+    settings = get_settings()
+    started = time.perf_counter()
+    agent_type = None
+    result = None
+    streamed: list[str] = []
+    pending = DeltaCoalescer(settings.sse_flush_max_chars, settings.sse_flush_interval_ms / 1000)
+    yield "status", {"stage": "routing"}
+    try:
+        with get_usage_metadata_callback() as usage, streaming_answers():
+            updates = get_orchestrator().astream(
+                {"messages": [{"role": "user", "content": message}]},
+                config,
+                stream_mode=["updates", "values", "custom"]
+            )
+            try:
+                async with contextlib.aclosing(_under_deadline(updates, deadline)) as steps:
+                    async for mode, chunk in steps:
+                        if mode == "values":
+                            result = chunk
+                        elif mode == "custom":
+                            # Specialist answer text, as it is generated
+                            if not isinstance(chunk, dict) or not chunk.get("delta"):
+                                continue
+                            if not streamed:
+                                yield "status", {"stage": "composing"}
+                            streamed.append(chunk["delta"])
+                            for text in pending.add(chunk["delta"]):
+                                yield "delta", {"text": text}
+                        elif "model" in chunk and agent_type is None:
+                            agent_type = (chunk["model"] or {}).get("current_agent")
+                            if agent_type:
+                                yield "meta", {"thread_id": thread_id, "agent_type": agent_type}
+                                yield "status", {"stage": "retrieving", "agent_type": agent_type}
+                        elif "tools" in chunk and not streamed:
+                            yield "status", {"stage": "composing"}
+            except asyncio.TimeoutError:
+                deadline.cancel("deadline")
+                logger.warning("Chat Endpoint: Stream still running past its deadline, cancelled")
+                result = await close_interrupted_turn(config)
+        
+        response_content = _response_content(result)
+        if agent_type is None:
+            # Not routed this turn (e.g. a greeting), or closed after the deadline
+            agent_type = result.get("current_agent")
+            yield "meta", {"thread_id": thread_id, "agent_type": agent_type}
+        logger.info(f"Chat Endpoint: Detected agent_type={agent_type}")
         
-        # Check if this is a ToolMessage - they contain the tool name in metadata
-        if hasattr(msg, 'name') and msg.name:
-            tool_name = msg.name.lower()
-            if 'handle_policy_query' in tool_name:
-                return "policy"
-            elif 'handle_technical_query' in tool_name:
-                return "technical"
-            elif 'handle_billing_query' in tool_name:
-                return "billing"
-            elif 'handle_dad_joke' in tool_name:
-                return "dad_joke"
-    
-    # Fallback: Check message content for explicit tool function names (not keywords)
-    for msg in reversed(messages):
-        if hasattr(msg, 'content') and msg.content:
-            content = str(msg.content)
-            # Only check for exact tool function names, not keywords
-            if 'handle_policy_query' in content:
-                return "policy"
-            elif 'handle_technical_query' in content:
-                return "technical"
-            elif 'handle_billing_query' in content:
-                return "billing"
-            elif 'handle_dad_joke_request' in content:
-                return "dad_joke"
-    
-    return None
+        rest = response_content
+        if streamed:
+            sent = "".join(streamed)
+            if response_content.startswith(sent):
+                rest = response_content[len(sent):]
+            else:
+                # The orchestrator was told to return the specialist's answer
+                # verbatim; the streamed answer stands
+                logger.info("Chat Endpoint: Final message differs from the streamed answer, keeping the latter")
+                rest = ""
+            response_content = sent + rest
+        
+        async def answer():
+            yield pending.flush()
+            yield rest
+        
+        async for text in coalesce(answer(), settings.sse_flush_max_chars, settings.sse_flush_interval_ms / 1000):
+            yield "delta", {"text": text}
+        done = {
+            "usage": _total_usage(usage.usage_metadata),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            "chars": len(response_content),
+        }
+        if deadline.expired:
+            done["partial"] = True
+        yield "done", done
+    except (asyncio.CancelledError, GeneratorExit):
+        # Consumer gone (turn cancelled, stream abandoned): stop the run and
+        # close the turn so the thread stays valid
+        deadline.cancel("cancelled")
+        await close_interrupted_turn(config)
+        raise
+    except (CircuitOpenError, UpstreamBusyError) as e:
+        logger.warning(f"Chat Endpoint: {e}")
+        yield "error", {"detail": str(e), "status": 503, "retry_after": max(1, math.ceil(e.retry_after))}
+    except Exception as e:
+        logger.error(f"Chat Endpoint: Stream failed: {e}")
+        yield "error", {"detail": f"Error processing chat request: {str(e)}", "status": 500}
 
 
 @router.post("", response_model=None)
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, http_request: Request):
     """
     Chat endpoint that routes queries to appropriate specialist agents.
     
     Supports both streaming and non-streaming responses.
-    Uses thread_id for conversation persistence.
+    Uses thread_id for conversation persistence. Streams use protocol v1
+    unless v2 is requested (see app.api.sse); v2 streams can be resumed by
+    sending the same thread_id with a Last-Event-ID header. Requests with an
+    idempotency key run once; retries get the same answer.
+    
+    Each turn has a deadline (deadline_seconds or REQUEST_DEADLINE_SECONDS);
+    past it the answer is partial or a fallback. A client that disconnects
+    while its answer is computed cancels the turn, including the specialist
+    and model calls in flight (abandoned v2 streams after
+    SSE_DISCONNECT_GRACE_SECONDS; requests with an idempotency key run on
+    for their retries).
     
     Args:
-        request: ChatRequest with message, thread_id, and stream flag
+        request: ChatRequest with message, thread_id, stream flag and protocol
+        http_request: Raw request (Accept, Last-Event-ID and Idempotency-Key headers)
         
     Returns:
         StreamingResponse if stream=True, else ChatResponse
     """
+    last_event_id = http_request.headers.get("last-event-id")
+    if request.stream and last_event_id:
+        # Reconnect to a v2 stream: replay the missed events (and follow the
+        # generation if it is still running) instead of re-running the turn
+        try:
+            events = get_stream_registry().resume(request.thread_id or "", last_event_id)
+        except ResumeError as e:
+            logger.info(f"Chat Endpoint: {e}")
+            raise HTTPException(status_code=410, detail=f"{e}. Send the message again without Last-Event-ID.")
+        return StreamingResponse(events, media_type="text/event-stream", headers=_SSE_HEADERS)
+    
     try:
         # Get or generate thread_id
         thread_id = request.thread_id or _generate_thread_id()
         config = {"configurable": {"thread_id": thread_id}}
         
         logger.info(f"Chat Endpoint: Received message=\"{request.message}\", thread_id={thread_id}")
+        deadline = _deadline(request.deadline_seconds)
         
-        # Get orchestrator agent
-        orchestrator = get_orchestrator()
-        
-        # Invoke orchestrator with user message
-        logger.info("Chat Endpoint: Invoking orchestrator")
-        result = orchestrator.invoke(
-            {"messages": [{"role": "user", "content": request.message}]},
-            config
+        protocol = negotiate_protocol(
+            request.protocol, http_request.headers.get("accept"), get_settings().sse_default_protocol
         )
+        idempotency_key = request.idempotency_key or http_request.headers.get("idempotency-key")
+        if request.stream and protocol == "v2":
+            # The orchestrator runs in a background task so routing progress can be
+            # reported and a dropped client can resume the turn
+            async def start_stream():
+                # Admitted before responding, so shed requests get a plain 429/503
+                slot = contextlib.AsyncExitStack()
+                await slot.enter_async_context(admitted(INTERACTIVE))
+                events = _v2_events(request.message, thread_id, config, deadline)
+                return get_stream_registry().start(thread_id, _release_after(slot, events))
+            
+            if idempotency_key:
+                # Retries replay the same turn's events from the start
+                buffer = await get_idempotency_store().run(
+                    idempotency_key, (request.thread_id, request.message, "v2"), start_stream
+                )
+            else:
+                buffer = await start_stream()
+            return StreamingResponse(buffer.subscribe(), media_type="text/event-stream", headers=_SSE_HEADERS)
         
-        # Log result structure
-        log_dict_keys(logger, result, prefix="Chat Endpoint: Orchestrator result ")
-        
-        # Get response - prefer structured response if available
-        structured_content = _format_structured_response(result)
-        has_structured = structured_content is not None
-        logger.info(f"Chat Endpoint: Structured response available={has_structured}")
-        
-        if structured_content:
-            logger.info(f"Chat Endpoint: Using structured response, length={len(structured_content)} chars")
-            response_content = structured_content
+        # Streams are interactive; plain JSON requests yield to them under load
+        priority = INTERACTIVE if request.stream else BATCH
+        if idempotency_key:
+            # JSON and v1 retries share one execution (the thread_id of the
+            # first request is returned when none was given)
+            thread_id, response_content, agent_type, partial = await get_idempotency_store().run(
+                idempotency_key,
+                (request.thread_id, request.message, "answer"),
+                lambda: _answer(request.message, thread_id, config, priority, deadline)
+            )
         else:
-            logger.info("Chat Endpoint: Using message content (no structured response)")
-            response_content = result["messages"][-1].content
-        
-        log_truncated(logger, response_content, prefix="Chat Endpoint: Final response content: ", max_chars=200)
-        
-        agent_type = _detect_agent_type(result["messages"])
-        logger.info(f"Chat Endpoint: Detected agent_type={agent_type}")
+            thread_id, response_content, agent_type, partial = await _unless_disconnected(
+                http_request, deadline, _answer(request.message, thread_id, config, priority, deadline)
+            )
         
         # Handle streaming vs non-streaming
         if request.stream:
@@ -187,10 +458,7 @@ async def chat_endpoint(request: ChatRequest):
             return StreamingResponse(
                 stream_response(),
                 media_type="text/event-stream",
-                headers={
-                    "Cache-Control": "no-cache",
-                    "Connection": "keep-alive",
-                }
+                headers=_SSE_HEADERS
             )
         else:
             # Return non-streaming response
@@ -198,12 +466,278 @@ async def chat_endpoint(request: ChatRequest):
             return ChatResponse(
                 response=response_content,
                 thread_id=thread_id,
-                agent_type=agent_type
+                agent_type=agent_type,
+                partial=partial
             )
             
+    except RequestCancelled as e:
+        # Nobody is left to read the response
+        raise HTTPException(status_code=499, detail=str(e))
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except AdmissionRejected as e:
+        # Shed under load: fail fast instead of queueing without bound
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))}
+        )
+    except (CircuitOpenError, UpstreamBusyError) as e:
+        # Provider is unhealthy (or saturated) and no fallback was available: fail fast
+        logger.warning(f"Chat Endpoint: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error processing chat request: {str(e)}"
         )
 
+
+async def _ndjson(lines: AsyncIterator[dict]) -> AsyncIterator[str]:
+    """Frame dicts as NDJSON lines (closing the source when the response ends)."""
+    async with contextlib.aclosing(lines) as lines:
+        async for line in lines:
+            yield dumps(line) + "\n"
+
+
+@router.post("/batch", response_model=None)
+async def chat_batch_endpoint(request: ChatBatchRequest):
+    """
+    Answer many independent messages, streaming results as NDJSON.
+    
+    Messages are answered with bounded parallelism (concurrency, at most
+    BATCH_MAX_CONCURRENCY), grouped by domain so related messages share
+    retrieval, each on its own thread unless one is given (messages sharing
+    a thread_id run one at a time, in request order). Each completed
+    message is one line ({"type": "result"} or {"type": "error"}, in
+    completion order, with the item's index and id); a final
+    {"type": "summary"} line reports throughput, token usage and per-domain
+    latency. Messages run at batch priority; disconnecting cancels the
+    messages still running.
+    
+    Args:
+        request: ChatBatchRequest with the messages, concurrency and per-message deadline
+        
+    Returns:
+        StreamingResponse of application/x-ndjson lines
+    """
+    settings = get_settings()
+    if len(request.items) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch has {len(request.items)} messages, the limit is {settings.batch_max_items}"
+        )
+    concurrency = min(request.concurrency or settings.batch_max_concurrency, settings.batch_max_concurrency)
+    
+    async def answer(item: ChatBatchItem) -> tuple[str, str, Optional[str], bool]:
+        thread_id = item.thread_id or _generate_thread_id()
+        config = {"configurable": {"thread_id": thread_id}}
+        return await _answer(item.message, thread_id, config, BATCH, _deadline(request.deadline_seconds))
+    
+    logger.info(f"Chat Endpoint: Batch of {len(request.items)} messages, concurrency={concurrency}")
+    return StreamingResponse(
+        _ndjson(run_batch(request.items, answer, concurrency)),
+        media_type="application/x-ndjson"
+    )
+
+
+async def _job_events(message: str, thread_id: str, deadline_seconds: Optional[float]) -> AsyncIterator:
+    """v2 events of a job's turn (batch priority; the deadline starts when the turn does)."""
+    async with admitted(BATCH):
+        config = {"configurable": {"thread_id": thread_id}}
+        deadline = _deadline(deadline_seconds)
+        async with contextlib.aclosing(_v2_events(message, thread_id, config, deadline)) as events:
+            async for item in events:
+                yield item
+
+
+def _job(job_id: str) -> Job:
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found (unknown or expired)")
+    return job
+
+
+def _job_response(job: Job) -> ChatJobResponse:
+    return ChatJobResponse(**job.snapshot(get_job_manager().position(job)))
+
+
+@router.post("/jobs", status_code=202, response_model=ChatJobResponse)
+async def create_chat_job(request: ChatJobRequest, response: Response):
+    """
+    Submit a chat turn as a background job.
+    
+    Returns right away with the job id; the turn runs on a bounded worker
+    pool. Poll GET /chat/jobs/{job_id} for the result, or follow
+    GET /chat/jobs/{job_id}/events for its progress.
+    
+    Args:
+        request: ChatJobRequest with message, thread_id and deadline
+        response: Response (Location header of the job)
+        
+    Returns:
+        ChatJobResponse of the queued job (202)
+    """
+    thread_id = request.thread_id or _generate_thread_id()
+    logger.info(f"Chat Endpoint: Job for message=\"{request.message}\", thread_id={thread_id}")
+    try:
+        job = await get_job_manager().submit(
+            thread_id, lambda: _job_events(request.message, thread_id, request.deadline_seconds)
+        )
+    except JobRejected as e:
+        headers = {"Retry-After": str(math.ceil(e.retry_after))} if e.retry_after else None
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=headers)
+    response.headers["Location"] = f"/chat/jobs/{job.id}"
+    return _job_response(job)
+
+
+@router.get("/jobs/{job_id}", response_model=ChatJobResponse)
+async def get_chat_job(job_id: str):
+    """
+    Get a job's status, progress and (once finished) result.
+    
+    Args:
+        job_id: Job ID
+        
+    Returns:
+        ChatJobResponse
+    """
+    return _job_response(_job(job_id))
+
+
+@router.get("/jobs/{job_id}/events")
+async def chat_job_events(job_id: str, http_request: Request):
+    """
+    Follow a job's progress as a protocol v2 event stream.
+    
+    Replays the job's events from the start (or after Last-Event-ID) and
+    follows it until it finishes: status (queued, routing, retrieving,
+    composing), meta, delta, then done, error or cancelled. Disconnecting
+    does not cancel the job.
+    
+    Args:
+        job_id: Job ID
+        http_request: Raw request (Last-Event-ID header)
+        
+    Returns:
+        StreamingResponse of SSE events
+    """
+    job = _job(job_id)
+    last_seq = -1
+    last_event_id = http_request.headers.get("last-event-id")
+    if last_event_id:
+        try:
+            turn_id, last_seq = parse_event_id(last_event_id)
+            if turn_id != job.events.turn_id:
+                raise ResumeError(f"Last-Event-ID {last_event_id!r} is not an event of {job_id}")
+            job.events.check_resumable(last_seq)
+        except ResumeError as e:
+            raise HTTPException(status_code=410, detail=f"{e}. Reconnect without Last-Event-ID.")
+    return StreamingResponse(job.events.subscribe(last_seq), media_type="text/event-stream", headers=_SSE_HEADERS)
+
+
+@router.delete("/jobs/{job_id}", response_model=ChatJobResponse)
+async def cancel_chat_job(job_id: str):
+    """
+    Cancel a waiting or running job (finished jobs are left as they are).
+    
+    Args:
+        job_id: Job ID
+        
+    Returns:
+        ChatJobResponse after cancellation
+    """
+    job = _job(job_id)
+    await get_job_manager().cancel(job)
+    return _job_response(job)
+
+
+@router.websocket("/ws")
+async def chat_websocket(websocket: WebSocket):
+    """
+    WebSocket chat endpoint: one connection, many conversations.
+    
+    Clients send JSON frames (ChatSocketFrame): {"type": "chat", "id",
+    "message", "thread_id"} starts a turn, {"type": "cancel", "id"} stops
+    it. Turns on different threads run concurrently; the server answers
+    with the v2 stream events of each turn as flat JSON frames tagged with
+    the turn id, e.g. {"id": "t1", "type": "delta", "text": "..."}, ending
+    with "done", "error" or "cancelled".
+    
+    Args:
+        websocket: Client connection
+    """
+    await websocket.accept()
+    _ws_connections.inc()
+    settings = get_settings()
+    send_lock = asyncio.Lock()
+    turns: dict[str, tuple[str, asyncio.Task]] = {}  # turn id -> (thread_id, task)
+    
+    async def send(frame: dict) -> None:
+        # Turns send concurrently; keep frames whole
+        async with send_lock:
+            await websocket.send_text(dumps(frame))
+    
+    async def run_turn(turn_id: str, message: str, thread_id: str, deadline: Deadline) -> None:
+        config = {"configurable": {"thread_id": thread_id}}
+        try:
+            async with admitted(INTERACTIVE):
+                # Closed deterministically so a cancelled turn stops its run right away
+                async with contextlib.aclosing(_v2_events(message, thread_id, config, deadline)) as events:
+                    async for event, data in events:
+                        await send({"id": turn_id, "type": event, **data})
+            _ws_turns.inc(outcome="completed")
+        except AdmissionRejected as e:
+            await reject(turn_id, str(e), e.status_code, retry_after=math.ceil(e.retry_after))
+        except asyncio.CancelledError:
+            _ws_turns.inc(outcome="cancelled")
+            logger.info(f"Chat WebSocket: Turn {turn_id} on {thread_id} cancelled")
+            with contextlib.suppress(Exception):
+                await send({"id": turn_id, "type": "cancelled"})
+        finally:
+            turns.pop(turn_id, None)
+    
+    async def reject(turn_id: Optional[str], detail: str, status: int, **extra) -> None:
+        _ws_turns.inc(outcome="rejected")
+        await send({"id": turn_id, "type": "error", "detail": detail, "status": status, **extra})
+    
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                frame = ChatSocketFrame.model_validate_json(raw)
+            except ValidationError as e:
+                await reject(None, f"Invalid frame: {e.errors()[0]['msg']}", 400)
+                continue
+            
+            if frame.type == "cancel":
+                if frame.id in turns:
+                    turns[frame.id][1].cancel()
+                continue
+            
+            thread_id = frame.thread_id or _generate_thread_id()
+            if not frame.message:
+                await reject(frame.id, "message is required", 400)
+            elif frame.id in turns:
+                await reject(frame.id, f"Turn {frame.id} is already running", 409)
+            elif any(busy == thread_id for busy, _ in turns.values()):
+                # One turn at a time per thread keeps its history consistent
+                await reject(frame.id, f"Thread {thread_id} already has a turn in progress", 409)
+            elif len(turns) >= settings.ws_max_turns_per_connection:
+                await reject(frame.id, "Too many turns in progress on this connection", 429)
+            else:
+                logger.info(f"Chat WebSocket: Turn {frame.id} message=\"{frame.message}\", thread_id={thread_id}")
+                deadline = _deadline(frame.deadline_seconds)
+                turns[frame.id] = (
+                    thread_id, asyncio.create_task(run_turn(frame.id, frame.message, thread_id, deadline))
+                )
+    except WebSocketDisconnect:
+        logger.info(f"Chat WebSocket: Client disconnected with {len(turns)} turn(s) in progress")
+    finally:
+        _ws_connections.dec()
+        for _, task in list(turns.values()):
+            task.cancel()
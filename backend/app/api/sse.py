@@ -0,0 +1,398 @@
+"""
+Server-sent events encoding for /chat streams.
+
+Protocol v1 sends one ChatStreamChunk per word (repeating thread_id,
+agent_type and done every time) followed by "data: [DONE]". Protocol v2
+sends typed events and keeps per-delta payloads to the text itself:
+
+    event: meta     {"thread_id": ..., "agent_type": ...}       once
+    event: status   {"stage": "routing" | "retrieving" | "composing"}
+    event: delta    {"text": ...}                                answer text
+    event: done     {"usage": {...}, "elapsed_ms": ..., "chars": ...}
+                    (+ "partial": true if the deadline cut the answer short)
+    event: error    {"detail": ..., "status": ...}               instead of done
+
+Concatenating the delta texts gives the exact answer (whitespace included).
+Delta text is coalesced: pieces are buffered and flushed once the buffer
+reaches a size limit or has waited for the flush interval.
+
+v2 streams are resumable. Each event has an id "<turn_id>:<seq>" and the
+events of a turn are kept in a bounded StreamBuffer while the generation
+runs in its own task, independent of the client connection. A client that
+reconnects with the same thread_id and a Last-Event-ID header gets the
+events it missed and then follows the still-running generation, without
+re-running the turn. Buffers expire SSE_RESUME_TTL_SECONDS after the turn
+finished. A turn that nobody has been subscribed to for
+SSE_DISCONNECT_GRACE_SECONDS is cancelled, so an abandoned stream stops
+spending tokens.
+
+LangChain Version: v1.0+
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterable, AsyncIterator, Optional
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
+
+logger = get_logger("sse")
+
+try:
+    import orjson
+except ImportError:  # Optional dependency, json is used instead
+    orjson = None
+
+
+def dumps(data: Any) -> str:
+    """Compact JSON (orjson when installed)."""
+    if orjson is not None:
+        return orjson.dumps(data).decode("utf-8")
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def format_event(event: str, data: Any, event_id: Optional[str] = None) -> str:
+    """Frame one typed SSE event."""
+    if event_id is not None:
+        return f"id: {event_id}\nevent: {event}\ndata: {dumps(data)}\n\n"
+    return f"event: {event}\ndata: {dumps(data)}\n\n"
+
+
+def negotiate_protocol(requested: Optional[str], accept: Optional[str], default: str) -> str:
+    """
+    Pick the stream protocol for a request.
+
+    An explicit request field wins, then a version parameter on the
+    text/event-stream media type in the Accept header
+    (e.g. 'text/event-stream; version=2'), then the configured default.
+    """
+    if requested:
+        return requested
+    for media_range in (accept or "").split(","):
+        media_type, *params = media_range.split(";")
+        if media_type.strip().lower() != "text/event-stream":
+            continue
+        for param in params:
+            key, _, value = param.partition("=")
+            version = value.strip().strip('"')
+            if key.strip().lower() == "version" and version in ("1", "2"):
+                return f"v{version}"
+    return default
+
+
+def _split(text: str, max_chars: int) -> tuple[list[str], str]:
+    """Cut full chunks of about max_chars off text (at whitespace where possible)."""
+    chunks = []
+    while len(text) >= max_chars:
+        cut = max(text.rfind(" ", 0, max_chars), text.rfind("\n", 0, max_chars)) + 1
+        if cut <= 0:
+            cut = max_chars
+        chunks.append(text[:cut])
+        text = text[cut:]
+    return chunks, text
+
+
+async def coalesce(pieces: AsyncIterable[str], max_chars: int, interval_seconds: float) -> AsyncIterator[str]:
+    """
+    Merge small text pieces into fewer, larger flushes.
+
+    Buffered text is flushed once it reaches max_chars (cut at whitespace)
+    or interval_seconds after the oldest buffered piece arrived, whichever
+    comes first, so slow producers still reach the client promptly.
+
+    Args:
+        pieces: Text pieces in order (tokens, words or a whole answer)
+        max_chars: Flush size
+        interval_seconds: Longest time text waits in the buffer
+
+    Yields:
+        Coalesced text; the concatenation equals the concatenated input
+    """
+    loop = asyncio.get_running_loop()
+    iterator = pieces.__aiter__()
+    pending: Optional[asyncio.Future] = None
+    buffer, deadline = "", 0.0
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            timeout = max(0.0, deadline - loop.time()) if buffer else None
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                # Interval elapsed while waiting for the next piece
+                yield buffer
+                buffer = ""
+                continue
+            future, pending = pending, None
+            try:
+                piece = future.result()
+            except StopAsyncIteration:
+                break
+            if not piece:
+                continue
+            if not buffer:
+                deadline = loop.time() + interval_seconds
+            buffer += piece
+            chunks, buffer = _split(buffer, max_chars)
+            for chunk in chunks:
+                yield chunk
+            if buffer and loop.time() >= deadline:
+                yield buffer
+                buffer = ""
+        if buffer:
+            yield buffer
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+class DeltaCoalescer:
+    """
+    Same flushing as coalesce(), for text that arrives between other events.
+
+    The caller pushes pieces as they arrive and sends what add() returns;
+    the flush interval is checked when a piece arrives, and flush() sends
+    the rest (e.g. before a status event or at the end of the answer).
+    """
+
+    def __init__(self, max_chars: int, interval_seconds: float):
+        self.max_chars = max_chars
+        self.interval_seconds = interval_seconds
+        self._buffer = ""
+        self._deadline = 0.0
+
+    def add(self, piece: str) -> list[str]:
+        """Buffer a piece; returns the text due for sending."""
+        if not piece:
+            return []
+        now = time.monotonic()
+        if not self._buffer:
+            self._deadline = now + self.interval_seconds
+        chunks, self._buffer = _split(self._buffer + piece, self.max_chars)
+        if self._buffer and now >= self._deadline:
+            chunks.append(self.flush())
+        return chunks
+
+    def flush(self) -> str:
+        """Take the buffered text."""
+        buffer, self._buffer = self._buffer, ""
+        return buffer
+
+
+_resumes = get_metrics().counter("sse_resumes_total", "Stream resume attempts by outcome")
+
+
+class ResumeError(Exception):
+    """A stream cannot be resumed from the requested event."""
+
+
+def parse_event_id(event_id: str) -> tuple[str, int]:
+    """
+    Split a v2 event id into (turn_id, seq).
+
+    Raises:
+        ResumeError: If the id is not a v2 event id
+    """
+    turn_id, _, seq = event_id.strip().rpartition(":")
+    if not turn_id or not seq.isdigit():
+        raise ResumeError(f"Invalid Last-Event-ID: {event_id!r}")
+    return turn_id, int(seq)
+
+
+class StreamBuffer:
+    """
+    Events of one streamed turn, replayable from any retained event.
+
+    Keeps the last max_events framed events; subscribers read from a
+    sequence number and then wait for new events until the turn finishes.
+    """
+
+    def __init__(self, thread_id: str, max_events: int, abandon_after: Optional[float] = None):
+        """
+        Initialize stream buffer.
+
+        Args:
+            thread_id: Conversation thread the turn belongs to
+            max_events: Number of most recent events kept for replay
+            abandon_after: Cancel the running turn once it has had no
+                subscriber for this many seconds (None to never cancel)
+        """
+        self.thread_id = thread_id
+        self.turn_id = f"turn_{uuid.uuid4().hex[:12]}"
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self.abandon_after = abandon_after
+        self._events: deque = deque(maxlen=max_events)
+        self._next_seq = 0
+        self._subscribers = 0
+        self._changed = asyncio.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    async def append(self, event: str, data: Any) -> None:
+        """Frame an event with the next id and wake subscribers."""
+        frame = format_event(event, data, f"{self.turn_id}:{self._next_seq}")
+        async with self._changed:
+            self._events.append((self._next_seq, frame))
+            self._next_seq += 1
+            self._changed.notify_all()
+
+    async def finish(self) -> None:
+        """Mark the turn finished (subscribers end after the last event)."""
+        async with self._changed:
+            self.finished_at = time.monotonic()
+            self._changed.notify_all()
+
+    async def pump(self, events: AsyncIterator[tuple[str, Any]]) -> None:
+        """Append (event, data) pairs until the source ends."""
+        try:
+            async for event, data in events:
+                await self.append(event, data)
+        finally:
+            await self.finish()
+
+    def check_resumable(self, last_seq: int) -> None:
+        """
+        Raises:
+            ResumeError: If events after last_seq were already dropped
+        """
+        oldest = self._events[0][0] if self._events else self._next_seq
+        if last_seq + 1 < oldest:
+            raise ResumeError(f"Events after {self.turn_id}:{last_seq} are no longer buffered")
+
+    async def subscribe(self, last_seq: int = -1) -> AsyncIterator[str]:
+        """
+        Framed events after last_seq, following the turn until it finishes.
+
+        Args:
+            last_seq: Sequence number of the last event the client has (-1 for all)
+        """
+        self._subscribers += 1
+        try:
+            while True:
+                async with self._changed:
+                    frames = [(seq, frame) for seq, frame in self._events if seq > last_seq]
+                    if not frames:
+                        if self.finished:
+                            return
+                        await self._changed.wait()
+                        continue
+                last_seq = frames[-1][0]
+                for _, frame in frames:
+                    yield frame
+        finally:
+            self._subscribers -= 1
+            if not self._subscribers and not self.finished and self.abandon_after is not None:
+                asyncio.get_running_loop().call_later(self.abandon_after, self._cancel_if_abandoned)
+
+    def _cancel_if_abandoned(self) -> None:
+        if self._subscribers or self.finished or self.task is None:
+            return
+        logger.info(f"SSE: No client reconnected to {self.turn_id} within {self.abandon_after}s, cancelling it")
+        self.task.cancel()
+
+
+class StreamRegistry:
+    """
+    Bounded, TTL-expiring index of stream buffers by (thread_id, turn_id).
+
+    Finished turns expire after ttl_seconds; past max_streams the oldest
+    buffers (finished ones first) are dropped.
+    """
+
+    def __init__(
+        self, max_streams: int, max_events: int, ttl_seconds: float, abandon_after: Optional[float] = None
+    ):
+        """
+        Initialize stream registry.
+
+        Args:
+            max_streams: Maximum number of turns kept
+            max_events: Events kept per turn
+            ttl_seconds: How long a finished turn stays resumable
+            abandon_after: Cancel running turns left without a subscriber this long
+        """
+        self.max_streams = max_streams
+        self.max_events = max_events
+        self.ttl_seconds = ttl_seconds
+        self.abandon_after = abandon_after
+        self._streams: "OrderedDict[tuple[str, str], StreamBuffer]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+    def start(self, thread_id: str, events: AsyncIterator[tuple[str, Any]]) -> StreamBuffer:
+        """
+        Run an event source in the background, buffering its events.
+
+        Args:
+            thread_id: Conversation thread of the turn
+            events: Source of (event, data) pairs
+
+        Returns:
+            StreamBuffer to subscribe to
+        """
+        self._prune()
+        buffer = StreamBuffer(thread_id, self.max_events, self.abandon_after)
+        self._streams[(thread_id, buffer.turn_id)] = buffer
+        buffer.task = asyncio.create_task(buffer.pump(events))
+        return buffer
+
+    def resume(self, thread_id: str, last_event_id: str) -> AsyncIterator[str]:
+        """
+        Events after last_event_id of a buffered turn on thread_id.
+
+        Raises:
+            ResumeError: If the turn is unknown, expired or has dropped the events
+        """
+        self._prune()
+        try:
+            turn_id, last_seq = parse_event_id(last_event_id)
+            buffer = self._streams.get((thread_id, turn_id))
+            if buffer is None:
+                raise ResumeError(f"No resumable stream for {last_event_id!r} on thread {thread_id}")
+            buffer.check_resumable(last_seq)
+        except ResumeError:
+            _resumes.inc(outcome="failed")
+            raise
+        _resumes.inc(outcome="live" if not buffer.finished else "replayed")
+        logger.info(f"SSE: Resuming {buffer.turn_id} after event {last_seq} (finished={buffer.finished})")
+        return buffer.subscribe(last_seq)
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        for key, buffer in list(self._streams.items()):
+            if buffer.finished and now - buffer.finished_at > self.ttl_seconds:
+                del self._streams[key]
+        while len(self._streams) >= self.max_streams:
+            finished = next((k for k, b in self._streams.items() if b.finished), None)
+            del self._streams[finished if finished is not None else next(iter(self._streams))]
+
+
+# Global registry instance
+_stream_registry: Optional[StreamRegistry] = None
+
+
+def get_stream_registry() -> StreamRegistry:
+    """
+    Get or create the global stream registry.
+
+    Returns:
+        StreamRegistry: Shared registry configured from settings
+    """
+    global _stream_registry
+    if _stream_registry is None:
+        settings = get_settings()
+        _stream_registry = StreamRegistry(
+            max_streams=settings.sse_resume_max_streams,
+            max_events=settings.sse_resume_max_events,
+            ttl_seconds=settings.sse_resume_ttl_seconds,
+            abandon_after=settings.sse_disconnect_grace_seconds,
+        )
+    return _stream_registry
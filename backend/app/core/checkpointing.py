@@ -5,8 +5,34 @@ LangChain Version: v1.0+
 Documentation Reference: https://docs.langchain.com/oss/python/langgraph/checkpoints
 """
 
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Protocol
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.checkpoint.memory import MemorySaver
-from typing import Protocol
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
+from app.core.serialization import get_serializer
+
+logger = get_logger("checkpointing")
+
+_metrics = get_metrics()
+_resident_threads = _metrics.gauge(
+    "checkpoint_resident_threads", "Threads currently held by the in-memory checkpointer"
+)
+_resident_bytes = _metrics.gauge(
+    "checkpoint_resident_bytes", "Serialized checkpoint, blob and write bytes held in memory"
+)
+_threads_evicted = _metrics.counter(
+    "checkpoint_threads_evicted_total", "Threads evicted from the in-memory checkpointer"
+)
+_checkpoints_pruned = _metrics.counter(
+    "checkpoint_checkpoints_pruned_total", "Old checkpoints dropped by the per-thread cap"
+)
 
 
 class CheckpointSaver(Protocol):
@@ -14,32 +40,320 @@ class CheckpointSaver(Protocol):
     pass
 
 
-def get_checkpointer() -> MemorySaver:
+def _typed_size(value: tuple) -> int:
+    """Byte size of a serialized (type, bytes) pair."""
+    return len(value[1]) if value and value[1] else 0
+
+
+class BoundedMemorySaver(MemorySaver):
+    """
+    In-memory checkpointer with bounded thread count and history.
+
+    - Threads are evicted least-recently-used first once max_threads is
+      exceeded, and after idle_ttl_seconds without any access.
+    - Only the latest max_checkpoints_per_thread checkpoints are kept per
+      thread/namespace; blobs no longer referenced by a kept checkpoint are
+      dropped with them. The app's state uses plain reducer channels, so
+      older checkpoints are not needed to rebuild the latest state.
+    - Subgraph namespaces (e.g. the tools:<task_id> namespace of each worker
+      agent run) are dropped once the root graph saves a checkpoint newer
+      than all of theirs, i.e. once the step that ran them has finished. A
+      thread at rest therefore holds at most max_checkpoints_per_thread
+      checkpoints in total, however many turns it has had.
+
+    Resident threads and bytes are exported as gauges.
+    """
+
+    def __init__(
+        self,
+        max_threads: int = 10000,
+        idle_ttl_seconds: float = 3600.0,
+        max_checkpoints_per_thread: int = 10,
+        **kwargs: Any
+    ):
+        """
+        Initialize bounded checkpointer.
+
+        Args:
+            max_threads: Maximum number of resident threads
+            idle_ttl_seconds: Evict threads not accessed for this long (0 disables)
+            max_checkpoints_per_thread: Latest checkpoints kept per thread/namespace
+            **kwargs: Passed to MemorySaver (e.g. serde)
+        """
+        super().__init__(**kwargs)
+        self.max_threads = max_threads
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_checkpoints_per_thread = max(2, max_checkpoints_per_thread)
+        self._lock = threading.RLock()
+        # thread_id -> last access time, least recently used first
+        self._last_access: "OrderedDict[str, float]" = OrderedDict()
+        # Per-thread bookkeeping so eviction never scans other threads
+        self._thread_bytes: dict[str, int] = {}
+        self._thread_write_keys: dict[str, set] = {}
+        self._thread_blob_keys: dict[str, set] = {}
+        # thread_id -> {(checkpoint_ns, checkpoint_id): channel_versions}
+        self._checkpoint_versions: dict[str, dict[tuple, dict]] = {}
+        self._total_bytes = 0
+        _resident_threads.set_function(lambda: len(self._last_access))
+        _resident_bytes.set_function(lambda: self._total_bytes)
+
+    # ------------------------------------------------------------------
+    # Bookkeeping helpers
+    # ------------------------------------------------------------------
+
+    def _add_bytes(self, thread_id: str, delta: int) -> None:
+        self._thread_bytes[thread_id] = self._thread_bytes.get(thread_id, 0) + delta
+        self._total_bytes += delta
+
+    def _touch(self, thread_id: str) -> None:
+        """Mark a thread as recently used and evict stale threads."""
+        now = time.monotonic()
+        self._last_access[thread_id] = now
+        self._last_access.move_to_end(thread_id)
+        self._evict(now, keep=thread_id)
+
+    def _evict(self, now: float, keep: Optional[str] = None) -> None:
+        """Evict idle threads and, if still over capacity, the least recently used."""
+        if self.idle_ttl_seconds > 0:
+            while self._last_access:
+                thread_id, last = next(iter(self._last_access.items()))
+                if thread_id == keep or now - last < self.idle_ttl_seconds:
+                    break
+                self._delete_thread_locked(thread_id)
+                _threads_evicted.inc(reason="ttl")
+        while len(self._last_access) > self.max_threads:
+            thread_id = next(iter(self._last_access))
+            if thread_id == keep:
+                break
+            self._delete_thread_locked(thread_id)
+            _threads_evicted.inc(reason="lru")
+
+    def _prune(self, thread_id: str, checkpoint_ns: str) -> None:
+        """Keep only the latest checkpoints for a thread/namespace."""
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        excess = len(checkpoints) - self.max_checkpoints_per_thread
+        if excess <= 0:
+            return
+
+        # Checkpoint IDs are time-ordered, so the smallest are the oldest
+        removed_ids = sorted(checkpoints)[:excess]
+        thread_versions = self._checkpoint_versions.setdefault(thread_id, {})
+        removed_versions: set = set()
+        for checkpoint_id in removed_ids:
+            checkpoint, metadata, _ = checkpoints.pop(checkpoint_id)
+            self._add_bytes(thread_id, -(_typed_size(checkpoint) + _typed_size(metadata)))
+            versions = thread_versions.pop((checkpoint_ns, checkpoint_id), {})
+            removed_versions.update(versions.items())
+            writes_key = (thread_id, checkpoint_ns, checkpoint_id)
+            writes = self.writes.pop(writes_key, None)
+            if writes:
+                self._add_bytes(thread_id, -sum(_typed_size(w[2]) for w in writes.values()))
+            self._thread_write_keys.get(thread_id, set()).discard(writes_key)
+
+        kept_versions: set = set()
+        for checkpoint_id in checkpoints:
+            kept_versions.update(thread_versions.get((checkpoint_ns, checkpoint_id), {}).items())
+
+        blob_keys = self._thread_blob_keys.get(thread_id, set())
+        for channel, version in removed_versions - kept_versions:
+            blob_key = (thread_id, checkpoint_ns, channel, version)
+            blob = self.blobs.pop(blob_key, None)
+            if blob is not None:
+                self._add_bytes(thread_id, -_typed_size(blob))
+            blob_keys.discard(blob_key)
+
+        _checkpoints_pruned.inc(len(removed_ids))
+
+    def _drop_finished_subgraphs(self, thread_id: str, root_checkpoint_id: str) -> None:
+        """Drop subgraph namespaces whose checkpoints all predate a root checkpoint."""
+        namespaces = self.storage[thread_id]
+        finished = {
+            checkpoint_ns for checkpoint_ns, checkpoints in namespaces.items()
+            if checkpoint_ns and (not checkpoints or max(checkpoints) < root_checkpoint_id)
+        }
+        if not finished:
+            return
+
+        removed = 0
+        thread_versions = self._checkpoint_versions.get(thread_id, {})
+        for checkpoint_ns in finished:
+            for checkpoint_id, (checkpoint, metadata, _) in namespaces.pop(checkpoint_ns).items():
+                self._add_bytes(thread_id, -(_typed_size(checkpoint) + _typed_size(metadata)))
+                thread_versions.pop((checkpoint_ns, checkpoint_id), None)
+                removed += 1
+
+        write_keys = self._thread_write_keys.get(thread_id, set())
+        for writes_key in [key for key in write_keys if key[1] in finished]:
+            writes = self.writes.pop(writes_key, None)
+            if writes:
+                self._add_bytes(thread_id, -sum(_typed_size(w[2]) for w in writes.values()))
+            write_keys.discard(writes_key)
+
+        blob_keys = self._thread_blob_keys.get(thread_id, set())
+        for blob_key in [key for key in blob_keys if key[1] in finished]:
+            blob = self.blobs.pop(blob_key, None)
+            if blob is not None:
+                self._add_bytes(thread_id, -_typed_size(blob))
+            blob_keys.discard(blob_key)
+
+        _checkpoints_pruned.inc(removed)
+
+    def _delete_thread_locked(self, thread_id: str) -> None:
+        """Delete a thread using the per-thread key index."""
+        self.storage.pop(thread_id, None)
+        for key in self._thread_write_keys.pop(thread_id, set()):
+            self.writes.pop(key, None)
+        for key in self._thread_blob_keys.pop(thread_id, set()):
+            self.blobs.pop(key, None)
+        self._checkpoint_versions.pop(thread_id, None)
+        self._total_bytes -= self._thread_bytes.pop(thread_id, 0)
+        self._last_access.pop(thread_id, None)
+
+    # ------------------------------------------------------------------
+    # BaseCheckpointSaver interface
+    # ------------------------------------------------------------------
+
+    def get_tuple(self, config):
+        """Get a checkpoint tuple, refreshing the thread's recency."""
+        with self._lock:
+            thread_id = config["configurable"]["thread_id"]
+            if thread_id not in self._last_access:
+                # Avoid creating empty defaultdict entries for unknown threads
+                return None
+            self._touch(thread_id)
+            return super().get_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        """List checkpoints (materialized under the lock)."""
+        with self._lock:
+            if config:
+                thread_id = config["configurable"]["thread_id"]
+                if thread_id not in self._last_access:
+                    return
+                self._touch(thread_id)
+            items = list(super().list(config, filter=filter, before=before, limit=limit))
+        yield from items
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        """Save a checkpoint, then enforce the per-thread cap and thread limits."""
+        with self._lock:
+            thread_id = config["configurable"]["thread_id"]
+            checkpoint_ns = config["configurable"]["checkpoint_ns"]
+            result = super().put(config, checkpoint, metadata, new_versions)
+
+            blob_keys = self._thread_blob_keys.setdefault(thread_id, set())
+            added = 0
+            for channel, version in new_versions.items():
+                blob_key = (thread_id, checkpoint_ns, channel, version)
+                if blob_key not in blob_keys:
+                    blob_keys.add(blob_key)
+                    added += _typed_size(self.blobs[blob_key])
+            saved_checkpoint, saved_metadata, _ = self.storage[thread_id][checkpoint_ns][checkpoint["id"]]
+            added += _typed_size(saved_checkpoint) + _typed_size(saved_metadata)
+            self._add_bytes(thread_id, added)
+            self._checkpoint_versions.setdefault(thread_id, {})[(checkpoint_ns, checkpoint["id"])] = dict(
+                checkpoint.get("channel_versions", {})
+            )
+
+            self._prune(thread_id, checkpoint_ns)
+            if not checkpoint_ns:
+                self._drop_finished_subgraphs(thread_id, checkpoint["id"])
+            self._touch(thread_id)
+            return result
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        """Save pending writes and account for their size."""
+        with self._lock:
+            thread_id = config["configurable"]["thread_id"]
+            writes_key = (
+                thread_id,
+                config["configurable"].get("checkpoint_ns", ""),
+                config["configurable"]["checkpoint_id"],
+            )
+            before = sum(_typed_size(w[2]) for w in self.writes.get(writes_key, {}).values())
+            super().put_writes(config, writes, task_id, task_path)
+            after = sum(_typed_size(w[2]) for w in self.writes.get(writes_key, {}).values())
+            self._thread_write_keys.setdefault(thread_id, set()).add(writes_key)
+            self._add_bytes(thread_id, after - before)
+            self._touch(thread_id)
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete all checkpoints and writes associated with a thread ID."""
+        with self._lock:
+            self._delete_thread_locked(thread_id)
+
+    def evict_expired(self) -> None:
+        """Evict idle threads without waiting for the next write."""
+        with self._lock:
+            self._evict(time.monotonic())
+
+
+def get_checkpointer() -> BaseCheckpointSaver:
     """
     Get checkpoint saver for conversation persistence.
     
-    Uses MemorySaver for development. For production, switch to
-    database-backed checkpointers (PostgreSQL, Redis).
+    Selected by Settings.checkpointer_backend:
+    - memory: bounded in-memory saver (per-process, lost on restart)
+    - sqlite: durable SQLite saver with batched writes (shared across workers)
+    
+    Both use the serializer selected by Settings.checkpoint_serializer.
     
     Returns:
-        MemorySaver: Checkpoint saver instance
+        BaseCheckpointSaver: Checkpoint saver instance
     """
-    return MemorySaver()
+    settings = get_settings()
+    serde = get_serializer(
+        settings.checkpoint_serializer,
+        compression=settings.checkpoint_compression,
+        threshold=settings.checkpoint_compression_threshold,
+    )
+    if settings.checkpointer_backend == "sqlite":
+        from app.core.sqlite_checkpointer import SQLiteCheckpointSaver
+        
+        logger.info(f"Checkpointing: Using SQLite checkpointer at {settings.checkpoint_sqlite_path}")
+        return SQLiteCheckpointSaver(
+            settings.checkpoint_sqlite_path,
+            flush_interval_ms=settings.checkpoint_flush_interval_ms,
+            max_batch=settings.checkpoint_flush_max_batch,
+            max_checkpoints_per_thread=settings.checkpoint_max_per_thread,
+            serde=serde,
+        )
+    
+    return BoundedMemorySaver(
+        max_threads=settings.checkpoint_max_threads,
+        idle_ttl_seconds=settings.checkpoint_idle_ttl_seconds,
+        max_checkpoints_per_thread=settings.checkpoint_max_per_thread,
+        serde=serde,
+    )
 
 
 # Global checkpointer instance
-_checkpointer: MemorySaver | None = None
+_checkpointer: BaseCheckpointSaver | None = None
 
 
-def get_or_create_checkpointer() -> MemorySaver:
+def get_or_create_checkpointer() -> BaseCheckpointSaver:
     """
     Get or create global checkpointer instance.
     
     Returns:
-        MemorySaver: Shared checkpointer instance
+        BaseCheckpointSaver: Shared checkpointer instance
     """
     global _checkpointer
     if _checkpointer is None:
         _checkpointer = get_checkpointer()
     return _checkpointer
 
+
+def close_checkpointer() -> None:
+    """
+    Close the global checkpointer if it holds resources (SQLite: flush and stop the flusher).
+    
+    Called on app shutdown. Agents are created per request, so a later
+    get_or_create_checkpointer() (e.g. the next startup in the same
+    process) opens a new one.
+    """
+    global _checkpointer
+    close = getattr(_checkpointer, "close", None)
+    if close is not None:
+        close()
+        _checkpointer = None
@@ -9,7 +9,7 @@ import os
 from pathlib import Path
 from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import Field, field_validator
+from pydantic import Field, field_validator, model_validator
 
 
 def find_env_file() -> str:
@@ -38,7 +38,10 @@ class Settings(BaseSettings):
     )
     
     # OpenAI Configuration
-    openai_api_key: str = Field(..., description="OpenAI API key")
+    openai_api_key: Optional[str] = Field(
+        default=None,
+        description="OpenAI API key (required unless LLM_BACKEND=fake)"
+    )
     
     # AWS Bedrock Configuration (API key authentication)
     # Note: Bedrock uses AWS_BEARER_TOKEN_BEDROCK environment variable
@@ -55,12 +58,466 @@ class Settings(BaseSettings):
         description="AWS Bedrock Bearer Token (alternative name)"
     )
     
+    # LLM Backend Configuration
+    llm_backend: str = Field(
+        default="live",
+        description="'live' (OpenAI/Bedrock) or 'fake' (deterministic offline models for load testing)"
+    )
+    fake_llm_latency_distribution: str = Field(
+        default="fixed",
+        description="Fake model time-to-first-token distribution: fixed, uniform, normal or lognormal"
+    )
+    fake_llm_latency_mean_seconds: float = Field(
+        default=0.0,
+        ge=0,
+        description="Mean fake model time to first token"
+    )
+    fake_llm_latency_stddev_seconds: float = Field(
+        default=0.0,
+        ge=0,
+        description="Standard deviation of fake model time to first token"
+    )
+    fake_llm_tokens_per_second: float = Field(
+        default=0.0,
+        ge=0,
+        description="Fake model output rate (0 = instant)"
+    )
+    fake_llm_answer_tokens: int = Field(
+        default=120,
+        ge=1,
+        description="Length of fake model answers in words"
+    )
+    fake_llm_seed: int = Field(
+        default=0,
+        description="Seed for fake model outputs and latency samples"
+    )
+    fake_embedding_size: int = Field(
+        default=1536,
+        ge=1,
+        description="Fake embedding dimension (1536 matches text-embedding-3-small collections)"
+    )
+    fake_embedding_latency_seconds: float = Field(
+        default=0.0,
+        ge=0,
+        description="Simulated delay per fake embedding call"
+    )
+    
+    # LLM Client Configuration
+    llm_max_connections: int = Field(
+        default=100,
+        ge=1,
+        description="Maximum open connections per LLM provider pool"
+    )
+    llm_max_keepalive_connections: int = Field(
+        default=20,
+        ge=0,
+        description="Idle keep-alive connections kept per LLM provider pool"
+    )
+    llm_keepalive_expiry_seconds: float = Field(
+        default=60.0,
+        description="Close idle pooled connections after this many seconds"
+    )
+    llm_connect_timeout_seconds: float = Field(
+        default=5.0,
+        description="Timeout for establishing a connection to an LLM provider"
+    )
+    llm_request_timeout_seconds: float = Field(
+        default=60.0,
+        description="Timeout for reading an LLM provider response"
+    )
+    llm_max_retries: int = Field(
+        default=2,
+        ge=0,
+        description="Retries for failed LLM provider requests"
+    )
+    llm_http2: bool = Field(
+        default=True,
+        description="Use HTTP/2 for LLM provider pools when the h2 package is installed"
+    )
+    
+    # Bedrock Client Configuration
+    bedrock_region: str = Field(
+        default="us-east-1",
+        description="AWS region for Bedrock runtime"
+    )
+    bedrock_max_pool_connections: int = Field(
+        default=50,
+        ge=1,
+        description="Maximum pooled connections for the shared Bedrock runtime client"
+    )
+    bedrock_retry_mode: str = Field(
+        default="adaptive",
+        description="botocore retry mode: 'adaptive', 'standard' or 'legacy'"
+    )
+    bedrock_max_attempts: int = Field(
+        default=3,
+        ge=1,
+        description="Maximum attempts (including the first) for Bedrock requests"
+    )
+    
+    # Hedged Request Configuration
+    llm_hedging_enabled: bool = Field(
+        default=False,
+        description="Send a duplicate request to the alternate model when the primary is slower than its p95"
+    )
+    hedge_percentile: float = Field(
+        default=95.0,
+        gt=0,
+        le=100,
+        description="Primary latency percentile after which a hedged request is sent"
+    )
+    hedge_min_samples: int = Field(
+        default=20,
+        ge=1,
+        description="Completed requests needed before the percentile is used as the hedge delay"
+    )
+    hedge_initial_delay_seconds: float = Field(
+        default=3.0,
+        description="Hedge delay used until enough latency samples exist"
+    )
+    
+    # Alternate Model Configuration (used for hedging and circuit-breaker fallback)
+    routing_alternate_model: str = Field(
+        default="bedrock:anthropic.claude-3-haiku-20240307-v1:0",
+        description="Alternate for the routing model as 'provider:model' on another provider (openai or bedrock, empty disables)"
+    )
+    generation_alternate_model: str = Field(
+        default="bedrock:anthropic.claude-3-haiku-20240307-v1:0",
+        description="Alternate for the generation model as 'provider:model' on another provider (openai or bedrock, empty disables)"
+    )
+    
+    # Model Tier Configuration ('provider:model')
+    model_tier_fast: str = Field(
+        default="openai:gpt-4.1-nano",
+        description="Fastest generation model, used for simple requests of opted-in agents and to meet latency SLOs"
+    )
+    model_tier_standard: str = Field(
+        default="openai:gpt-4o-mini",
+        description="Default generation model"
+    )
+    model_tier_large: str = Field(
+        default="openai:gpt-4.1",
+        description="Largest generation model, used for complex troubleshooting"
+    )
+    
+    # Adaptive Model Selection Configuration
+    model_selection_enabled: bool = Field(
+        default=False,
+        description="Pick the generation model tier per request from query/context signals (opt-in: changes models and cost)"
+    )
+    model_selection_long_query_tokens: int = Field(
+        default=60,
+        description="Queries longer than this many tokens count toward a larger tier"
+    )
+    model_selection_large_context_tokens: int = Field(
+        default=4000,
+        description="Retrieved context larger than this many tokens counts toward a larger tier"
+    )
+    model_selection_deep_conversation_turns: int = Field(
+        default=4,
+        description="Conversations with more user turns than this count toward a larger tier"
+    )
+    model_selection_large_tier_agents: list[str] = Field(
+        default=["technical"],
+        description="Agents allowed to use the large tier"
+    )
+    model_selection_fast_tier_agents: list[str] = Field(
+        default=[],
+        description="Agents whose simple requests (no signal toward a larger tier) use the fast tier"
+    )
+    agent_latency_slo_seconds: dict[str, float] = Field(
+        default={"policy": 12.0, "technical": 20.0, "billing": 12.0, "dad_joke": 5.0},
+        description="Per-agent p95 latency SLO; tiers slower than this step down to a faster tier"
+    )
+    
+    # Agent Limits Configuration (per worker agent; agents not listed are unlimited)
+    agent_max_output_tokens: dict[str, int] = Field(
+        default={"policy": 1500, "technical": 1500, "billing": 800, "dad_joke": 200},
+        description="Maximum tokens the model may generate per call (structured answers cut off by it are retried without it)"
+    )
+    agent_timeout_seconds: dict[str, float] = Field(
+        default={"policy": 30.0, "technical": 45.0, "billing": 30.0, "dad_joke": 15.0},
+        description="Time budget for one agent run (all model and tool calls)"
+    )
+    agent_max_tool_iterations: dict[str, int] = Field(
+        default={"policy": 2, "technical": 3, "billing": 3, "dad_joke": 2},
+        description="Tool-calling rounds per run before the agent must answer"
+    )
+    
+    # Upstream Concurrency Configuration (per 'provider:model'; 0 = unlimited)
+    upstream_default_max_concurrency: int = Field(
+        default=16,
+        ge=0,
+        description="Maximum concurrent calls to one upstream model unless set in UPSTREAM_MAX_CONCURRENCY"
+    )
+    upstream_max_concurrency: dict[str, int] = Field(
+        default={},
+        description="Per-upstream concurrent call limits, e.g. {\"openai:gpt-4o-mini\": 32}"
+    )
+    upstream_acquire_timeout_seconds: float = Field(
+        default=10.0,
+        gt=0,
+        description="Longest an LLM call waits for a free upstream slot before failing"
+    )
+    
+    # Circuit Breaker Configuration
+    circuit_breaker_enabled: bool = Field(
+        default=True,
+        description="Fail fast (or fall back to the alternate model) while an LLM provider is unhealthy"
+    )
+    circuit_window_seconds: float = Field(
+        default=30.0,
+        description="Window of recent calls used to compute error and slow-call rates"
+    )
+    circuit_min_requests: int = Field(
+        default=10,
+        ge=1,
+        description="Minimum calls in the window before a circuit can open"
+    )
+    circuit_error_rate_threshold: float = Field(
+        default=0.5,
+        gt=0,
+        le=1,
+        description="Open the circuit when this fraction of recent calls failed"
+    )
+    circuit_slow_call_seconds: float = Field(
+        default=20.0,
+        description="Calls slower than this count as slow"
+    )
+    circuit_slow_rate_threshold: float = Field(
+        default=0.8,
+        gt=0,
+        le=1,
+        description="Open the circuit when this fraction of recent calls were slow"
+    )
+    circuit_open_seconds: float = Field(
+        default=30.0,
+        description="Time a circuit stays open before half-open probe calls"
+    )
+    circuit_half_open_probes: int = Field(
+        default=1,
+        ge=1,
+        description="Concurrent probe calls allowed while half-open"
+    )
+    
     # ChromaDB Configuration
     chroma_db_path: str = Field(
         default="./chroma_db",
         description="Path to ChromaDB persistence directory"
     )
     
+    # Retrieval Context Configuration
+    context_store_max_entries: int = Field(
+        default=1024,
+        description="Maximum retrieval contexts kept in memory for resolving context references"
+    )
+    
+    # Checkpointing Configuration
+    checkpointer_backend: str = Field(
+        default="memory",
+        description="Checkpointer backend: 'memory' (bounded, per-process) or 'sqlite' (durable, shared by workers)"
+    )
+    checkpoint_sqlite_path: str = Field(
+        default="./checkpoints.sqlite3",
+        description="Path to the SQLite checkpoint database"
+    )
+    checkpoint_flush_interval_ms: int = Field(
+        default=50,
+        ge=0,
+        description="Maximum time SQLite checkpoint writes are buffered before a batched flush (0 = write-through; other workers only see writes once flushed)"
+    )
+    checkpoint_flush_max_batch: int = Field(
+        default=256,
+        description="Flush buffered SQLite checkpoint writes once this many are pending"
+    )
+    checkpoint_max_threads: int = Field(
+        default=10000,
+        description="Maximum conversation threads kept by the in-memory checkpointer (LRU eviction)"
+    )
+    checkpoint_idle_ttl_seconds: float = Field(
+        default=3600.0,
+        description="Evict threads idle for longer than this many seconds (0 disables)"
+    )
+    checkpoint_max_per_thread: int = Field(
+        default=10,
+        ge=2,
+        description="Latest checkpoints retained per thread (finished worker agent namespaces are dropped)"
+    )
+    checkpoint_serializer: str = Field(
+        default="compact",
+        description="Checkpoint serializer: 'compact' (msgpack + dictionary compression) or 'jsonplus' (LangGraph default)"
+    )
+    checkpoint_compression: str = Field(
+        default="auto",
+        description="Compact serializer codec: 'auto' (zstd if installed, else zlib), 'zstd', 'zlib' or 'none'"
+    )
+    checkpoint_compression_threshold: int = Field(
+        default=256,
+        ge=0,
+        description="Compress serialized checkpoint payloads of at least this many bytes"
+    )
+    
+    # History Window Configuration
+    routing_history_max_messages: int = Field(
+        default=8,
+        ge=1,
+        description="Maximum conversation messages sent to the routing model"
+    )
+    routing_history_max_tokens: int = Field(
+        default=1500,
+        ge=1,
+        description="Approximate token budget for conversation messages sent to the routing model"
+    )
+    history_summary_enabled: bool = Field(
+        default=False,
+        description="Keep a rolling extractive summary of messages outside the history window"
+    )
+    history_summary_max_chars: int = Field(
+        default=1500,
+        description="Maximum length of the rolling history summary"
+    )
+    
+    # Streaming Configuration
+    sse_default_protocol: str = Field(
+        default="v1",
+        description="SSE protocol when the request does not ask for one: 'v1' (per-word chunks) or 'v2' (typed events)"
+    )
+    sse_flush_interval_ms: int = Field(
+        default=50,
+        ge=0,
+        description="v2 streams: maximum time buffered answer text waits before it is flushed as a delta event"
+    )
+    sse_flush_max_chars: int = Field(
+        default=256,
+        ge=1,
+        description="v2 streams: flush buffered answer text once it reaches this many characters"
+    )
+    sse_resume_ttl_seconds: float = Field(
+        default=300.0,
+        gt=0,
+        description="v2 streams: how long a finished turn can still be resumed with Last-Event-ID"
+    )
+    sse_resume_max_streams: int = Field(
+        default=256,
+        ge=1,
+        description="v2 streams: maximum turns kept for resuming (oldest finished turns dropped first)"
+    )
+    sse_resume_max_events: int = Field(
+        default=1024,
+        ge=1,
+        description="v2 streams: events kept per turn for resuming"
+    )
+    sse_disconnect_grace_seconds: float = Field(
+        default=15.0,
+        ge=0,
+        description="v2 streams: cancel a running turn once no client has been connected to it for this long"
+    )
+    
+    # Request Deadline Configuration
+    request_deadline_seconds: float = Field(
+        default=60.0,
+        ge=0,
+        description="Time budget for one chat turn; past it agents answer with what they have (0 = no deadline)"
+    )
+    request_max_deadline_seconds: float = Field(
+        default=300.0,
+        gt=0,
+        description="Upper bound for a deadline_seconds requested by the client"
+    )
+    request_deadline_grace_seconds: float = Field(
+        default=5.0,
+        ge=0,
+        description="Extra time past the deadline before a turn still running (e.g. a stuck provider call) is cancelled"
+    )
+    disconnect_poll_interval_seconds: float = Field(
+        default=0.25,
+        gt=0,
+        description="How often a waiting request checks whether its client disconnected"
+    )
+    
+    admission_control_enabled: bool = Field(
+        default=True,
+        description="Bound concurrent chat requests, queue the rest and shed load when the queue is too slow"
+    )
+    admission_max_concurrent: int = Field(
+        default=32,
+        ge=1,
+        description="Chat requests (turns) processed at once"
+    )
+    admission_max_queue: int = Field(
+        default=128,
+        ge=0,
+        description="Chat requests waiting for a slot; beyond this requests get 429"
+    )
+    admission_max_queue_wait_seconds: float = Field(
+        default=10.0,
+        gt=0,
+        description="Requests expected to (or that do) wait longer than this for a slot get 503"
+    )
+    
+    # WebSocket Configuration
+    ws_max_turns_per_connection: int = Field(
+        default=8,
+        ge=1,
+        description="Maximum concurrent turns on one /chat/ws connection (one per thread)"
+    )
+    
+    # Idempotency Configuration
+    idempotency_ttl_seconds: float = Field(
+        default=600.0,
+        gt=0,
+        description="How long the result of a request with an idempotency key is served to retries"
+    )
+    idempotency_max_entries: int = Field(
+        default=1024,
+        ge=1,
+        description="Maximum idempotency keys kept (oldest completed keys dropped first)"
+    )
+    
+    # Batch Configuration
+    batch_max_items: int = Field(
+        default=5000,
+        ge=1,
+        description="Maximum messages in one /chat/batch request"
+    )
+    batch_max_concurrency: int = Field(
+        default=8,
+        ge=1,
+        description="Messages of one /chat/batch request answered at once (default and upper bound)"
+    )
+    batch_item_max_attempts: int = Field(
+        default=3,
+        ge=1,
+        description="Attempts per batch message when it is shed or the upstream is busy"
+    )
+    
+    # Job Configuration
+    job_workers: int = Field(
+        default=4,
+        ge=1,
+        description="Background workers running /chat/jobs (jobs processed at once)"
+    )
+    job_max_queued: int = Field(
+        default=256,
+        ge=1,
+        description="Chat jobs waiting for a worker; beyond this submissions get 429"
+    )
+    job_max_jobs: int = Field(
+        default=2048,
+        ge=1,
+        description="Chat jobs kept (waiting, running and finished; oldest finished jobs dropped first)"
+    )
+    job_ttl_seconds: float = Field(
+        default=3600.0,
+        gt=0,
+        description="How long a finished job's result can be polled"
+    )
+    job_max_attempts: int = Field(
+        default=3,
+        ge=1,
+        description="Attempts per job when it is shed by admission control"
+    )
+    
     # Server Configuration
     backend_port: int = Field(
         default=8000,
@@ -75,10 +532,10 @@ class Settings(BaseSettings):
     
     @field_validator("openai_api_key")
     @classmethod
-    def validate_openai_key(cls, v: str) -> str:
-        """Validate OpenAI API key is not empty."""
-        if not v or v.strip() == "":
-            raise ValueError("OPENAI_API_KEY cannot be empty")
+    def validate_openai_key(cls, v: Optional[str]) -> Optional[str]:
+        """Validate OpenAI API key if provided (required unless LLM_BACKEND=fake, see below)."""
+        if v is None or v.strip() == "":
+            return None
         if "your_openai_api_key_here" in v.lower():
             raise ValueError("Please set a valid OPENAI_API_KEY in .env file")
         return v.strip()
@@ -167,6 +624,78 @@ class Settings(BaseSettings):
             )
         return key
     
+    @field_validator("llm_backend")
+    @classmethod
+    def validate_llm_backend(cls, v: str) -> str:
+        """Ensure the LLM backend is supported."""
+        v = v.strip().lower()
+        if v not in ("live", "fake"):
+            raise ValueError(f"LLM_BACKEND must be 'live' or 'fake', got '{v}'")
+        return v
+    
+    @field_validator("fake_llm_latency_distribution")
+    @classmethod
+    def validate_fake_latency_distribution(cls, v: str) -> str:
+        """Ensure the fake latency distribution is supported."""
+        v = v.strip().lower()
+        if v not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(
+                f"FAKE_LLM_LATENCY_DISTRIBUTION must be 'fixed', 'uniform', 'normal' or 'lognormal', got '{v}'"
+            )
+        return v
+    
+    @model_validator(mode="after")
+    def require_openai_key(self) -> "Settings":
+        """OpenAI API key is required for live models."""
+        if self.llm_backend == "live" and not self.openai_api_key:
+            raise ValueError("OPENAI_API_KEY cannot be empty (or set LLM_BACKEND=fake for offline testing)")
+        return self
+    
+    @field_validator("checkpointer_backend")
+    @classmethod
+    def validate_checkpointer_backend(cls, v: str) -> str:
+        """Ensure the checkpointer backend is supported."""
+        v = v.strip().lower()
+        if v not in ("memory", "sqlite"):
+            raise ValueError(f"CHECKPOINTER_BACKEND must be 'memory' or 'sqlite', got '{v}'")
+        return v
+    
+    @field_validator("checkpoint_serializer")
+    @classmethod
+    def validate_checkpoint_serializer(cls, v: str) -> str:
+        """Ensure the checkpoint serializer is supported."""
+        v = v.strip().lower()
+        if v not in ("compact", "jsonplus"):
+            raise ValueError(f"CHECKPOINT_SERIALIZER must be 'compact' or 'jsonplus', got '{v}'")
+        return v
+    
+    @field_validator("checkpoint_compression")
+    @classmethod
+    def validate_checkpoint_compression(cls, v: str) -> str:
+        """Ensure the checkpoint compression codec is supported."""
+        v = v.strip().lower()
+        if v not in ("auto", "zstd", "zlib", "none"):
+            raise ValueError(f"CHECKPOINT_COMPRESSION must be 'auto', 'zstd', 'zlib' or 'none', got '{v}'")
+        return v
+    
+    @field_validator("sse_default_protocol")
+    @classmethod
+    def validate_sse_default_protocol(cls, v: str) -> str:
+        """Ensure the default SSE protocol is supported."""
+        v = v.strip().lower()
+        if v not in ("v1", "v2"):
+            raise ValueError(f"SSE_DEFAULT_PROTOCOL must be 'v1' or 'v2', got '{v}'")
+        return v
+    
+    @field_validator("bedrock_retry_mode")
+    @classmethod
+    def validate_bedrock_retry_mode(cls, v: str) -> str:
+        """Ensure the botocore retry mode is supported."""
+        v = v.strip().lower()
+        if v not in ("adaptive", "standard", "legacy"):
+            raise ValueError(f"BEDROCK_RETRY_MODE must be 'adaptive', 'standard' or 'legacy', got '{v}'")
+        return v
+    
     @field_validator("chroma_db_path")
     @classmethod
     def validate_chroma_path(cls, v: str) -> str:
@@ -0,0 +1,142 @@
+"""
+Request deadlines and cancellation.
+
+Each chat turn runs under a Deadline: an optional point in time by which it
+should have answered, and a flag set when nobody is waiting for the answer
+any more (client disconnected, hard timeout). The deadline travels with the
+turn in a context variable, so it reaches the orchestrator, the handle_*
+tools and the worker agents they call (LangChain copies the context into
+the worker threads that run sync tools), retrieval and model calls without
+being passed around explicitly.
+
+The two are handled differently:
+
+- An expired deadline is a soft stop: agents answer with what they have
+  (see AgentLimitsMiddleware) and the turn completes normally.
+- A cancelled deadline is a hard stop: check_cancelled() raises
+  RequestCancelled at the next checkpoint (model call, retrieval, worker
+  invocation), which is the only way to stop work running in a thread.
+
+LangChain Version: v1.0+
+"""
+
+import contextlib
+import threading
+import time
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from app.core.metrics import get_metrics
+
+_cancellations = get_metrics().counter(
+    "request_cancellations_total", "Chat turns cancelled by reason (disconnected, deadline)"
+)
+
+
+class RequestCancelled(BaseException):
+    """
+    The turn was cancelled; its remaining work is abandoned.
+
+    A BaseException (like asyncio.CancelledError) so that the broad
+    `except Exception` fallbacks in tools and retrieval don't swallow it.
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(f"Request cancelled ({reason})")
+        self.reason = reason
+
+
+class Deadline:
+    """Time budget and cancellation flag of one chat turn (thread-safe)."""
+
+    def __init__(self, seconds: Optional[float]):
+        """
+        Initialize deadline.
+
+        Args:
+            seconds: Time budget from now, or None for no deadline
+        """
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds if seconds else None
+        self.reason: Optional[str] = None
+        self._cancelled = threading.Event()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (negative once expired), or None without a deadline."""
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self, reason: str) -> None:
+        """Abandon the turn: in-flight work stops at its next checkpoint."""
+        if self._cancelled.is_set():
+            return
+        self.reason = reason
+        self._cancelled.set()
+        _cancellations.inc(reason=reason)
+
+    def check_cancelled(self) -> None:
+        """
+        Raises:
+            RequestCancelled: If the turn was cancelled
+        """
+        if self._cancelled.is_set():
+            raise RequestCancelled(self.reason or "cancelled")
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Deadline of the turn running in this context, if any."""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """Run the block (and everything it starts) under a deadline."""
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def remaining_seconds(budget: Optional[float] = None) -> Optional[float]:
+    """
+    Time left for a step: the smaller of its own budget and the turn's deadline.
+
+    Args:
+        budget: Seconds the step may take on its own (None for unlimited)
+
+    Returns:
+        Seconds left, or None if neither is limited
+    """
+    deadline = _current.get()
+    remaining = deadline.remaining() if deadline is not None else None
+    if remaining is None:
+        return budget
+    if budget is None:
+        return remaining
+    return min(budget, remaining)
+
+
+def check_cancelled() -> None:
+    """
+    Stop here if the current turn was cancelled.
+
+    Raises:
+        RequestCancelled: If the turn was cancelled
+    """
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.check_cancelled()
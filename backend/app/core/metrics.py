@@ -0,0 +1,238 @@
+"""
+In-process metrics for performance monitoring.
+
+Lightweight counters, gauges and histograms kept in memory and exposed as a
+JSON snapshot via the /metrics endpoint. Labels are passed as keyword
+arguments and stored per label combination.
+"""
+
+import math
+import threading
+from collections import deque
+from typing import Callable, Dict, Optional, Tuple
+
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    """Normalize labels into a hashable, ordered key."""
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _label_str(key: LabelKey) -> str:
+    """Render a label key for snapshots (e.g. 'agent=policy,tier=fast')."""
+    return ",".join(f"{k}={v}" for k, v in key)
+
+
+class Counter:
+    """Monotonically increasing counter."""
+
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """Increment the counter for a label combination."""
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        """Get the current value for a label combination."""
+        return self._values.get(_label_key(labels), 0.0)
+
+    def snapshot(self) -> dict:
+        """Snapshot values keyed by label string."""
+        with self._lock:
+            return {_label_str(k): v for k, v in self._values.items()}
+
+
+class Gauge:
+    """Point-in-time value, set directly or computed by a callback."""
+
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self._values: Dict[LabelKey, float] = {}
+        self._callback: Optional[Callable[[], float]] = None
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels) -> None:
+        """Set the gauge for a label combination."""
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """Increase the gauge for a label combination."""
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        """Decrease the gauge for a label combination."""
+        self.inc(-amount, **labels)
+
+    def set_function(self, callback: Callable[[], float]) -> None:
+        """Compute the (unlabelled) gauge value on demand."""
+        self._callback = callback
+
+    def value(self, **labels) -> float:
+        """Get the current value for a label combination."""
+        if self._callback is not None and not labels:
+            return float(self._callback())
+        return self._values.get(_label_key(labels), 0.0)
+
+    def snapshot(self) -> dict:
+        """Snapshot values keyed by label string."""
+        with self._lock:
+            values = {_label_str(k): v for k, v in self._values.items()}
+        if self._callback is not None:
+            values[""] = float(self._callback())
+        return values
+
+
+class Histogram:
+    """
+    Distribution of observed values.
+
+    Keeps count/sum/max over all observations and a bounded window of recent
+    observations for percentile estimates.
+    """
+
+    def __init__(self, name: str, description: str = "", window: int = 1024):
+        self.name = name
+        self.description = description
+        self.window = window
+        self._series: Dict[LabelKey, dict] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        """Record an observation for a label combination."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = {"count": 0, "sum": 0.0, "max": 0.0, "recent": deque(maxlen=self.window)}
+                self._series[key] = series
+            series["count"] += 1
+            series["sum"] += value
+            series["max"] = max(series["max"], value)
+            series["recent"].append(value)
+
+    def percentile(self, q: float, **labels) -> Optional[float]:
+        """
+        Estimate a percentile from the recent window.
+
+        Args:
+            q: Percentile in [0, 100]
+
+        Returns:
+            Estimated value or None if nothing was observed
+        """
+        with self._lock:
+            series = self._series.get(_label_key(labels))
+            values = sorted(series["recent"]) if series else []
+        return percentile(values, q)
+
+    def snapshot(self) -> dict:
+        """Snapshot count/sum/mean/max and recent percentiles per label string."""
+        with self._lock:
+            items = [(k, dict(s, recent=sorted(s["recent"]))) for k, s in self._series.items()]
+        result = {}
+        for key, series in items:
+            count = series["count"]
+            result[_label_str(key)] = {
+                "count": count,
+                "sum": series["sum"],
+                "mean": series["sum"] / count if count else 0.0,
+                "max": series["max"],
+                "p50": percentile(series["recent"], 50),
+                "p95": percentile(series["recent"], 95),
+                "p99": percentile(series["recent"], 99),
+            }
+        return result
+
+
+def percentile(sorted_values: list, q: float) -> Optional[float]:
+    """
+    Nearest-rank percentile of an already sorted list.
+
+    Args:
+        sorted_values: Values in ascending order
+        q: Percentile in [0, 100]
+
+    Returns:
+        Percentile value or None for an empty list
+    """
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class MetricsRegistry:
+    """Registry of named metrics."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, description: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, description, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {type(metric).__name__}")
+            return metric
+
+    def counter(self, name: str, description: str = "") -> Counter:
+        """Get or create a counter."""
+        return self._get_or_create(Counter, name, description)
+
+    def gauge(self, name: str, description: str = "") -> Gauge:
+        """Get or create a gauge."""
+        return self._get_or_create(Gauge, name, description)
+
+    def histogram(self, name: str, description: str = "", window: int = 1024) -> Histogram:
+        """Get or create a histogram."""
+        return self._get_or_create(Histogram, name, description, window=window)
+
+    def snapshot(self) -> dict:
+        """
+        Snapshot all metrics.
+
+        Returns:
+            Dictionary of metric name to {type, description, values}
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            m.name: {
+                "type": type(m).__name__.lower(),
+                "description": m.description,
+                "values": m.snapshot(),
+            }
+            for m in metrics
+        }
+
+
+# Global registry instance
+_registry: Optional[MetricsRegistry] = None
+
+
+def get_metrics() -> MetricsRegistry:
+    """
+    Get or create the global metrics registry.
+
+    Returns:
+        MetricsRegistry: Shared registry instance
+    """
+    global _registry
+    if _registry is None:
+        _registry = MetricsRegistry()
+    return _registry
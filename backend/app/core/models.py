@@ -4,7 +4,7 @@ Pydantic models for FastAPI request/response schemas.
 LangChain Version: v1.0+
 """
 
-from typing import Optional
+from typing import Literal, Optional
 from pydantic import BaseModel, Field
 
 
@@ -20,6 +20,29 @@ class ChatRequest(BaseModel):
         default=True,
         description="Whether to stream the response (default: True)"
     )
+    protocol: Optional[Literal["v1", "v2"]] = Field(
+        default=None,
+        description=(
+            "Streaming protocol: 'v1' (one JSON chunk per word) or 'v2' (meta/status/delta/done events). "
+            "Also negotiable with 'Accept: text/event-stream; version=2'; defaults to SSE_DEFAULT_PROTOCOL."
+        )
+    )
+    idempotency_key: Optional[str] = Field(
+        default=None,
+        max_length=255,
+        description=(
+            "Key identifying this request across retries (or the Idempotency-Key header). "
+            "Retries with the same key share one execution instead of running the pipeline again."
+        )
+    )
+    deadline_seconds: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description=(
+            "Time budget for this turn (capped at REQUEST_MAX_DEADLINE_SECONDS, default REQUEST_DEADLINE_SECONDS). "
+            "Past it the answer is partial or a short fallback."
+        )
+    )
 
     class Config:
         json_schema_extra = {
@@ -40,6 +63,10 @@ class ChatResponse(BaseModel):
         default=None,
         description="Type of agent that handled the query (policy, technical, billing)"
     )
+    partial: bool = Field(
+        default=False,
+        description="True if the deadline passed first and the response is partial or a fallback"
+    )
 
     class Config:
         json_schema_extra = {
@@ -76,6 +103,144 @@ class ChatStreamChunk(BaseModel):
         }
 
 
+class ChatSocketFrame(BaseModel):
+    """Client frame for the /chat/ws WebSocket endpoint."""
+    
+    type: Literal["chat", "cancel"] = Field(..., description="'chat' starts a turn, 'cancel' stops one")
+    id: str = Field(
+        ...,
+        min_length=1,
+        max_length=128,
+        description="Client-chosen turn id, echoed on every server frame of the turn"
+    )
+    message: Optional[str] = Field(default=None, description="User message (required for 'chat')")
+    thread_id: Optional[str] = Field(
+        default=None,
+        description="Conversation thread ID. If not provided, a new conversation starts."
+    )
+    deadline_seconds: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description="Time budget for the turn (as for /chat)"
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "type": "chat",
+                "id": "turn-1",
+                "message": "What is your privacy policy?",
+                "thread_id": "user_123"
+            }
+        }
+
+
+class ChatBatchItem(BaseModel):
+    """One message of a /chat/batch request."""
+    
+    message: str = Field(..., description="User message to answer")
+    id: Optional[str] = Field(
+        default=None,
+        max_length=128,
+        description="Client-chosen id, echoed on the result line (default: the item's index)"
+    )
+    thread_id: Optional[str] = Field(
+        default=None,
+        description="Conversation thread ID. If not provided, the message is answered on a new thread."
+    )
+    domain: Optional[Literal["policy", "technical", "billing", "dad_joke"]] = Field(
+        default=None,
+        description="Expected domain, used to group messages (guessed from keywords if not provided)"
+    )
+
+
+class ChatBatchRequest(BaseModel):
+    """Request model for /chat/batch endpoint."""
+    
+    items: list[ChatBatchItem] = Field(..., min_length=1, description="Messages to answer")
+    concurrency: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Messages answered at once (capped at and defaulting to BATCH_MAX_CONCURRENCY)"
+    )
+    deadline_seconds: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description="Time budget per message (as for /chat)"
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [
+                    {"id": "q1", "message": "What is your privacy policy?"},
+                    {"id": "q2", "message": "How do I update my payment method?"}
+                ],
+                "concurrency": 4
+            }
+        }
+
+
+class ChatJobRequest(BaseModel):
+    """Request model for /chat/jobs endpoint."""
+    
+    message: str = Field(..., description="User message to send to the agent")
+    thread_id: Optional[str] = Field(
+        default=None,
+        description="Conversation thread ID for maintaining context. If not provided, a new conversation starts."
+    )
+    deadline_seconds: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description="Time budget for the turn once it starts running (as for /chat)"
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "message": "The integration keeps timing out, how do I troubleshoot it?",
+                "thread_id": "user_123"
+            }
+        }
+
+
+class ChatJobResponse(BaseModel):
+    """State of a /chat/jobs job."""
+    
+    job_id: str = Field(..., description="Job ID")
+    status: Literal["queued", "running", "succeeded", "failed", "cancelled"] = Field(..., description="Job status")
+    stage: Optional[str] = Field(
+        default=None,
+        description="Progress of a waiting or running job (queued, routing, retrieving, composing)"
+    )
+    position: Optional[int] = Field(default=None, description="Position in the queue while queued (1 is next)")
+    thread_id: str = Field(..., description="Conversation thread ID")
+    agent_type: Optional[str] = Field(default=None, description="Type of agent handling the query")
+    response: Optional[str] = Field(default=None, description="Agent's response message once succeeded")
+    partial: bool = Field(
+        default=False,
+        description="True if the deadline passed first and the response is partial or a fallback"
+    )
+    usage: Optional[dict] = Field(default=None, description="Token usage of the turn once succeeded")
+    error: Optional[str] = Field(default=None, description="Error details if the job failed")
+    created_at: float = Field(..., description="Submission time (Unix seconds)")
+    started_at: Optional[float] = Field(default=None, description="Start time (Unix seconds)")
+    finished_at: Optional[float] = Field(default=None, description="Completion time (Unix seconds)")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "job_id": "job_3f2a9c1b7d4e",
+                "status": "running",
+                "stage": "retrieving",
+                "thread_id": "user_123",
+                "agent_type": "technical",
+                "created_at": 1760000000.0,
+                "started_at": 1760000000.4
+            }
+        }
+
+
 class ErrorResponse(BaseModel):
     """Error response model."""
     
@@ -0,0 +1,249 @@
+"""
+Compact checkpoint serialization.
+
+Checkpoints are encoded with LangGraph's msgpack serializer and, above a size
+threshold, compressed with zstd (if the zstandard package is installed) or
+zlib. Both codecs are primed with a shared dictionary of text that repeats in
+every checkpoint (message class paths, field names, state channel, tool and
+collection names), so even small message blobs compress well.
+
+The codec and dictionary version are recorded in the type tag
+(e.g. "msgpack+zstd:d2"), so stored checkpoints stay readable when defaults
+change. Payloads written without compression are decoded unchanged.
+
+LangChain Version: v1.0+
+Documentation Reference: https://docs.langchain.com/oss/python/langgraph/persistence#serializer
+"""
+
+import threading
+import zlib
+from typing import Any, Optional
+
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from app.core.logging_config import get_logger
+
+logger = get_logger("serialization")
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency, zlib is used instead
+    zstandard = None
+
+
+# Shared dictionaries by version. Never edit a published version: stored
+# checkpoints reference it by id. Add a new version and point
+# CURRENT_DICTIONARY at it instead.
+_SHARED_DICTIONARIES: dict[str, tuple[str, ...]] = {
+    "d1": (
+        # Checkpoint structure
+        "channel_values", "channel_versions", "versions_seen", "updated_channels",
+        "__start__", "branch:to:model", "branch:to:tools", "messages",
+        "source", "step", "parents", "loop", "input", "writes",
+        # Message classes and fields
+        "langchain_core.messages.human", "HumanMessage",
+        "langchain_core.messages.ai", "AIMessage",
+        "langchain_core.messages.tool", "ToolMessage",
+        "langchain_core.messages.system", "SystemMessage",
+        "model_validate_json", "content", "additional_kwargs", "response_metadata",
+        "type", "human", "name", "id", "tool_calls", "tool_call", "args",
+        "invalid_tool_calls", "usage_metadata", "input_tokens", "output_tokens",
+        "total_tokens", "input_token_details", "output_token_details",
+        "cache_read", "reasoning", "token_usage", "prompt_tokens", "completion_tokens",
+        "model_name", "model_provider", "finish_reason", "stop", "system_fingerprint",
+        "tool_call_id", "artifact", "status", "success", "error",
+        "gpt-4o-mini", "openai", "bedrock_converse", "stopReason", "end_turn", "tool_use",
+        # Tools and context references
+        "handle_policy_query", "handle_technical_query", "handle_billing_query",
+        "handle_dad_joke_request", "get_policy_documents", "search_technical_docs",
+        "search_billing_info", "find_contextual_dad_joke", "query",
+        "context_ref://rag/", "context_ref://hybrid/", "context_ref://cag/policy/",
+        "technical_docs", "billing_docs", "dad_jokes", "?ids=",
+        # Common answer text
+        "**Key Points:**", "**Contact:**", "privacy policy", "terms of service",
+    ),
+    # d1 seeded collection names that are not in use ("technical_docs",
+    # "billing_docs", "dad_jokes"). d2 uses the names the agents actually
+    # write; test_checkpointing.py fails when the tool, collection or state
+    # channel names in use drift from the current dictionary.
+    "d2": (
+        # Checkpoint structure
+        "channel_values", "channel_versions", "versions_seen", "updated_channels",
+        "__start__", "branch:to:model", "branch:to:tools", "messages",
+        "source", "step", "parents", "loop", "input", "writes",
+        # Agent state channels (middleware state schemas)
+        "jump_to", "structured_response", "current_agent", "run_started_at",
+        "history_summary", "history_summary_upto", "session_cache",
+        "branch:to:AgentLimitsMiddleware.before_agent", "branch:to:AgentLimitsMiddleware.before_model",
+        "branch:to:HistoryWindowMiddleware.before_model",
+        # Message classes and fields
+        "langchain_core.messages.human", "HumanMessage",
+        "langchain_core.messages.ai", "AIMessage",
+        "langchain_core.messages.tool", "ToolMessage",
+        "langchain_core.messages.system", "SystemMessage",
+        "model_validate_json", "content", "additional_kwargs", "response_metadata",
+        "type", "human", "name", "id", "tool_calls", "tool_call", "args",
+        "invalid_tool_calls", "usage_metadata", "input_tokens", "output_tokens",
+        "total_tokens", "input_token_details", "output_token_details",
+        "cache_read", "reasoning", "token_usage", "prompt_tokens", "completion_tokens",
+        "model_name", "model_provider", "finish_reason", "stop", "system_fingerprint",
+        "tool_call_id", "artifact", "status", "success", "error",
+        "gpt-4o-mini", "openai", "bedrock_converse", "stopReason", "end_turn", "tool_use",
+        # Tools, collections and context references
+        "handle_policy_query", "handle_technical_query", "handle_billing_query",
+        "handle_dad_joke_request", "get_policy_documents", "search_technical_docs",
+        "search_billing_info", "find_contextual_dad_joke", "query",
+        "technical_documents", "billing_documents", "dad_jokes_documents",
+        "context_ref://rag/technical_documents/", "context_ref://rag/dad_jokes_documents/",
+        "context_ref://hybrid/billing_documents/", "context_ref://cag/policy/", "?ids=",
+        "hybrid_ref_billing_documents",
+        # Common answer text
+        "**Key Points:**", "**Contact:**", "privacy policy", "terms of service",
+    ),
+}
+CURRENT_DICTIONARY = "d2"
+
+_COMPRESSION_LEVELS = {"zstd": 3, "zlib": 6}
+
+
+def _dictionary_bytes(dict_id: str) -> bytes:
+    """Raw dictionary content for a dictionary version."""
+    try:
+        return "\n".join(_SHARED_DICTIONARIES[dict_id]).encode("utf-8")
+    except KeyError:
+        raise ValueError(f"Unknown serializer dictionary: {dict_id}")
+
+
+def resolve_compression(compression: str) -> str:
+    """
+    Resolve a configured compression name to an available codec.
+
+    Args:
+        compression: "auto", "zstd", "zlib" or "none"
+
+    Returns:
+        Codec name ("zstd", "zlib" or "none")
+    """
+    if compression == "auto":
+        return "zstd" if zstandard is not None else "zlib"
+    if compression == "zstd" and zstandard is None:
+        logger.warning("Serialization: zstandard not installed, falling back to zlib")
+        return "zlib"
+    return compression
+
+
+class CompactSerializer(SerializerProtocol):
+    """
+    Msgpack serializer with dictionary-primed compression above a threshold.
+
+    Wraps JsonPlusSerializer, so anything it can encode (messages, Pydantic
+    models, dataclasses) is supported.
+    """
+
+    def __init__(
+        self,
+        compression: str = "auto",
+        threshold: int = 256,
+        use_dictionary: bool = True,
+        inner: Optional[SerializerProtocol] = None,
+    ):
+        """
+        Initialize compact serializer.
+
+        Args:
+            compression: "auto" (zstd if installed, else zlib), "zstd", "zlib" or "none"
+            threshold: Only compress encoded payloads of at least this many bytes
+            use_dictionary: Prime compression with the shared dictionary
+            inner: Serializer producing the uncompressed encoding
+        """
+        self.inner = inner or JsonPlusSerializer()
+        self.codec = resolve_compression(compression)
+        self.threshold = threshold
+        self.dict_id = CURRENT_DICTIONARY if use_dictionary else ""
+        self._zstd_dicts: dict[str, Any] = {}
+        self._local = threading.local()
+
+    # ------------------------------------------------------------------
+    # Codecs
+    # ------------------------------------------------------------------
+
+    def _zstd_dict(self, dict_id: str):
+        zstd_dict = self._zstd_dicts.get(dict_id)
+        if zstd_dict is None:
+            zstd_dict = zstandard.ZstdCompressionDict(
+                _dictionary_bytes(dict_id), dict_type=zstandard.DICT_TYPE_RAWCONTENT
+            )
+            self._zstd_dicts[dict_id] = zstd_dict
+        return zstd_dict
+
+    def _zstd(self, kind: str, dict_id: str):
+        """Thread-local zstd (de)compressor (they are not thread-safe)."""
+        cache = self._local.__dict__.setdefault(kind, {})
+        codec = cache.get(dict_id)
+        if codec is None:
+            options = {"dict_data": self._zstd_dict(dict_id)} if dict_id else {}
+            if kind == "compressor":
+                codec = zstandard.ZstdCompressor(level=_COMPRESSION_LEVELS["zstd"], **options)
+            else:
+                codec = zstandard.ZstdDecompressor(**options)
+            cache[dict_id] = codec
+        return codec
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == "zstd":
+            return self._zstd("compressor", self.dict_id).compress(data)
+        options = {"zdict": _dictionary_bytes(self.dict_id)} if self.dict_id else {}
+        compressor = zlib.compressobj(_COMPRESSION_LEVELS["zlib"], **options)
+        return compressor.compress(data) + compressor.flush()
+
+    def _decompress(self, codec: str, dict_id: str, data: bytes) -> bytes:
+        if codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError("Checkpoint was compressed with zstd but zstandard is not installed")
+            return self._zstd("decompressor", dict_id).decompress(data)
+        if codec == "zlib":
+            options = {"zdict": _dictionary_bytes(dict_id)} if dict_id else {}
+            decompressor = zlib.decompressobj(**options)
+            return decompressor.decompress(data) + decompressor.flush()
+        raise ValueError(f"Unknown checkpoint compression: {codec}")
+
+    # ------------------------------------------------------------------
+    # SerializerProtocol
+    # ------------------------------------------------------------------
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        """Encode, compressing payloads at or above the threshold when it saves space."""
+        type_, data = self.inner.dumps_typed(obj)
+        if self.codec == "none" or len(data) < self.threshold or type_ == "null":
+            return type_, data
+        compressed = self._compress(data)
+        if len(compressed) >= len(data):
+            return type_, data
+        return f"{type_}+{self.codec}:{self.dict_id}", compressed
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        """Decode a payload written by this or the inner serializer."""
+        type_, payload = data
+        if "+" in type_:
+            type_, codec_tag = type_.split("+", 1)
+            codec, _, dict_id = codec_tag.partition(":")
+            payload = self._decompress(codec, dict_id, payload)
+        return self.inner.loads_typed((type_, payload))
+
+
+def get_serializer(name: str, compression: str = "auto", threshold: int = 256) -> Optional[SerializerProtocol]:
+    """
+    Get a checkpoint serializer by name.
+
+    Args:
+        name: "compact" or "jsonplus"
+        compression: Compression for the compact serializer
+        threshold: Compression threshold in bytes
+
+    Returns:
+        Serializer instance, or None for the saver's default (jsonplus)
+    """
+    if name == "compact":
+        return CompactSerializer(compression=compression, threshold=threshold)
+    return None
@@ -0,0 +1,510 @@
+"""
+SQLite-backed durable checkpointer with write coalescing.
+
+Conversation state survives restarts and can be shared by several uvicorn
+workers on one host (SQLite WAL mode allows concurrent readers alongside a
+single writer). A graph step issues several checkpoint writes (one put plus
+put_writes per task); these are buffered and flushed together in a single
+transaction, either when the buffer is read from, when it reaches a batch
+size, or after a short flush interval.
+
+The buffer belongs to one process: another worker only sees a write once it
+has been flushed. A follow-up request routed to a different worker within
+the flush interval can read the thread's previous state, so deployments
+running several workers without sticky sessions should use write-through
+(checkpoint_flush_interval_ms=0).
+
+LangChain Version: v1.0+
+Documentation Reference: https://docs.langchain.com/oss/python/langgraph/checkpoints
+"""
+
+import asyncio
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
+
+logger = get_logger("sqlite_checkpointer")
+
+_metrics = get_metrics()
+_flushes = _metrics.counter(
+    "checkpoint_sqlite_flushes_total", "SQLite checkpoint write transactions"
+)
+_flush_batch = _metrics.histogram(
+    "checkpoint_sqlite_flush_batch_size", "Buffered checkpoint operations per SQLite transaction"
+)
+_flush_seconds = _metrics.histogram(
+    "checkpoint_sqlite_flush_seconds", "Duration of SQLite checkpoint flushes"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    Durable checkpointer storing checkpoints in a SQLite database (WAL mode).
+
+    Writes are coalesced: put/put_writes append to an in-memory buffer that is
+    flushed in one transaction. Every read flushes first, so reads always see
+    this process's own writes; other processes see them after the flush. A
+    crash can lose at most flush_interval_ms of buffered writes (set it to 0
+    to flush on every write); the app closes the saver on shutdown, which
+    flushes the rest.
+
+    The per-thread cap applies per namespace, and subgraph namespaces (the
+    tools:<task_id> namespace of each worker agent run) are deleted once the
+    root graph has a checkpoint newer than all of theirs, so a thread at rest
+    keeps at most max_checkpoints_per_thread checkpoints in total.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval_ms: int = 50,
+        max_batch: int = 256,
+        max_checkpoints_per_thread: Optional[int] = None,
+        **kwargs: Any
+    ):
+        """
+        Initialize SQLite checkpointer.
+
+        Args:
+            path: SQLite database file path
+            flush_interval_ms: Maximum time buffered writes wait before flushing (0 = write-through)
+            max_batch: Flush as soon as this many operations are buffered
+            max_checkpoints_per_thread: Latest checkpoints kept per thread/namespace (None keeps all)
+            **kwargs: Passed to BaseCheckpointSaver (e.g. serde)
+        """
+        super().__init__(**kwargs)
+        self.path = path
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_batch = max_batch
+        self.max_checkpoints_per_thread = max_checkpoints_per_thread
+
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+
+        # Serializes use of the connection; buffer has its own lock so
+        # writers never wait on an in-progress flush.
+        self._db_lock = threading.Lock()
+        self._buffer_lock = threading.Lock()
+        self._buffer: list[tuple[str, tuple]] = []
+        self._touched: set[tuple[str, str]] = set()
+        self._flush_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._closed = False
+        self._flusher: Optional[threading.Thread] = None
+        if self.flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name="checkpoint-flusher", daemon=True)
+            self._flusher.start()
+
+    # ------------------------------------------------------------------
+    # Write buffering
+    # ------------------------------------------------------------------
+
+    def _enqueue(self, ops: list[tuple[str, tuple]], thread_key: tuple[str, str]) -> bool:
+        """
+        Buffer write operations.
+
+        Returns:
+            True if the caller should flush now (write-through or buffer full);
+            otherwise the background flusher has been signalled
+        """
+        with self._buffer_lock:
+            self._buffer.extend(ops)
+            self._touched.add(thread_key)
+            pending = len(self._buffer)
+        if self.flush_interval <= 0 or pending >= self.max_batch:
+            return True
+        self._flush_event.set()
+        return False
+
+    def _flush_loop(self) -> None:
+        """Background flusher: wait for buffered writes, then coalesce for one interval."""
+        while not self._closed:
+            self._flush_event.wait()
+            if self._closed:
+                break
+            self._flush_event.clear()
+            # Give the rest of the graph step a chance to join this batch (cut short by close)
+            self._stop_event.wait(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"SQLite Checkpointer: Background flush failed: {e}")
+
+    def flush(self) -> None:
+        """Write all buffered operations in a single transaction."""
+        with self._db_lock:
+            with self._buffer_lock:
+                ops, self._buffer = self._buffer, []
+                touched, self._touched = self._touched, set()
+            if not ops:
+                return
+            start = time.perf_counter()
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in ops:
+                    cursor.execute(sql, params)
+                if self.max_checkpoints_per_thread:
+                    for thread_id, checkpoint_ns in touched:
+                        self._prune(cursor, thread_id, checkpoint_ns)
+                for thread_id in {thread_id for thread_id, checkpoint_ns in touched if not checkpoint_ns}:
+                    self._drop_finished_subgraphs(cursor, thread_id)
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            _flushes.inc()
+            _flush_batch.observe(len(ops))
+            _flush_seconds.observe(time.perf_counter() - start)
+
+    def _prune(self, cursor: sqlite3.Cursor, thread_id: str, checkpoint_ns: str) -> None:
+        """Delete checkpoints (and their writes) beyond the per-thread cap."""
+        cursor.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.max_checkpoints_per_thread - 1),
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return
+        oldest_kept = row[0]
+        for table in ("checkpoints", "writes"):
+            cursor.execute(
+                f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+                (thread_id, checkpoint_ns, oldest_kept),
+            )
+
+    def _drop_finished_subgraphs(self, cursor: sqlite3.Cursor, thread_id: str) -> None:
+        """Delete subgraph namespaces whose checkpoints all predate the latest root checkpoint."""
+        cursor.execute(
+            "SELECT checkpoint_ns FROM checkpoints WHERE thread_id = ? AND checkpoint_ns != '' "
+            "GROUP BY checkpoint_ns HAVING MAX(checkpoint_id) < "
+            "(SELECT MAX(checkpoint_id) FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = '')",
+            (thread_id, thread_id),
+        )
+        finished = [(thread_id, row[0]) for row in cursor.fetchall()]
+        for table in ("checkpoints", "writes"):
+            cursor.executemany(f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ?", finished)
+
+    def close(self) -> None:
+        """Stop the background flusher, flush pending writes and close the database."""
+        self._closed = True
+        self._stop_event.set()
+        self._flush_event.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
+
+    # ------------------------------------------------------------------
+    # BaseCheckpointSaver interface
+    # ------------------------------------------------------------------
+
+    def _load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> list:
+        rows = self._conn.execute(
+            "SELECT task_id, channel, type, value, task_path, idx FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        rows.sort(key=lambda r: writes_sort_key(r[4], r[0], r[5]))
+        return [(task_id, channel, self.serde.loads_typed((type_, value))) for task_id, channel, type_, value, _, _ in rows]
+
+    def _row_to_tuple(self, row: tuple) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata = row
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=self._load_writes(thread_id, checkpoint_ns, checkpoint_id),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Get a checkpoint tuple (the latest for the thread unless checkpoint_id is set)."""
+        self.flush()
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+        with self._db_lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            result = self._row_to_tuple(row)
+        if checkpoint_id:
+            # Preserve the caller's config, as the in-memory saver does
+            result = result._replace(config=config)
+        return result
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """List checkpoints, newest first."""
+        self.flush()
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+            f"metadata_type, metadata FROM checkpoints {where} ORDER BY checkpoint_id DESC"
+        )
+
+        results = []
+        with self._db_lock:
+            for row in self._conn.execute(query, params).fetchall():
+                if limit is not None and len(results) >= limit:
+                    break
+                if filter:
+                    metadata = self.serde.loads_typed((row[6], row[7]))
+                    if not all(metadata.get(k) == v for k, v in filter.items()):
+                        continue
+                results.append(self._row_to_tuple(row))
+        yield from results
+
+    def _checkpoint_ops(
+        self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata
+    ) -> tuple[list, tuple[str, str], RunnableConfig]:
+        """Serialize a checkpoint into (operations, thread key, config of the new checkpoint)."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        type_, serialized = self.serde.dumps_typed(checkpoint)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        return (
+            [(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, "
+                "parent_checkpoint_id, type, checkpoint, metadata_type, metadata) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    serialized,
+                    metadata_type,
+                    serialized_metadata,
+                ),
+            )],
+            (thread_id, checkpoint_ns),
+            {
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint["id"],
+                }
+            },
+        )
+
+    def _writes_ops(
+        self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str, task_path: str
+    ) -> tuple[list, tuple[str, str]]:
+        """Serialize pending writes into (operations, thread key)."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # Special writes (errors, interrupts) replace; regular writes are idempotent
+        verb = "INSERT OR REPLACE" if all(w[0] in WRITES_IDX_MAP for w in writes) else "INSERT OR IGNORE"
+        ops = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, serialized = self.serde.dumps_typed(value)
+            ops.append((
+                f"{verb} INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, "
+                "type, value, task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint_id,
+                    task_id,
+                    WRITES_IDX_MAP.get(channel, idx),
+                    channel,
+                    type_,
+                    serialized,
+                    task_path,
+                ),
+            ))
+        return ops, (thread_id, checkpoint_ns)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Buffer a checkpoint for the next flush."""
+        ops, thread_key, next_config = self._checkpoint_ops(config, checkpoint, metadata)
+        if self._enqueue(ops, thread_key):
+            self.flush()
+        return next_config
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Buffer pending writes for the next flush."""
+        if self._enqueue(*self._writes_ops(config, writes, task_id, task_path)):
+            self.flush()
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete all checkpoints and writes associated with a thread ID."""
+        self.flush()
+        with self._db_lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+            self._conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+            self._conn.execute("COMMIT")
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        """Generate monotonically increasing string versions (same format as MemorySaver)."""
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # ------------------------------------------------------------------
+    # Async interface (runs the blocking SQLite calls in a worker thread)
+    # ------------------------------------------------------------------
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Async version of get_tuple."""
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        """Async version of list."""
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Async version of put (buffers on the event loop; any flush runs in a worker thread)."""
+        ops, thread_key, next_config = self._checkpoint_ops(config, checkpoint, metadata)
+        if self._enqueue(ops, thread_key):
+            await asyncio.to_thread(self.flush)
+        return next_config
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Async version of put_writes (buffers on the event loop; any flush runs in a worker thread)."""
+        if self._enqueue(*self._writes_ops(config, writes, task_id, task_path)):
+            await asyncio.to_thread(self.flush)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        """Async version of delete_thread."""
+        await asyncio.to_thread(self.delete_thread, thread_id)
@@ -20,7 +20,7 @@ class AgentState(TypedDict):
     # Conversation messages (required for LangGraph)
     messages: Annotated[Sequence, add_messages]
     
-    # Session cache for hybrid RAG/CAG strategy (billing agent)
+    # Session cache for hybrid RAG/CAG strategy (billing agent; context references only)
     session_cache: dict
     
     # Current agent type handling the request
@@ -31,6 +31,9 @@ class AgentState(TypedDict):
     
     # Thread ID for conversation persistence
     thread_id: str
+    
+    # Rolling summary of messages outside the model's history window
+    history_summary: str
 
 
 def create_initial_state(thread_id: str = "default") -> AgentState:
@@ -48,6 +51,7 @@ def create_initial_state(thread_id: str = "default") -> AgentState:
         session_cache={},
         current_agent="",
         retrieval_context="",
-        thread_id=thread_id
+        thread_id=thread_id,
+        history_summary=""
     )
 
@@ -0,0 +1,392 @@
+"""
+Per-provider circuit breakers for LLM calls.
+
+When a provider is erroring or very slow, every request would otherwise wait
+out the full timeout/retry sequence and hold a worker slot. A breaker tracks
+recent outcomes per provider and opens when the error rate or slow-call rate
+crosses a threshold; while open, calls fail immediately (or go to a fallback
+model). After a cool-down a limited number of half-open probe calls decide
+whether to close it again.
+
+States: closed -> open (thresholds crossed) -> half_open (after open_seconds)
+-> closed (probe succeeded) or open (probe failed).
+
+Only errors that say the provider is unhealthy count as failures: transport
+errors, timeouts, rate limiting (429) and server errors (5xx). Client errors
+(bad request, auth, validation) would fail the same way on any model, so
+they are raised without touching the breaker or trying the fallback, and so
+is a call that ran out of its own time budget.
+
+LangChain Version: v1.0+
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Optional
+
+import botocore.exceptions
+import httpx
+import openai
+from langchain_core.messages import AIMessage, BaseMessage
+
+from app.core.config import get_settings
+from app.core.deadline import current_deadline
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
+from app.llm.concurrency import UpstreamBusyError
+from app.llm.wrappers import DelegatingChatModel, model_label
+
+logger = get_logger("circuit_breaker")
+
+_metrics = get_metrics()
+_state_gauge = _metrics.gauge(
+    "llm_circuit_state", "Circuit state per provider (0 closed, 1 half-open, 2 open)"
+)
+_transitions = _metrics.counter(
+    "llm_circuit_transitions_total", "Circuit state changes per provider"
+)
+_rejected = _metrics.counter(
+    "llm_circuit_rejected_total", "Calls rejected without reaching the provider because its circuit was open"
+)
+_fallbacks = _metrics.counter(
+    "llm_circuit_fallbacks_total", "Calls served by the fallback model"
+)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+_TIMEOUT_ERRORS = (
+    TimeoutError,
+    httpx.TimeoutException,
+    openai.APITimeoutError,
+    botocore.exceptions.ReadTimeoutError,
+    botocore.exceptions.ConnectTimeoutError,
+)
+_TRANSPORT_ERRORS = _TIMEOUT_ERRORS + (
+    ConnectionError,
+    httpx.TransportError,
+    openai.APIConnectionError,
+    botocore.exceptions.HTTPClientError,
+    botocore.exceptions.ConnectionError,
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the provider's circuit is open."""
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"LLM provider '{provider}' is unavailable (circuit open), retry in {retry_after:.0f}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Error-rate and latency based circuit breaker for one provider."""
+
+    def __init__(
+        self,
+        provider: str,
+        window_seconds: float = 30.0,
+        min_requests: int = 10,
+        error_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 20.0,
+        slow_rate_threshold: float = 0.8,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1,
+    ):
+        """
+        Initialize circuit breaker.
+
+        Args:
+            provider: Provider name (for metrics and errors)
+            window_seconds: Outcomes older than this are ignored
+            min_requests: Minimum outcomes in the window before the circuit can open
+            error_rate_threshold: Open when this fraction of calls fail
+            slow_call_seconds: Calls slower than this count as slow
+            slow_rate_threshold: Open when this fraction of calls are slow
+            open_seconds: Time to stay open before allowing probe calls
+            half_open_probes: Concurrent probe calls allowed while half-open
+        """
+        self.provider = provider
+        self.window_seconds = window_seconds
+        self.min_requests = min_requests
+        self.error_rate_threshold = error_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate_threshold = slow_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        # (timestamp, failed, slow), oldest first
+        self._outcomes: deque = deque()
+        self._lock = threading.Lock()
+        _state_gauge.set(0, provider=provider)
+
+    def _set_state(self, state: str) -> None:
+        if state == self.state:
+            return
+        logger.warning(f"Circuit Breaker: {self.provider} {self.state} -> {state}")
+        self.state = state
+        _state_gauge.set(_STATE_VALUES[state], provider=self.provider)
+        _transitions.inc(provider=self.provider, state=state)
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self._probes_in_flight = 0
+        elif state == CLOSED:
+            self._outcomes.clear()
+
+    def retry_after(self) -> float:
+        """Seconds until the circuit allows probe calls."""
+        return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may go to the provider.
+
+        Returns:
+            True if allowed (closed, or a half-open probe slot is free)
+        """
+        with self._lock:
+            if self.state == OPEN and self.retry_after() <= 0:
+                self._set_state(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return True
+            _rejected.inc(provider=self.provider)
+            return False
+
+    def record(self, failed: bool, latency: float) -> None:
+        """
+        Record the outcome of an allowed call.
+
+        Args:
+            failed: Whether the call failed with a provider error
+            latency: Call duration in seconds
+        """
+        slow = latency >= self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                self._set_state(OPEN if failed or slow else CLOSED)
+                return
+
+            now = time.monotonic()
+            self._outcomes.append((now, failed, slow))
+            while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+                self._outcomes.popleft()
+            total = len(self._outcomes)
+            if self.state != CLOSED or total < self.min_requests:
+                return
+            failures = sum(1 for _, f, _ in self._outcomes if f)
+            slow_calls = sum(1 for _, _, s in self._outcomes if s)
+            if failures / total >= self.error_rate_threshold or slow_calls / total >= self.slow_rate_threshold:
+                self._set_state(OPEN)
+
+    def release(self) -> None:
+        """Record an allowed call that was cancelled (no outcome)."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def snapshot(self) -> dict:
+        """Current state for diagnostics."""
+        with self._lock:
+            return {
+                "state": self.state,
+                "recent_calls": len(self._outcomes),
+                "retry_after": round(self.retry_after(), 1) if self.state == OPEN else 0.0,
+            }
+
+
+# Breakers by provider
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(provider: str) -> CircuitBreaker:
+    """
+    Get or create the circuit breaker for a provider (configured from Settings).
+
+    Args:
+        provider: Provider name (e.g. "openai", "bedrock")
+
+    Returns:
+        CircuitBreaker: Shared breaker for the provider
+    """
+    breaker = _breakers.get(provider)
+    if breaker is None:
+        settings = get_settings()
+        with _breakers_lock:
+            breaker = _breakers.get(provider)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    provider,
+                    window_seconds=settings.circuit_window_seconds,
+                    min_requests=settings.circuit_min_requests,
+                    error_rate_threshold=settings.circuit_error_rate_threshold,
+                    slow_call_seconds=settings.circuit_slow_call_seconds,
+                    slow_rate_threshold=settings.circuit_slow_rate_threshold,
+                    open_seconds=settings.circuit_open_seconds,
+                    half_open_probes=settings.circuit_half_open_probes,
+                )
+                _breakers[provider] = breaker
+    return breaker
+
+
+def get_circuit_states() -> dict:
+    """Snapshot of every provider's circuit."""
+    return {provider: breaker.snapshot() for provider, breaker in list(_breakers.items())}
+
+
+def _is_provider_failure(error: BaseException) -> bool:
+    """
+    Whether an error says the provider is unhealthy.
+
+    Args:
+        error: Exception raised by a model call
+
+    Returns:
+        True for transport errors, timeouts, 429 and 5xx responses
+    """
+    status = getattr(error, "status_code", None)
+    if status is None and isinstance(error, botocore.exceptions.ClientError):
+        status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, _TRANSPORT_ERRORS)
+
+
+def _out_of_budget(error: BaseException, kwargs: dict) -> bool:
+    """Whether the call timed out on its own budget (a per-call timeout shorter than the provider's)."""
+    timeout = kwargs.get("timeout")
+    return (
+        isinstance(error, _TIMEOUT_ERRORS)
+        and timeout is not None
+        and timeout < get_settings().llm_request_timeout_seconds
+    )
+
+
+def _deadline_expired() -> bool:
+    deadline = current_deadline()
+    return deadline is not None and deadline.expired
+
+
+def _model_provider(model: Any) -> str:
+    """Provider part of a model's "provider:model" label."""
+    return model_label(model).split(":", 1)[0]
+
+
+class CircuitBreakerChatModel(DelegatingChatModel):
+    """
+    Chat model guarded by its provider's circuit breaker.
+
+    While the primary's circuit is open (or if the primary call fails with a
+    provider error and the request deadline hasn't passed), the optional
+    fallback model is used; without a fallback, CircuitOpenError is raised
+    immediately. A fallback on the primary's own provider is ignored:
+    it shares the primary's breaker, so it would only add a second wait on
+    the degraded provider before failing.
+    """
+
+    @classmethod
+    def create(cls, primary: Any, fallback: Optional[Any] = None) -> "CircuitBreakerChatModel":
+        """
+        Guard a model with its provider's circuit breaker.
+
+        Args:
+            primary: Model to call while its provider is healthy
+            fallback: Optional model (on another provider) used while it is not
+
+        Returns:
+            CircuitBreakerChatModel
+        """
+        if fallback is not None and _model_provider(fallback) == _model_provider(primary):
+            logger.warning(
+                f"Circuit Breaker: Ignoring fallback {model_label(fallback)} on the same provider as {model_label(primary)}"
+            )
+            fallback = None
+        models = {"primary": primary}
+        label = f"breaker({model_label(primary)})"
+        if fallback is not None:
+            models["fallback"] = fallback
+            label = f"breaker({model_label(primary)}|{model_label(fallback)})"
+        return cls(models=models, label=label)
+
+    def _provider(self, name: str) -> str:
+        return _model_provider(self.models[name])
+
+    def _plan(self) -> list[tuple[str, CircuitBreaker]]:
+        """Models to try in order, each with its breaker."""
+        return [(name, get_circuit_breaker(self._provider(name))) for name in ("primary", "fallback") if name in self.models]
+
+    def _rejection(self, plan: list) -> CircuitOpenError:
+        _, breaker = plan[0]
+        return CircuitOpenError(breaker.provider, breaker.retry_after())
+
+    def _invoke(self, messages: list[BaseMessage], **kwargs: Any) -> AIMessage:
+        plan = self._plan()
+        error: Optional[Exception] = None
+        for name, breaker in plan:
+            if not breaker.allow():
+                continue
+            if name == "fallback":
+                _fallbacks.inc(model=self.label)
+            start = time.monotonic()
+            try:
+                result = self.models[name].invoke(messages, **kwargs)
+            except UpstreamBusyError:
+                # Local overload, not a provider failure
+                breaker.release()
+                raise
+            except Exception as e:
+                if not _is_provider_failure(e) or _out_of_budget(e, kwargs):
+                    breaker.release()
+                    raise
+                breaker.record(failed=True, latency=time.monotonic() - start)
+                error = e
+                if _deadline_expired():
+                    break
+                continue
+            breaker.record(failed=False, latency=time.monotonic() - start)
+            return result
+        raise error or self._rejection(plan)
+
+    async def _ainvoke(self, messages: list[BaseMessage], **kwargs: Any) -> AIMessage:
+        plan = self._plan()
+        error: Optional[Exception] = None
+        for name, breaker in plan:
+            if not breaker.allow():
+                continue
+            if name == "fallback":
+                _fallbacks.inc(model=self.label)
+            start = time.monotonic()
+            try:
+                result = await self.models[name].ainvoke(messages, **kwargs)
+            except asyncio.CancelledError:
+                # e.g. the losing side of a hedged request
+                breaker.release()
+                raise
+            except UpstreamBusyError:
+                # Local overload, not a provider failure
+                breaker.release()
+                raise
+            except Exception as e:
+                if not _is_provider_failure(e) or _out_of_budget(e, kwargs):
+                    breaker.release()
+                    raise
+                breaker.record(failed=True, latency=time.monotonic() - start)
+                error = e
+                if _deadline_expired():
+                    break
+                continue
+            breaker.record(failed=False, latency=time.monotonic() - start)
+            return result
+        raise error or self._rejection(plan)
@@ -0,0 +1,320 @@
+"""
+Shared HTTP clients for LLM providers.
+
+Every ChatOpenAI/OpenAIEmbeddings instance would otherwise create its own
+HTTP client, so agents rebuilt per request start with a cold connection pool
+and pay a new TCP + TLS handshake. The registry keeps one keep-alive pool per
+provider (HTTP/2 when the h2 package is installed) that all models share, and
+counts how many requests reuse a pooled connection.
+Models are given client handles rather than the pools themselves: a handle
+sends through the registry's current pool for its provider (per event loop
+for async clients), so cached models keep working after the pools are
+closed on shutdown and recreated, and an async pool is never used from a
+loop other than the one it was created in.
+Bedrock runtime clients are likewise created once per region with a tuned
+botocore config.
+
+LangChain Version: v1.0+
+Documentation Reference: https://www.python-httpx.org/advanced/resource-limits/
+"""
+
+import asyncio
+import importlib.util
+import threading
+import weakref
+from typing import Optional
+
+import httpx
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
+
+logger = get_logger("llm_clients")
+
+_metrics = get_metrics()
+_http_requests = _metrics.counter(
+    "llm_http_requests_total", "LLM provider HTTP requests by connection reuse (new/reused)"
+)
+_connections_opened = _metrics.counter(
+    "llm_http_connections_opened_total", "New TCP connections opened to LLM providers"
+)
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (httpx[http2])."""
+    return importlib.util.find_spec("h2") is not None
+
+
+class _ConnectionTrace:
+    """Per-request httpcore trace that records whether a new connection was opened."""
+
+    __slots__ = ("provider", "opened")
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.opened = False
+
+    def _record(self, event_name: str) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self.opened = True
+            _connections_opened.inc(provider=self.provider)
+
+    def __call__(self, event_name: str, info: dict) -> None:
+        self._record(event_name)
+
+    async def async_trace(self, event_name: str, info: dict) -> None:
+        self._record(event_name)
+
+
+def _record_response(response: httpx.Response) -> None:
+    trace = response.request.extensions.get("trace")
+    owner = getattr(trace, "__self__", trace)
+    if isinstance(owner, _ConnectionTrace):
+        _http_requests.inc(provider=owner.provider, connection="new" if owner.opened else "reused")
+
+
+class _ClientHandle(httpx.Client):
+    """Sync client given to models; sends through the registry's current pool for a provider."""
+
+    def __init__(self, registry: "ClientRegistry", provider: str):
+        super().__init__(timeout=get_timeout())
+        self._registry = registry
+        self._provider = provider
+
+    def send(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        return self._registry.client(self._provider).send(request, **kwargs)
+
+    def close(self) -> None:
+        """No-op: the registry owns the pool."""
+
+
+class _AsyncClientHandle(httpx.AsyncClient):
+    """Async client given to models; sends through the running loop's pool for a provider."""
+
+    def __init__(self, registry: "ClientRegistry", provider: str):
+        super().__init__(timeout=get_timeout())
+        self._registry = registry
+        self._provider = provider
+
+    async def send(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        return await self._registry.async_client(self._provider).send(request, **kwargs)
+
+    async def aclose(self) -> None:
+        """No-op: the registry owns the pool."""
+
+
+class ClientRegistry:
+    """Lazily created, process-wide sync and async HTTP clients per provider."""
+
+    def __init__(self):
+        self._clients: dict[str, httpx.Client] = {}
+        # Event loop -> provider -> client (async pools are bound to their loop)
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, httpx.AsyncClient]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._handles: dict[str, _ClientHandle] = {}
+        self._async_handles: dict[str, _AsyncClientHandle] = {}
+        self._bedrock_clients: dict[str, object] = {}
+        self._bedrock_key: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _client_options(self) -> dict:
+        settings = get_settings()
+        http2 = settings.llm_http2 and _http2_available()
+        if settings.llm_http2 and not http2:
+            logger.info("LLM Clients: h2 not installed, using HTTP/1.1 keep-alive pools")
+        return {
+            "http2": http2,
+            "limits": httpx.Limits(
+                max_connections=settings.llm_max_connections,
+                max_keepalive_connections=settings.llm_max_keepalive_connections,
+                keepalive_expiry=settings.llm_keepalive_expiry_seconds,
+            ),
+            "timeout": get_timeout(),
+        }
+
+    def client(self, provider: str) -> httpx.Client:
+        """Get the shared sync client for a provider."""
+        client = self._clients.get(provider)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(provider)
+                if client is None:
+                    def on_request(request: httpx.Request) -> None:
+                        request.extensions["trace"] = _ConnectionTrace(provider)
+
+                    client = httpx.Client(
+                        event_hooks={"request": [on_request], "response": [_record_response]},
+                        **self._client_options(),
+                    )
+                    self._clients[provider] = client
+                    logger.info(f"LLM Clients: Created shared sync client for {provider}")
+        return client
+
+    def async_client(self, provider: str) -> httpx.AsyncClient:
+        """Get the shared async client for a provider in the running event loop."""
+        loop = asyncio.get_running_loop()
+        loop_clients = self._async_clients.get(loop, {})
+        client = loop_clients.get(provider)
+        if client is None:
+            with self._lock:
+                loop_clients = self._async_clients.setdefault(loop, {})
+                client = loop_clients.get(provider)
+                if client is None:
+                    async def on_request(request: httpx.Request) -> None:
+                        request.extensions["trace"] = _ConnectionTrace(provider).async_trace
+
+                    async def on_response(response: httpx.Response) -> None:
+                        _record_response(response)
+
+                    client = httpx.AsyncClient(
+                        event_hooks={"request": [on_request], "response": [on_response]},
+                        **self._client_options(),
+                    )
+                    loop_clients[provider] = client
+                    logger.info(f"LLM Clients: Created shared async client for {provider}")
+        return client
+
+    def client_handle(self, provider: str) -> httpx.Client:
+        """
+        Get the sync client to give a model for a provider.
+
+        Args:
+            provider: Provider name (e.g. "openai")
+
+        Returns:
+            Client that sends through the shared pool current at request time
+        """
+        with self._lock:
+            handle = self._handles.get(provider)
+            if handle is None:
+                handle = self._handles[provider] = _ClientHandle(self, provider)
+        return handle
+
+    def async_client_handle(self, provider: str) -> httpx.AsyncClient:
+        """
+        Get the async client to give a model for a provider.
+
+        Args:
+            provider: Provider name (e.g. "openai")
+
+        Returns:
+            Client that sends through the running loop's shared pool
+        """
+        with self._lock:
+            handle = self._async_handles.get(provider)
+            if handle is None:
+                handle = self._async_handles[provider] = _AsyncClientHandle(self, provider)
+        return handle
+
+    def bedrock_key(self) -> str:
+        """Resolve the Bedrock API key once (it may be read from a file)."""
+        if self._bedrock_key is None:
+            with self._lock:
+                if self._bedrock_key is None:
+                    self._bedrock_key = get_settings().get_bedrock_key()
+        return self._bedrock_key
+
+    def bedrock_client(self, region: str):
+        """
+        Get the shared bedrock-runtime client for a region.
+
+        boto3 clients are thread-safe, so one client (and its connection pool)
+        serves every model and concurrent request. The bearer token handler
+        is registered once, when the client is created.
+
+        Args:
+            region: AWS region name
+
+        Returns:
+            botocore BedrockRuntime client
+        """
+        client = self._bedrock_clients.get(region)
+        if client is not None:
+            return client
+
+        bedrock_key = self.bedrock_key()
+        with self._lock:
+            client = self._bedrock_clients.get(region)
+            if client is None:
+                import boto3
+                from botocore.config import Config
+
+                settings = get_settings()
+                config = Config(
+                    region_name=region,
+                    max_pool_connections=settings.bedrock_max_pool_connections,
+                    connect_timeout=settings.llm_connect_timeout_seconds,
+                    read_timeout=settings.llm_request_timeout_seconds,
+                    tcp_keepalive=True,
+                    retries={"mode": settings.bedrock_retry_mode, "total_max_attempts": settings.bedrock_max_attempts},
+                )
+                # Sessions are not thread-safe; create the client from a private one under the lock
+                client = boto3.session.Session().client(service_name="bedrock-runtime", config=config)
+
+                def inject_bearer_token(request, **kwargs):
+                    """Inject bearer token from .env/file into request headers."""
+                    if request.headers is None:
+                        request.headers = {}
+                    request.headers["Authorization"] = f"Bearer {bedrock_key}"
+
+                # Runs before each request is sent
+                client.meta.events.register("before-send.bedrock-runtime", inject_bearer_token)
+                self._bedrock_clients[region] = client
+                logger.info(f"LLM Clients: Created shared Bedrock client for {region}")
+        return client
+
+    def close(self) -> None:
+        """Close sync and Bedrock clients (async clients are closed by aclose)."""
+        with self._lock:
+            clients, self._clients = self._clients, {}
+            bedrock_clients, self._bedrock_clients = self._bedrock_clients, {}
+        for client in clients.values():
+            client.close()
+        for client in bedrock_clients.values():
+            client.close()
+
+    async def aclose(self) -> None:
+        """
+        Close all clients.
+
+        Async clients of the running loop are closed; those of other loops
+        are dropped (they can only be closed from their own loop). Pools are
+        recreated on the next request, so models built on handles keep working.
+        """
+        self.close()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async_clients.pop(loop, {})
+            self._async_clients.clear()
+        for client in clients.values():
+            await client.aclose()
+
+
+def get_timeout() -> httpx.Timeout:
+    """
+    Request timeout for LLM provider calls from Settings.
+
+    Returns:
+        httpx.Timeout with a separate connect timeout
+    """
+    settings = get_settings()
+    return httpx.Timeout(settings.llm_request_timeout_seconds, connect=settings.llm_connect_timeout_seconds)
+
+
+# Global registry instance
+_registry: Optional[ClientRegistry] = None
+
+
+def get_client_registry() -> ClientRegistry:
+    """
+    Get or create the global client registry.
+
+    Returns:
+        ClientRegistry: Shared registry instance
+    """
+    global _registry
+    if _registry is None:
+        _registry = ClientRegistry()
+    return _registry
@@ -0,0 +1,244 @@
+"""
+Per-upstream concurrency limits for LLM calls.
+
+Every chat model instance talks to one upstream ("provider:model"). Without
+a bound, a traffic spike sends as many concurrent calls to it as there are
+requests, which runs into provider rate limits and makes every call slower.
+ConcurrencyLimitedChatModel holds a slot of its upstream's UpstreamLimiter
+for the duration of each call; callers beyond the limit wait (FIFO) and give
+up with UpstreamBusyError after UPSTREAM_ACQUIRE_TIMEOUT_SECONDS.
+
+Agents call models from worker threads (sync tools) and from the event loop
+(orchestrator), so the limiter is shared by both: sync callers block on a
+threading.Event, async callers await a future.
+
+LangChain Version: v1.0+
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
+from app.llm.wrappers import DelegatingChatModel, model_label
+
+logger = get_logger("concurrency")
+
+_metrics = get_metrics()
+_in_flight = _metrics.gauge("llm_upstream_in_flight", "LLM calls holding a slot, by upstream")
+_waiting = _metrics.gauge("llm_upstream_waiting", "LLM calls waiting for a slot, by upstream")
+_wait_time = _metrics.histogram("llm_upstream_wait_seconds", "Time LLM calls waited for an upstream slot")
+_timeouts = _metrics.counter("llm_upstream_timeouts_total", "LLM calls that gave up waiting for an upstream slot")
+
+
+class UpstreamBusyError(Exception):
+    """Raised when a call waited too long for a slot of its upstream."""
+
+    def __init__(self, upstream: str, retry_after: float):
+        super().__init__(f"LLM upstream '{upstream}' is at its concurrency limit, retry in {retry_after:.0f}s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    """A queued acquire; granted is set (under the limiter lock) when a slot is handed over."""
+
+    __slots__ = ("event", "loop", "future", "granted")
+
+    def __init__(self, event=None, loop=None, future=None):
+        self.event = event
+        self.loop = loop
+        self.future = future
+        self.granted = False
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class UpstreamLimiter:
+    """FIFO semaphore usable from threads and from the event loop."""
+
+    def __init__(self, upstream: str, limit: int, acquire_timeout: float):
+        """
+        Initialize upstream limiter.
+
+        Args:
+            upstream: Upstream label (for metrics and errors)
+            limit: Maximum concurrent calls
+            acquire_timeout: Longest wait for a slot in seconds
+        """
+        self.upstream = upstream
+        self.limit = limit
+        self.acquire_timeout = acquire_timeout
+        self._in_use = 0
+        self._waiters: deque[_Waiter] = deque()
+        self._lock = threading.Lock()
+
+    def _try_acquire(self) -> bool:
+        if self._in_use < self.limit and not self._waiters:
+            self._in_use += 1
+            _in_flight.set(self._in_use, upstream=self.upstream)
+            return True
+        return False
+
+    def _timed_out(self, waited: float) -> UpstreamBusyError:
+        _timeouts.inc(upstream=self.upstream)
+        _wait_time.observe(waited, upstream=self.upstream)
+        logger.warning(f"Concurrency: {self.upstream} busy, gave up after {waited:.1f}s")
+        return UpstreamBusyError(self.upstream, retry_after=self.acquire_timeout)
+
+    def acquire(self) -> None:
+        """
+        Take a slot, blocking the calling thread while the upstream is full.
+
+        Raises:
+            UpstreamBusyError: If no slot was free within acquire_timeout
+        """
+        start = time.monotonic()
+        with self._lock:
+            if self._try_acquire():
+                _wait_time.observe(0.0, upstream=self.upstream)
+                return
+            waiter = _Waiter(event=threading.Event())
+            self._waiters.append(waiter)
+            _waiting.set(len(self._waiters), upstream=self.upstream)
+        waiter.event.wait(self.acquire_timeout)
+        with self._lock:
+            if not waiter.granted:
+                self._waiters.remove(waiter)
+                _waiting.set(len(self._waiters), upstream=self.upstream)
+                raise self._timed_out(time.monotonic() - start)
+        _wait_time.observe(time.monotonic() - start, upstream=self.upstream)
+
+    async def aacquire(self) -> None:
+        """
+        Take a slot without blocking the event loop.
+
+        Raises:
+            UpstreamBusyError: If no slot was free within acquire_timeout
+        """
+        start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._try_acquire():
+                _wait_time.observe(0.0, upstream=self.upstream)
+                return
+            waiter = _Waiter(loop=loop, future=loop.create_future())
+            self._waiters.append(waiter)
+            _waiting.set(len(self._waiters), upstream=self.upstream)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.acquire_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            with self._lock:
+                if not waiter.granted:
+                    self._waiters.remove(waiter)
+                    _waiting.set(len(self._waiters), upstream=self.upstream)
+                    if isinstance(e, asyncio.CancelledError):
+                        raise
+                    raise self._timed_out(time.monotonic() - start)
+            # The slot was handed over while timing out or being cancelled
+            if isinstance(e, asyncio.CancelledError):
+                self.release()
+                raise
+        _wait_time.observe(time.monotonic() - start, upstream=self.upstream)
+
+    def release(self) -> None:
+        """Return a slot, handing it to the oldest waiter if there is one."""
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                _waiting.set(len(self._waiters), upstream=self.upstream)
+                if waiter.event is not None:
+                    waiter.event.set()
+                else:
+                    waiter.loop.call_soon_threadsafe(_wake, waiter.future)
+                return
+            self._in_use -= 1
+            _in_flight.set(self._in_use, upstream=self.upstream)
+
+    def snapshot(self) -> dict:
+        """Current usage for diagnostics."""
+        with self._lock:
+            return {"limit": self.limit, "in_flight": self._in_use, "waiting": len(self._waiters)}
+
+
+# Limiters by upstream label
+_limiters: dict[str, UpstreamLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_upstream_limiter(upstream: str) -> Optional[UpstreamLimiter]:
+    """
+    Get or create the limiter for an upstream (configured from Settings).
+
+    The limit is UPSTREAM_MAX_CONCURRENCY[upstream], else
+    UPSTREAM_DEFAULT_MAX_CONCURRENCY; 0 means unlimited.
+
+    Args:
+        upstream: Upstream label, e.g. "openai:gpt-4o-mini"
+
+    Returns:
+        Shared limiter, or None if the upstream is unlimited
+    """
+    limiter = _limiters.get(upstream)
+    if limiter is None:
+        settings = get_settings()
+        limit = settings.upstream_max_concurrency.get(upstream, settings.upstream_default_max_concurrency)
+        if limit <= 0:
+            return None
+        with _limiters_lock:
+            limiter = _limiters.get(upstream)
+            if limiter is None:
+                limiter = UpstreamLimiter(upstream, limit, settings.upstream_acquire_timeout_seconds)
+                _limiters[upstream] = limiter
+    return limiter
+
+
+def get_upstream_states() -> dict:
+    """Snapshot of every upstream's limiter."""
+    return {upstream: limiter.snapshot() for upstream, limiter in list(_limiters.items())}
+
+
+class ConcurrencyLimitedChatModel(DelegatingChatModel):
+    """Chat model whose calls hold a slot of its upstream's limiter."""
+
+    @classmethod
+    def create(cls, model: Any) -> Any:
+        """
+        Limit a model's concurrent calls (unchanged if its upstream is unlimited).
+
+        Args:
+            model: Chat model for one upstream
+
+        Returns:
+            ConcurrencyLimitedChatModel, or the model itself
+        """
+        label = model_label(model)
+        if get_upstream_limiter(label) is None:
+            return model
+        return cls(models={"model": model}, label=label)
+
+    def _invoke(self, messages: list[BaseMessage], **kwargs: Any) -> AIMessage:
+        limiter = get_upstream_limiter(self.label)
+        limiter.acquire()
+        try:
+            return self.models["model"].invoke(messages, **kwargs)
+        finally:
+            limiter.release()
+
+    async def _ainvoke(self, messages: list[BaseMessage], **kwargs: Any) -> AIMessage:
+        limiter = get_upstream_limiter(self.label)
+        await limiter.aacquire()
+        try:
+            return await self.models["model"].ainvoke(messages, **kwargs)
+        finally:
+            limiter.release()
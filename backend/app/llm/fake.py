@@ -0,0 +1,428 @@
+"""
+Deterministic fake chat model and embeddings for offline load testing.
+
+Selected with LLM_BACKEND=fake. Every provider function then returns these
+instead of OpenAI/Bedrock models, so the whole backend (orchestrator routing,
+worker agents, retrieval, checkpointing, streaming) runs without network
+access or API keys.
+
+The fake chat model behaves like a tool-calling model:
+- With tools bound and no tool result yet in the current turn, it calls the
+  tool whose name and description best match the user's message (so the
+  orchestrator still routes to the handle_* tools), passing the message as
+  the tool's first string argument.
+- With native structured output requested (response_format), it returns JSON
+  that satisfies the schema.
+- Otherwise it returns a synthetic answer built from the retrieved context.
+
+Latency (time to first token) is drawn from a configurable distribution and
+output is produced at a configurable token rate. Outputs depend only on the
+input and the seed, so runs are reproducible. A call's `timeout` option
+is honoured like a provider's request timeout: a call that would take
+longer raises TimeoutError once it has elapsed.
+
+LangChain Version: v1.0+
+Documentation Reference: https://docs.langchain.com/oss/python/langchain/models
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+from typing import Any, Iterator, AsyncIterator, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import PrivateAttr
+
+from app.core.metrics import get_metrics
+
+_fake_calls = get_metrics().counter(
+    "fake_llm_calls_total", "Fake chat model calls by model and response kind (tool_call/answer)"
+)
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Filler vocabulary for synthetic answers
+_VOCABULARY = (
+    "the", "your", "account", "request", "please", "policy", "settings", "support",
+    "team", "update", "review", "steps", "check", "details", "available", "option",
+    "contact", "within", "days", "access", "information", "process", "service", "help",
+)
+
+
+def _words(text: str) -> set[str]:
+    return set(_WORD.findall(text.lower()))
+
+
+def _stable_seed(*parts: Any) -> int:
+    """Seed derived from the inputs (hash() is randomized per process)."""
+    digest = hashlib.blake2b("\x1f".join(str(p) for p in parts).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def sample_latency(rng: random.Random, distribution: str, mean: float, stddev: float) -> float:
+    """
+    Draw a latency in seconds.
+
+    Args:
+        rng: Random generator
+        distribution: One of LATENCY_DISTRIBUTIONS
+        mean: Mean latency in seconds
+        stddev: Standard deviation in seconds (ignored for "fixed")
+
+    Returns:
+        Non-negative latency in seconds
+    """
+    if mean <= 0:
+        return 0.0
+    if distribution == "uniform":
+        half_width = math.sqrt(3) * stddev
+        return max(0.0, rng.uniform(mean - half_width, mean + half_width))
+    if distribution == "normal":
+        return max(0.0, rng.gauss(mean, stddev))
+    if distribution == "lognormal" and stddev > 0:
+        # Parameters of the underlying normal for the requested mean/stddev
+        sigma = math.sqrt(math.log(1 + (stddev / mean) ** 2))
+        mu = math.log(mean) - sigma ** 2 / 2
+        return rng.lognormvariate(mu, sigma)
+    return mean
+
+
+def _example_value(schema: dict, defs: dict, name: str, rng: random.Random) -> Any:
+    """Synthetic value satisfying a JSON schema fragment."""
+    if "$ref" in schema:
+        schema = defs.get(schema["$ref"].rsplit("/", 1)[-1], {})
+    for key in ("anyOf", "oneOf"):
+        if key in schema:
+            options = [s for s in schema[key] if s.get("type") != "null"] or schema[key]
+            return _example_value(options[0], defs, name, rng)
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type", "string")
+    if kind == "object":
+        properties = schema.get("properties", {})
+        return {key: _example_value(value, defs, key, rng) for key, value in properties.items()}
+    if kind == "array":
+        count = max(schema.get("minItems", 0), 3)
+        return [_example_value(schema.get("items", {}), defs, name, rng) for _ in range(count)]
+    if kind == "integer":
+        return rng.randint(1, 10)
+    if kind == "number":
+        return round(rng.uniform(1, 10), 2)
+    if kind == "boolean":
+        return True
+    return f"{name.replace('_', ' ')}: " + " ".join(rng.choice(_VOCABULARY) for _ in range(8))
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic tool-calling chat model with simulated latency and token rate."""
+
+    model_name: str = "fake"
+    latency_distribution: str = "fixed"
+    latency_mean_seconds: float = 0.0
+    latency_stddev_seconds: float = 0.0
+    # 0 means output is produced instantly
+    tokens_per_second: float = 0.0
+    answer_tokens: int = 120
+    seed: int = 0
+    # Native structured output (response_format), like the OpenAI models it stands in for
+    profile: Optional[dict] = {"structured_output": True, "tool_calling": True}
+
+    _latency_rng: random.Random = PrivateAttr()
+
+    def model_post_init(self, __context: Any) -> None:
+        self._latency_rng = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"model_name": self.model_name, "seed": self.seed}
+
+    def bind_tools(self, tools, *, tool_choice: Optional[str] = None, **kwargs):
+        """Bind tools (as OpenAI tool schemas) and other call options."""
+        formatted = [convert_to_openai_tool(t) for t in tools]
+        return self.bind(tools=formatted, tool_choice=tool_choice, **kwargs)
+
+    # ------------------------------------------------------------------
+    # Scripted behaviour
+    # ------------------------------------------------------------------
+
+    def _choose_tool(self, tools: list[dict], query: str) -> Optional[dict]:
+        """
+        Tool whose name and description share the most words with the query.
+
+        A single tool is always chosen (worker agents must call theirs); with
+        several tools and no overlap, None (answer directly, e.g. greetings).
+        """
+        if len(tools) == 1:
+            return tools[0]
+        query_words = _words(query)
+
+        def score(tool: dict) -> int:
+            function = tool["function"]
+            return len(query_words & _words(f"{function['name'].replace('_', ' ')} {function.get('description', '')}"))
+
+        # max() keeps the first tool on ties, so routing is stable
+        best = max(tools, key=score)
+        return best if score(best) else None
+
+    def _tool_call(self, tool: dict, query: str, index: int) -> dict:
+        function = tool["function"]
+        properties = function.get("parameters", {}).get("properties", {})
+        args = {}
+        for name, schema in properties.items():
+            if schema.get("type", "string") == "string" and not args:
+                args[name] = query
+            else:
+                args[name] = _example_value(schema, {}, name, random.Random(self.seed))
+        call_id = f"call_{_stable_seed(self.seed, function['name'], query, index):016x}"
+        return {"name": function["name"], "args": args, "id": call_id, "type": "tool_call"}
+
+    def _answer_text(self, messages: list[BaseMessage], rng: random.Random) -> str:
+        """Synthetic answer that quotes the latest retrieved context."""
+        context = ""
+        for msg in reversed(messages):
+            if isinstance(msg, HumanMessage):
+                break
+            if isinstance(msg, ToolMessage):
+                context = msg.text if hasattr(msg, "text") else str(msg.content)
+                break
+        words = context.split()[: self.answer_tokens // 2]
+        filler = [rng.choice(_VOCABULARY) for _ in range(self.answer_tokens - len(words))]
+        return " ".join(words + filler).capitalize() + "."
+
+    def _respond(self, messages: list[BaseMessage], **kwargs: Any) -> AIMessage:
+        """Build the response message (without any simulated delay)."""
+        query = ""
+        turn_has_tool_result = False
+        tool_rounds = 0
+        for msg in reversed(messages):
+            if isinstance(msg, HumanMessage):
+                query = msg.text if hasattr(msg, "text") else str(msg.content)
+                break
+            if isinstance(msg, ToolMessage):
+                turn_has_tool_result = True
+            elif isinstance(msg, AIMessage) and msg.tool_calls:
+                tool_rounds += 1
+
+        rng = random.Random(_stable_seed(self.seed, self.model_name, query, tool_rounds))
+        tools = kwargs.get("tools") or []
+        tool_choice = kwargs.get("tool_choice")
+        response_format = kwargs.get("response_format")
+        metadata = {"model_name": self.model_name, "model_provider": "fake"}
+
+        tool = self._choose_tool(tools, query) if tools and tool_choice != "none" and not turn_has_tool_result else None
+        if tool is not None:
+            _fake_calls.inc(model=self.model_name, kind="tool_call")
+            tool_call = self._tool_call(tool, query, tool_rounds)
+            return AIMessage(
+                content="", tool_calls=[tool_call], response_metadata={**metadata, "finish_reason": "tool_calls"}
+            )
+
+        _fake_calls.inc(model=self.model_name, kind="answer")
+        if isinstance(response_format, dict) and response_format.get("type") == "json_schema":
+            schema = response_format["json_schema"]["schema"]
+            content = json.dumps(_example_value(schema, schema.get("$defs", {}), "response", rng))
+        else:
+            content = self._answer_text(messages, rng)
+
+        max_tokens = kwargs.get("max_tokens")
+        finish_reason = "stop"
+        words = content.split(" ")
+        if max_tokens is not None and len(words) > max_tokens:
+            content = " ".join(words[:max_tokens])
+            finish_reason = "length"
+        return AIMessage(content=content, response_metadata={**metadata, "finish_reason": finish_reason})
+
+    def _with_usage(self, messages: list[BaseMessage], message: AIMessage) -> AIMessage:
+        input_tokens = count_tokens_approximately(messages)
+        output_tokens = count_tokens_approximately([message])
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        return message
+
+    def _first_token_delay(self) -> float:
+        return sample_latency(
+            self._latency_rng, self.latency_distribution, self.latency_mean_seconds, self.latency_stddev_seconds
+        )
+
+    def _generation_delay(self, message: AIMessage) -> float:
+        if self.tokens_per_second <= 0:
+            return 0.0
+        return count_tokens_approximately([message]) / self.tokens_per_second
+
+    @staticmethod
+    def _bounded_delay(delay: float, timeout: Optional[float]) -> float:
+        """Delay to simulate, raising TimeoutError (after the timeout) if it exceeds the call's timeout."""
+        if timeout is not None and delay > timeout:
+            time.sleep(max(timeout, 0))
+            raise TimeoutError("Request timed out.")
+        return delay
+
+    @staticmethod
+    async def _abounded_delay(delay: float, timeout: Optional[float]) -> float:
+        """Async version of _bounded_delay."""
+        if timeout is not None and delay > timeout:
+            await asyncio.sleep(max(timeout, 0))
+            raise TimeoutError("Request timed out.")
+        return delay
+
+    @staticmethod
+    def _stream_pieces(message: AIMessage) -> list[str]:
+        """Split content into word-sized chunks (keeping spaces)."""
+        return re.findall(r"\S+\s*", message.content) if isinstance(message.content, str) else []
+
+    # ------------------------------------------------------------------
+    # BaseChatModel
+    # ------------------------------------------------------------------
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message = self._with_usage(messages, self._respond(messages, **kwargs))
+        delay = self._bounded_delay(self._first_token_delay() + self._generation_delay(message), kwargs.get("timeout"))
+        if delay:
+            time.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message = self._with_usage(messages, self._respond(messages, **kwargs))
+        delay = await self._abounded_delay(self._first_token_delay() + self._generation_delay(message), kwargs.get("timeout"))
+        if delay:
+            await asyncio.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _chunks(self, message: AIMessage) -> Iterator[ChatGenerationChunk]:
+        """Content chunks, with tool calls and usage on the last chunk."""
+        pieces = self._stream_pieces(message) or [""]
+        for i, piece in enumerate(pieces):
+            last = i == len(pieces) - 1
+            chunk = AIMessageChunk(
+                content=piece,
+                tool_call_chunks=[
+                    {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": n}
+                    for n, c in enumerate(message.tool_calls)
+                ] if last else [],
+                usage_metadata=message.usage_metadata if last else None,
+                response_metadata=message.response_metadata if last else {},
+            )
+            yield ChatGenerationChunk(message=chunk)
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        message = self._with_usage(messages, self._respond(messages, **kwargs))
+        delay = self._bounded_delay(self._first_token_delay(), kwargs.get("timeout"))
+        if delay:
+            time.sleep(delay)
+        per_chunk = self._generation_delay(message) / max(1, len(self._stream_pieces(message)))
+        for chunk in self._chunks(message):
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            if per_chunk:
+                time.sleep(per_chunk)
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        message = self._with_usage(messages, self._respond(messages, **kwargs))
+        delay = await self._abounded_delay(self._first_token_delay(), kwargs.get("timeout"))
+        if delay:
+            await asyncio.sleep(delay)
+        per_chunk = self._generation_delay(message) / max(1, len(self._stream_pieces(message)))
+        for chunk in self._chunks(message):
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            if per_chunk:
+                await asyncio.sleep(per_chunk)
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Deterministic hash-based embeddings.
+
+    Each text maps to a fixed unit vector derived from its words, so texts
+    sharing words are somewhat similar (enough for retrieval to return
+    stable results).
+    """
+
+    def __init__(self, size: int = 1536, latency_seconds: float = 0.0):
+        """
+        Initialize fake embeddings.
+
+        Args:
+            size: Vector dimension (match the real model to reuse its collections)
+            latency_seconds: Simulated delay per embedding call
+        """
+        self.size = size
+        self.latency_seconds = latency_seconds
+
+    def _embed(self, text: str) -> list[float]:
+        vector = [0.0] * self.size
+        for word in _WORD.findall(text.lower()) or [text]:
+            seed = _stable_seed("embedding", word)
+            vector[seed % self.size] += 1.0
+            vector[(seed >> 20) % self.size] += 0.5
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed documents."""
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embed a query."""
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Async version of embed_documents."""
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        """Async version of embed_query."""
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return self._embed(text)
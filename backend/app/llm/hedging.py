@@ -0,0 +1,216 @@
+"""
+Hedged requests across LLM providers.
+
+Tail latency of a single provider is what users see. HedgedChatModel sends
+each request to the primary model and, if it has not answered within that
+model's recent p95 latency, sends a duplicate to an alternate provider/model.
+The first completion wins and the other request is cancelled.
+
+Per-model latencies are recorded in the llm_request_latency_seconds histogram,
+which also supplies the rolling percentiles used as hedge delays.
+
+LangChain Version: v1.0+
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import time
+from typing import Any, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
+from app.llm.wrappers import DelegatingChatModel, model_label
+
+logger = get_logger("hedging")
+
+_metrics = get_metrics()
+_latency = _metrics.histogram(
+    "llm_request_latency_seconds", "Completed LLM request latency by model"
+)
+_requests = _metrics.counter(
+    "llm_hedge_requests_total", "Requests handled by a hedged model"
+)
+_hedges = _metrics.counter(
+    "llm_hedges_fired_total", "Hedged duplicate requests sent to the alternate model"
+)
+_wins = _metrics.counter(
+    "llm_hedge_wins_total", "Completions returned by hedged requests, by winner (primary/alternate)"
+)
+_saved = _metrics.histogram(
+    "llm_hedge_saved_seconds", "Estimated latency saved when the alternate won (primary p99 minus actual)"
+)
+
+# Threads for the sync path; a losing sync request cannot be interrupted and
+# finishes in the background, but its result is discarded.
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
+
+
+def record_latency(label: str, seconds: float) -> None:
+    """Record a completed request latency for a model label."""
+    _latency.observe(seconds, model=label)
+
+
+def latency_percentile(label: str, q: float) -> Optional[float]:
+    """Rolling latency percentile for a model label (None if never observed)."""
+    return _latency.percentile(q, model=label)
+
+
+class HedgedChatModel(DelegatingChatModel):
+    """
+    Chat model that hedges slow primary requests with an alternate model.
+
+    The hedge delay is the primary's rolling latency percentile
+    (hedge_percentile) once min_samples requests have completed, and
+    initial_delay before that. Errors from one model fall through to the
+    other, so the hedge also acts as a failover.
+    """
+
+    hedge_percentile: float = 95.0
+    min_samples: int = 20
+    initial_delay: float = 3.0
+    min_delay: float = 0.05
+
+    @classmethod
+    def create(cls, primary: Any, alternate: Any, **kwargs: Any) -> "HedgedChatModel":
+        """
+        Wrap a primary model with an alternate.
+
+        Args:
+            primary: Model tried first
+            alternate: Model sent the hedged duplicate
+            **kwargs: Hedge settings (hedge_percentile, min_samples, initial_delay)
+
+        Returns:
+            HedgedChatModel
+        """
+        label = f"hedged({model_label(primary)}|{model_label(alternate)})"
+        return cls(models={"primary": primary, "alternate": alternate}, label=label, **kwargs)
+
+    def _hedge_delay(self, primary_label: str) -> float:
+        """Seconds to wait for the primary before hedging."""
+        samples = _latency.snapshot().get(f"model={primary_label}", {}).get("count", 0)
+        if samples < self.min_samples:
+            return self.initial_delay
+        return max(self.min_delay, latency_percentile(primary_label, self.hedge_percentile) or self.initial_delay)
+
+    def _record_win(self, winner: str, labels: dict, elapsed: float, hedged: bool) -> None:
+        _wins.inc(winner=winner, model=self.label)
+        if hedged and winner == "alternate":
+            primary_tail = latency_percentile(labels["primary"], 99)
+            if primary_tail is not None:
+                _saved.observe(max(0.0, primary_tail - elapsed), model=self.label)
+
+    def _timed(self, name: str, label: str, messages: list[BaseMessage], kwargs: dict) -> AIMessage:
+        start = time.perf_counter()
+        result = self.models[name].invoke(messages, **kwargs)
+        record_latency(label, time.perf_counter() - start)
+        return result
+
+    async def _atimed(self, name: str, label: str, messages: list[BaseMessage], kwargs: dict) -> AIMessage:
+        start = time.perf_counter()
+        result = await self.models[name].ainvoke(messages, **kwargs)
+        record_latency(label, time.perf_counter() - start)
+        return result
+
+    def _invoke(self, messages: list[BaseMessage], **kwargs: Any) -> AIMessage:
+        labels = {name: model_label(model) for name, model in self.models.items()}
+        _requests.inc(model=self.label)
+        start = time.perf_counter()
+        futures: dict = {}
+
+        def submit(name: str) -> concurrent.futures.Future:
+            # Copy the context so callbacks/tracing follow the request into the thread
+            context = contextvars.copy_context()
+            future = _executor.submit(context.run, self._timed, name, labels[name], messages, kwargs)
+            futures[future] = name
+            return future
+
+        submit("primary")
+        done, _ = concurrent.futures.wait(futures, timeout=self._hedge_delay(labels["primary"]))
+        hedged = not done
+        if hedged:
+            _hedges.inc(model=self.label)
+            logger.info(f"Hedging: {labels['primary']} slower than p{self.hedge_percentile:g}, hedging to {labels['alternate']}")
+            submit("alternate")
+
+        errors = []
+        pending = set(futures)
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    errors.append(future.exception())
+                    if not hedged:
+                        # Primary failed before the hedge delay: fail over now
+                        hedged = True
+                        _hedges.inc(model=self.label)
+                        pending.add(submit("alternate"))
+                    continue
+                for loser in pending:
+                    loser.cancel()
+                self._record_win(futures[future], labels, time.perf_counter() - start, hedged)
+                return future.result()
+        raise errors[-1]
+
+    async def _ainvoke(self, messages: list[BaseMessage], **kwargs: Any) -> AIMessage:
+        labels = {name: model_label(model) for name, model in self.models.items()}
+        _requests.inc(model=self.label)
+        start = time.perf_counter()
+        tasks = {asyncio.ensure_future(self._atimed("primary", labels["primary"], messages, kwargs)): "primary"}
+        done, _ = await asyncio.wait(tasks, timeout=self._hedge_delay(labels["primary"]))
+        hedged = not done
+        if hedged:
+            _hedges.inc(model=self.label)
+            logger.info(f"Hedging: {labels['primary']} slower than p{self.hedge_percentile:g}, hedging to {labels['alternate']}")
+            tasks[asyncio.ensure_future(self._atimed("alternate", labels["alternate"], messages, kwargs))] = "alternate"
+
+        errors = []
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        errors.append(task.exception())
+                        if not hedged:
+                            # Primary failed before the hedge delay: fail over now
+                            hedged = True
+                            _hedges.inc(model=self.label)
+                            failover = asyncio.ensure_future(self._atimed("alternate", labels["alternate"], messages, kwargs))
+                            tasks[failover] = "alternate"
+                            pending.add(failover)
+                        continue
+                    self._record_win(tasks[task], labels, time.perf_counter() - start, hedged)
+                    return task.result()
+            raise errors[-1]
+        finally:
+            # Cancel the loser (or everything, if the caller was cancelled)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+
+def hedge_model(primary: Any, alternate: Any) -> HedgedChatModel:
+    """
+    Wrap a model with hedging using the settings from Settings.
+
+    Args:
+        primary: Model tried first
+        alternate: Model sent the hedged duplicate
+
+    Returns:
+        HedgedChatModel
+    """
+    from app.core.config import get_settings
+
+    settings = get_settings()
+    return HedgedChatModel.create(
+        primary,
+        alternate,
+        hedge_percentile=settings.hedge_percentile,
+        min_samples=settings.hedge_min_samples,
+        initial_delay=settings.hedge_initial_delay_seconds,
+    )
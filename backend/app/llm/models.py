@@ -1,12 +1,27 @@
 """
 Model selection logic for multi-LLM strategy.
 
+Besides the fixed routing/generation purposes, generation requests can be
+assigned a model tier per request (fast, standard, large) from cheap signals:
+query length, domain, retrieved-context size and conversation depth, with
+per-agent latency SLOs stepping down to a faster tier when a tier is too
+slow. Simple requests use the fast tier only for agents opted in to it.
+Per-request selection is opt-in (MODEL_SELECTION_ENABLED); otherwise every
+generation call uses the standard tier. Latency, token usage and estimated cost are recorded per tier.
+
 LangChain Version: v1.0+
 """
 
+import re
+from typing import Callable, NamedTuple, Optional
+
 from langchain_openai import ChatOpenAI
 from langchain_aws import ChatBedrock
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
 
+from app.core.config import get_settings
+from app.core.metrics import get_metrics
 from app.llm.providers import (
     get_openai_model,
     get_bedrock_model,
@@ -14,6 +29,20 @@ from app.llm.providers import (
     get_generation_model
 )
 
+_metrics = get_metrics()
+_tier_requests = _metrics.counter(
+    "model_tier_requests_total", "Generation model calls by agent, tier and selection reason"
+)
+_tier_latency = _metrics.histogram(
+    "model_tier_latency_seconds", "Generation model call latency by agent and tier"
+)
+_tier_tokens = _metrics.counter(
+    "model_tier_tokens_total", "Tokens used by agent, tier and kind (input/output)"
+)
+_tier_cost = _metrics.counter(
+    "model_tier_cost_usd_total", "Estimated model cost in USD by agent and tier"
+)
+
 
 # Model selection strategy constants
 class ModelStrategy:
@@ -78,3 +107,211 @@ MODEL_CONFIGS = {
     }
 }
 
+
+
+class ModelTier:
+    """Generation model tiers, fastest first."""
+    
+    FAST = "fast"  # Short FAQ-style questions (opt-in per agent)
+    STANDARD = "standard"  # Default generation model
+    LARGE = "large"  # Complex technical troubleshooting
+    
+    ORDER = (FAST, STANDARD, LARGE)
+
+
+# USD per 1M tokens (input, output), used for cost reporting only
+MODEL_PRICING = {
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4o": (2.50, 10.00),
+    "anthropic.claude-3-haiku-20240307-v1:0": (0.25, 1.25),
+}
+
+# Terms that indicate troubleshooting rather than a quick lookup
+_COMPLEX_TERMS = re.compile(
+    r"\b(error|exception|traceback|stack ?trace|fail(s|ed|ing|ure)?|crash(es|ed)?|timeout|"
+    r"debug|troubleshoot\w*|configur\w*|integrat\w*|migrat\w*|webhook|authenticat\w*|"
+    r"rate limit\w*|status code|\d{3} response|not working|intermittent\w*)\b",
+    re.IGNORECASE,
+)
+
+
+class RequestSignals(NamedTuple):
+    """Cheap per-request signals used to pick a model tier."""
+    
+    agent: str
+    query_tokens: int
+    context_tokens: int
+    depth: int
+    complex_terms: int
+
+
+def extract_signals(agent: str, messages: list) -> RequestSignals:
+    """
+    Compute selection signals from the messages about to be sent.
+    
+    Args:
+        agent: Agent name (domain)
+        messages: Conversation messages (retrieval contexts already resolved)
+        
+    Returns:
+        RequestSignals
+    """
+    query = ""
+    depth = 0
+    context_tokens = 0
+    for msg in messages:
+        if isinstance(msg, HumanMessage):
+            depth += 1
+            query = msg.content if isinstance(msg.content, str) else str(msg.content)
+        elif isinstance(msg, ToolMessage):
+            context_tokens += count_tokens_approximately([msg])
+    return RequestSignals(
+        agent=agent,
+        query_tokens=count_tokens_approximately([HumanMessage(content=query)]) if query else 0,
+        context_tokens=context_tokens,
+        depth=depth,
+        complex_terms=len(_COMPLEX_TERMS.findall(query)),
+    )
+
+
+def select_tier(
+    signals: RequestSignals,
+    latency_p95: Optional[Callable[[str], Optional[float]]] = None
+) -> tuple[str, str]:
+    """
+    Pick a model tier for a request.
+    
+    Scores the signals, caps the large tier to the domains allowed in
+    Settings, then steps down while the chosen tier's recent p95 latency for
+    this agent exceeds the agent's SLO. Requests without any signal stay on
+    the standard tier; only agents listed for the fast tier in Settings
+    send them to the fast model.
+    
+    Args:
+        signals: Request signals
+        latency_p95: Returns the recent p95 latency (seconds) for a tier, or None
+        
+    Returns:
+        (tier, reason) tuple
+    """
+    settings = get_settings()
+    score = 0
+    if signals.query_tokens > settings.model_selection_long_query_tokens:
+        score += 1
+    if signals.complex_terms:
+        score += min(signals.complex_terms, 2)
+    if signals.context_tokens > settings.model_selection_large_context_tokens:
+        score += 1
+    if signals.depth > settings.model_selection_deep_conversation_turns:
+        score += 1
+    
+    if score <= 0 and signals.agent in settings.model_selection_fast_tier_agents:
+        tier, reason = ModelTier.FAST, "simple"
+    elif score >= 3 and signals.agent in settings.model_selection_large_tier_agents:
+        tier, reason = ModelTier.LARGE, "complex"
+    else:
+        tier, reason = ModelTier.STANDARD, "moderate"
+    
+    slo = settings.agent_latency_slo_seconds.get(signals.agent)
+    if slo and latency_p95 is not None:
+        index = ModelTier.ORDER.index(tier)
+        while index > 0:
+            p95 = latency_p95(ModelTier.ORDER[index])
+            if p95 is None or p95 <= slo:
+                break
+            index -= 1
+            reason = "slo"
+        tier = ModelTier.ORDER[index]
+    return tier, reason
+
+
+def tier_latency_p95(agent: str, tier: str, min_samples: int = 10) -> Optional[float]:
+    """Recent p95 latency of a tier for an agent, once enough calls were observed."""
+    series = _tier_latency.snapshot().get(f"agent={agent},tier={tier}")
+    if not series or series["count"] < min_samples:
+        return None
+    return series["p95"]
+
+
+def get_model_for_tier(tier: str):
+    """
+    Get the generation model for a tier.
+    
+    Args:
+        tier: One of ModelTier.ORDER
+        
+    Returns:
+        Chat model configured for the tier
+    """
+    if tier not in ModelTier.ORDER:
+        raise ValueError(f"Unknown model tier: {tier}. Use one of {', '.join(ModelTier.ORDER)}.")
+    return get_generation_model(tier=tier)
+
+
+def estimate_cost(model_name: str, input_tokens: int, output_tokens: int) -> float:
+    """Estimated USD cost of a call (0 for models without pricing)."""
+    input_price, output_price = MODEL_PRICING.get(model_name, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+def record_tier_call(agent: str, tier: str, reason: str, model_name: str, latency: float, message) -> None:
+    """
+    Record latency, token usage and estimated cost of a tiered model call.
+    
+    Args:
+        agent: Agent name
+        tier: Tier used
+        reason: Why the tier was selected
+        model_name: Model name for pricing
+        latency: Call duration in seconds
+        message: AIMessage returned by the model (for usage metadata)
+    """
+    _tier_requests.inc(agent=agent, tier=tier, reason=reason)
+    _tier_latency.observe(latency, agent=agent, tier=tier)
+    usage = getattr(message, "usage_metadata", None) if isinstance(message, AIMessage) else None
+    if usage:
+        input_tokens = usage.get("input_tokens", 0)
+        output_tokens = usage.get("output_tokens", 0)
+        _tier_tokens.inc(input_tokens, agent=agent, tier=tier, kind="input")
+        _tier_tokens.inc(output_tokens, agent=agent, tier=tier, kind="output")
+        _tier_cost.inc(estimate_cost(model_name, input_tokens, output_tokens), agent=agent, tier=tier)
+
+
+def get_tier_report() -> dict:
+    """
+    Per-tier latency and cost summary across agents.
+    
+    Latency percentiles are those of the slowest agent on the tier.
+    
+    Returns:
+        Dictionary of tier -> {model, requests, latency p50/p95, tokens, cost}
+    """
+    settings = get_settings()
+    latency = _tier_latency.snapshot()
+    requests = _tier_requests.snapshot()
+    tokens = _tier_tokens.snapshot()
+    cost = _tier_cost.snapshot()
+    
+    def labels(key: str) -> dict:
+        return dict(part.split("=", 1) for part in key.split(",") if part)
+    
+    report = {}
+    for tier in ModelTier.ORDER:
+        series = [v for k, v in latency.items() if labels(k).get("tier") == tier]
+        report[tier] = {
+            "model": getattr(settings, f"model_tier_{tier}"),
+            "requests": sum(v for k, v in requests.items() if labels(k).get("tier") == tier),
+            "latency_p50_seconds": max((s["p50"] for s in series), default=None),
+            "latency_p95_seconds": max((s["p95"] for s in series), default=None),
+            "latency_mean_seconds": (
+                sum(s["sum"] for s in series) / sum(s["count"] for s in series) if series else None
+            ),
+            "input_tokens": sum(v for k, v in tokens.items() if labels(k).get("tier") == tier and labels(k).get("kind") == "input"),
+            "output_tokens": sum(v for k, v in tokens.items() if labels(k).get("tier") == tier and labels(k).get("kind") == "output"),
+            "cost_usd": round(sum(v for k, v in cost.items() if labels(k).get("tier") == tier), 6),
+        }
+    return report
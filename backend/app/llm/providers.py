@@ -5,11 +5,76 @@ LangChain Version: v1.0+
 Documentation Reference: https://docs.langchain.com/oss/python/langchain/models
 """
 
+import threading
 from typing import Optional
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_aws import ChatBedrock
 
 from app.core.config import get_settings
+from app.core.logging_config import get_logger
+from app.core.metrics import get_metrics
+from app.llm.clients import get_client_registry, get_timeout
+
+logger = get_logger("providers")
+
+_model_cache_lookups = get_metrics().counter(
+    "llm_model_cache_lookups_total", "Model instance cache lookups (hit/miss)"
+)
+
+# Model instances are stateless wrappers around the shared HTTP clients, so
+# one instance per configuration is reused by every agent.
+_models: dict[tuple, object] = {}
+_models_lock = threading.RLock()  # factories may build nested models
+
+
+def _get_or_create_model(key: tuple, factory):
+    """Return the cached model for a configuration, creating it once."""
+    model = _models.get(key)
+    if model is not None:
+        _model_cache_lookups.inc(result="hit")
+        return model
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            _model_cache_lookups.inc(result="miss")
+            model = factory()
+            _models[key] = model
+        else:
+            _model_cache_lookups.inc(result="hit")
+    return model
+
+
+def get_fake_model(provider: str, model_name: str, temperature: float = 0.7, streaming: bool = False):
+    """
+    Get the deterministic fake chat model standing in for a provider model.
+    
+    Used for every chat model when LLM_BACKEND=fake (see app.llm.fake).
+    
+    Args:
+        provider: Provider being replaced ("openai" or "bedrock")
+        model_name: Model being replaced (kept as the fake's model_name for metrics)
+        temperature: Ignored (fake output depends only on the input and seed)
+        streaming: Enable streaming responses
+        
+    Returns:
+        FakeChatModel configured from Settings
+    """
+    from app.llm.fake import FakeChatModel
+    
+    settings = get_settings()
+    return _get_or_create_model(
+        ("fake", provider, model_name, streaming),
+        lambda: FakeChatModel(
+            model_name=model_name,
+            latency_distribution=settings.fake_llm_latency_distribution,
+            latency_mean_seconds=settings.fake_llm_latency_mean_seconds,
+            latency_stddev_seconds=settings.fake_llm_latency_stddev_seconds,
+            tokens_per_second=settings.fake_llm_tokens_per_second,
+            answer_tokens=settings.fake_llm_answer_tokens,
+            seed=settings.fake_llm_seed,
+            streaming=streaming
+        )
+    )
 
 
 def get_openai_model(
@@ -20,6 +85,9 @@ def get_openai_model(
     """
     Get OpenAI chat model instance.
     
+    Instances are cached per configuration and share the OpenAI connection pool.
+    With LLM_BACKEND=fake, returns the fake model instead (see get_fake_model).
+    
     Args:
         model_name: Model name (default: gpt-4o-mini for cost-effectiveness)
         temperature: Sampling temperature (0.0-2.0)
@@ -29,19 +97,49 @@ def get_openai_model(
         ChatOpenAI: Configured OpenAI model
     """
     settings = get_settings()
+    if settings.llm_backend == "fake":
+        return get_fake_model("openai", model_name, temperature, streaming)
+    registry = get_client_registry()
     
-    return ChatOpenAI(
-        model=model_name,
-        api_key=settings.openai_api_key,
-        temperature=temperature,
-        streaming=streaming
+    return _get_or_create_model(
+        ("openai", model_name, temperature, streaming),
+        lambda: ChatOpenAI(
+            model=model_name,
+            api_key=settings.openai_api_key,
+            temperature=temperature,
+            streaming=streaming,
+            timeout=get_timeout(),
+            max_retries=settings.llm_max_retries,
+            http_client=registry.client_handle("openai"),
+            http_async_client=registry.async_client_handle("openai")
+        )
     )
 
 
+class _BedrockChatModel(ChatBedrock):
+    """
+    ChatBedrock that accepts (and ignores) a per-call `timeout`.
+
+    Agents pass their remaining time budget as the `timeout` call option,
+    which OpenAI models apply as the request timeout. ChatBedrock would send
+    it to the model as an unknown request field; Bedrock calls are bounded
+    by the shared client's read timeout instead.
+    """
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        kwargs.pop("timeout", None)
+        return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        kwargs.pop("timeout", None)
+        return super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+
 def get_bedrock_model(
     model_id: str = "anthropic.claude-3-haiku-20240307-v1:0",
     temperature: float = 0.7,
-    streaming: bool = False
+    streaming: bool = False,
+    region: Optional[str] = None
 ) -> ChatBedrock:
     """
     Get AWS Bedrock chat model instance.
@@ -50,6 +148,10 @@ def get_bedrock_model(
     Reads API key from .env file or file path (avoids Windows env var truncation).
     Injects bearer token directly into request headers using boto3 event handlers.
     
+    The bedrock-runtime client (connection pool, retries, timeouts) and the
+    resolved API key are shared across models; model instances are cached
+    per configuration. With LLM_BACKEND=fake, returns the fake model instead.
+    
     NOTE: There is a known issue with boto3's signing mechanism interfering with
     bearer token authentication. The code implements the correct approach per AWS
     documentation, but boto3 may still attempt AWS credential signing.
@@ -60,6 +162,7 @@ def get_bedrock_model(
         model_id: Bedrock model ID (default: Claude 3 Haiku for fast/cheap routing)
         temperature: Sampling temperature (0.0-1.0)
         streaming: Enable streaming responses
+        region: AWS region (default: Settings.bedrock_region)
         
     Returns:
         ChatBedrock: Configured Bedrock model
@@ -67,39 +170,24 @@ def get_bedrock_model(
     Raises:
         ValueError: If Bedrock API key is not configured
     """
-    import boto3
-    from botocore.awsrequest import AWSRequest
+    if get_settings().llm_backend == "fake":
+        return get_fake_model("bedrock", model_id, temperature, streaming)
+    region = region or get_settings().bedrock_region
+    # Validates the key exists (resolved once and cached)
+    bedrock_client = get_client_registry().bedrock_client(region)
     
-    # Get API key from settings (reads from .env file or file path)
-    settings = get_settings()
-    bedrock_key = settings.get_bedrock_key()  # Validates key exists
-    
-    # Create an Amazon Bedrock client
-    bedrock_client = boto3.client(
-        service_name="bedrock-runtime",
-        region_name="us-east-1"
-    )
-    
-    # Inject bearer token directly into request headers (avoids Windows env var truncation)
-    # This follows AWS documentation pattern but avoids os.environ for long keys
-    def inject_bearer_token(request: AWSRequest, **kwargs):
-        """Inject bearer token from .env/file into request headers."""
-        if request.headers is None:
-            request.headers = {}
-        request.headers["Authorization"] = f"Bearer {bedrock_key}"
-    
-    # Register the event handler - this runs before each request is sent
-    bedrock_client.meta.events.register('before-send.bedrock-runtime', inject_bearer_token)
-    
-    # ChatBedrock wraps the boto3 client
-    return ChatBedrock(
-        model_id=model_id,
-        client=bedrock_client,
-        region_name="us-east-1",
-        model_kwargs={
-            "temperature": temperature,
-        },
-        streaming=streaming
+    # ChatBedrock wraps the shared boto3 client
+    return _get_or_create_model(
+        ("bedrock", model_id, temperature, streaming, region),
+        lambda: _BedrockChatModel(
+            model_id=model_id,
+            client=bedrock_client,
+            region_name=region,
+            model_kwargs={
+                "temperature": temperature,
+            },
+            streaming=streaming
+        )
     )
 
 
@@ -109,6 +197,9 @@ def get_openai_embeddings(
     """
     Get OpenAI embeddings model.
     
+    Shares the OpenAI connection pool with the chat models. With
+    LLM_BACKEND=fake, returns deterministic FakeEmbeddings instead.
+    
     Args:
         model_name: Embedding model name (default: text-embedding-3-small for cost-effectiveness)
         
@@ -116,13 +207,97 @@ def get_openai_embeddings(
         OpenAIEmbeddings: Configured embeddings model
     """
     settings = get_settings()
+    if settings.llm_backend == "fake":
+        from app.llm.fake import FakeEmbeddings
+        
+        return _get_or_create_model(
+            ("fake_embeddings", model_name),
+            lambda: FakeEmbeddings(
+                size=settings.fake_embedding_size,
+                latency_seconds=settings.fake_embedding_latency_seconds
+            )
+        )
+    registry = get_client_registry()
     
-    return OpenAIEmbeddings(
-        model=model_name,
-        api_key=settings.openai_api_key
+    return _get_or_create_model(
+        ("openai_embeddings", model_name),
+        lambda: OpenAIEmbeddings(
+            model=model_name,
+            api_key=settings.openai_api_key,
+            timeout=get_timeout(),
+            max_retries=settings.llm_max_retries,
+            http_client=registry.client_handle("openai"),
+            http_async_client=registry.async_client_handle("openai")
+        )
     )
 
 
+def get_model_by_spec(spec: str, temperature: float = 0.7):
+    """
+    Get a chat model from a "provider:model" spec.
+    
+    Args:
+        spec: e.g. "openai:gpt-4o-mini" or "bedrock:anthropic.claude-3-haiku-20240307-v1:0"
+        temperature: Sampling temperature
+        
+    Returns:
+        ChatOpenAI or ChatBedrock model
+        
+    Raises:
+        ValueError: If the provider is not supported
+    """
+    provider, _, model = spec.partition(":")
+    if provider == "openai":
+        return get_openai_model(model_name=model, temperature=temperature)
+    if provider == "bedrock":
+        return get_bedrock_model(model_id=model, temperature=temperature)
+    raise ValueError(f"Unknown model provider in '{spec}'. Use 'openai:<model>' or 'bedrock:<model_id>'.")
+
+
+def _with_reliability(purpose: str, primary, alternate_spec: str, temperature: float):
+    """
+    Wrap a model with the reliability features enabled in Settings.
+    
+    - Concurrency limit: calls to each upstream model hold one of its slots
+      (UPSTREAM_MAX_CONCURRENCY), so spikes queue instead of piling onto it.
+    - Circuit breaker: each provider's model fails fast while the provider is
+      unhealthy; without hedging, the alternate model is the fallback.
+    - Hedging: slow primary requests are duplicated to the alternate model
+      (each side still guarded by its own circuit breaker).
+    """
+    settings = get_settings()
+    
+    def build():
+        from app.llm.circuit_breaker import CircuitBreakerChatModel
+        from app.llm.concurrency import ConcurrencyLimitedChatModel
+        from app.llm.hedging import hedge_model
+        
+        primary_model = ConcurrencyLimitedChatModel.create(primary)
+        if not settings.circuit_breaker_enabled and not settings.llm_hedging_enabled:
+            return primary_model
+        
+        alternate = None
+        if alternate_spec:
+            try:
+                alternate = ConcurrencyLimitedChatModel.create(
+                    get_model_by_spec(alternate_spec, temperature=temperature)
+                )
+            except ValueError as e:
+                # e.g. Bedrock alternate without a Bedrock key: run without it rather than fail
+                logger.warning(f"Providers: Alternate {purpose} model unavailable: {e}")
+        
+        if settings.llm_hedging_enabled and alternate is not None:
+            if settings.circuit_breaker_enabled:
+                primary_model = CircuitBreakerChatModel.create(primary_model)
+                alternate = CircuitBreakerChatModel.create(alternate)
+            return hedge_model(primary_model, alternate)
+        if settings.circuit_breaker_enabled:
+            return CircuitBreakerChatModel.create(primary_model, fallback=alternate)
+        return primary_model
+    
+    return _get_or_create_model(("reliable", purpose, alternate_spec), build)
+
+
 # Convenience functions for specific use cases
 def get_routing_model() -> ChatOpenAI:
     """
@@ -131,24 +306,40 @@ def get_routing_model() -> ChatOpenAI:
     Uses OpenAI gpt-3.5-turbo for routing (smaller/faster than generation model).
     TODO: Switch to Bedrock Claude 3 Haiku once authentication is resolved.
     
+    Guarded by the OpenAI circuit breaker, falling back to (or, with
+    LLM_HEDGING_ENABLED, hedging slow requests to) ROUTING_ALTERNATE_MODEL.
+    
     Returns:
         ChatOpenAI: GPT-3.5-turbo model for routing decisions
     """
-    return get_openai_model(
+    model = get_openai_model(
         model_name="gpt-3.5-turbo",
         temperature=0.3  # Lower temperature for more consistent routing
     )
+    return _with_reliability("routing", model, get_settings().routing_alternate_model, temperature=0.3)
 
 
-def get_generation_model() -> ChatOpenAI:
+def get_generation_model(tier: str = "standard") -> ChatOpenAI:
     """
     Get model for response generation (high quality).
     
+    The model for each tier (fast, standard, large) comes from Settings
+    (MODEL_TIER_*); standard is the default generation model.
+    
+    Guarded by the OpenAI circuit breaker, falling back to (or, with
+    LLM_HEDGING_ENABLED, hedging slow requests to) GENERATION_ALTERNATE_MODEL.
+    
+    Args:
+        tier: Model tier
+        
     Returns:
-        ChatOpenAI: GPT-4o-mini model for generating responses
+        ChatOpenAI: GPT-4o-mini model (standard tier) for generating responses
     """
-    return get_openai_model(
-        model_name="gpt-4o-mini",
+    settings = get_settings()
+    model = get_model_by_spec(
+        getattr(settings, f"model_tier_{tier}"),
         temperature=0.7  # Higher temperature for more natural responses
     )
+    purpose = "generation" if tier == "standard" else f"generation_{tier}"
+    return _with_reliability(purpose, model, settings.generation_alternate_model, temperature=0.7)
 
@@ -0,0 +1,113 @@
+"""
+Base class for chat models that delegate to other chat models.
+
+Used by the reliability wrappers (hedging, circuit breaking) so they can be
+passed to create_agent like any other model: tools are bound on every
+wrapped model, and the wrapper decides which one to call.
+
+LangChain Version: v1.0+
+Documentation Reference: https://docs.langchain.com/oss/python/langchain/models
+"""
+
+from typing import Any, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import ConfigDict, model_validator
+
+
+def model_label(model: Any) -> str:
+    """
+    Stable "provider:model" label for metrics and logs.
+
+    Args:
+        model: Chat model, bound runnable or delegating wrapper
+
+    Returns:
+        Label such as "openai:gpt-4o-mini"
+    """
+    inner = getattr(model, "bound", model)
+    if isinstance(inner, DelegatingChatModel):
+        return inner.label
+    name = getattr(inner, "model_name", None) or getattr(inner, "model_id", None) or getattr(inner, "model", None)
+    provider = getattr(inner, "_llm_type", type(inner).__name__)
+    provider = {"openai-chat": "openai", "amazon_bedrock_chat": "bedrock"}.get(provider, provider)
+    return f"{provider}:{name}" if name else provider
+
+
+class DelegatingChatModel(BaseChatModel):
+    """
+    Chat model that forwards calls to wrapped models.
+
+    Subclasses implement _invoke/_ainvoke to choose which wrapped model (by
+    key in `models`) handles a call. bind_tools (also used for structured
+    output) is applied to every wrapped model, so the wrapper keeps working
+    after create_agent binds tools to it.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    # Wrapped models (chat models or tool-bound runnables) by name
+    models: dict[str, Any]
+    label: str = "delegating"
+
+    @model_validator(mode="after")
+    def _inherit_profile(self) -> "DelegatingChatModel":
+        """
+        Advertise native structured output only if every wrapped model has it.
+
+        create_agent reads the model profile to choose between provider-native
+        structured output and the tool-calling fallback.
+        """
+        if self.profile is None:
+            profiles = [getattr(model, "profile", None) for model in self.models.values()]
+            if profiles and all(p and p.get("structured_output") for p in profiles):
+                self.profile = profiles[0]
+        return self
+
+    def __repr_args__(self) -> Any:
+        # Run tracing serializes the model via repr; rendering every wrapped
+        # model (with its bound tool schemas) costs a large string per call
+        return [("label", self.label), ("models", list(self.models))]
+
+    @property
+    def _llm_type(self) -> str:
+        return "delegating"
+
+    def bind_tools(self, tools, **kwargs) -> "DelegatingChatModel":
+        """Bind tools to every wrapped model."""
+        return self.model_copy(update={"models": {name: model.bind_tools(tools, **kwargs) for name, model in self.models.items()}})
+
+    @staticmethod
+    def _call_kwargs(stop: Optional[list[str]], kwargs: dict) -> dict:
+        return {**kwargs, "stop": stop} if stop else kwargs
+
+    def _invoke(self, messages: list[BaseMessage], **kwargs: Any) -> AIMessage:
+        """Produce a response for the messages using the wrapped models."""
+        raise NotImplementedError
+
+    async def _ainvoke(self, messages: list[BaseMessage], **kwargs: Any) -> AIMessage:
+        """Async version of _invoke."""
+        raise NotImplementedError
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message = self._invoke(messages, **self._call_kwargs(stop, kwargs))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message = await self._ainvoke(messages, **self._call_kwargs(stop, kwargs))
+        return ChatResult(generations=[ChatGeneration(message=message)])
@@ -4,19 +4,41 @@ FastAPI application entry point.
 LangChain Version: v1.0+
 """
 
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.checkpointing import close_checkpointer
 from app.core.config import get_settings
+from app.core.metrics import get_metrics
+from app.llm.clients import get_client_registry
+from app.llm.circuit_breaker import get_circuit_states
+from app.llm.concurrency import get_upstream_states
+from app.llm.models import get_tier_report
+from app.api.admission import get_admission_controller
+from app.api.jobs import get_job_manager
 from app.api.routes import chat
 
 # Initialize settings
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Stop chat job workers, flush checkpoints and close shared LLM connection pools on shutdown."""
+    yield
+    await get_job_manager().aclose()
+    await asyncio.to_thread(close_checkpointer)
+    await get_client_registry().aclose()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Office Lifeline Chat API",
     description="Multi-agent customer service chat API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -39,15 +61,43 @@ async def root():
         "message": "Office Lifeline Chat API",
         "version": "1.0.0",
         "endpoints": {
-            "chat": "/chat"
+            "chat": "/chat",
+            "chat_websocket": "/chat/ws",
+            "chat_batch": "/chat/batch",
+            "chat_jobs": "/chat/jobs",
+            "metrics": "/metrics"
         }
     }
 
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
-    return {"status": "healthy"}
+    """Health check endpoint (reports degraded while any LLM circuit is open)."""
+    circuits = get_circuit_states()
+    degraded = any(c["state"] != "closed" for c in circuits.values())
+    return {"status": "degraded" if degraded else "healthy", "llm_circuits": circuits}
+
+
+@app.get("/metrics")
+async def metrics():
+    """In-process performance metrics snapshot."""
+    return get_metrics().snapshot()
+
+
+@app.get("/metrics/model-tiers")
+async def model_tier_metrics():
+    """Per-agent, per-tier model selection counts, latency and estimated cost."""
+    return get_tier_report()
+
+
+@app.get("/metrics/admission")
+async def admission_metrics():
+    """Admission queue state and per-upstream LLM concurrency."""
+    controller = get_admission_controller()
+    return {
+        "admission": controller.snapshot() if controller else {"enabled": False},
+        "upstreams": get_upstream_states(),
+    }
 
 
 if __name__ == "__main__":
@@ -58,4 +108,3 @@ if __name__ == "__main__":
         port=settings.backend_port,
         reload=True
     )
-
@@ -11,6 +11,8 @@ from pathlib import Path
 from typing import Dict, List, Optional
 import json
 
+from app.retrieval.context_refs import ContextRef, make_context_ref, register_context_source
+
 
 class CAGStrategy:
     """
@@ -35,6 +37,8 @@ class CAGStrategy:
         self.data_directory = Path(data_directory)
         self._cache: Dict[str, str] = {}
         self._loaded = False
+        self._context: Optional[str] = None
+        register_context_source("cag", self.data_directory.name, self._resolve_context_ref)
     
     def load_documents(self) -> None:
         """Load all markdown documents from data directory into cache."""
@@ -95,12 +99,41 @@ class CAGStrategy:
         if not self._cache:
             return "No documents loaded in cache."
         
-        context_parts = ["Policy documents (full content):\n"]
+        # Documents are static once loaded, so the formatted bundle is built once
+        if self._context is None:
+            context_parts = ["Policy documents (full content):\n"]
+            
+            for doc_name, content in self._cache.items():
+                context_parts.append(f"\n--- {doc_name.replace('_', ' ').title()} ---\n{content}\n")
+            
+            self._context = "\n".join(context_parts)
         
-        for doc_name, content in self._cache.items():
-            context_parts.append(f"\n--- {doc_name.replace('_', ' ').title()} ---\n{content}\n")
+        return self._context
+    
+    def get_context_ref(self, query: str = "") -> str:
+        """
+        Get a compact reference to the full document bundle.
         
-        return "\n".join(context_parts)
+        The reference carries the bundle hash, so every tool call in a thread
+        stores a few dozen bytes instead of the full policy corpus.
+        
+        Args:
+            query: Optional query (not used in CAG, but kept for interface consistency)
+            
+        Returns:
+            Context reference string (or the no-documents message)
+        """
+        context = self.get_context(query)
+        if not self._cache:
+            return context
+        return make_context_ref("cag", self.data_directory.name, context)
+    
+    def _resolve_context_ref(self, ref: ContextRef) -> Optional[str]:
+        """Rebuild the document bundle for a reference."""
+        self.load_documents()
+        if not self._cache:
+            return None
+        return self.get_context()
     
     def search_documents(self, keywords: List[str]) -> str:
         """
@@ -140,4 +173,5 @@ class CAGStrategy:
         """Clear the document cache (useful for testing)."""
         self._cache.clear()
         self._loaded = False
+        self._context = None
 
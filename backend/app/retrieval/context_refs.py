@@ -0,0 +1,241 @@
+"""
+Content-addressed references for retrieval context.
+
+Retrieval tools return a compact reference (chunk IDs or a CAG bundle hash)
+instead of the full context text, so the tool messages stored in every
+checkpoint stay small. References are resolved back to text only when a
+model prompt is built (see app.agents.middleware.ContextRefMiddleware).
+
+Reference format:
+    context_ref://<kind>/<source>/<digest>[?ids=<id1>,<id2>,...]
+
+LangChain Version: v1.0+
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from app.core.config import get_settings
+from app.core.logging_config import get_logger
+
+logger = get_logger("context_refs")
+
+CONTEXT_REF_PREFIX = "context_ref://"
+
+
+class ContextRef(NamedTuple):
+    """Parsed context reference."""
+
+    kind: str  # rag, hybrid, cag
+    source: str  # collection name or document bundle name
+    digest: str  # content hash of the formatted context
+    ids: Tuple[str, ...] = ()  # chunk IDs (RAG/hybrid only)
+
+
+def content_digest(text: str) -> str:
+    """
+    Compute the content address for a context string.
+
+    Args:
+        text: Formatted context text
+
+    Returns:
+        Short hex digest (first 16 chars of SHA-256)
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class ContextStore:
+    """
+    Bounded, process-local store mapping content digests to context text.
+
+    Entries are evicted least-recently-used first. A miss is not an error:
+    registered sources can rebuild the text from the reference itself.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        """
+        Initialize context store.
+
+        Args:
+            max_entries: Maximum number of context strings kept in memory
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, text: str) -> str:
+        """
+        Store context text and return its digest.
+
+        Args:
+            text: Formatted context text
+
+        Returns:
+            Content digest for the text
+        """
+        digest = content_digest(text)
+        with self._lock:
+            self._entries[digest] = text
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return digest
+
+    def get(self, digest: str) -> Optional[str]:
+        """
+        Get context text by digest.
+
+        Args:
+            digest: Content digest
+
+        Returns:
+            Context text or None if not resident
+        """
+        with self._lock:
+            text = self._entries.get(digest)
+            if text is not None:
+                self._entries.move_to_end(digest)
+            return text
+
+    def clear(self) -> None:
+        """Clear all stored context (useful for testing)."""
+        with self._lock:
+            self._entries.clear()
+
+
+# Resolvers rebuild context text from a reference when the store misses
+# (e.g. after a restart with a durable checkpointer).
+_resolvers: Dict[Tuple[str, str], Callable[[ContextRef], Optional[str]]] = {}
+
+# Global store instance
+_context_store: Optional[ContextStore] = None
+
+
+def get_context_store() -> ContextStore:
+    """
+    Get or create the global context store.
+
+    Returns:
+        ContextStore: Shared store instance
+    """
+    global _context_store
+    if _context_store is None:
+        _context_store = ContextStore(max_entries=get_settings().context_store_max_entries)
+    return _context_store
+
+
+def register_context_source(
+    kind: str,
+    source: str,
+    resolver: Callable[[ContextRef], Optional[str]]
+) -> None:
+    """
+    Register a resolver that can rebuild context text for a source.
+
+    Args:
+        kind: Reference kind (rag, hybrid, cag)
+        source: Collection or bundle name
+        resolver: Callable returning the context text for a reference, or None
+    """
+    _resolvers[(kind, source)] = resolver
+
+
+def make_context_ref(
+    kind: str,
+    source: str,
+    text: str,
+    ids: Optional[List[str]] = None
+) -> str:
+    """
+    Store context text and build a compact reference to it.
+
+    Args:
+        kind: Reference kind (rag, hybrid, cag)
+        source: Collection or bundle name
+        text: Formatted context text
+        ids: Optional chunk IDs used to rebuild the context on a store miss
+
+    Returns:
+        Reference string suitable for a tool message
+    """
+    digest = get_context_store().put(text)
+    ref = f"{CONTEXT_REF_PREFIX}{kind}/{quote(source, safe='')}/{digest}"
+    if ids:
+        ref += "?ids=" + ",".join(quote(i, safe="") for i in ids)
+    return ref
+
+
+def is_context_ref(content) -> bool:
+    """Check whether message content is a context reference."""
+    return isinstance(content, str) and content.startswith(CONTEXT_REF_PREFIX)
+
+
+def parse_context_ref(ref: str) -> Optional[ContextRef]:
+    """
+    Parse a reference string.
+
+    Args:
+        ref: Reference string
+
+    Returns:
+        ContextRef or None if the string is not a valid reference
+    """
+    if not is_context_ref(ref):
+        return None
+    body = ref[len(CONTEXT_REF_PREFIX):]
+    path, _, query = body.partition("?")
+    parts = path.split("/")
+    if len(parts) != 3:
+        return None
+    kind, source, digest = parts
+    ids: Tuple[str, ...] = ()
+    if query.startswith("ids="):
+        ids = tuple(unquote(i) for i in query[4:].split(",") if i)
+    return ContextRef(kind=kind, source=unquote(source), digest=digest, ids=ids)
+
+
+def resolve_context_ref(ref: str) -> Optional[str]:
+    """
+    Resolve a reference back to its context text.
+
+    Checks the in-memory store first, then falls back to the registered
+    resolver for the reference's source.
+
+    Args:
+        ref: Reference string
+
+    Returns:
+        Context text, or None if the reference cannot be resolved
+    """
+    parsed = parse_context_ref(ref)
+    if parsed is None:
+        return None
+
+    store = get_context_store()
+    text = store.get(parsed.digest)
+    if text is not None:
+        return text
+
+    resolver = _resolvers.get((parsed.kind, parsed.source))
+    if resolver is None:
+        logger.warning(f"Context Refs: No resolver registered for {parsed.kind}/{parsed.source}")
+        return None
+
+    try:
+        text = resolver(parsed)
+    except Exception as e:
+        logger.warning(f"Context Refs: Failed to rebuild {ref}: {e}")
+        return None
+    if text is None:
+        return None
+
+    if content_digest(text) != parsed.digest:
+        # Source content changed since the reference was created; the
+        # rebuilt text is still the best available context.
+        logger.warning(f"Context Refs: Rebuilt content for {parsed.kind}/{parsed.source} differs from digest {parsed.digest}")
+    store.put(text)
+    return text
@@ -3,13 +3,20 @@ Hybrid RAG/CAG (Retrieval-Augmented Generation / Cached-Augmented Generation) st
 
 This strategy combines RAG and CAG:
 - First call: Performs RAG retrieval from ChromaDB
-- Subsequent calls: Uses cached results from session state
+- Subsequent calls: Reuses the context reference cached in session state
 
 LangChain Version: v1.0+
 """
 
 from typing import Dict, List, Optional, Any
 from app.retrieval.rag_strategy import RAGStrategy
+from app.retrieval.context_refs import (
+    ContextRef,
+    is_context_ref,
+    make_context_ref,
+    register_context_source,
+    resolve_context_ref,
+)
 
 
 class HybridRAGCAGStrategy:
@@ -32,48 +39,44 @@ class HybridRAGCAGStrategy:
         self.rag_strategy = RAGStrategy(collection_name=collection_name, k=k)
         self.collection_name = collection_name
         self.k = k
+        register_context_source("hybrid", collection_name, self._resolve_context_ref)
+    
+    def _ref_key(self) -> str:
+        """Session cache key holding the context reference for this collection."""
+        return f"hybrid_ref_{self.collection_name}"
+    
+    def _retrieve_documents(
+        self,
+        query: str,
+        k: Optional[int] = None,
+        filter: Optional[dict] = None
+    ) -> list:
+        try:
+            return self.rag_strategy.retrieve_documents(query, k=k, filter=filter)
+        except Exception as e:
+            # Handle case where collection doesn't exist or is corrupted
+            print(f"[Hybrid Strategy] Warning: Error retrieving from collection '{self.collection_name}': {e}")
+            return []
     
     def retrieve(
         self,
         query: str,
-        session_cache: Dict[str, Any],
         k: Optional[int] = None,
         filter: Optional[dict] = None
     ) -> List[str]:
         """
-        Retrieve documents using hybrid strategy.
+        Retrieve document chunks via RAG (bypasses the session cache).
         
         Args:
             query: User query string
-            session_cache: Session state dictionary to store/retrieve cache
             k: Number of documents to retrieve (overrides instance default)
             filter: Optional metadata filter
             
         Returns:
             List of retrieved document chunk strings
         """
-        cache_key = f"hybrid_cache_{self.collection_name}"
-        
-        # Check if cache exists in session
-        if cache_key in session_cache:
-            cached_chunks = session_cache[cache_key]
-            print(f"[Hybrid Strategy] Using cached results (no RAG call)")
-            return cached_chunks
-        
-        # First call: Perform RAG retrieval
-        print(f"[Hybrid Strategy] Performing RAG retrieval (first call)")
-        try:
-            chunks = self.rag_strategy.retrieve(query, k=k, filter=filter)
-            
-            # Cache results in session
-            session_cache[cache_key] = chunks
-            print(f"[Hybrid Strategy] Cached {len(chunks)} chunks for future use")
-            
-            return chunks
-        except Exception as e:
-            # Handle case where collection doesn't exist or is corrupted
-            print(f"[Hybrid Strategy] Warning: Error retrieving from collection '{self.collection_name}': {e}")
-            return []
+        docs = self._retrieve_documents(query, k=k, filter=filter)
+        return [self.rag_strategy.format_chunk(doc) for doc in docs]
     
     def get_context(
         self,
@@ -94,8 +97,22 @@ class HybridRAGCAGStrategy:
         Returns:
             Formatted context string
         """
-        chunks = self.retrieve(query, session_cache, k=k, filter=filter)
+        ref = self.get_context_ref(query, session_cache, k=k, filter=filter)
+        if not is_context_ref(ref):
+            return ref
+        return resolve_context_ref(ref) or self.format_context([])
+    
+    @staticmethod
+    def format_context(chunks: List[str]) -> str:
+        """
+        Combine formatted chunks into a billing context string.
         
+        Args:
+            chunks: Formatted chunk strings
+            
+        Returns:
+            Formatted context string
+        """
         if not chunks:
             return "No relevant information found."
         
@@ -105,6 +122,57 @@ class HybridRAGCAGStrategy:
         
         return "\n".join(context_parts)
     
+    def get_context_ref(
+        self,
+        query: str,
+        session_cache: Dict[str, Any],
+        k: Optional[int] = None,
+        filter: Optional[dict] = None
+    ) -> str:
+        """
+        Get a compact reference to the hybrid context for a query.
+        
+        The session cache only holds the reference (the context text lives in
+        the context store), so caching adds a few dozen bytes to agent state.
+        
+        Args:
+            query: User query string
+            session_cache: Session state dictionary to store/retrieve the reference
+            k: Number of documents to retrieve
+            filter: Optional metadata filter
+            
+        Returns:
+            Context reference string (or the no-results message)
+        """
+        cached_ref = session_cache.get(self._ref_key())
+        if cached_ref:
+            print(f"[Hybrid Strategy] Using cached context reference (no RAG call)")
+            return cached_ref
+        
+        # First call: Perform RAG retrieval
+        print(f"[Hybrid Strategy] Performing RAG retrieval (first call)")
+        docs = self._retrieve_documents(query, k=k, filter=filter)
+        chunks = [self.rag_strategy.format_chunk(doc) for doc in docs]
+        context = self.format_context(chunks)
+        if not chunks:
+            return context
+        
+        # Chunk IDs allow rebuilding the context after a store miss
+        ids = [doc.id for doc in docs if doc.id]
+        ref = make_context_ref("hybrid", self.collection_name, context, ids=ids if len(ids) == len(chunks) else None)
+        session_cache[self._ref_key()] = ref
+        print(f"[Hybrid Strategy] Cached reference to {len(chunks)} chunks for future use")
+        return ref
+    
+    def _resolve_context_ref(self, ref: ContextRef) -> Optional[str]:
+        """Rebuild billing context for a reference from its chunk IDs."""
+        if not ref.ids:
+            return None
+        docs = self.rag_strategy.get_documents_by_ids(list(ref.ids))
+        if not docs:
+            return None
+        return self.format_context([self.rag_strategy.format_chunk(doc) for doc in docs])
+    
     def clear_cache(self, session_cache: Dict[str, Any]) -> None:
         """
         Clear cached results from session.
@@ -112,8 +180,5 @@ class HybridRAGCAGStrategy:
         Args:
             session_cache: Session state dictionary
         """
-        cache_key = f"hybrid_cache_{self.collection_name}"
-        if cache_key in session_cache:
-            del session_cache[cache_key]
+        if session_cache.pop(self._ref_key(), None) is not None:
             print(f"[Hybrid Strategy] Cache cleared for {self.collection_name}")
-
@@ -2,16 +2,91 @@
 Pure RAG (Retrieval-Augmented Generation) strategy.
 
 This strategy retrieves relevant document chunks from ChromaDB based on
-semantic similarity and returns them for LLM context.
+semantic similarity and returns them for LLM context. Turns running together
+(e.g. the questions of a batch) can share identical searches through
+shared_retrieval().
 
 LangChain Version: v1.0+
 Documentation Reference: https://docs.langchain.com/oss/python/langchain/retrieval
 """
 
-from typing import List, Optional
+import contextlib
+import threading
+from concurrent.futures import Future
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional
 from langchain_chroma import Chroma
+from langchain_core.documents import Document
 
+from app.core.deadline import check_cancelled
 from app.vectorstore.chroma_client import get_chroma_client
+from app.retrieval.context_refs import ContextRef, make_context_ref, register_context_source
+
+
+class SharedRetrieval:
+    """
+    Retrieval results shared by concurrent turns (e.g. the questions of a batch).
+    
+    Within shared_retrieval(), identical searches (same collection, query, k
+    and filter) hit the vector store once; turns running the same search
+    concurrently wait for the first one instead of repeating it. Failed
+    searches are not shared. Thread-safe (worker agents retrieve from
+    executor threads).
+    """
+    
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._results: Dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+    
+    def get_or_retrieve(self, key: tuple, retrieve: Callable[[], List[Document]]) -> List[Document]:
+        """
+        Return the shared result for a search, running it on first use.
+        
+        Args:
+            key: Search identity
+            retrieve: Runs the search
+            
+        Returns:
+            Retrieved documents
+        """
+        with self._lock:
+            future = self._results.get(key)
+            first = future is None
+            if first:
+                future = self._results[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+        
+        if not first:
+            docs = future.result()
+            # None: the first search failed, so search again
+            return docs if docs is not None else retrieve()
+        
+        try:
+            docs = retrieve()
+        except BaseException:
+            with self._lock:
+                self._results.pop(key, None)
+            future.set_result(None)
+            raise
+        future.set_result(docs)
+        return docs
+
+
+_shared_retrieval: ContextVar[Optional[SharedRetrieval]] = ContextVar("shared_retrieval", default=None)
+
+
+@contextlib.contextmanager
+def shared_retrieval(shared: SharedRetrieval) -> Iterator[SharedRetrieval]:
+    """Share retrieval results through `shared` within the block (and everything it starts)."""
+    token = _shared_retrieval.set(shared)
+    try:
+        yield shared
+    finally:
+        _shared_retrieval.reset(token)
 
 
 class RAGStrategy:
@@ -29,6 +104,7 @@ class RAGStrategy:
         self.k = k
         self.client = get_chroma_client()
         self.vectorstore: Optional[Chroma] = None
+        register_context_source("rag", collection_name, self._resolve_context_ref)
     
     def _get_vectorstore(self) -> Chroma:
         """Get or create vector store instance."""
@@ -36,9 +112,28 @@ class RAGStrategy:
             self.vectorstore = self.client.get_vectorstore(self.collection_name)
         return self.vectorstore
     
-    def retrieve(self, query: str, k: Optional[int] = None, filter: Optional[dict] = None) -> List[str]:
+    @staticmethod
+    def format_chunk(doc: Document) -> str:
         """
-        Retrieve relevant document chunks for a query.
+        Format a retrieved document for LLM context.
+        
+        Args:
+            doc: Retrieved document
+            
+        Returns:
+            Chunk text prefixed with its source
+        """
+        # Include metadata in context for better understanding
+        metadata_info = ""
+        if doc.metadata:
+            source = doc.metadata.get('source_file', 'unknown')
+            metadata_info = f"[Source: {source}]"
+        
+        return f"{metadata_info}\n{doc.page_content}"
+    
+    def retrieve_documents(self, query: str, k: Optional[int] = None, filter: Optional[dict] = None) -> List[Document]:
+        """
+        Retrieve relevant documents (with chunk IDs) for a query.
         
         Args:
             query: User query string
@@ -46,41 +141,60 @@ class RAGStrategy:
             filter: Optional metadata filter (e.g., {'domain': 'technical'})
             
         Returns:
-            List of retrieved document chunk strings formatted for LLM context
+            List of retrieved documents
+            
+        Raises:
+            RequestCancelled: If the request was cancelled
         """
+        check_cancelled()
+        num_results = k if k is not None else self.k
         try:
-            vectorstore = self._get_vectorstore()
-            num_results = k if k is not None else self.k
-            
-            # Perform similarity search
-            if filter:
-                results = vectorstore.similarity_search(
-                    query,
-                    k=num_results,
-                    filter=filter
-                )
-            else:
-                results = vectorstore.similarity_search(query, k=num_results)
-            
-            # Format results for LLM context
-            formatted_chunks = []
-            for i, doc in enumerate(results, 1):
-                # Include metadata in context for better understanding
-                metadata_info = ""
-                if doc.metadata:
-                    source = doc.metadata.get('source_file', 'unknown')
-                    metadata_info = f"[Source: {source}]"
-                
-                chunk_text = f"{metadata_info}\n{doc.page_content}"
-                formatted_chunks.append(chunk_text)
-            
-            return formatted_chunks
+            shared = _shared_retrieval.get()
+            if shared is None:
+                return self._search(query, num_results, filter)
+            key = (self.collection_name, query, num_results, repr(sorted(filter.items())) if filter else None)
+            return shared.get_or_retrieve(key, lambda: self._search(query, num_results, filter))
         except Exception as e:
             # Handle case where collection doesn't exist or is corrupted
             # Return empty list so get_context can handle it gracefully
             print(f"Warning: Error retrieving from collection '{self.collection_name}': {e}")
             return []
     
+    def _search(self, query: str, k: int, filter: Optional[dict]) -> List[Document]:
+        """Run a similarity search against the collection."""
+        vectorstore = self._get_vectorstore()
+        if filter:
+            return vectorstore.similarity_search(query, k=k, filter=filter)
+        return vectorstore.similarity_search(query, k=k)
+    
+    def retrieve(self, query: str, k: Optional[int] = None, filter: Optional[dict] = None) -> List[str]:
+        """
+        Retrieve relevant document chunks for a query.
+        
+        Args:
+            query: User query string
+            k: Number of documents to retrieve (overrides instance default)
+            filter: Optional metadata filter (e.g., {'domain': 'technical'})
+            
+        Returns:
+            List of retrieved document chunk strings formatted for LLM context
+        """
+        return [self.format_chunk(doc) for doc in self.retrieve_documents(query, k=k, filter=filter)]
+    
+    def get_documents_by_ids(self, ids: List[str]) -> List[Document]:
+        """
+        Fetch documents by chunk ID, preserving the requested order.
+        
+        Args:
+            ids: Chunk IDs
+            
+        Returns:
+            Documents that still exist in the collection
+        """
+        docs = self._get_vectorstore().get_by_ids(list(ids))
+        by_id = {doc.id: doc for doc in docs}
+        return [by_id[i] for i in ids if i in by_id]
+    
     def retrieve_with_scores(self, query: str, k: Optional[int] = None, filter: Optional[dict] = None) -> List[tuple]:
         """
         Retrieve documents with similarity scores.
@@ -106,17 +220,7 @@ class RAGStrategy:
         else:
             results = vectorstore.similarity_search_with_score(query, k=num_results)
         
-        formatted_results = []
-        for doc, score in results:
-            metadata_info = ""
-            if doc.metadata:
-                source = doc.metadata.get('source_file', 'unknown')
-                metadata_info = f"[Source: {source}]"
-            
-            chunk_text = f"{metadata_info}\n{doc.page_content}"
-            formatted_results.append((chunk_text, score))
-        
-        return formatted_results
+        return [(self.format_chunk(doc), score) for doc, score in results]
     
     def get_context(self, query: str, k: Optional[int] = None, filter: Optional[dict] = None) -> str:
         """
@@ -131,7 +235,19 @@ class RAGStrategy:
             Formatted context string combining all retrieved chunks
         """
         chunks = self.retrieve(query, k=k, filter=filter)
+        return self.format_context(chunks)
+    
+    @staticmethod
+    def format_context(chunks: List[str]) -> str:
+        """
+        Combine formatted chunks into a single context string.
         
+        Args:
+            chunks: Formatted chunk strings
+            
+        Returns:
+            Formatted context string
+        """
         if not chunks:
             return "No relevant information found in the knowledge base."
         
@@ -140,4 +256,36 @@ class RAGStrategy:
             context_parts.append(f"\n--- Document {i} ---\n{chunk}")
         
         return "\n".join(context_parts)
-
+    
+    def get_context_ref(self, query: str, k: Optional[int] = None, filter: Optional[dict] = None) -> str:
+        """
+        Get a compact reference to the context for a query.
+        
+        The formatted context is kept in the process context store and the
+        reference carries the chunk IDs, so tool messages in checkpointed
+        state stay small. Empty results are returned as plain text.
+        
+        Args:
+            query: User query string
+            k: Number of documents to retrieve
+            filter: Optional metadata filter
+            
+        Returns:
+            Context reference string (or the no-results message)
+        """
+        docs = self.retrieve_documents(query, k=k, filter=filter)
+        if not docs:
+            return self.format_context([])
+        
+        context = self.format_context([self.format_chunk(doc) for doc in docs])
+        ids = [doc.id for doc in docs if doc.id]
+        return make_context_ref("rag", self.collection_name, context, ids=ids if len(ids) == len(docs) else None)
+    
+    def _resolve_context_ref(self, ref: ContextRef) -> Optional[str]:
+        """Rebuild context text for a reference from its chunk IDs."""
+        if not ref.ids:
+            return None
+        docs = self.get_documents_by_ids(list(ref.ids))
+        if not docs:
+            return None
+        return self.format_context([self.format_chunk(doc) for doc in docs])
@@ -14,6 +14,7 @@ from langchain_chroma import Chroma
 from langchain_openai import OpenAIEmbeddings
 
 from app.core.config import get_settings
+from app.llm.providers import get_openai_embeddings
 
 
 class ChromaDBClient:
@@ -53,9 +54,9 @@ class ChromaDBClient:
             OpenAIEmbeddings: Configured embeddings model
         """
         if self.embeddings is None:
-            self.embeddings = OpenAIEmbeddings(
-                model="text-embedding-3-small",  # Cost-effective model
-                api_key=self.settings.openai_api_key
+            # Shared instance (fake embeddings when LLM_BACKEND=fake)
+            self.embeddings = get_openai_embeddings(
+                model_name="text-embedding-3-small"  # Cost-effective model
             )
         return self.embeddings
     
@@ -0,0 +1,154 @@
+"""
+Answer a file of questions through the /chat/batch API.
+
+Reads messages from a text file (one per line), a JSON list (strings or
+{"message", "id", "domain", "thread_id"} objects, optionally under
+"items") or JSONL, sends them to /chat/batch in chunks of at most
+--chunk-size messages, and writes each result as one NDJSON line as soon
+as it arrives (with the message's position in the input as "index").
+Progress goes to stderr, followed by the aggregate throughput.
+
+Usage:
+    python batch_chat.py questions.txt --output answers.ndjson
+    python batch_chat.py eval_set.jsonl --url http://localhost:8000 --concurrency 4 --deadline 30
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Optional, TextIO
+
+import httpx
+
+
+def load_items(path: Path) -> list[dict]:
+    """
+    Read batch items from a text, JSON or JSONL file.
+
+    Args:
+        path: Input file
+
+    Returns:
+        Items with at least a "message" and an "id" (position in the file when not given)
+    """
+    text = path.read_text(encoding="utf-8")
+    if path.suffix == ".json":
+        raw = json.loads(text)
+        if isinstance(raw, dict):
+            raw = raw["items"]
+    elif path.suffix in (".jsonl", ".ndjson"):
+        raw = [json.loads(line) for line in text.splitlines() if line.strip()]
+    else:
+        raw = [line.strip() for line in text.splitlines() if line.strip()]
+
+    items = []
+    for index, entry in enumerate(raw):
+        item = {"message": entry} if isinstance(entry, str) else dict(entry)
+        item.setdefault("id", str(index))
+        items.append(item)
+    return items
+
+
+async def run_chunk(
+    client: httpx.AsyncClient,
+    items: list[dict],
+    offset: int,
+    total: int,
+    args: argparse.Namespace,
+    output: TextIO,
+    done: list[int],
+) -> Optional[dict]:
+    """Send one /chat/batch request, writing its results; returns its summary line."""
+    payload = {"items": items}
+    if args.concurrency:
+        payload["concurrency"] = args.concurrency
+    if args.deadline:
+        payload["deadline_seconds"] = args.deadline
+
+    summary = None
+    async with client.stream("POST", "/chat/batch", json=payload) as response:
+        if response.status_code != 200:
+            await response.aread()
+            raise RuntimeError(f"/chat/batch returned {response.status_code}: {response.text}")
+        async for raw in response.aiter_lines():
+            if not raw.strip():
+                continue
+            line = json.loads(raw)
+            if line["type"] == "summary":
+                summary = line
+                continue
+            line["index"] += offset
+            output.write(json.dumps(line, ensure_ascii=False) + "\n")
+            output.flush()
+            done[0] += 1
+            if line["type"] == "error":
+                print(f"[{done[0]}/{total}] {line['id']}: error {line['status']} {line['detail']}", file=sys.stderr)
+            elif not args.quiet:
+                print(
+                    f"[{done[0]}/{total}] {line['id']}: {line['agent_type']} in {line['elapsed_ms']:.0f}ms"
+                    + (" (partial)" if line["partial"] else ""),
+                    file=sys.stderr,
+                )
+    return summary
+
+
+async def run(args: argparse.Namespace, items: list[dict], output: TextIO) -> dict:
+    """Answer all items chunk by chunk and combine the chunk summaries."""
+    started = time.perf_counter()
+    done = [0]
+    totals = {"items": 0, "succeeded": 0, "failed": 0, "partial": 0, "total_tokens": 0, "shared_searches": 0}
+    async with httpx.AsyncClient(base_url=args.url, timeout=httpx.Timeout(args.timeout, read=None)) as client:
+        for offset in range(0, len(items), args.chunk_size):
+            chunk = items[offset:offset + args.chunk_size]
+            summary = await run_chunk(client, chunk, offset, len(items), args, output, done)
+            if summary is None:
+                raise RuntimeError("Batch response ended without a summary (server error or disconnect)")
+            for key in ("items", "succeeded", "failed", "partial"):
+                totals[key] += summary[key]
+            totals["total_tokens"] += summary["usage"]["total_tokens"]
+            totals["shared_searches"] += summary["retrieval"]["shared"]
+    elapsed = time.perf_counter() - started
+    totals["elapsed_seconds"] = round(elapsed, 2)
+    totals["items_per_second"] = round(totals["items"] / elapsed, 2) if elapsed > 0 else None
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a file of questions through /chat/batch")
+    parser.add_argument("input", type=Path, help="Questions: .txt (one per line), .json or .jsonl")
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the chat API")
+    parser.add_argument("--output", type=Path, help="Write NDJSON results here (default: stdout)")
+    parser.add_argument("--concurrency", type=int, help="Messages answered at once (server caps it)")
+    parser.add_argument("--deadline", type=float, help="Time budget per message in seconds")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Messages per /chat/batch request")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Connect/write timeout in seconds")
+    parser.add_argument("--quiet", action="store_true", help="Only report errors and the summary")
+    args = parser.parse_args()
+
+    items = load_items(args.input)
+    if not items:
+        print(f"No messages in {args.input}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Answering {len(items)} messages from {args.input} via {args.url}/chat/batch", file=sys.stderr)
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        totals = asyncio.run(run(args, items, output))
+    finally:
+        if args.output:
+            output.close()
+
+    print(
+        f"\n{totals['succeeded']}/{totals['items']} answered ({totals['partial']} partial, {totals['failed']} failed) "
+        f"in {totals['elapsed_seconds']}s: {totals['items_per_second']} messages/s, "
+        f"{totals['total_tokens']} tokens, {totals['shared_searches']} shared searches",
+        file=sys.stderr,
+    )
+    sys.exit(1 if totals["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
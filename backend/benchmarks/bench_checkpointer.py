@@ -0,0 +1,109 @@
+"""
+Benchmark per-turn checkpoint overhead (offline - no LLM calls).
+
+Runs a small message graph (model node -> tool node -> model node, so each
+turn issues several checkpoint writes) against each checkpointer and reports
+the mean and p95 time per conversation turn.
+
+Usage:
+    python benchmarks/bench_checkpointer.py [--threads 20] [--turns 10]
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import StateGraph, START, END, MessagesState
+
+from app.core.checkpointing import BoundedMemorySaver
+from app.core.metrics import percentile
+from app.core.sqlite_checkpointer import SQLiteCheckpointSaver
+
+
+def _build_graph(checkpointer):
+    """Model -> tool -> model graph, mimicking one agent turn with a tool call."""
+    def model(state: MessagesState):
+        last = state["messages"][-1]
+        if isinstance(last, ToolMessage):
+            return {"messages": [AIMessage(content="answer " + "x" * 400)]}
+        return {"messages": [AIMessage(content="", tool_calls=[{"name": "lookup", "args": {"q": last.content}, "id": f"call_{len(state['messages'])}"}])]}
+
+    def tool(state: MessagesState):
+        call = state["messages"][-1].tool_calls[0]
+        return {"messages": [ToolMessage(content="context " + "y" * 1500, tool_call_id=call["id"])]}
+
+    def route(state: MessagesState):
+        return "tool" if state["messages"][-1].tool_calls else END
+
+    builder = StateGraph(MessagesState)
+    builder.add_node("model", model)
+    builder.add_node("tool", tool)
+    builder.add_edge(START, "model")
+    builder.add_conditional_edges("model", route, ["tool", END])
+    builder.add_edge("tool", "model")
+    return builder.compile(checkpointer=checkpointer)
+
+
+def run(name: str, checkpointer, threads: int, turns: int) -> dict:
+    """Time every turn of every thread for one checkpointer."""
+    graph = _build_graph(checkpointer)
+    timings = []
+    for t in range(threads):
+        config = {"configurable": {"thread_id": f"bench_{t}"}}
+        for i in range(turns):
+            start = time.perf_counter()
+            graph.invoke({"messages": [{"role": "user", "content": f"question {i}"}]}, config)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "checkpointer": name,
+        "turns": len(timings),
+        "mean_ms": round(sum(timings) / len(timings), 3),
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark checkpoint overhead per turn")
+    parser.add_argument("--threads", type=int, default=20, help="Conversation threads")
+    parser.add_argument("--turns", type=int, default=10, help="Turns per thread")
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of a table")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        candidates = [
+            ("MemorySaver", lambda: MemorySaver()),
+            ("BoundedMemorySaver", lambda: BoundedMemorySaver(max_checkpoints_per_thread=10)),
+            ("SQLite (batched 50ms)", lambda: SQLiteCheckpointSaver(
+                str(Path(tmp) / "batched.sqlite3"), flush_interval_ms=50, max_checkpoints_per_thread=10)),
+            ("SQLite (write-through)", lambda: SQLiteCheckpointSaver(
+                str(Path(tmp) / "through.sqlite3"), flush_interval_ms=0, max_checkpoints_per_thread=10)),
+        ]
+        for name, factory in candidates:
+            checkpointer = factory()
+            results.append(run(name, checkpointer, args.threads, args.turns))
+            if hasattr(checkpointer, "close"):
+                checkpointer.close()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'Checkpointer':26} {'turns':>6} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    print("-" * 63)
+    for r in results:
+        print(f"{r['checkpointer']:26} {r['turns']:>6} {r['mean_ms']:>9} {r['p50_ms']:>9} {r['p95_ms']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Benchmark checkpoint serializers on realistic threads (offline - no LLM calls).
+
+Replays multi-turn conversations shaped like the orchestrator's (user
+question -> routing tool call -> worker answer -> final answer, with token
+usage metadata) using text from data/, captures every payload the
+checkpointer stores (checkpoints, metadata, channel blobs, pending writes),
+then re-encodes them with each serializer and reports bytes per checkpoint
+and encode/decode time.
+
+Usage:
+    python benchmarks/bench_serializer.py [--threads 10] [--turns 8]
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.graph import StateGraph, START, END, MessagesState
+
+from app.core.serialization import CompactSerializer, zstandard
+
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+TOOLS = ["handle_policy_query", "handle_technical_query", "handle_billing_query", "handle_dad_joke_request"]
+
+
+def _load_paragraphs() -> list[str]:
+    """Paragraphs from the project's knowledge base documents."""
+    paragraphs = []
+    for path in sorted(DATA_DIR.glob("*/*.md")):
+        paragraphs.extend(p.strip() for p in path.read_text(encoding="utf-8").split("\n\n") if len(p.strip()) > 80)
+    return paragraphs
+
+
+def _build_graph(checkpointer, paragraphs: list[str], rng: random.Random):
+    """Orchestrator-shaped graph: route with a tool call, then answer."""
+    usage = {"input_tokens": 812, "output_tokens": 164, "total_tokens": 976}
+    metadata = {"model_name": "gpt-4o-mini", "finish_reason": "stop", "model_provider": "openai"}
+
+    def model(state: MessagesState):
+        last = state["messages"][-1]
+        if isinstance(last, ToolMessage):
+            answer = "\n\n".join(rng.sample(paragraphs, 2))
+            return {"messages": [AIMessage(content=answer, usage_metadata=usage, response_metadata=metadata)]}
+        call = {"name": rng.choice(TOOLS), "args": {"query": last.content}, "id": f"call_{rng.getrandbits(48):x}"}
+        return {"messages": [AIMessage(content="", tool_calls=[call], usage_metadata=usage, response_metadata=metadata)]}
+
+    def tools(state: MessagesState):
+        call = state["messages"][-1].tool_calls[0]
+        answer = "\n\n".join(rng.sample(paragraphs, 3)) + "\n\n**Key Points:**\n- " + rng.choice(paragraphs)[:120]
+        return {"messages": [ToolMessage(content=answer, name=call["name"], tool_call_id=call["id"])]}
+
+    def route(state: MessagesState):
+        return "tools" if state["messages"][-1].tool_calls else END
+
+    builder = StateGraph(MessagesState)
+    builder.add_node("model", model)
+    builder.add_node("tools", tools)
+    builder.add_edge(START, "model")
+    builder.add_conditional_edges("model", route, ["tools", END])
+    builder.add_edge("tools", "model")
+    return builder.compile(checkpointer=checkpointer)
+
+
+def capture_payloads(threads: int, turns: int) -> tuple[list, int]:
+    """Run conversations and return every stored object plus the checkpoint count."""
+    rng = random.Random(7)
+    paragraphs = _load_paragraphs()
+    saver = MemorySaver()
+    graph = _build_graph(saver, paragraphs, rng)
+    for t in range(threads):
+        config = {"configurable": {"thread_id": f"bench_{t}"}}
+        for i in range(turns):
+            question = rng.choice(paragraphs)[:160]
+            graph.invoke({"messages": [{"role": "user", "content": f"Question {i}: {question}?"}]}, config)
+
+    serde = saver.serde
+    payloads, checkpoints = [], 0
+    for namespaces in saver.storage.values():
+        for entries in namespaces.values():
+            for checkpoint, metadata, _ in entries.values():
+                payloads.append(serde.loads_typed(checkpoint))
+                payloads.append(serde.loads_typed(metadata))
+                checkpoints += 1
+    payloads.extend(serde.loads_typed(blob) for blob in saver.blobs.values() if blob[0] != "empty")
+    payloads.extend(serde.loads_typed(w[2]) for writes in saver.writes.values() for w in writes.values())
+    return payloads, checkpoints
+
+
+def measure(name: str, serializer, payloads: list, checkpoints: int) -> dict:
+    """Encode and decode every payload, returning size and timing totals."""
+    start = time.perf_counter()
+    encoded = [serializer.dumps_typed(p) for p in payloads]
+    encode_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for item in encoded:
+        serializer.loads_typed(item)
+    decode_seconds = time.perf_counter() - start
+    total = sum(len(data) for _, data in encoded)
+    return {
+        "serializer": name,
+        "total_bytes": total,
+        "bytes_per_checkpoint": round(total / checkpoints),
+        "encode_us_per_checkpoint": round(encode_seconds / checkpoints * 1e6, 1),
+        "decode_us_per_checkpoint": round(decode_seconds / checkpoints * 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark checkpoint serializers")
+    parser.add_argument("--threads", type=int, default=10, help="Conversation threads")
+    parser.add_argument("--turns", type=int, default=8, help="Turns per thread")
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of a table")
+    args = parser.parse_args()
+
+    payloads, checkpoints = capture_payloads(args.threads, args.turns)
+    candidates = [
+        ("jsonplus (msgpack)", JsonPlusSerializer()),
+        ("compact zlib", CompactSerializer(compression="zlib", use_dictionary=False)),
+        ("compact zlib + dict", CompactSerializer(compression="zlib")),
+    ]
+    if zstandard is not None:
+        candidates += [
+            ("compact zstd", CompactSerializer(compression="zstd", use_dictionary=False)),
+            ("compact zstd + dict", CompactSerializer(compression="zstd")),
+        ]
+    results = [measure(name, serializer, payloads, checkpoints) for name, serializer in candidates]
+
+    if args.json:
+        print(json.dumps({"checkpoints": checkpoints, "payloads": len(payloads), "results": results}, indent=2))
+        return
+
+    print(f"{checkpoints} checkpoints, {len(payloads)} stored payloads")
+    print(f"{'Serializer':22} {'bytes/ckpt':>11} {'ratio':>7} {'enc us/ckpt':>12} {'dec us/ckpt':>12}")
+    print("-" * 68)
+    baseline = results[0]["total_bytes"]
+    for r in results:
+        ratio = baseline / r["total_bytes"]
+        print(
+            f"{r['serializer']:22} {r['bytes_per_checkpoint']:>11} {ratio:>6.2f}x "
+            f"{r['encode_us_per_checkpoint']:>12} {r['decode_us_per_checkpoint']:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
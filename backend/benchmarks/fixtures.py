@@ -0,0 +1,69 @@
+"""
+Shared offline setup for benchmarks and the performance gate.
+
+Call use_offline_backend() before importing anything from app: it selects
+the deterministic fake LLM backend (LLM_BACKEND=fake) and points Chroma at
+a throwaway directory, which build_vector_store() fills from data/ using the
+fake embeddings.
+"""
+
+import atexit
+import contextlib
+import io
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+
+# Collections used by the RAG (technical, dad jokes) and hybrid (billing) agents
+COLLECTIONS = {
+    "technical": "technical_documents",
+    "billing": "billing_documents",
+    "dad_jokes": "dad_jokes_documents",
+}
+
+
+def use_offline_backend(**settings: str) -> str:
+    """
+    Configure fake models and a temporary Chroma directory via the environment.
+
+    Args:
+        **settings: Extra settings to set (e.g. checkpointer_backend="memory")
+
+    Returns:
+        Path of the temporary Chroma directory (removed at exit)
+    """
+    chroma_dir = tempfile.mkdtemp(prefix="bench_chroma_")
+    atexit.register(shutil.rmtree, chroma_dir, ignore_errors=True)
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["CHROMA_DB_PATH"] = chroma_dir
+    for name, value in settings.items():
+        os.environ[name.upper()] = str(value)
+    return chroma_dir
+
+
+def build_vector_store(domains: tuple = ("technical", "billing", "dad_jokes")) -> None:
+    """Ingest data/<domain> into the configured Chroma store with the fake embeddings."""
+    from app.vectorstore.chroma_client import get_chroma_client
+    from ingest_data import chunk_documents, load_documents_from_directory
+
+    client = get_chroma_client()
+    for domain in domains:
+        with contextlib.redirect_stdout(io.StringIO()):
+            chunks = chunk_documents(load_documents_from_directory(DATA_DIR / domain))
+        store = client.create_collection(COLLECTIONS[domain])
+        store.add_texts(
+            texts=[c["content"] for c in chunks],
+            metadatas=[{"source_file": c["source_file"], "chunk_index": c["chunk_index"]} for c in chunks],
+        )
+
+
+def quiet_app_logging() -> None:
+    """Raise app loggers to WARNING; per-request INFO logs would dominate timings."""
+    logging.getLogger("officelifeline").setLevel(logging.WARNING)
+    for name in list(logging.Logger.manager.loggerDict):
+        if name.startswith("officelifeline."):
+            logging.getLogger(name).setLevel(logging.WARNING)
@@ -0,0 +1,377 @@
+"""
+Load test the /chat API end to end.
+
+Virtual users hold multi-turn conversations (one thread per conversation)
+drawn from a weighted mix of policy, technical, billing and dad-joke
+queries, with a configurable share of streaming requests. Concurrency is
+ramped through stages; each stage reports throughput, total latency
+p50/p95/p99, time to first SSE chunk (streaming requests), error rates and
+routing accuracy. The report is JSON so runs can be compared with --compare.
+
+Targets either a running server (--url) or, with --fake, an in-process
+server on a free port using the deterministic fake LLM backend
+(LLM_BACKEND=fake), so no API keys or network access are needed.
+
+Usage:
+    python benchmarks/load_test.py --fake --stages 1,8,32 --duration 10
+    python benchmarks/load_test.py --url http://localhost:8000 --stages 1,4 --duration 30 --output run.json
+    python benchmarks/load_test.py --fake --compare run.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import socket
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Callable
+
+import httpx
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.metrics import percentile
+from benchmarks.fixtures import build_vector_store, quiet_app_logging, use_offline_backend
+
+# Queries per scenario; follow-ups make later turns depend on thread history
+SCENARIOS = {
+    "policy": [
+        "What is your privacy policy?",
+        "How long do you keep my data?",
+        "What are the terms of service for refunds?",
+        "What is the remote work policy?",
+    ],
+    "technical": [
+        "How do I fix API errors?",
+        "I get a 401 error when calling the API",
+        "How do I configure webhooks?",
+        "The integration keeps timing out, how do I troubleshoot it?",
+    ],
+    "billing": [
+        "What are your pricing plans?",
+        "How do I update my payment method?",
+        "When am I billed for my subscription?",
+        "How do I get a refund on my invoice?",
+    ],
+    "dad_joke": [
+        "Tell me a dad joke",
+        "I need a joke to cheer me up",
+        "Make me laugh with something funny",
+    ],
+}
+FOLLOW_UPS = {
+    "policy": ["Can you summarize the key points of that policy?"],
+    "technical": ["What should I check if that doesn't fix the error?"],
+    "billing": ["Does that pricing include a free trial?"],
+    "dad_joke": ["Tell me another joke"],
+}
+DEFAULT_MIX = "policy=0.3,technical=0.3,billing=0.3,dad_joke=0.1"
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    """Parse 'policy=0.3,technical=0.3,...' into normalized weights."""
+    weights = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}'. Use: {', '.join(SCENARIOS)}")
+        weights[name] = float(weight or 1)
+    total = sum(weights.values())
+    return {name: weight / total for name, weight in weights.items()}
+
+
+def _summary(values: list[float]) -> dict:
+    """Latency summary in milliseconds."""
+    values = sorted(values)
+    if not values:
+        return {"count": 0, "mean_ms": None, "p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 2),
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2),
+    }
+
+
+async def _send(client: httpx.AsyncClient, message: str, thread_id: str, stream: bool) -> dict:
+    """Send one chat request and measure it."""
+    payload = {"message": message, "thread_id": thread_id, "stream": stream}
+    start = time.perf_counter()
+    result = {"stream": stream, "status": None, "error": None, "ttfc": None, "agent_type": None}
+    try:
+        if stream:
+            async with client.stream("POST", "/chat", json=payload) as response:
+                result["status"] = response.status_code
+                if response.status_code != 200:
+                    await response.aread()
+                else:
+                    completed = False
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            if line.startswith("event:") and line[6:].strip() == "done":
+                                completed = True
+                            continue
+                        if result["ttfc"] is None:
+                            result["ttfc"] = time.perf_counter() - start
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            completed = True
+                            continue
+                        if result["agent_type"] is None and "agent_type" in data:
+                            try:
+                                result["agent_type"] = json.loads(data).get("agent_type")
+                            except ValueError:
+                                pass
+                    if not completed:
+                        result["error"] = "incomplete_stream"
+        else:
+            response = await client.post("/chat", json=payload)
+            result["status"] = response.status_code
+            if response.status_code == 200:
+                result["agent_type"] = response.json().get("agent_type")
+    except httpx.TimeoutException:
+        result["error"] = "timeout"
+    except httpx.HTTPError as e:
+        result["error"] = type(e).__name__
+    result["latency"] = time.perf_counter() - start
+    if result["error"] is None and result["status"] != 200:
+        result["error"] = f"http_{result['status']}"
+    return result
+
+
+async def _virtual_user(
+    client: httpx.AsyncClient,
+    rng: random.Random,
+    mix: dict[str, float],
+    turns: int,
+    stream_ratio: float,
+    deadline: float,
+    results: list,
+):
+    """Hold conversations until the stage deadline."""
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        scenario = rng.choices(names, weights)[0]
+        thread_id = f"load_{uuid.uuid4().hex[:12]}"
+        for turn in range(turns):
+            if time.perf_counter() >= deadline:
+                break
+            pool = SCENARIOS[scenario] if turn == 0 else FOLLOW_UPS[scenario] + SCENARIOS[scenario]
+            result = await _send(client, rng.choice(pool), thread_id, rng.random() < stream_ratio)
+            result["scenario"] = scenario
+            result["turn"] = turn
+            results.append(result)
+            if result["error"]:
+                break
+
+
+def _stage_report(concurrency: int, results: list, elapsed: float) -> dict:
+    """Aggregate one stage's request results."""
+    ok = [r for r in results if r["error"] is None]
+    errors = Counter(r["error"] for r in results if r["error"])
+    routed = [r for r in ok if r["turn"] == 0 and r["agent_type"]]
+    correct = sum(1 for r in routed if r["agent_type"] == r["scenario"])
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        "requests": len(results),
+        "successful": len(ok),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(sum(errors.values()) / len(results), 4) if results else 0.0,
+        "errors": dict(errors),
+        "latency": _summary([r["latency"] for r in ok]),
+        "latency_streaming": _summary([r["latency"] for r in ok if r["stream"]]),
+        "latency_non_streaming": _summary([r["latency"] for r in ok if not r["stream"]]),
+        "time_to_first_chunk": _summary([r["ttfc"] for r in ok if r["stream"] and r["ttfc"] is not None]),
+        "routing_accuracy": round(correct / len(routed), 4) if routed else None,
+        "scenarios": dict(Counter(r["scenario"] for r in results)),
+    }
+
+
+async def run_load_test(
+    base_url: str,
+    stages: list[int],
+    duration: float,
+    mix: dict[str, float],
+    turns: int = 3,
+    stream_ratio: float = 0.5,
+    seed: int = 0,
+    timeout: float = 120.0,
+    warmup_requests: int = 2,
+) -> list[dict]:
+    """
+    Run each concurrency stage against the /chat API.
+
+    Args:
+        base_url: Server URL (e.g. http://localhost:8000)
+        stages: Concurrent virtual users per stage
+        duration: Seconds per stage
+        mix: Scenario weights (see parse_mix)
+        turns: Turns per conversation thread
+        stream_ratio: Fraction of requests sent with stream=True
+        seed: Seed for scenario, query and streaming choices
+        timeout: Per-request timeout in seconds
+        warmup_requests: Untimed requests sent first (agent and index creation)
+
+    Returns:
+        One report dict per stage
+    """
+    limits = httpx.Limits(max_connections=max(stages), max_keepalive_connections=max(stages))
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        for i in range(warmup_requests):
+            scenario = list(mix)[i % len(mix)]
+            await _send(client, SCENARIOS[scenario][0], f"warmup_{i}", stream=False)
+
+        reports = []
+        for stage, concurrency in enumerate(stages):
+            results: list[dict] = []
+            start = time.perf_counter()
+            deadline = start + duration
+            await asyncio.gather(*(
+                _virtual_user(
+                    client, random.Random(f"{seed}:{stage}:{user}"), mix, turns, stream_ratio, deadline, results
+                )
+                for user in range(concurrency)
+            ))
+            report = _stage_report(concurrency, results, time.perf_counter() - start)
+            reports.append(report)
+            print_stage(report)
+    return reports
+
+
+def serve_in_background(fake: bool = True) -> tuple[str, Callable[[], None]]:
+    """
+    Start the app with uvicorn on a free local port in a background thread.
+
+    Args:
+        fake: Use the fake LLM backend and a temporary vector store built from data/
+
+    Returns:
+        (base_url, stop) where stop() shuts the server down
+    """
+    if fake:
+        # Must happen before the app (and its settings) are imported
+        use_offline_backend()
+        build_vector_store()
+    import uvicorn
+    from app.main import app
+
+    quiet_app_logging()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", access_log=False))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("In-process server failed to start")
+        time.sleep(0.05)
+
+    def stop():
+        server.should_exit = True
+        thread.join(timeout=10)
+        sock.close()
+
+    return f"http://127.0.0.1:{port}", stop
+
+
+def print_stage(report: dict) -> None:
+    """Print one stage as a table row."""
+    latency, ttfc = report["latency"], report["time_to_first_chunk"]
+    print(
+        f"{report['concurrency']:>5} {report['requests']:>8} {report['throughput_rps']:>9} "
+        f"{latency['p50_ms'] or '-':>9} {latency['p95_ms'] or '-':>9} {latency['p99_ms'] or '-':>9} "
+        f"{ttfc['p95_ms'] or '-':>10} {report['error_rate']:>7}"
+    )
+
+
+def compare(current: list[dict], baseline: list[dict]) -> None:
+    """Print per-stage changes against a baseline report."""
+    base_by_concurrency = {r["concurrency"]: r for r in baseline}
+    print(f"\n{'users':>5} {'rps':>16} {'p95 ms':>20} {'p99 ms':>20} {'error rate':>16}")
+    for report in current:
+        base = base_by_concurrency.get(report["concurrency"])
+        if base is None:
+            continue
+
+        def delta(new, old) -> str:
+            if new is None or old is None:
+                return "-"
+            change = f" ({(new - old) / old * 100:+.0f}%)" if old else ""
+            return f"{old}->{new}{change}"
+
+        print(
+            f"{report['concurrency']:>5} {delta(report['throughput_rps'], base['throughput_rps']):>16} "
+            f"{delta(report['latency']['p95_ms'], base['latency']['p95_ms']):>20} "
+            f"{delta(report['latency']['p99_ms'], base['latency']['p99_ms']):>20} "
+            f"{delta(report['error_rate'], base['error_rate']):>16}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the /chat API")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Base URL of a running server")
+    target.add_argument("--fake", action="store_true", help="Serve the app in-process with the fake LLM backend")
+    parser.add_argument("--stages", default="1,4,16", help="Comma-separated concurrent users per stage")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per stage")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Scenario weights, e.g. policy=1,billing=2")
+    parser.add_argument("--turns", type=int, default=3, help="Turns per conversation thread")
+    parser.add_argument("--stream-ratio", type=float, default=0.5, help="Fraction of streaming requests")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for scenario choices")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    args = parser.parse_args()
+
+    stages = [int(s) for s in args.stages.split(",")]
+    mix = parse_mix(args.mix)
+    stop = None
+    base_url = args.url
+    if args.fake:
+        base_url, stop = serve_in_background(fake=True)
+
+    print(f"Load testing {base_url}/chat: stages={stages}, {args.duration}s each, mix={args.mix}")
+    print(f"{'users':>5} {'requests':>8} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ttfc p95':>10} {'errors':>7}")
+    print("-" * 74)
+    try:
+        reports = asyncio.run(run_load_test(
+            base_url, stages, args.duration, mix,
+            turns=args.turns, stream_ratio=args.stream_ratio, seed=args.seed, timeout=args.timeout,
+        ))
+    finally:
+        if stop:
+            stop()
+
+    report = {
+        "target": "fake" if args.fake else args.url,
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "stages": stages, "duration_s": args.duration, "mix": mix, "turns": args.turns,
+            "stream_ratio": args.stream_ratio, "seed": args.seed,
+        },
+        "stages": reports,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\nReport written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        compare(reports, json.loads(Path(args.compare).read_text())["stages"])
+
+
+if __name__ == "__main__":
+    main()
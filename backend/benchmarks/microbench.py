@@ -0,0 +1,276 @@
+"""
+Microbenchmarks for backend hot paths (offline - no LLM calls).
+
+Times retrieval (RAG, CAG, hybrid hit/miss), context formatting, agent type
+detection on long histories, SSE chunk serialization, checkpointer put/get
+and document chunking in isolation. Retrieval runs against a temporary
+Chroma store built from data/ with the deterministic fake embeddings
+(LLM_BACKEND=fake), so results do not depend on network latency.
+
+Results are written in a stable JSON format (schema version, environment,
+one entry per benchmark with ops/s, mean, p50, p95 in microseconds);
+--compare flags benchmarks that got slower than a baseline file by more
+than --threshold.
+
+Usage:
+    python benchmarks/microbench.py
+    python benchmarks/microbench.py --filter rag --output micro.json
+    python benchmarks/microbench.py --compare micro.json --threshold 0.2
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.fixtures import DATA_DIR, build_vector_store, use_offline_backend
+
+# Stand-ins for models and a throwaway vector store (set before app imports)
+use_offline_backend()
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.base import empty_checkpoint
+
+from app.agents.models import PolicyResponse
+from app.agents.structured_stream import PolicyStreamRenderer
+from app.api.sse import _split, format_event
+from app.core.checkpointing import BoundedMemorySaver
+from app.core.metrics import percentile
+from app.core.models import ChatStreamChunk
+from app.core.sqlite_checkpointer import SQLiteCheckpointSaver
+from app.retrieval.cag_strategy import CAGStrategy
+from app.retrieval.hybrid_strategy import HybridRAGCAGStrategy
+from app.retrieval.rag_strategy import RAGStrategy
+from ingest_data import chunk_documents, load_documents_from_directory
+
+SCHEMA_VERSION = 1
+
+
+def measure(fn: Callable[[], object], min_time: float = 0.3, rounds: int = 7) -> dict:
+    """
+    Time a zero-argument callable.
+
+    The number of calls per round is calibrated so each round takes about
+    min_time / rounds; per-call times of each round are the samples.
+
+    Returns:
+        ops_per_sec, mean_us, p50_us, p95_us, stdev_us, calls
+    """
+    fn()  # warm up caches and lazy initialization
+    calls, elapsed = 1, 0.0
+    target = min_time / rounds
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= target / 2 or calls >= 1_000_000:
+            break
+        calls *= 2
+
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        samples.append((time.perf_counter() - start) / calls * 1e6)
+    samples.sort()
+    mean = statistics.fmean(samples)
+    return {
+        "ops_per_sec": round(1e6 / mean, 1),
+        "mean_us": round(mean, 3),
+        "p50_us": round(percentile(samples, 50), 3),
+        "p95_us": round(percentile(samples, 95), 3),
+        "stdev_us": round(statistics.stdev(samples), 3) if len(samples) > 1 else 0.0,
+        "calls": calls * rounds,
+    }
+
+
+def _long_history(turns: int = 100) -> list:
+    """Orchestrator history of routed turns."""
+    messages = []
+    for i in range(turns):
+        call_id = f"call_{i}"
+        messages += [
+            HumanMessage(content=f"question {i}"),
+            AIMessage(content="", tool_calls=[{"name": "handle_billing_query", "args": {"query": "q"}, "id": call_id}]),
+            ToolMessage(content="answer " * 50, name="handle_billing_query", tool_call_id=call_id),
+            AIMessage(content="answer " * 50),
+        ]
+    messages.append(HumanMessage(content="thanks"))
+    messages.append(AIMessage(content="You're welcome!"))
+    return messages
+
+
+def _sse_chunks(response: str, thread_id: str, agent_type: str) -> list[str]:
+    """SSE framing as done by chat_endpoint for a streamed response."""
+    words = response.split()
+    frames = []
+    for i, word in enumerate(words):
+        is_last = i == len(words) - 1
+        chunk = ChatStreamChunk(
+            content=word + ("" if is_last else " "), done=is_last, thread_id=thread_id, agent_type=agent_type
+        )
+        frames.append(f"data: {chunk.model_dump_json()}\n\n")
+    frames.append("data: [DONE]\n\n")
+    return frames
+
+
+def _sse_events_v2(response: str, thread_id: str, agent_type: str) -> list[str]:
+    """Protocol v2 framing of a complete answer (meta, size-coalesced deltas, done)."""
+    frames = [format_event("meta", {"thread_id": thread_id, "agent_type": agent_type})]
+    chunks, rest = _split(response, 256)
+    frames += [format_event("delta", {"text": text}) for text in chunks + [rest] if text]
+    frames.append(format_event("done", {"chars": len(response)}))
+    return frames
+
+
+def _policy_json_tokens() -> list[str]:
+    """A PolicyResponse as streamed by the model, in token-sized pieces."""
+    response = PolicyResponse(
+        friendly_response="Here's an overview of our privacy policy!",
+        policy_description="\n".join(f"- **Section {i}**: we handle \"data\" carefully." for i in range(60)),
+        key_points=[f"Key point {i}" for i in range(5)],
+        contact_info="privacy@example.com",
+    )
+    raw = response.model_dump_json()
+    return [raw[i:i + 4] for i in range(0, len(raw), 4)]
+
+
+def _render_policy_stream(tokens: list[str]) -> str:
+    renderer = PolicyStreamRenderer()
+    return "".join(renderer.feed(token) for token in tokens)
+
+
+def _checkpoint_benchmarks(tmp: Path) -> dict[str, Callable]:
+    """put/get of a 40-message checkpoint for each persistent-enough saver."""
+    messages = _long_history(10)
+    savers = {
+        "memory": BoundedMemorySaver(max_checkpoints_per_thread=10),
+        "sqlite": SQLiteCheckpointSaver(str(tmp / "bench.sqlite3"), flush_interval_ms=50, max_checkpoints_per_thread=10),
+    }
+    benchmarks = {}
+    for name, saver in savers.items():
+        config = {"configurable": {"thread_id": f"bench_{name}", "checkpoint_ns": ""}}
+        checkpoint = empty_checkpoint()
+        checkpoint["channel_values"] = {"messages": messages}
+        checkpoint["channel_versions"] = {"messages": 1}
+        saved = saver.put(config, checkpoint, {"source": "loop", "step": 1}, {"messages": 1})
+
+        def put(saver=saver, config=config, checkpoint=checkpoint):
+            checkpoint["id"] = empty_checkpoint()["id"]
+            saver.put(config, checkpoint, {"source": "loop", "step": 1}, {"messages": 1})
+
+        benchmarks[f"checkpointer.{name}.put"] = put
+        benchmarks[f"checkpointer.{name}.get"] = lambda saver=saver, saved=saved: saver.get_tuple(saved)
+    return benchmarks
+
+
+def build_benchmarks(tmp: Path) -> dict[str, Callable]:
+    """All benchmarks by stable name."""
+    build_vector_store(("technical", "billing"))
+    rag = RAGStrategy(collection_name="technical_documents", k=3)
+    hybrid = HybridRAGCAGStrategy(collection_name="billing_documents", k=3)
+    cag = CAGStrategy()
+    query = "How do I fix 401 authentication errors from the API?"
+    chunks = rag.retrieve(query)
+    warm_cache: dict = {}
+    hybrid.get_context_ref("How do refunds work?", warm_cache)
+    response = "word " * 300
+    policy_tokens = _policy_json_tokens()
+    with contextlib.redirect_stdout(io.StringIO()):
+        documents = [
+            doc for domain in ("billing", "technical", "policy")
+            for doc in load_documents_from_directory(DATA_DIR / domain)
+        ]
+
+    benchmarks = {
+        "rag.retrieve": lambda: rag.retrieve(query),
+        "rag.get_context": lambda: rag.get_context(query),
+        "rag.format_context": lambda: RAGStrategy.format_context(chunks),
+        "cag.get_context": lambda: cag.get_context(),
+        "cag.search_documents": lambda: cag.search_documents(["data retention", "cookies"]),
+        "hybrid.get_context_ref.miss": lambda: hybrid.get_context_ref("How do refunds work?", {}),
+        "hybrid.get_context_ref.hit": lambda: hybrid.get_context_ref("How do refunds work?", warm_cache),
+        "chat.sse_serialize.300_words": lambda: _sse_chunks(response, "thread_1", "billing"),
+        "chat.sse_serialize_v2.300_words": lambda: _sse_events_v2(response, "thread_1", "billing"),
+        "ingest.chunk_documents": lambda: chunk_documents(documents),
+        "agents.policy_stream_render": lambda: _render_policy_stream(policy_tokens),
+    }
+    benchmarks.update(_checkpoint_benchmarks(tmp))
+    return dict(sorted(benchmarks.items()))
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Names of benchmarks whose mean time grew by more than threshold."""
+    regressions = []
+    print(f"\n{'Benchmark':40} {'baseline us':>12} {'current us':>12} {'change':>8}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        change = (result["mean_us"] - base["mean_us"]) / base["mean_us"]
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{name:40} {base['mean_us']:>12} {result['mean_us']:>12} {change:>+8.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark backend hot paths")
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--min-time", type=float, default=0.3, help="Approximate seconds per benchmark")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--compare", help="Baseline JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before flagging (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # Retrieval code prints progress; keep it out of the timings and output
+        with contextlib.redirect_stdout(io.StringIO()):
+            benchmarks = build_benchmarks(Path(tmp))
+        print(f"{'Benchmark':40} {'ops/s':>12} {'mean us':>12} {'p95 us':>12}")
+        print("-" * 79)
+        for name, fn in benchmarks.items():
+            if args.filter not in name:
+                continue
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = measure(fn, min_time=args.min_time)
+            results[name] = result
+            print(f"{name:40} {result['ops_per_sec']:>12} {result['mean_us']:>12} {result['p95_us']:>12}")
+
+    report = {
+        "schema": SCHEMA_VERSION,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.machine(),
+        },
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, sort_keys=True))
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Performance regression gate for the /chat API (offline - no LLM calls).
+
+Runs a fixed scenario set through the app with fastapi.testclient.TestClient
+and the deterministic fake LLM backend, measuring per request:
+
+- latency_ms: wall time of the request (best of --repeat runs, like timeit)
+- alloc_peak_kb: peak Python memory allocated while serving it (tracemalloc)
+- llm_calls: chat model calls (fake_llm_calls_total)
+- model_lookups: model instance lookups (llm_model_cache_lookups_total),
+  which grows when agents or models are rebuilt per request
+
+Results are compared with the committed baseline (perf_baseline.json); the
+gate exits non-zero when a scenario exceeds a threshold. Latency and memory
+use a relative threshold plus an absolute floor (to ignore noise on tiny
+values); call counts must not grow beyond --count-tolerance. Wall time on
+shared machines is noisy, so the latency defaults are loose; allocations and
+call counts are deterministic and catch most regressions.
+
+Usage:
+    python benchmarks/perf_gate.py
+    python benchmarks/perf_gate.py --latency-threshold 0.3 --alloc-threshold 0.1
+    python benchmarks/perf_gate.py --update-baseline
+"""
+
+import argparse
+import gc
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.fixtures import build_vector_store, quiet_app_logging, use_offline_backend
+
+# Fake models, temporary vector store and in-memory checkpoints (set before app imports)
+use_offline_backend(checkpointer_backend="memory", fake_llm_latency_mean_seconds="0", fake_llm_tokens_per_second="0")
+
+from fastapi.testclient import TestClient
+
+from app.core.metrics import get_metrics
+from app.main import app
+
+SCHEMA_VERSION = 1
+BASELINE_PATH = Path(__file__).parent / "perf_baseline.json"
+
+# name -> (setup turns sent first on the same thread, measured message, stream)
+SCENARIOS = {
+    "policy": ([], "What is your privacy policy?", False),
+    "technical": ([], "How do I fix API errors?", False),
+    "billing": ([], "What are your pricing plans?", False),
+    "billing_follow_up": (["What are your pricing plans?"], "How do I get a refund on my invoice?", False),
+    "dad_joke_stream": ([], "Tell me a dad joke", True),
+    "technical_long_thread": (
+        ["How do I fix API errors?", "I get a 401 error when calling the API", "How do I configure webhooks?"],
+        "The integration keeps timing out, how do I troubleshoot it?",
+        True,
+    ),
+    "greeting": ([], "Hello!", False),
+}
+METRICS = ("latency_ms", "alloc_peak_kb", "llm_calls", "model_lookups")
+
+
+def _counter_total(name: str) -> float:
+    metric = get_metrics().snapshot().get(name, {})
+    return sum(metric.get("values", {}).values())
+
+
+def _post(client: TestClient, message: str, thread_id: str, stream: bool) -> None:
+    response = client.post("/chat", json={"message": message, "thread_id": thread_id, "stream": stream})
+    if response.status_code != 200:
+        raise RuntimeError(f"/chat returned {response.status_code}: {response.text[:200]}")
+
+
+def run_scenario(client: TestClient, setup: list, message: str, stream: bool, trace_memory: bool) -> dict:
+    """Run one scenario on a fresh thread and measure the final request."""
+    thread_id = f"perf_{uuid.uuid4().hex[:12]}"
+    for turn in setup:
+        _post(client, turn, thread_id, stream=False)
+
+    gc.collect()
+    llm_calls = _counter_total("fake_llm_calls_total")
+    lookups = _counter_total("llm_model_cache_lookups_total")
+    if trace_memory:
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        start_memory = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    _post(client, message, thread_id, stream)
+    latency = time.perf_counter() - start
+    result = {
+        "latency_ms": latency * 1000,
+        "llm_calls": _counter_total("fake_llm_calls_total") - llm_calls,
+        "model_lookups": _counter_total("llm_model_cache_lookups_total") - lookups,
+    }
+    if trace_memory:
+        result["alloc_peak_kb"] = (tracemalloc.get_traced_memory()[1] - start_memory) / 1024
+        tracemalloc.stop()
+    return result
+
+
+def measure(repeat: int) -> dict:
+    """Measure every scenario over repeated runs."""
+    results = {}
+    with TestClient(app) as client:
+        # Warm-up: agents, indexes and caches are built on first use
+        for setup, message, stream in SCENARIOS.values():
+            run_scenario(client, setup, message, stream, trace_memory=False)
+
+        for name, (setup, message, stream) in SCENARIOS.items():
+            # Timed runs without tracemalloc (it slows allocation-heavy code)
+            runs = [run_scenario(client, setup, message, stream, trace_memory=False) for _ in range(repeat)]
+            memory = [run_scenario(client, setup, message, stream, trace_memory=True)["alloc_peak_kb"] for _ in range(3)]
+            results[name] = {
+                # Best run: least affected by scheduler and GC noise
+                "latency_ms": round(min(r["latency_ms"] for r in runs), 2),
+                "alloc_peak_kb": round(statistics.median(memory), 1),
+                "llm_calls": max(r["llm_calls"] for r in runs),
+                "model_lookups": max(r["model_lookups"] for r in runs),
+            }
+    return results
+
+
+def compare(results: dict, baseline: dict, args) -> list[str]:
+    """Print a comparison table and return the failures."""
+    limits = {
+        "latency_ms": (args.latency_threshold, args.latency_floor_ms),
+        "alloc_peak_kb": (args.alloc_threshold, args.alloc_floor_kb),
+    }
+    failures = []
+    print(f"{'Scenario':24} {'metric':14} {'baseline':>10} {'current':>10} {'change':>8}")
+    print("-" * 70)
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:24} (not in baseline)")
+            continue
+        for metric in METRICS:
+            old, new = base[metric], result[metric]
+            if metric in limits:
+                threshold, floor = limits[metric]
+                failed = new > old * (1 + threshold) and new - old > floor
+            else:
+                failed = new > old + args.count_tolerance
+            change = f"{(new - old) / old:+.0%}" if old else ("+" if new else "0")
+            flag = "  FAIL" if failed else ""
+            print(f"{name:24} {metric:14} {old:>10} {new:>10} {change:>8}{flag}")
+            if failed:
+                failures.append(f"{name}.{metric}: {old} -> {new}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check /chat performance against the committed baseline")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH), help="Baseline JSON file")
+    parser.add_argument("--repeat", type=int, default=7, help="Timed runs per scenario")
+    parser.add_argument("--latency-threshold", type=float, default=1.0, help="Allowed latency growth (1.0 = 100%%)")
+    parser.add_argument("--latency-floor-ms", type=float, default=25.0, help="Ignore latency growth below this")
+    parser.add_argument("--alloc-threshold", type=float, default=0.25, help="Allowed peak allocation growth")
+    parser.add_argument("--alloc-floor-kb", type=float, default=256.0, help="Ignore allocation growth below this")
+    parser.add_argument("--count-tolerance", type=float, default=0, help="Allowed growth in call counts")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the measured results as the baseline")
+    args = parser.parse_args()
+
+    quiet_app_logging()
+    build_vector_store()
+    results = measure(args.repeat)
+
+    if args.update_baseline:
+        Path(args.baseline).write_text(json.dumps(
+            {"schema": SCHEMA_VERSION, "scenarios": results}, indent=2, sort_keys=True
+        ) + "\n")
+        print(json.dumps(results, indent=2))
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    baseline = json.loads(Path(args.baseline).read_text())["scenarios"]
+    failures = compare(results, baseline, args)
+    if failures:
+        print(f"\n✗ Performance gate FAILED ({len(failures)}):")
+        for failure in failures:
+            print(f"   - {failure}")
+        sys.exit(1)
+    print("\n✅ Performance gate PASSED")
+
+
+if __name__ == "__main__":
+    main()
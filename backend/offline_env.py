@@ -0,0 +1,39 @@
+"""
+Shared offline setup for the test scripts.
+
+Call use_offline_env() before importing anything from app: it selects the
+deterministic fake LLM backend (LLM_BACKEND=fake) with no simulated latency,
+in-memory checkpoints, and a throwaway Chroma directory, so every test runs
+the same way whatever the shell or .env sets.
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+
+DEFAULTS = {
+    "llm_backend": "fake",
+    "checkpointer_backend": "memory",
+    "fake_llm_latency_mean_seconds": "0",
+    "fake_llm_tokens_per_second": "0",
+}
+
+
+def use_offline_env(name: str, **settings: str) -> str:
+    """
+    Configure fake models, memory checkpoints and a temporary Chroma directory.
+
+    Args:
+        name: Test name, used in the Chroma directory prefix
+        **settings: Settings to set or override (e.g. fake_llm_latency_mean_seconds="0.1")
+
+    Returns:
+        Path of the temporary Chroma directory (removed at exit)
+    """
+    chroma_dir = tempfile.mkdtemp(prefix=f"test_{name}_chroma_")
+    atexit.register(shutil.rmtree, chroma_dir, ignore_errors=True)
+    os.environ["CHROMA_DB_PATH"] = chroma_dir
+    for key, value in {**DEFAULTS, **settings}.items():
+        os.environ[key.upper()] = str(value)
+    return chroma_dir
@@ -0,0 +1,234 @@
+"""
+Test admission control and upstream concurrency limits (offline - no LLM calls).
+
+Checks that interactive requests are admitted before batch ones, that load
+is shed with 429/503 and a Retry-After estimate, that the upstream limiter
+bounds concurrent calls from threads and the event loop alike, and that
+/metrics/admission reports both.
+
+Usage:
+    python test_admission.py
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from offline_env import use_offline_env
+
+# Fake models and in-memory checkpoints (set before app imports)
+use_offline_env("admission")
+
+from fastapi.testclient import TestClient
+
+from app.api.admission import BATCH, INTERACTIVE, AdmissionController, AdmissionRejected
+from app.llm.concurrency import UpstreamBusyError, UpstreamLimiter
+from app.main import app
+
+print("Testing Admission Control")
+print("=" * 60)
+
+
+def test_priority_order():
+    """Queued interactive requests are admitted before earlier batch ones."""
+    print("\n1. Testing priority order:")
+    try:
+        async def scenario():
+            controller = AdmissionController(max_concurrent=1, max_queue=10, max_queue_wait_seconds=5)
+            order = []
+
+            async def request(name, priority):
+                async with controller.slot(priority):
+                    order.append(name)
+                    await asyncio.sleep(0.01)
+
+            holder = asyncio.create_task(request("first", INTERACTIVE))
+            await asyncio.sleep(0)
+            tasks = [asyncio.create_task(request("batch", BATCH)), asyncio.create_task(request("chat", INTERACTIVE))]
+            await asyncio.gather(holder, *tasks)
+            return order, controller.snapshot()
+
+        order, snapshot = asyncio.run(scenario())
+        assert order == ["first", "chat", "batch"], order
+        assert snapshot["in_flight"] == 0 and snapshot["queued"] == {INTERACTIVE: 0, BATCH: 0}, snapshot
+        print(f"   ✓ Admission order {order}")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_load_shedding():
+    """Full queues and long expected waits are rejected fast with a retry estimate."""
+    print("\n2. Testing load shedding:")
+    try:
+        async def scenario():
+            controller = AdmissionController(max_concurrent=1, max_queue=1, max_queue_wait_seconds=5)
+            await controller.acquire(INTERACTIVE)
+            batch = asyncio.create_task(controller.acquire(BATCH))
+            await asyncio.sleep(0)
+
+            try:
+                await controller.acquire(BATCH)
+                raise AssertionError("Full queue should reject batch requests")
+            except AdmissionRejected as e:
+                assert e.status_code == 429 and e.retry_after >= 1, (e.status_code, e.retry_after)
+                print(f"   ✓ Full queue -> 429, retry after {e.retry_after:.1f}s")
+
+            interactive = asyncio.create_task(controller.acquire(INTERACTIVE))
+            await asyncio.sleep(0)
+            try:
+                await batch
+                raise AssertionError("Queued batch request should be displaced")
+            except AdmissionRejected as e:
+                assert e.status_code == 503 and e.reason == "displaced", e.reason
+                print("   ✓ Interactive request displaces a queued batch request (503)")
+            controller.release(0.1)
+            await interactive
+            controller.release(0.1)
+
+            slow = AdmissionController(max_concurrent=1, max_queue=10, max_queue_wait_seconds=1)
+            slow._service_seconds = 2.0
+            await slow.acquire()
+            try:
+                await slow.acquire()
+                raise AssertionError("Long expected wait should be rejected")
+            except AdmissionRejected as e:
+                assert e.status_code == 503 and e.reason == "expected_wait", e.reason
+                print(f"   ✓ Expected wait over the limit -> 503 ({e})")
+
+            timed = AdmissionController(max_concurrent=1, max_queue=10, max_queue_wait_seconds=0.05)
+            timed._service_seconds = 0.01
+            await timed.acquire()
+            try:
+                await timed.acquire()
+                raise AssertionError("Queued request should time out")
+            except AdmissionRejected as e:
+                assert e.reason == "queue_timeout" and timed.queue_depth == 0, (e.reason, timed.queue_depth)
+                print("   ✓ Request that waited too long -> 503 and leaves the queue")
+
+        asyncio.run(scenario())
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_upstream_limiter():
+    """Threads and coroutines share the upstream limit; waiters give up after the timeout."""
+    print("\n3. Testing upstream limiter:")
+    try:
+        limiter = UpstreamLimiter("fake:test", limit=2, acquire_timeout=2.0)
+        lock = threading.Lock()
+        peak = [0, 0]
+
+        def call():
+            limiter.acquire()
+            with lock:
+                peak[0] += 1
+                peak[1] = max(peak[1], peak[0])
+            time.sleep(0.02)
+            with lock:
+                peak[0] -= 1
+            limiter.release()
+
+        async def acall():
+            await limiter.aacquire()
+            with lock:
+                peak[0] += 1
+                peak[1] = max(peak[1], peak[0])
+            await asyncio.sleep(0.02)
+            with lock:
+                peak[0] -= 1
+            limiter.release()
+
+        async def scenario():
+            threads = [threading.Thread(target=call) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            await asyncio.gather(*(acall() for _ in range(4)))
+            for thread in threads:
+                thread.join()
+
+        asyncio.run(scenario())
+        assert peak[1] == 2, f"Peak concurrency {peak[1]}, limit 2"
+        assert limiter.snapshot() == {"limit": 2, "in_flight": 0, "waiting": 0}, limiter.snapshot()
+        print("   ✓ 8 mixed sync/async calls never exceeded the limit of 2")
+
+        busy = UpstreamLimiter("fake:busy", limit=1, acquire_timeout=0.05)
+        busy.acquire()
+        try:
+            asyncio.run(busy.aacquire())
+            raise AssertionError("Acquire should time out while the upstream is full")
+        except UpstreamBusyError as e:
+            assert busy.snapshot()["waiting"] == 0
+            print(f"   ✓ {e}")
+        busy.release()
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_metrics_endpoint():
+    """Chat requests go through admission and show up in /metrics/admission."""
+    print("\n4. Testing /metrics/admission:")
+    try:
+        with TestClient(app) as client:
+            response = client.post("/chat", json={"message": "What are your pricing plans?", "stream": False})
+            assert response.status_code == 200, response.text
+            state = client.get("/metrics/admission").json()
+            assert state["admission"]["in_flight"] == 0, state
+            assert all(s["in_flight"] == 0 for s in state["upstreams"].values()), state
+            assert state["upstreams"], "Upstream limiters should be listed"
+            print(f"   ✓ Admission {state['admission']}, upstreams {sorted(state['upstreams'])}")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def main():
+    """Run all admission control tests."""
+    results = []
+
+    results.append(("Priority Order", test_priority_order()))
+    results.append(("Load Shedding", test_load_shedding()))
+    results.append(("Upstream Limiter", test_upstream_limiter()))
+    results.append(("Metrics Endpoint", test_metrics_endpoint()))
+
+    print("\n" + "=" * 60)
+    print("Admission Control Test Results:")
+    print("-" * 60)
+
+    all_passed = True
+    for test_name, passed in results:
+        status = "✓ PASSED" if passed else "✗ FAILED"
+        print(f"{test_name:30} {status}")
+        if not passed:
+            all_passed = False
+
+    print("-" * 60)
+    if all_passed:
+        print("\n✅ Admission control tests PASSED")
+    else:
+        print("\n⚠ Some admission control tests failed. Review errors above.")
+
+    return all_passed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,208 @@
+"""
+Test per-agent execution limits (offline - no LLM calls).
+
+Checks that the limits middleware passes the output token limit to the model,
+forces an answer once the tool iteration budget is used, and ends runs that
+exceed their time budget (sync and async). A structured answer cut off by
+the token limit must be retried rather than fail to parse.
+
+Usage:
+    python test_agent_limits.py
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from offline_env import use_offline_env
+
+# Fake models and in-memory checkpoints (set before app imports)
+use_offline_env("agent_limits")
+
+from langchain.agents import create_agent
+from langchain.tools import tool
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.agents.middleware import AgentLimits, AgentLimitsMiddleware, get_agent_limits
+from app.agents.models import PolicyResponse
+from app.llm.fake import FakeChatModel
+
+print("Testing Agent Limits")
+print("=" * 60)
+
+
+class LoopingModel(BaseChatModel):
+    """Model that keeps calling the tool until tools are disabled."""
+
+    delay: float = 0.0
+    calls: list = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "looping"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(**kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls.append(kwargs)
+        if kwargs.get("tool_choice") == "none":
+            message = AIMessage(content="final answer", response_metadata={"finish_reason": "length"})
+        else:
+            message = AIMessage(
+                content="",
+                tool_calls=[{"name": "lookup", "args": {"query": "x"}, "id": f"call_{len(self.calls)}"}],
+            )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.delay)
+        return self._generate(messages, stop=stop, **kwargs)
+
+
+@tool
+def lookup(query: str) -> str:
+    """Look something up."""
+    return "result"
+
+
+def _agent(model, limits: AgentLimits):
+    agent = create_agent(model=model, tools=[lookup], middleware=[AgentLimitsMiddleware("test", limits)])
+    if limits.recursion_limit() is not None:
+        agent = agent.with_config(recursion_limit=limits.recursion_limit())
+    return agent
+
+
+def test_settings_limits():
+    """Every worker agent has limits configured."""
+    print("\n1. Testing limits from Settings:")
+    try:
+        for name in ("policy", "technical", "billing", "dad_joke"):
+            limits = get_agent_limits(name)
+            assert None not in limits, f"{name} is missing a limit: {limits}"
+            print(f"   ✓ {name}: {limits}")
+        assert get_agent_limits("unknown") == AgentLimits(), "Unlisted agents should be unlimited"
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_tool_iterations_and_tokens():
+    """Agent answers without tools after the iteration budget; max_tokens reaches the model."""
+    print("\n2. Testing tool iterations and max tokens:")
+    try:
+        model = LoopingModel(calls=[])
+        result = _agent(model, AgentLimits(max_output_tokens=100, max_tool_iterations=2)).invoke(
+            {"messages": [{"role": "user", "content": "help"}]}
+        )
+        choices = [call.get("tool_choice") for call in model.calls]
+        assert choices == [None, None, "none"], f"Unexpected tool choices: {choices}"
+        assert all(call.get("max_tokens") == 100 for call in model.calls), "max_tokens not passed to the model"
+        assert result["messages"][-1].content == "final answer"
+        print(f"   ✓ Model calls: {len(model.calls)}, final call with tool_choice='none'")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_timeout():
+    """Runs that exceed the time budget end with the timeout message."""
+    print("\n3. Testing time budget:")
+    try:
+        model = LoopingModel(delay=0.5, calls=[])
+        result = asyncio.run(
+            _agent(model, AgentLimits(timeout_seconds=0.2)).ainvoke({"messages": [{"role": "user", "content": "help"}]})
+        )
+        content = result["messages"][-1].content
+        assert content == AgentLimitsMiddleware.TIMEOUT_MESSAGE, f"Unexpected answer: {content}"
+        print("   ✓ Async run ended with the timeout message")
+
+        # Sync calls can't be cancelled; the budget is their request timeout
+        start = time.perf_counter()
+        result = _agent(FakeChatModel(latency_mean_seconds=2.0), AgentLimits(timeout_seconds=0.2)).invoke(
+            {"messages": [{"role": "user", "content": "help"}]}
+        )
+        elapsed = time.perf_counter() - start
+        content = result["messages"][-1].content
+        assert content == AgentLimitsMiddleware.TIMEOUT_MESSAGE, f"Unexpected answer: {content}"
+        assert elapsed < 1.0, f"Sync model call ran past the budget ({elapsed:.2f}s)"
+        print(f"   ✓ Sync run ended with the timeout message after {elapsed:.2f}s (model call takes 2s)")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_truncated_structured_response():
+    """A structured answer cut off by max tokens is retried without the limit."""
+    print("\n4. Testing truncated structured response:")
+    try:
+        calls = []
+
+        class RecordingModel(FakeChatModel):
+            def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+                calls.append(kwargs.get("max_tokens"))
+                return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+        agent = create_agent(
+            model=RecordingModel(),
+            response_format=PolicyResponse,
+            middleware=[AgentLimitsMiddleware("test", AgentLimits(max_output_tokens=5))],
+        )
+        result = agent.invoke({"messages": [{"role": "user", "content": "What is the PTO policy?"}]})
+        assert isinstance(result["structured_response"], PolicyResponse), result.get("structured_response")
+        assert calls == [5, None], f"Unexpected max_tokens per call: {calls}"
+        print("   ✓ Truncated JSON retried once without max_tokens; PolicyResponse parsed")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def main():
+    """Run all agent limits tests."""
+    results = []
+
+    results.append(("Settings Limits", test_settings_limits()))
+    results.append(("Tool Iterations + Tokens", test_tool_iterations_and_tokens()))
+    results.append(("Time Budget", test_timeout()))
+    results.append(("Truncated Structured Output", test_truncated_structured_response()))
+
+    print("\n" + "=" * 60)
+    print("Agent Limits Test Results:")
+    print("-" * 60)
+
+    all_passed = True
+    for test_name, passed in results:
+        status = "✓ PASSED" if passed else "✗ FAILED"
+        print(f"{test_name:30} {status}")
+        if not passed:
+            all_passed = False
+
+    print("-" * 60)
+    if all_passed:
+        print("\n✅ Agent limits tests PASSED")
+    else:
+        print("\n⚠ Some agent limits tests failed. Review errors above.")
+
+    return all_passed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,338 @@
+"""
+Test the batch chat endpoint (offline - no LLM calls).
+
+Checks that /chat/batch answers every message and streams NDJSON results
+with a throughput summary, that messages are grouped by domain and answered
+with bounded parallelism, that shed messages are retried, that closing the
+stream cancels the messages still running, that identical searches within a
+batch hit the vector store once, that the CLI reads its input formats, and
+that messages sharing a thread run one at a time in request order.
+
+Usage:
+    python test_batch.py
+"""
+
+import asyncio
+import json
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from offline_env import use_offline_env
+
+# Fake models and in-memory checkpoints (set before app imports)
+use_offline_env("batch")
+
+from fastapi.testclient import TestClient
+
+from app.api.admission import AdmissionRejected
+from app.api.batch import guess_domain, plan_batch, run_batch
+from app.core.models import ChatBatchItem
+from app.main import app
+from app.retrieval.rag_strategy import SharedRetrieval
+from batch_chat import load_items
+
+print("Testing Batch Chat")
+print("=" * 60)
+
+QUESTIONS = [
+    ("What is your privacy policy?", "policy"),
+    ("How do I fix API errors?", "technical"),
+    ("What are your pricing plans?", "billing"),
+    ("How do I fix API errors?", "technical"),
+    ("Tell me a dad joke", "dad_joke"),
+    ("How long do you keep my data?", "policy"),
+    ("I get a 401 error when calling the API", "technical"),
+    ("How do I update my payment method?", "billing"),
+    ("How do I fix API errors?", "technical"),
+]
+
+
+def _items(count: int) -> list[ChatBatchItem]:
+    return [ChatBatchItem(message=QUESTIONS[i % len(QUESTIONS)][0]) for i in range(count)]
+
+
+def test_grouping():
+    """Messages are grouped by (given or guessed) domain, largest group first."""
+    print("\n1. Testing domain grouping:")
+    try:
+        for message, domain in QUESTIONS:
+            assert guess_domain(message) == domain, (message, guess_domain(message))
+        assert guess_domain("Hello there") == "other"
+        print(f"   ✓ Guessed the domain of {len(QUESTIONS)} sample questions")
+
+        items = [ChatBatchItem(message=m) for m, _ in QUESTIONS]
+        items.append(ChatBatchItem(message="Hello there", domain="billing"))
+        plan = [entry for unit in plan_batch(items) for entry in unit]
+        domains = [domain for _, domain in plan]
+        assert domains == ["technical"] * 4 + ["billing"] * 3 + ["policy"] * 2 + ["dad_joke"], domains
+        assert sorted(index for index, _ in plan) == list(range(len(items)))
+        print(f"   ✓ Dispatch order {[d for i, d in enumerate(domains) if i == 0 or domains[i - 1] != d]}")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_batch_endpoint():
+    """Every message gets one NDJSON result line, then a summary."""
+    print("\n2. Testing /chat/batch:")
+    try:
+        items = [{"message": m, "id": f"q{i}"} for i, (m, _) in enumerate(QUESTIONS)]
+        with TestClient(app) as client:
+            with client.stream("POST", "/chat/batch", json={"items": items, "concurrency": 4}) as response:
+                assert response.status_code == 200, response.read()
+                assert response.headers["content-type"].startswith("application/x-ndjson")
+                lines = [json.loads(line) for line in response.iter_lines() if line.strip()]
+
+        results, summary = lines[:-1], lines[-1]
+        assert all(line["type"] == "result" for line in results), [l for l in results if l["type"] != "result"]
+        assert sorted(line["index"] for line in results) == list(range(len(items)))
+        for line in results:
+            assert line["id"] == f"q{line['index']}" and line["response"], line
+            assert line["agent_type"] in ("policy", "technical", "billing", "dad_joke"), line
+        assert len({line["thread_id"] for line in results}) == len(items), "Each message gets its own thread"
+        print(f"   ✓ {len(results)} results, each routed to a specialist on its own thread")
+
+        assert summary["type"] == "summary" and summary["succeeded"] == len(items) and summary["failed"] == 0
+        assert summary["concurrency"] == 4 and summary["items_per_second"] > 0, summary
+        assert summary["usage"]["total_tokens"] > 0, summary["usage"]
+        assert summary["retrieval"]["shared"] >= 2, summary["retrieval"]
+        assert summary["domains"]["technical"]["items"] == 4, summary["domains"]
+        print(
+            f"   ✓ Summary: {summary['items_per_second']} msg/s, {summary['usage']['total_tokens']} tokens, "
+            f"retrieval {summary['retrieval']}"
+        )
+
+        with TestClient(app) as client:
+            response = client.post("/chat/batch", json={"items": []})
+            assert response.status_code == 422, response.status_code
+        print("   ✓ Empty batch rejected (422)")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_bounded_parallelism():
+    """At most `concurrency` messages run at once; shed messages are retried."""
+    print("\n3. Testing bounded parallelism and retries:")
+    try:
+        items = _items(12)
+        state = {"running": 0, "peak": 0, "started": [], "rejected": set()}
+
+        async def answer(item):
+            index = int(item.id)
+            if index % 5 == 0 and index not in state["rejected"]:
+                state["rejected"].add(index)
+                raise AdmissionRejected(503, "queue_timeout", 0.01)
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+            state["started"].append(guess_domain(item.message))
+            await asyncio.sleep(0.02)
+            state["running"] -= 1
+            return f"thread_{index}", f"answer {index}", guess_domain(item.message), False
+
+        for index, item in enumerate(items):
+            item.id = str(index)
+
+        async def scenario():
+            return [line async for line in run_batch(items, answer, concurrency=3)]
+
+        lines = asyncio.run(scenario())
+        assert state["peak"] == 3, f"Peak concurrency {state['peak']}, limit 3"
+        assert lines[-1]["succeeded"] == 12 and lines[-1]["concurrency"] == 3, lines[-1]
+        assert state["rejected"] == {0, 5, 10}
+        print(f"   ✓ 12 messages, at most 3 at once, {len(state['rejected'])} shed messages retried")
+
+        changes = sum(1 for a, b in zip(state["started"], state["started"][1:]) if a != b)
+        assert changes <= 6, f"Messages should run grouped by domain: {state['started']}"
+        print(f"   ✓ Domains started in groups ({changes} switches)")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_cancellation():
+    """Closing the result stream cancels the messages still running."""
+    print("\n4. Testing cancellation:")
+    try:
+        cancelled = []
+
+        async def answer(item):
+            try:
+                await asyncio.sleep(0.01 if item.message == "fast" else 5)
+            except asyncio.CancelledError:
+                cancelled.append(item.message)
+                raise
+            return "thread", item.message, None, False
+
+        async def scenario():
+            items = [ChatBatchItem(message="fast")] + [ChatBatchItem(message="slow") for _ in range(3)]
+            start = time.monotonic()
+            lines = run_batch(items, answer, concurrency=4)
+            first = await lines.__anext__()
+            await lines.aclose()
+            return first, time.monotonic() - start
+
+        first, elapsed = asyncio.run(scenario())
+        assert first["response"] == "fast" and elapsed < 1, (first, elapsed)
+        assert cancelled == ["slow"] * 3, cancelled
+        print(f"   ✓ 3 running messages cancelled after {elapsed:.2f}s")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_shared_retrieval():
+    """Concurrent identical searches run once; failed searches are not shared."""
+    print("\n5. Testing shared retrieval:")
+    try:
+        shared = SharedRetrieval()
+        calls = []
+
+        def search():
+            calls.append(1)
+            time.sleep(0.05)
+            return ["doc"]
+
+        threads = [
+            threading.Thread(target=lambda: shared.get_or_retrieve(("c", "q", 3, None), search)) for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(calls) == 1 and shared.hits == 4 and shared.misses == 1, (len(calls), shared.hits)
+        print("   ✓ 5 concurrent identical searches, 1 vector store query")
+
+        def failing():
+            raise RuntimeError("collection missing")
+
+        try:
+            shared.get_or_retrieve(("c", "other", 3, None), failing)
+        except RuntimeError:
+            pass
+        assert shared.get_or_retrieve(("c", "other", 3, None), search) == ["doc"]
+        print("   ✓ Failed search retried by the next caller")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_cli_input():
+    """The CLI reads text, JSON and JSONL question files."""
+    print("\n6. Testing CLI input formats:")
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            text = Path(directory, "q.txt")
+            text.write_text("What is your privacy policy?\n\nTell me a dad joke\n")
+            jsonl = Path(directory, "q.jsonl")
+            jsonl.write_text('{"message": "How do I fix API errors?", "id": "t1"}\n"Tell me a dad joke"\n')
+            listing = Path(directory, "q.json")
+            listing.write_text(json.dumps({"items": [{"message": "Hi", "domain": "billing"}]}))
+
+            assert load_items(text) == [
+                {"message": "What is your privacy policy?", "id": "0"},
+                {"message": "Tell me a dad joke", "id": "1"},
+            ]
+            assert [item["id"] for item in load_items(jsonl)] == ["t1", "1"]
+            assert load_items(listing) == [{"message": "Hi", "domain": "billing", "id": "0"}]
+        print("   ✓ .txt, .jsonl and .json inputs")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_shared_threads():
+    """Messages sharing a thread run one at a time, in request order."""
+    print("\n7. Testing messages sharing a thread:")
+    try:
+        messages = ["Tell me a dad joke", "What is your privacy policy?", "How do I fix API errors?", "Another joke"]
+        items = [ChatBatchItem(message=m, id=str(i), thread_id="shared") for i, m in enumerate(messages)]
+        items += [ChatBatchItem(message="How do I fix API errors?", id=str(4 + i)) for i in range(4)]
+        units = plan_batch(items)
+        assert len(units) == 5 and [[index for index, _ in unit] for unit in units if len(unit) > 1] == [[0, 1, 2, 3]]
+        state = {"running": 0, "order": []}
+
+        async def answer(item):
+            shared = item.thread_id == "shared"
+            if shared:
+                assert state["running"] == 0, "Two turns of one thread ran at once"
+                state["running"] += 1
+            await asyncio.sleep(0.02)
+            if shared:
+                state["order"].append(int(item.id))
+                state["running"] -= 1
+            return item.thread_id or f"thread_{item.id}", "answer", None, False
+
+        async def scenario():
+            return [line async for line in run_batch(items, answer, concurrency=4)]
+
+        lines = asyncio.run(scenario())
+        assert lines[-1]["succeeded"] == len(items), lines[-1]
+        assert state["order"] == [0, 1, 2, 3], state["order"]
+        print("   ✓ 4 turns of one thread ran one at a time in request order (other messages in parallel)")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def main():
+    """Run all batch tests."""
+    results = []
+
+    results.append(("Domain Grouping", test_grouping()))
+    results.append(("Batch Endpoint", test_batch_endpoint()))
+    results.append(("Bounded Parallelism", test_bounded_parallelism()))
+    results.append(("Cancellation", test_cancellation()))
+    results.append(("Shared Retrieval", test_shared_retrieval()))
+    results.append(("CLI Input", test_cli_input()))
+    results.append(("Shared Threads", test_shared_threads()))
+
+    print("\n" + "=" * 60)
+    print("Batch Test Results:")
+    print("-" * 60)
+
+    all_passed = True
+    for test_name, passed in results:
+        status = "✓ PASSED" if passed else "✗ FAILED"
+        print(f"{test_name:30} {status}")
+        if not passed:
+            all_passed = False
+
+    print("-" * 60)
+    if all_passed:
+        print("\n✅ Batch tests PASSED")
+    else:
+        print("\n⚠ Some batch tests failed. Review errors above.")
+
+    return all_passed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
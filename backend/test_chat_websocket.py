@@ -0,0 +1,131 @@
+"""
+Test the /chat/ws WebSocket endpoint (offline - no LLM calls).
+
+Checks that one connection runs turns for several threads concurrently,
+that an in-flight turn can be cancelled, and that busy threads and invalid
+frames are rejected without closing the connection. Uses the fake LLM
+backend with a small latency so turns overlap.
+
+Usage:
+    python test_chat_websocket.py
+"""
+
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from offline_env import use_offline_env
+
+# Fake models with some latency and in-memory checkpoints (set before app imports)
+use_offline_env("ws", fake_llm_latency_distribution="fixed", fake_llm_latency_mean_seconds="0.1")
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+print("Testing Chat WebSocket")
+print("=" * 60)
+
+TERMINAL = ("done", "error", "cancelled")
+
+
+def _collect(ws, turn_ids: set) -> dict:
+    """Frames per turn id until every turn has ended."""
+    frames = {turn_id: [] for turn_id in turn_ids}
+    pending = set(turn_ids)
+    while pending:
+        frame = ws.receive_json()
+        frames[frame["id"]].append(frame)
+        if frame["type"] in TERMINAL:
+            pending.discard(frame["id"])
+    return frames
+
+
+def test_multiplexing():
+    """Turns for different threads share one connection and run concurrently."""
+    print("\n1. Testing multiplexed turns:")
+    try:
+        with TestClient(app) as client, client.websocket_connect("/chat/ws") as ws:
+            ws.send_json({"type": "chat", "id": "t1", "message": "What are your pricing plans?", "thread_id": "ws_a"})
+            ws.send_json({"type": "chat", "id": "t2", "message": "How do I fix API errors?", "thread_id": "ws_b"})
+            frames = _collect(ws, {"t1", "t2"})
+            for turn_id, agent_type in (("t1", "billing"), ("t2", "technical")):
+                types = [f["type"] for f in frames[turn_id]]
+                assert types[-1] == "done", types
+                meta = next(f for f in frames[turn_id] if f["type"] == "meta")
+                assert meta["agent_type"] == agent_type, meta
+                text = "".join(f["text"] for f in frames[turn_id] if f["type"] == "delta")
+                assert len(text) == frames[turn_id][-1]["chars"], "Deltas should add up to the answer"
+            print(f"   ✓ Two threads answered on one connection ({sum(map(len, frames.values()))} frames)")
+
+            ws.send_json({"type": "chat", "id": "t3", "message": "What about annual billing?", "thread_id": "ws_a"})
+            follow_up = _collect(ws, {"t3"})["t3"]
+            assert follow_up[-1]["type"] == "done", follow_up[-1]
+            print("   ✓ Follow-up on the same connection and thread")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_cancel_and_rejections():
+    """In-flight turns can be cancelled; busy threads and bad frames get error frames."""
+    print("\n2. Testing cancellation and rejections:")
+    try:
+        with TestClient(app) as client, client.websocket_connect("/chat/ws") as ws:
+            ws.send_json({"type": "chat", "id": "slow", "message": "Tell me a dad joke", "thread_id": "ws_c"})
+            ws.send_json({"type": "chat", "id": "busy", "message": "Another one", "thread_id": "ws_c"})
+            ws.send_json({"type": "cancel", "id": "slow"})
+            frames = _collect(ws, {"slow", "busy"})
+            assert frames["busy"][-1]["type"] == "error" and frames["busy"][-1]["status"] == 409, frames["busy"]
+            print("   ✓ Second turn on a busy thread rejected with 409")
+            assert frames["slow"][-1]["type"] == "cancelled", frames["slow"]
+            print("   ✓ In-flight turn cancelled")
+
+            ws.send_text("not json")
+            error = ws.receive_json()
+            assert error["type"] == "error" and error["status"] == 400, error
+            ws.send_json({"type": "chat", "id": "after", "message": "Hello!", "thread_id": "ws_d"})
+            assert _collect(ws, {"after"})["after"][-1]["type"] == "done"
+            print("   ✓ Invalid frame rejected; connection stays usable")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def main():
+    """Run all WebSocket tests."""
+    results = []
+
+    results.append(("Multiplexing", test_multiplexing()))
+    results.append(("Cancel and Rejections", test_cancel_and_rejections()))
+
+    print("\n" + "=" * 60)
+    print("Chat WebSocket Test Results:")
+    print("-" * 60)
+
+    all_passed = True
+    for test_name, passed in results:
+        status = "✓ PASSED" if passed else "✗ FAILED"
+        print(f"{test_name:30} {status}")
+        if not passed:
+            all_passed = False
+
+    print("-" * 60)
+    if all_passed:
+        print("\n✅ Chat WebSocket tests PASSED")
+    else:
+        print("\n⚠ Some chat WebSocket tests failed. Review errors above.")
+
+    return all_passed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,406 @@
+"""
+Test checkpointer implementations (offline - no LLM calls).
+
+Drives a small LangGraph message graph against each checkpointer and checks
+that conversation state survives while memory stays bounded, including the
+namespaces written by worker agents (fake LLM backend for the /chat test).
+
+Usage:
+    python test_checkpointing.py
+"""
+
+import asyncio
+import hashlib
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from offline_env import use_offline_env
+
+# Fake models and in-memory checkpoints for /chat (set before app imports)
+use_offline_env("checkpointing")
+
+from fastapi.testclient import TestClient
+from langgraph.graph import StateGraph, START, END, MessagesState
+from langchain_core.messages import AIMessage
+
+from app.core import checkpointing
+from app.core.checkpointing import BoundedMemorySaver, get_or_create_checkpointer
+from app.core.config import get_settings
+from app.core.serialization import (
+    CURRENT_DICTIONARY,
+    CompactSerializer,
+    _SHARED_DICTIONARIES,
+    _dictionary_bytes,
+)
+from app.core.sqlite_checkpointer import SQLiteCheckpointSaver
+from app.main import app
+
+print("Testing Checkpointers")
+print("=" * 60)
+
+
+def _build_graph(checkpointer):
+    """Build a one-node graph that answers every user message."""
+    def respond(state: MessagesState):
+        last = state["messages"][-1].content
+        return {"messages": [AIMessage(content=f"echo: {last} " + "x" * 200)]}
+
+    builder = StateGraph(MessagesState)
+    builder.add_node("respond", respond)
+    builder.add_edge(START, "respond")
+    builder.add_edge("respond", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+def _build_delegating_graph(checkpointer):
+    """Build a graph whose node runs a checkpointed subgraph, as the orchestrator's tools run worker agents."""
+    worker = _build_graph(checkpointer)
+
+    def delegate(state: MessagesState):
+        result = worker.invoke({"messages": [state["messages"][-1]]})
+        return {"messages": [result["messages"][-1]]}
+
+    builder = StateGraph(MessagesState)
+    builder.add_node("delegate", delegate)
+    builder.add_edge(START, "delegate")
+    builder.add_edge("delegate", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+def _run_turns(graph, thread_id: str, turns: int) -> dict:
+    """Run several user turns on a thread and return the final state."""
+    config = {"configurable": {"thread_id": thread_id}}
+    result = None
+    for i in range(turns):
+        result = graph.invoke({"messages": [{"role": "user", "content": f"question {i}"}]}, config)
+    return result
+
+
+def test_bounded_history():
+    """Per-thread checkpoint cap keeps full conversation state."""
+    print("\n1. Testing per-thread checkpoint cap:")
+    try:
+        saver = BoundedMemorySaver(max_threads=100, idle_ttl_seconds=0, max_checkpoints_per_thread=3)
+        graph = _build_graph(saver)
+        result = _run_turns(graph, "thread_a", 10)
+
+        assert len(result["messages"]) == 20, f"Expected 20 messages, got {len(result['messages'])}"
+        resident = len(saver.storage["thread_a"][""])
+        assert resident <= 3, f"Expected at most 3 checkpoints, got {resident}"
+        print(f"   ✓ Messages in state: {len(result['messages'])}")
+        print(f"   ✓ Checkpoints retained: {resident}")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_subgraph_namespaces():
+    """Namespaces of finished subgraph runs are dropped, so the cap holds per thread."""
+    print("\n2. Testing subgraph namespaces:")
+    try:
+        saver = BoundedMemorySaver(max_threads=100, idle_ttl_seconds=0, max_checkpoints_per_thread=3)
+        result = _run_turns(_build_delegating_graph(saver), "delegating_thread", 10)
+        assert len(result["messages"]) == 20, f"Expected 20 messages, got {len(result['messages'])}"
+        namespaces = saver.storage["delegating_thread"]
+        total = sum(len(checkpoints) for checkpoints in namespaces.values())
+        assert list(namespaces) == [""] and total <= 3, f"{len(namespaces)} namespaces, {total} checkpoints"
+        assert all(key[1] == "" for key in list(saver.blobs) + list(saver.writes)), "Subgraph blobs/writes left"
+        print(f"   ✓ Checkpoints retained after 10 delegated turns: {total} (root namespace only)")
+
+        with TestClient(app) as client:
+            thread_id = "bounded_chat_thread"
+            for i in range(16):
+                response = client.post("/chat", json={
+                    "message": f"Tell me a dad joke #{i}", "thread_id": thread_id, "stream": False
+                })
+                assert response.status_code == 200, response.text
+        checkpointer = get_or_create_checkpointer()
+        namespaces = checkpointer.storage[thread_id]
+        total = sum(len(checkpoints) for checkpoints in namespaces.values())
+        cap = get_settings().checkpoint_max_per_thread
+        assert total <= cap, f"{len(namespaces)} namespaces, {total} checkpoints (cap {cap})"
+        print(f"   ✓ /chat thread after 16 turns: {total} checkpoints in {len(namespaces)} namespace(s) (cap {cap})")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_lru_eviction():
+    """Least recently used threads are evicted beyond max_threads."""
+    print("\n3. Testing LRU thread eviction:")
+    try:
+        saver = BoundedMemorySaver(max_threads=3, idle_ttl_seconds=0, max_checkpoints_per_thread=3)
+        graph = _build_graph(saver)
+        for i in range(5):
+            _run_turns(graph, f"thread_{i}", 1)
+
+        threads = set(saver.storage.keys())
+        assert threads == {"thread_2", "thread_3", "thread_4"}, f"Unexpected threads: {threads}"
+        print(f"   ✓ Resident threads: {sorted(threads)}")
+
+        real_bytes = (
+            sum(len(c[1]) + len(m[1]) for t in saver.storage.values() for ns in t.values() for c, m, _ in ns.values())
+            + sum(len(b[1]) for b in saver.blobs.values())
+            + sum(len(w[2][1]) for ws in saver.writes.values() for w in ws.values())
+        )
+        assert saver._total_bytes == real_bytes, f"Tracked {saver._total_bytes} bytes, actual {real_bytes}"
+        print(f"   ✓ Resident bytes tracked accurately: {real_bytes}")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_ttl_eviction():
+    """Idle threads are evicted after the TTL."""
+    print("\n4. Testing idle TTL eviction:")
+    try:
+        saver = BoundedMemorySaver(max_threads=100, idle_ttl_seconds=0.05, max_checkpoints_per_thread=3)
+        graph = _build_graph(saver)
+        _run_turns(graph, "idle_thread", 1)
+        time.sleep(0.1)
+        saver.evict_expired()
+
+        assert "idle_thread" not in saver.storage, "Idle thread should be evicted"
+        assert saver._total_bytes == 0, f"Expected 0 resident bytes, got {saver._total_bytes}"
+        print("   ✓ Idle thread evicted")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_sqlite_persistence():
+    """SQLite checkpointer keeps conversations across reopen."""
+    print("\n5. Testing SQLite persistence across restart:")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = str(Path(tmp) / "checkpoints.sqlite3")
+            saver = SQLiteCheckpointSaver(db_path, flush_interval_ms=20, max_checkpoints_per_thread=3)
+            _run_turns(_build_graph(saver), "durable_thread", 3)
+            saver.close()
+
+            reopened = SQLiteCheckpointSaver(db_path, flush_interval_ms=20, max_checkpoints_per_thread=3)
+            result = _run_turns(_build_graph(reopened), "durable_thread", 1)
+            assert len(result["messages"]) == 8, f"Expected 8 messages, got {len(result['messages'])}"
+            print(f"   ✓ Messages after reopen: {len(result['messages'])}")
+
+            retained = len(list(reopened.list({"configurable": {"thread_id": "durable_thread"}})))
+            assert retained <= 3, f"Expected at most 3 checkpoints, got {retained}"
+            print(f"   ✓ Checkpoints retained: {retained}")
+
+            result = _run_turns(_build_delegating_graph(reopened), "delegating_thread", 10)
+            assert len(result["messages"]) == 20, f"Expected 20 messages, got {len(result['messages'])}"
+            namespaces = {
+                checkpoint.config["configurable"]["checkpoint_ns"]
+                for checkpoint in reopened.list({"configurable": {"thread_id": "delegating_thread"}})
+            }
+            rows = reopened._conn.execute(
+                "SELECT (SELECT COUNT(*) FROM checkpoints WHERE thread_id = ?), "
+                "(SELECT COUNT(*) FROM writes WHERE thread_id = ? AND checkpoint_ns != '')",
+                ("delegating_thread", "delegating_thread"),
+            ).fetchone()
+            assert namespaces == {""} and rows[0] <= 3 and rows[1] == 0, f"{namespaces}, rows={rows}"
+            print(f"   ✓ Checkpoints after 10 delegated turns: {rows[0]} (root namespace only)")
+            reopened.close()
+
+            # App shutdown flushes what the flusher hasn't written yet
+            memory_saver = get_or_create_checkpointer()
+            checkpointing._checkpointer = SQLiteCheckpointSaver(db_path, flush_interval_ms=60_000)
+            try:
+                with TestClient(app) as client:
+                    response = client.post("/chat", json={
+                        "message": "Tell me a dad joke", "thread_id": "shutdown_thread", "stream": False
+                    })
+                    assert response.status_code == 200, response.text
+            finally:
+                checkpointing._checkpointer = memory_saver
+            after_shutdown = SQLiteCheckpointSaver(db_path, flush_interval_ms=0)
+            saved = after_shutdown.get_tuple({"configurable": {"thread_id": "shutdown_thread"}})
+            after_shutdown.close()
+            messages = saved.checkpoint["channel_values"]["messages"] if saved else []
+            assert messages and messages[-1].content == response.json()["response"], "Last turn not on disk"
+            print(f"   ✓ Last /chat turn on disk after app shutdown ({len(messages)} messages)")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_sqlite_async():
+    """SQLite checkpointer works on the async (ainvoke) path."""
+    print("\n6. Testing SQLite async path:")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            saver = SQLiteCheckpointSaver(str(Path(tmp) / "checkpoints.sqlite3"), flush_interval_ms=20)
+            graph = _build_graph(saver)
+            config = {"configurable": {"thread_id": "async_thread"}}
+
+            async def run():
+                result = None
+                for i in range(3):
+                    result = await graph.ainvoke({"messages": [{"role": "user", "content": f"question {i}"}]}, config)
+                return result
+
+            result = asyncio.run(run())
+            assert len(result["messages"]) == 6, f"Expected 6 messages, got {len(result['messages'])}"
+            print(f"   ✓ Messages in state: {len(result['messages'])}")
+            saver.close()
+
+            # A full buffer is flushed off the event loop
+            saver = SQLiteCheckpointSaver(str(Path(tmp) / "batched.sqlite3"), flush_interval_ms=60_000, max_batch=2)
+            graph = _build_graph(saver)
+            flush_threads = []
+            flush = saver.flush
+
+            def recording_flush():
+                flush_threads.append(threading.current_thread())
+                flush()
+
+            saver.flush = recording_flush
+
+            async def run_batched():
+                await graph.ainvoke({"messages": [{"role": "user", "content": "question"}]}, config)
+                return threading.current_thread()
+
+            loop_thread = asyncio.run(run_batched())
+            assert flush_threads and loop_thread not in flush_threads, f"{len(flush_threads)} flushes, on loop thread"
+            print(f"   ✓ {len(flush_threads)} batch flushes ran off the event loop thread")
+            saver.close()
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_compact_serializer():
+    """Compact serializer round-trips state through both checkpointers."""
+    print("\n7. Testing compact serializer:")
+    try:
+        saver = BoundedMemorySaver(serde=CompactSerializer(threshold=64))
+        result = _run_turns(_build_graph(saver), "compact_thread", 3)
+        assert result["messages"][-1].content.startswith("echo: question 2"), "Messages did not round-trip"
+        compressed = [blob[0] for blob in saver.blobs.values() if "+" in blob[0]]
+        assert compressed, "Expected compressed blobs"
+        print(f"   ✓ Compressed blobs: {len(compressed)} ({compressed[0]})")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            sqlite_saver = SQLiteCheckpointSaver(
+                str(Path(tmp) / "checkpoints.sqlite3"), serde=CompactSerializer(threshold=64)
+            )
+            result = _run_turns(_build_graph(sqlite_saver), "compact_thread", 3)
+            assert len(result["messages"]) == 6, f"Expected 6 messages, got {len(result['messages'])}"
+            print(f"   ✓ SQLite messages in state: {len(result['messages'])}")
+            sqlite_saver.close()
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def _names_in_use() -> set:
+    """Tool, collection, context reference and state channel names the agents write to checkpoints."""
+    from app.agents import billing_agent, dad_joke_agent, policy_agent, technical_agent
+    from app.agents.orchestrator import ROUTES, get_orchestrator
+
+    hybrid = billing_agent._hybrid_strategy
+    rag = [technical_agent._rag_strategy, dad_joke_agent._rag_strategy]
+    names = set(ROUTES) | {
+        technical_agent.search_technical_docs.name, billing_agent.search_billing_info.name,
+        dad_joke_agent.find_contextual_dad_joke.name, policy_agent.get_policy_documents.name,
+        hybrid.collection_name, hybrid._ref_key(), f"context_ref://hybrid/{hybrid.collection_name}/",
+        f"context_ref://cag/{policy_agent._cag_strategy.data_directory.name}/",
+    }
+    for strategy in rag:
+        names |= {strategy.collection_name, f"context_ref://rag/{strategy.collection_name}/"}
+    agents = [
+        get_orchestrator(), technical_agent.get_technical_agent(), billing_agent.get_billing_agent(),
+        dad_joke_agent.get_dad_joke_agent(), policy_agent.get_policy_agent(),
+    ]
+    for agent in agents:
+        names.update(getattr(agent, "bound", agent).stream_channels)
+    return names
+
+
+def test_serializer_dictionary():
+    """The current compression dictionary covers the names in use; published ones never change."""
+    print("\n8. Testing serializer dictionary:")
+    try:
+        assert hashlib.sha256(_dictionary_bytes("d1")).hexdigest()[:16] == "586bf0e137b88ebd", "d1 was edited"
+        legacy = CompactSerializer(threshold=0)
+        legacy.dict_id = "d1"
+        message = AIMessage(content="See context_ref://rag/technical_documents/abc " * 4)
+        stored = legacy.dumps_typed(message)
+        assert stored[0].endswith(":d1") and CompactSerializer().loads_typed(stored) == message, stored[0]
+        print("   ✓ Published dictionary d1 unchanged; d1 checkpoints still decode")
+
+        entries = set(_SHARED_DICTIONARIES[CURRENT_DICTIONARY])
+        names = _names_in_use()
+        missing = sorted(names - entries)
+        assert not missing, f"Not in dictionary {CURRENT_DICTIONARY} (add a new version): {missing}"
+        print(f"   ✓ {len(names)} tool, collection, reference and channel names in {CURRENT_DICTIONARY}")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def main():
+    """Run all checkpointer tests."""
+    results = []
+
+    results.append(("Bounded History", test_bounded_history()))
+    results.append(("Subgraph Namespaces", test_subgraph_namespaces()))
+    results.append(("LRU Eviction", test_lru_eviction()))
+    results.append(("TTL Eviction", test_ttl_eviction()))
+    results.append(("SQLite Persistence", test_sqlite_persistence()))
+    results.append(("SQLite Async", test_sqlite_async()))
+    results.append(("Compact Serializer", test_compact_serializer()))
+    results.append(("Serializer Dictionary", test_serializer_dictionary()))
+
+    print("\n" + "=" * 60)
+    print("Checkpointer Test Results:")
+    print("-" * 60)
+
+    all_passed = True
+    for test_name, passed in results:
+        status = "✓ PASSED" if passed else "✗ FAILED"
+        print(f"{test_name:30} {status}")
+        if not passed:
+            all_passed = False
+
+    print("-" * 60)
+    if all_passed:
+        print("\n✅ Checkpointer tests PASSED")
+    else:
+        print("\n⚠ Some checkpointer tests failed. Review errors above.")
+
+    return all_passed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
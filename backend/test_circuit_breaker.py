@@ -0,0 +1,189 @@
+"""
+Test LLM circuit breakers (offline - stub models, no LLM calls).
+
+Checks that only provider errors (transport, timeout, 429, 5xx) count as
+failures and move on to the fallback, that client errors and calls out of
+their own time budget are raised without touching the breaker, and that no
+fallback is tried once the request deadline has passed.
+
+Usage:
+    python test_circuit_breaker.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from offline_env import use_offline_env
+
+# Fake models and in-memory checkpoints (set before app imports)
+use_offline_env("circuit_breaker")
+
+import botocore.exceptions
+import httpx
+import openai
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.core.config import get_settings
+from app.core.deadline import Deadline, deadline_scope
+from app.llm.circuit_breaker import CircuitBreakerChatModel, get_circuit_breaker
+
+print("Testing Circuit Breakers")
+print("=" * 60)
+
+_REQUEST = httpx.Request("POST", "https://api.example.com/v1/chat/completions")
+
+
+def _status_error(cls, status: int):
+    return cls(f"HTTP {status}", response=httpx.Response(status, request=_REQUEST), body=None)
+
+
+class StubModel(BaseChatModel):
+    """Model that raises `error` (if set) and counts its calls."""
+
+    provider: str
+    error: object = None
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return self.provider
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"{self.provider} answer"))])
+
+
+def _guarded(provider: str, error) -> tuple[CircuitBreakerChatModel, StubModel]:
+    fallback = StubModel(provider=f"{provider}_fallback")
+    return CircuitBreakerChatModel.create(StubModel(provider=provider, error=error), fallback=fallback), fallback
+
+
+def test_client_errors():
+    """Client errors are raised as-is: no breaker outcome, no fallback."""
+    print("\n1. Testing client errors:")
+    try:
+        errors = {
+            "bad_request": _status_error(openai.BadRequestError, 400),
+            "auth": _status_error(openai.AuthenticationError, 401),
+            "validation": ValueError("Invalid message format"),
+        }
+        for provider, error in errors.items():
+            model, fallback = _guarded(provider, error)
+            for _ in range(get_settings().circuit_min_requests * 2):
+                try:
+                    model.invoke("hi")
+                    raise AssertionError("Client error was swallowed")
+                except type(error):
+                    pass
+            snapshot = get_circuit_breaker(provider).snapshot()
+            assert snapshot["state"] == "closed" and snapshot["recent_calls"] == 0, (provider, snapshot)
+            assert fallback.calls == 0, f"{provider} error went to the fallback"
+        print(f"   ✓ {', '.join(errors)} errors raised; circuits closed, fallbacks unused")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_provider_errors():
+    """Transport, timeout, 429 and 5xx errors count as failures and use the fallback."""
+    print("\n2. Testing provider errors:")
+    try:
+        errors = {
+            "server_error": _status_error(openai.InternalServerError, 500),
+            "rate_limited": _status_error(openai.RateLimitError, 429),
+            "unreachable": openai.APIConnectionError(request=_REQUEST),
+            "bedrock_throttled": botocore.exceptions.ClientError(
+                {"Error": {"Code": "ThrottlingException"}, "ResponseMetadata": {"HTTPStatusCode": 429}}, "Converse"
+            ),
+            "timed_out": TimeoutError("Request timed out."),
+        }
+        calls = get_settings().circuit_min_requests
+        for provider, error in errors.items():
+            model, fallback = _guarded(provider, error)
+            for _ in range(calls):
+                assert model.invoke("hi").content == f"{provider}_fallback answer"
+            assert fallback.calls == calls, (provider, fallback.calls)
+            assert get_circuit_breaker(provider).snapshot()["state"] == "open", provider
+        print(f"   ✓ {len(errors)} kinds of provider error served by the fallback and opened the circuit")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_budget_and_deadline():
+    """A call out of its own budget isn't a provider failure; no fallback past the deadline."""
+    print("\n3. Testing time budget and deadline:")
+    try:
+        model, fallback = _guarded("budget", TimeoutError("Request timed out."))
+        try:
+            model.invoke("hi", timeout=0.5)
+            raise AssertionError("Budget timeout was swallowed")
+        except TimeoutError:
+            pass
+        snapshot = get_circuit_breaker("budget").snapshot()
+        assert snapshot["recent_calls"] == 0 and fallback.calls == 0, (snapshot, fallback.calls)
+        print("   ✓ Timeout on the call's own budget raised without breaker outcome or fallback")
+
+        model, fallback = _guarded("deadline", _status_error(openai.InternalServerError, 503))
+        deadline = Deadline(0.01)
+        time.sleep(0.02)
+        with deadline_scope(deadline):
+            try:
+                model.invoke("hi")
+                raise AssertionError("Expected the provider error")
+            except openai.InternalServerError:
+                pass
+        assert get_circuit_breaker("deadline").snapshot()["recent_calls"] == 1 and fallback.calls == 0
+        print("   ✓ Provider error after the deadline recorded, fallback skipped")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def main():
+    """Run all circuit breaker tests."""
+    results = []
+
+    results.append(("Client Errors", test_client_errors()))
+    results.append(("Provider Errors", test_provider_errors()))
+    results.append(("Budget + Deadline", test_budget_and_deadline()))
+
+    print("\n" + "=" * 60)
+    print("Circuit Breaker Test Results:")
+    print("-" * 60)
+
+    all_passed = True
+    for test_name, passed in results:
+        status = "✓ PASSED" if passed else "✗ FAILED"
+        print(f"{test_name:30} {status}")
+        if not passed:
+            all_passed = False
+
+    print("-" * 60)
+    if all_passed:
+        print("\n✅ Circuit breaker tests PASSED")
+    else:
+        print("\n⚠ Some circuit breaker tests failed. Review errors above.")
+
+    return all_passed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
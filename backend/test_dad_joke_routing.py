@@ -40,8 +40,7 @@ print()
 # Check agent type detection
 print("\n3. Checking agent type detection:")
 print("-" * 60)
-from app.api.routes.chat import _detect_agent_type
-agent_type = _detect_agent_type(result1['messages'])
+agent_type = result1.get("current_agent")
 print(f"Detected agent type: {agent_type}")
 print()
 
@@ -0,0 +1,237 @@
+"""
+Test request deadlines and cancellation (offline - no LLM calls).
+
+Checks that a turn past its deadline answers with the specialist's result
+instead of another routing call, that a turn stuck past the grace period is
+cancelled and closed with a fallback, that a client disconnect cancels the
+turn including its worker agent, and that abandoned v2 streams are stopped.
+Worker agents call the fake model synchronously; the tests slow those calls
+down to put the deadline in the middle of a turn.
+
+Usage:
+    python test_deadlines.py
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from offline_env import use_offline_env
+
+# Fake models and in-memory checkpoints (set before app imports)
+use_offline_env("deadlines")
+
+from langchain_core.messages import AIMessage, ToolMessage
+
+from app.agents.middleware import AgentLimitsMiddleware
+from app.agents.orchestrator import get_orchestrator
+from app.api.routes.chat import _answer, _unless_disconnected
+from app.api.admission import BATCH
+from app.api.sse import StreamRegistry
+from app.core.config import get_settings
+from app.core.deadline import Deadline, RequestCancelled
+from app.core.metrics import get_metrics
+from app.llm.fake import FakeChatModel
+
+print("Testing Request Deadlines")
+print("=" * 60)
+
+_generate = FakeChatModel._generate
+
+
+def _slow_worker_calls(seconds: float) -> None:
+    """Delay sync (worker agent) model calls; async orchestrator calls stay fast."""
+    def slow(self, *args, **kwargs):
+        time.sleep(seconds)
+        return _generate(self, *args, **kwargs)
+    FakeChatModel._generate = slow
+
+
+def _llm_calls() -> float:
+    return sum(get_metrics().snapshot().get("fake_llm_calls_total", {}).get("values", {}).values())
+
+
+def _thread_is_closed(thread_id: str) -> bool:
+    """Last message answers the turn and every tool call has a result."""
+    messages = get_orchestrator().get_state({"configurable": {"thread_id": thread_id}}).values["messages"]
+    calls = {call["id"] for m in messages if isinstance(m, AIMessage) for call in m.tool_calls}
+    results = {m.tool_call_id for m in messages if isinstance(m, ToolMessage)}
+    return isinstance(messages[-1], AIMessage) and not messages[-1].tool_calls and calls <= results
+
+
+def _run(message: str, thread_id: str, deadline: Deadline):
+    """Answer a message and time the turn (asyncio.run also waits for leftover worker threads)."""
+    config = {"configurable": {"thread_id": thread_id}}
+
+    async def timed():
+        start = time.perf_counter()
+        answer = await _answer(message, thread_id, config, BATCH, deadline)
+        return answer, time.perf_counter() - start
+
+    return asyncio.run(timed())
+
+
+def test_soft_deadline():
+    """Past the deadline the orchestrator answers with the specialist's result."""
+    print("\n1. Testing deadline with a finished specialist:")
+    try:
+        _slow_worker_calls(0.3)
+        calls = _llm_calls()
+        (_, content, agent_type, partial), _ = _run("What are your pricing plans?", "deadline_soft", Deadline(0.5))
+        assert partial, "Answer past the deadline should be marked partial"
+        assert content and content != AgentLimitsMiddleware.TIMEOUT_MESSAGE, content
+        assert _llm_calls() - calls == 3, f"Expected no final routing call, got {_llm_calls() - calls} calls"
+        print(f"   ✓ {agent_type} answer returned without the final orchestrator call")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        FakeChatModel._generate = _generate
+
+
+def test_hard_deadline():
+    """A turn stuck past the grace period is cancelled, closed and stops its worker."""
+    print("\n2. Testing hard timeout:")
+    settings = get_settings()
+    grace = settings.request_deadline_grace_seconds
+    try:
+        settings.request_deadline_grace_seconds = 0.2
+        _slow_worker_calls(1.0)
+        calls = _llm_calls()
+        (_, content, _, partial), elapsed = _run("How do I fix API errors?", "deadline_hard", Deadline(0.3))
+        assert elapsed < 0.9, f"Turn should end at the hard timeout, took {elapsed:.2f}s"
+        assert partial and content == AgentLimitsMiddleware.TIMEOUT_MESSAGE, content
+        print(f"   ✓ Fallback answer after {elapsed:.2f}s")
+
+        assert _thread_is_closed("deadline_hard"), "Interrupted turn should leave no unanswered tool calls"
+        time.sleep(0.5)  # The worker's stuck call has returned (asyncio.run waited for it)
+        assert _llm_calls() - calls == 2, f"Worker should stop after its stuck call, got {_llm_calls() - calls} calls"
+        print("   ✓ Thread closed; worker stopped at its next checkpoint")
+
+        FakeChatModel._generate = _generate
+        (_, content, _, partial), _ = _run("How do I fix API errors?", "deadline_hard", Deadline(None))
+        assert content and not partial, "Thread should accept the next turn"
+        print("   ✓ Next turn on the thread succeeds")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        settings.request_deadline_grace_seconds = grace
+        FakeChatModel._generate = _generate
+
+
+def test_disconnect():
+    """A client disconnect cancels the turn and the worker agent's remaining calls."""
+    print("\n3. Testing client disconnect:")
+    try:
+        class DisconnectingRequest:
+            def __init__(self, after: float):
+                self.at = time.monotonic() + after
+
+            async def is_disconnected(self) -> bool:
+                return time.monotonic() >= self.at
+
+        _slow_worker_calls(0.5)
+        calls = _llm_calls()
+        deadline = Deadline(None)
+        config = {"configurable": {"thread_id": "deadline_disconnect"}}
+
+        async def scenario():
+            work = _answer("What is your privacy policy?", "deadline_disconnect", config, BATCH, deadline)
+            await _unless_disconnected(DisconnectingRequest(0.2), deadline, work)
+
+        try:
+            asyncio.run(scenario())
+            raise AssertionError("Disconnect should cancel the request")
+        except RequestCancelled as e:
+            assert e.reason == "disconnected" and deadline.cancelled, e
+        print("   ✓ Disconnect cancelled the turn")
+        time.sleep(0.6)
+        assert _llm_calls() - calls == 2, f"Worker should stop after its current call, got {_llm_calls() - calls} calls"
+        assert _thread_is_closed("deadline_disconnect")
+        cancellations = get_metrics().snapshot()["request_cancellations_total"]["values"]
+        print(f"   ✓ No further LLM calls; thread closed ({cancellations})")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        FakeChatModel._generate = _generate
+
+
+def test_abandoned_stream():
+    """A v2 turn nobody is subscribed to is cancelled after the grace period."""
+    print("\n4. Testing abandoned v2 stream:")
+    try:
+        async def scenario():
+            produced = []
+
+            async def source():
+                for i in range(50):
+                    await asyncio.sleep(0.02)
+                    produced.append(i)
+                    yield "delta", {"text": str(i)}
+
+            registry = StreamRegistry(max_streams=4, max_events=100, ttl_seconds=60, abandon_after=0.05)
+            buffer = registry.start("thread_abandoned", source())
+            subscriber = buffer.subscribe()
+            await subscriber.__anext__()
+            await subscriber.aclose()  # client went away
+            await asyncio.sleep(0.2)
+            return buffer, len(produced)
+
+        buffer, produced = asyncio.run(scenario())
+        assert buffer.finished and buffer.task.cancelled(), "Abandoned turn should be cancelled"
+        assert produced < 20, f"Source kept running ({produced} events)"
+        print(f"   ✓ Turn cancelled after {produced} of 50 events")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def main():
+    """Run all deadline tests."""
+    results = []
+
+    results.append(("Soft Deadline", test_soft_deadline()))
+    results.append(("Hard Timeout", test_hard_deadline()))
+    results.append(("Client Disconnect", test_disconnect()))
+    results.append(("Abandoned Stream", test_abandoned_stream()))
+
+    print("\n" + "=" * 60)
+    print("Deadline Test Results:")
+    print("-" * 60)
+
+    all_passed = True
+    for test_name, passed in results:
+        status = "✓ PASSED" if passed else "✗ FAILED"
+        print(f"{test_name:30} {status}")
+        if not passed:
+            all_passed = False
+
+    print("-" * 60)
+    if all_passed:
+        print("\n✅ Deadline tests PASSED")
+    else:
+        print("\n⚠ Some deadline tests failed. Review errors above.")
+
+    return all_passed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,137 @@
+"""
+Test conversation history windowing (offline - no LLM calls).
+
+Checks that the history window trims whole turns to the configured budgets,
+never splits a tool call from its result, and keeps a rolling summary.
+
+Usage:
+    python test_history_window.py
+"""
+
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from offline_env import use_offline_env
+
+# Fake models and in-memory checkpoints (set before app imports)
+use_offline_env("history_window")
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from app.agents.middleware import HistoryWindowMiddleware
+
+print("Testing History Window")
+print("=" * 60)
+
+
+def _conversation(turns: int, answer_words: int = 50) -> list:
+    """Build an orchestrator-style history: question, tool call, tool result, answer."""
+    messages = []
+    for i in range(turns):
+        call_id = f"call_{i}"
+        messages += [
+            HumanMessage(content=f"question {i}"),
+            AIMessage(content="", tool_calls=[{"name": "handle_policy_query", "args": {"query": f"q{i}"}, "id": call_id}]),
+            ToolMessage(content="policy " * answer_words, name="handle_policy_query", tool_call_id=call_id),
+            AIMessage(content="answer " * answer_words),
+        ]
+    messages.append(HumanMessage(content="current question"))
+    return messages
+
+
+def test_message_budget():
+    """Window keeps whole turns within the message budget."""
+    print("\n1. Testing message budget:")
+    try:
+        middleware = HistoryWindowMiddleware("test", max_messages=9, max_tokens=100000)
+        messages = _conversation(5)
+        window = messages[middleware._window_start(messages):]
+        assert len(window) == 9, f"Expected 9 messages, got {len(window)}"
+        assert isinstance(window[0], HumanMessage), "Window must start on a user message"
+        print(f"   ✓ Messages in window: {len(window)} of {len(messages)}")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_token_budget():
+    """Window respects the token budget but always keeps the current turn."""
+    print("\n2. Testing token budget:")
+    try:
+        middleware = HistoryWindowMiddleware("test", max_messages=100, max_tokens=200)
+        messages = _conversation(5, answer_words=200)
+        window = messages[middleware._window_start(messages):]
+        assert len(window) == 1 and window[0].content == "current question", f"Unexpected window: {window}"
+        print("   ✓ Only the current turn fits the token budget")
+
+        tool_ids = {m.tool_call_id for m in window if isinstance(m, ToolMessage)}
+        call_ids = {c["id"] for m in window if isinstance(m, AIMessage) for c in m.tool_calls}
+        assert tool_ids == call_ids, "Tool calls and results must stay together"
+        print("   ✓ Tool calls and results kept together")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_rolling_summary():
+    """Turns outside the window are folded into the rolling summary."""
+    print("\n3. Testing rolling summary:")
+    try:
+        middleware = HistoryWindowMiddleware("test", max_messages=5, max_tokens=100000, summarize=True)
+        messages = _conversation(3)
+        update = middleware.before_model({"messages": messages}, None)
+        assert update["history_summary_upto"] == 8, f"Expected 8 summarized messages, got {update['history_summary_upto']}"
+        assert "User asked: question 0" in update["history_summary"], "Summary should mention earlier questions"
+        assert "Handled by handle_policy_query" in update["history_summary"], "Summary should mention routing"
+        print(f"   ✓ Summary covers {update['history_summary_upto']} messages")
+
+        state = {"messages": messages, **update}
+        assert middleware.before_model(state, None) is None, "Summary should not change without new turns"
+        print("   ✓ Summary unchanged when the window does not move")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def main():
+    """Run all history window tests."""
+    results = []
+
+    results.append(("Message Budget", test_message_budget()))
+    results.append(("Token Budget", test_token_budget()))
+    results.append(("Rolling Summary", test_rolling_summary()))
+
+    print("\n" + "=" * 60)
+    print("History Window Test Results:")
+    print("-" * 60)
+
+    all_passed = True
+    for test_name, passed in results:
+        status = "✓ PASSED" if passed else "✗ FAILED"
+        print(f"{test_name:30} {status}")
+        if not passed:
+            all_passed = False
+
+    print("-" * 60)
+    if all_passed:
+        print("\n✅ History window tests PASSED")
+    else:
+        print("\n⚠ Some history window tests failed. Review errors above.")
+
+    return all_passed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,280 @@
+"""
+Test asynchronous chat jobs (offline - no LLM calls).
+
+Checks that POST /chat/jobs returns a job right away and the result can be
+polled, that the job's progress can be followed (and resumed) as an SSE
+stream, that jobs run on a bounded FIFO worker pool, that waiting and
+running jobs can be cancelled, that shed jobs are retried, and that
+finished jobs expire from the bounded store.
+
+Usage:
+    python test_jobs.py
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from offline_env import use_offline_env
+
+# Fake models and in-memory checkpoints (set before app imports)
+use_offline_env("jobs")
+
+from fastapi.testclient import TestClient
+
+from app.api.admission import AdmissionRejected
+from app.api.jobs import JobManager, JobRejected
+from app.main import app
+
+print("Testing Chat Jobs")
+print("=" * 60)
+
+
+def _manager(**overrides) -> JobManager:
+    options = dict(workers=2, max_queued=10, max_jobs=20, ttl_seconds=60, max_attempts=3, max_events=100)
+    options.update(overrides)
+    return JobManager(**options)
+
+
+def _source(text: str, seconds: float = 0.0, log: list = None):
+    """Event source of a scripted turn."""
+    async def events():
+        if log is not None:
+            log.append(("start", text))
+        yield "status", {"stage": "routing"}
+        await asyncio.sleep(seconds)
+        yield "delta", {"text": text}
+        yield "done", {"usage": {"total_tokens": 1}}
+        if log is not None:
+            log.append(("end", text))
+    return events
+
+
+def _events(frames: list[str]) -> list[str]:
+    return [line.split(": ", 1)[1] for frame in frames for line in frame.splitlines() if line.startswith("event: ")]
+
+
+def test_submit_and_poll():
+    """A submitted job answers in the background; polling returns the result."""
+    print("\n1. Testing submit and poll:")
+    try:
+        with TestClient(app) as client:
+            response = client.post("/chat/jobs", json={"message": "How do I fix API errors?"})
+            assert response.status_code == 202, response.text
+            job = response.json()
+            assert job["status"] in ("queued", "running") and job["thread_id"], job
+            assert response.headers["location"] == f"/chat/jobs/{job['job_id']}"
+            print(f"   ✓ 202 {job['job_id']} ({job['status']})")
+
+            for _ in range(200):
+                job = client.get(f"/chat/jobs/{job['job_id']}").json()
+                if job["status"] not in ("queued", "running"):
+                    break
+                time.sleep(0.02)
+            assert job["status"] == "succeeded", job
+            assert job["response"] and job["agent_type"] and job["usage"]["total_tokens"] > 0, job
+            assert job["started_at"] >= job["created_at"] and job["finished_at"] >= job["started_at"]
+            print(f"   ✓ Polled result from {job['agent_type']} agent ({len(job['response'])} chars)")
+
+            response = client.post("/chat/jobs", json={"message": "Thanks!", "thread_id": job["thread_id"]})
+            assert response.status_code == 202, "Finished jobs don't block their thread"
+            assert client.get("/chat/jobs/job_unknown").status_code == 404
+            print("   ✓ Follow-up job on the same thread accepted; unknown job -> 404")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_event_stream():
+    """The job's progress replays as v2 events, also after Last-Event-ID."""
+    print("\n2. Testing job event stream:")
+    try:
+        with TestClient(app) as client:
+            job = client.post("/chat/jobs", json={"message": "What are your pricing plans?"}).json()
+            with client.stream("GET", f"/chat/jobs/{job['job_id']}/events") as response:
+                assert response.status_code == 200 and response.headers["content-type"].startswith("text/event-stream")
+                frames = [frame for frame in response.read().decode().split("\n\n") if frame.strip()]
+            events = _events(frames)
+            assert events[0] == "status" and '"stage":"queued"' in frames[0], frames[0]
+            assert "meta" in events and "delta" in events and events[-1] == "done", events
+            print(f"   ✓ Followed {len(events)} events: {' '.join(dict.fromkeys(events))}")
+
+            ids = [line.split(": ", 1)[1] for frame in frames for line in frame.splitlines() if line.startswith("id: ")]
+            with client.stream(
+                "GET", f"/chat/jobs/{job['job_id']}/events", headers={"Last-Event-ID": ids[1]}
+            ) as response:
+                resumed = [frame for frame in response.read().decode().split("\n\n") if frame.strip()]
+            assert resumed == frames[2:], "Resume should replay only the events after Last-Event-ID"
+            print(f"   ✓ Resumed after {ids[1]}: {len(resumed)} events")
+
+            response = client.get(f"/chat/jobs/{job['job_id']}/events", headers={"Last-Event-ID": "turn_other:1"})
+            assert response.status_code == 410, response.status_code
+            print("   ✓ Event id of another job -> 410")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_worker_pool():
+    """At most `workers` jobs run at once, in submission order."""
+    print("\n3. Testing bounded worker pool:")
+    try:
+        async def scenario():
+            manager = _manager(workers=2)
+            log = []
+            jobs = [await manager.submit(f"thread_{i}", _source(f"job{i}", 0.05, log)) for i in range(5)]
+            await asyncio.sleep(0)
+            positions = [manager.position(job) for job in jobs]
+            while not all(job.finished for job in jobs):
+                await asyncio.sleep(0.01)
+            await manager.aclose()
+            return jobs, log, positions
+
+        jobs, log, positions = asyncio.run(scenario())
+        running, peak = 0, 0
+        for kind, _ in log:
+            running += 1 if kind == "start" else -1
+            peak = max(peak, running)
+        starts = [text for kind, text in log if kind == "start"]
+        assert peak == 2, f"Peak {peak} jobs running, 2 workers"
+        assert starts == [f"job{i}" for i in range(5)], starts
+        assert positions[2:] == [1, 2, 3], positions
+        assert all(job.status == "succeeded" and job.response == f"job{i}" for i, job in enumerate(jobs))
+        print(f"   ✓ 5 jobs, at most 2 running, FIFO; queue positions {positions}")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_cancellation():
+    """Waiting and running jobs can be cancelled; the worker moves on."""
+    print("\n4. Testing cancellation:")
+    try:
+        async def scenario():
+            manager = _manager(workers=1)
+            running = await manager.submit("thread_a", _source("slow", 5))
+            waiting = await manager.submit("thread_b", _source("never"))
+            after = await manager.submit("thread_c", _source("next"))
+            await asyncio.sleep(0.02)
+            await manager.cancel(waiting)
+            await manager.cancel(running)
+            while not after.finished:
+                await asyncio.sleep(0.01)
+            frames = [frame async for frame in running.events.subscribe()]
+            await manager.aclose()
+            return running, waiting, after, frames
+
+        running, waiting, after, frames = asyncio.run(scenario())
+        assert running.status == "cancelled" and waiting.status == "cancelled", (running.status, waiting.status)
+        assert waiting.started_at is None, "Cancelled waiting job should never start"
+        assert _events(frames)[-1] == "cancelled", _events(frames)
+        assert after.status == "succeeded" and after.response == "next"
+        print("   ✓ Running and waiting jobs cancelled, next job still ran")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_limits_and_retries():
+    """Busy threads and full queues are rejected; shed jobs retry; finished jobs expire."""
+    print("\n5. Testing limits, retries and expiry:")
+    try:
+        async def scenario():
+            manager = _manager(workers=1, max_queued=2, ttl_seconds=0.05)
+            first = await manager.submit("thread_a", _source("a", 0.1))
+            try:
+                await manager.submit("thread_a", _source("again"))
+                raise AssertionError("Second job on a busy thread should be rejected")
+            except JobRejected as e:
+                assert e.status_code == 409, e.status_code
+            await asyncio.sleep(0)
+            await manager.submit("thread_b", _source("b"))
+            await manager.submit("thread_c", _source("c"))
+            try:
+                await manager.submit("thread_d", _source("d"))
+                raise AssertionError("Full queue should reject jobs")
+            except JobRejected as e:
+                assert e.status_code == 429 and e.retry_after, e.status_code
+            print("   ✓ Busy thread -> 409, full queue -> 429")
+
+            attempts = []
+
+            def shed_once():
+                async def events():
+                    attempts.append(1)
+                    if len(attempts) == 1:
+                        raise AdmissionRejected(503, "queue_timeout", 0.01)
+                    yield "delta", {"text": "ok"}
+                    yield "done", {}
+                return events()
+
+            while manager._waiting:
+                await asyncio.sleep(0.01)
+            retried = await manager.submit("thread_e", shed_once)
+            while not retried.finished:
+                await asyncio.sleep(0.01)
+            assert retried.status == "succeeded" and len(attempts) == 2, (retried.status, attempts)
+            print("   ✓ Job shed by admission control retried")
+
+            await asyncio.sleep(0.1)
+            assert manager.get(first.id) is None and len(manager) == 0, len(manager)
+            print("   ✓ Finished jobs expire after the TTL")
+            await manager.aclose()
+
+        asyncio.run(scenario())
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def main():
+    """Run all job tests."""
+    results = []
+
+    results.append(("Submit and Poll", test_submit_and_poll()))
+    results.append(("Event Stream", test_event_stream()))
+    results.append(("Worker Pool", test_worker_pool()))
+    results.append(("Cancellation", test_cancellation()))
+    results.append(("Limits and Retries", test_limits_and_retries()))
+
+    print("\n" + "=" * 60)
+    print("Chat Job Test Results:")
+    print("-" * 60)
+
+    all_passed = True
+    for test_name, passed in results:
+        status = "✓ PASSED" if passed else "✗ FAILED"
+        print(f"{test_name:30} {status}")
+        if not passed:
+            all_passed = False
+
+    print("-" * 60)
+    if all_passed:
+        print("\n✅ Chat job tests PASSED")
+    else:
+        print("\n⚠ Some chat job tests failed. Review errors above.")
+
+    return all_passed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,165 @@
+"""
+Test shared LLM HTTP clients (offline - against a local stand-in server).
+
+Checks that cached OpenAI models keep working after the app's shutdown hook
+closes the shared connection pools (e.g. repeated TestClient contexts in one
+process), that async calls from different event loops each use a pool of
+their own loop, and that pooled connections are reused.
+
+Usage:
+    python test_llm_clients.py
+"""
+
+import asyncio
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from offline_env import use_offline_env
+
+
+class _OpenAIStandIn(BaseHTTPRequestHandler):
+    """Answers chat completions with a fixed message over keep-alive HTTP/1.1."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps({
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "gpt-4o-mini",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "pong"}}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_server = ThreadingHTTPServer(("127.0.0.1", 0), _OpenAIStandIn)
+threading.Thread(target=_server.serve_forever, daemon=True).start()
+
+# Live OpenAI models pointed at the stand-in (set before app imports)
+use_offline_env(
+    "llm_clients",
+    llm_backend="live",
+    openai_api_key="sk-test",
+    openai_base_url=f"http://127.0.0.1:{_server.server_port}/v1",
+    llm_max_retries="0",
+)
+
+from fastapi.testclient import TestClient
+
+from app.core.metrics import get_metrics
+from app.llm.clients import get_client_registry
+from app.llm.providers import get_openai_model
+from app.main import app
+
+print("Testing Shared LLM Clients")
+print("=" * 60)
+
+
+def _requests() -> dict:
+    return get_metrics().snapshot().get("llm_http_requests_total", {}).get("values", {})
+
+
+def test_restart_cycle():
+    """Cached models still work after the shutdown hook closed the pools."""
+    print("\n1. Testing models across app shutdown/startup:")
+    try:
+        model = get_openai_model("gpt-4o-mini", temperature=0)
+        assert model.invoke("ping").content == "pong"
+        for cycle in range(2):
+            with TestClient(app):
+                pass
+            assert get_openai_model("gpt-4o-mini", temperature=0) is model, "Model cache should survive"
+            assert model.invoke("ping").content == "pong", f"Sync call failed after shutdown {cycle + 1}"
+        print("   ✓ Sync calls succeed after 2 shutdown/startup cycles (same cached model)")
+
+        async def call():
+            return (await model.ainvoke("ping")).content
+
+        with TestClient(app) as client:
+            assert client.portal.call(call) == "pong"
+        with TestClient(app) as client:
+            assert client.portal.call(call) == "pong"
+        print("   ✓ Async calls succeed in the next app's event loop")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_loops_and_reuse():
+    """Each event loop gets its own async pool; connections are reused within a pool."""
+    print("\n2. Testing event loops and connection reuse:")
+    try:
+        model = get_openai_model("gpt-4o-mini", temperature=0)
+        registry = get_client_registry()
+
+        async def calls():
+            for _ in range(3):
+                assert (await model.ainvoke("ping")).content == "pong"
+            return registry.async_client("openai")
+
+        first, second = asyncio.run(calls()), asyncio.run(calls())
+        assert first is not second, "Each event loop should get its own async client"
+        print("   ✓ Separate async pools for two event loops")
+
+        before = _requests().get("connection=reused,provider=openai", 0)
+        for _ in range(3):
+            model.invoke("ping")
+        reused = _requests().get("connection=reused,provider=openai", 0) - before
+        assert reused >= 2, _requests()
+        print(f"   ✓ {reused:.0f} of 3 sync requests reused a pooled connection")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def main():
+    """Run all shared client tests."""
+    results = []
+
+    results.append(("Restart Cycle", test_restart_cycle()))
+    results.append(("Loops And Reuse", test_loops_and_reuse()))
+
+    print("\n" + "=" * 60)
+    print("Shared LLM Client Test Results:")
+    print("-" * 60)
+
+    all_passed = True
+    for test_name, passed in results:
+        status = "✓ PASSED" if passed else "✗ FAILED"
+        print(f"{test_name:30} {status}")
+        if not passed:
+            all_passed = False
+
+    print("-" * 60)
+    if all_passed:
+        print("\n✅ Shared LLM client tests PASSED")
+    else:
+        print("\n⚠ Some shared LLM client tests failed. Review errors above.")
+
+    return all_passed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,241 @@
+"""
+Test the v2 SSE streaming protocol (offline - no LLM calls).
+
+Checks protocol negotiation, delta coalescing by size and time, the
+meta/status/delta/done event sequence of a streamed /chat request served
+by the fake LLM backend, and resuming a dropped stream with Last-Event-ID.
+
+Usage:
+    python test_sse_protocol.py
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from offline_env import use_offline_env
+
+# Fake models and in-memory checkpoints (set before app imports)
+use_offline_env("sse")
+
+from fastapi.testclient import TestClient
+
+from langchain_core.messages import HumanMessage
+
+from app.agents.orchestrator import get_orchestrator
+from app.api.sse import StreamRegistry, coalesce, negotiate_protocol
+from app.core.metrics import get_metrics
+from app.main import app
+
+print("Testing SSE Protocol v2")
+print("=" * 60)
+
+
+def _parse_frames(body: str) -> list:
+    """Field dicts (id, event, data) of an SSE body."""
+    return [dict(line.split(": ", 1) for line in frame.split("\n")) for frame in body.strip().split("\n\n")]
+
+
+def _parse_events(body: str) -> list:
+    """(event, data) pairs of an SSE body."""
+    return [(fields.get("event", "message"), fields["data"]) for fields in _parse_frames(body)]
+
+
+def _llm_calls() -> float:
+    return sum(get_metrics().snapshot().get("fake_llm_calls_total", {}).get("values", {}).values())
+
+
+def test_negotiation():
+    """Request field wins over the Accept header, which wins over the default."""
+    print("\n1. Testing protocol negotiation:")
+    try:
+        assert negotiate_protocol("v1", "text/event-stream; version=2", "v2") == "v1"
+        assert negotiate_protocol(None, "text/event-stream; version=2", "v1") == "v2"
+        assert negotiate_protocol(None, "application/json, text/event-stream;version=\"2\"", "v1") == "v2"
+        assert negotiate_protocol(None, "text/event-stream", "v1") == "v1"
+        assert negotiate_protocol(None, None, "v2") == "v2"
+        print("   ✓ Field, Accept header and default applied in order")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_coalescing():
+    """Small pieces are merged by size; slow producers are flushed on time."""
+    print("\n2. Testing delta coalescing:")
+    try:
+        async def words(delay=0.0):
+            for i in range(40):
+                if delay:
+                    await asyncio.sleep(delay)
+                yield f"word{i} "
+
+        async def collect(pieces, max_chars, interval):
+            return [chunk async for chunk in coalesce(pieces, max_chars, interval)]
+
+        expected = "".join(f"word{i} " for i in range(40))
+        chunks = asyncio.run(collect(words(), 64, 10.0))
+        assert "".join(chunks) == expected, "Coalesced text must equal the input"
+        assert all(len(c) <= 64 for c in chunks) and len(chunks) < 10, f"Unexpected chunks: {chunks}"
+        print(f"   ✓ 40 pieces -> {len(chunks)} size-based flushes")
+
+        chunks = asyncio.run(collect(words(delay=0.01), 10_000, 0.05))
+        assert "".join(chunks) == expected, "Coalesced text must equal the input"
+        assert len(chunks) > 2, f"Expected time-based flushes, got {len(chunks)}"
+        print(f"   ✓ Slow producer -> {len(chunks)} time-based flushes")
+
+        whole = "A long answer. " * 40
+        chunks = asyncio.run(collect(_single(whole), 100, 0.05))
+        assert "".join(chunks) == whole and max(len(c) for c in chunks) <= 100
+        print(f"   ✓ Whole answer split into {len(chunks)} deltas at whitespace")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+async def _single(text):
+    yield text
+
+
+def test_v2_stream():
+    """A v2 stream has one meta, status updates, deltas and a final done event."""
+    print("\n3. Testing /chat v2 event stream:")
+    try:
+        with TestClient(app) as client:
+            payload = {"message": "What is your privacy policy?", "thread_id": "sse_v2_test", "stream": True}
+            response = client.post("/chat", json={**payload, "protocol": "v2"})
+            assert response.status_code == 200, response.text
+            events = _parse_events(response.text)
+            names = [name for name, _ in events]
+            assert names[0] == "status" and names[-1] == "done", names
+            assert names.count("meta") == 1, names
+            meta = json.loads(dict(events)["meta"])
+            assert meta == {"thread_id": "sse_v2_test", "agent_type": "policy"}, meta
+            stages = [json.loads(data)["stage"] for name, data in events if name == "status"]
+            assert stages == ["routing", "retrieving", "composing"], stages
+            done = json.loads(events[-1][1])
+            assert done["usage"]["total_tokens"] > 0, done
+            text = "".join(json.loads(data)["text"] for name, data in events if name == "delta")
+            assert len(text) == done["chars"], "Deltas should add up to the full answer"
+            print(f"   ✓ {names.count('delta')} deltas, stages {stages}, {done['usage']['total_tokens']} tokens")
+
+            # Same answer through v1 costs more bytes on the wire
+            v1 = client.post("/chat", json={**payload, "thread_id": "sse_v1_test"})
+            assert v1.text.endswith("data: [DONE]\n\n"), "v1 stays the default"
+            print(f"   ✓ v2 {len(response.content)} bytes vs v1 {len(v1.content)} bytes")
+            assert len(response.content) < len(v1.content)
+
+            accepted = client.post(
+                "/chat", json={**payload, "thread_id": "sse_accept_test"},
+                headers={"Accept": "text/event-stream; version=2"}
+            )
+            assert _parse_events(accepted.text)[0][0] == "status", "Accept header should select v2"
+            print("   ✓ Accept header selects v2")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_resume():
+    """Reconnecting with Last-Event-ID replays missed events without re-running the turn."""
+    print("\n4. Testing stream resume:")
+    try:
+        async def follow_live():
+            async def source():
+                for i in range(6):
+                    await asyncio.sleep(0.02)
+                    yield "delta", {"text": str(i)}
+
+            registry = StreamRegistry(max_streams=4, max_events=100, ttl_seconds=60)
+            buffer = registry.start("thread_live", source())
+            await asyncio.sleep(0.05)
+            assert not buffer.finished, "Source should still be running"
+            resumed = [frame async for frame in registry.resume("thread_live", f"{buffer.turn_id}:1")]
+            return [_parse_frames(frame)[0]["id"] for frame in resumed], buffer.turn_id
+
+        ids, turn_id = asyncio.run(follow_live())
+        assert ids == [f"{turn_id}:{i}" for i in range(2, 6)], ids
+        print("   ✓ Resumed subscriber follows a still-running turn")
+
+        with TestClient(app) as client:
+            payload = {"message": "How do I fix API errors?", "thread_id": "sse_resume_test", "stream": True, "protocol": "v2"}
+            received = []
+            with client.stream("POST", "/chat", json=payload) as response:
+                for line in response.iter_lines():
+                    if line.startswith("id: "):
+                        received.append(line[4:])
+                    if len(received) == 2:
+                        break  # connection drops mid-answer
+
+            resumed = client.post("/chat", json=payload, headers={"Last-Event-ID": received[-1]})
+            assert resumed.status_code == 200, resumed.text
+            frames = _parse_frames(resumed.text)
+            turn_id = received[0].rsplit(":", 1)[0]
+            assert [f["id"] for f in frames] == [f"{turn_id}:{i}" for i in range(2, 2 + len(frames))], frames
+            assert frames[-1]["event"] == "done", frames[-1]
+            print(f"   ✓ Resumed after {received[-1]}: {len(frames)} missed events ending with done")
+
+            state = get_orchestrator().get_state({"configurable": {"thread_id": "sse_resume_test"}})
+            turns = sum(isinstance(m, HumanMessage) for m in state.values["messages"])
+            assert turns == 1, f"Expected one turn in the thread, found {turns}"
+            calls = _llm_calls()
+            replay = client.post("/chat", json=payload, headers={"Last-Event-ID": f"{turn_id}:0"})
+            assert len(_parse_frames(replay.text)) == len(frames) + 1
+            assert _llm_calls() == calls, "Resume must not call the LLM again"
+            print("   ✓ No duplicate turn; replays served from the buffer")
+
+            missing = client.post("/chat", json=payload, headers={"Last-Event-ID": "turn_unknown:3"})
+            assert missing.status_code == 410, missing.status_code
+            print("   ✓ Unknown or expired stream returns 410")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def main():
+    """Run all SSE protocol tests."""
+    results = []
+
+    results.append(("Protocol Negotiation", test_negotiation()))
+    results.append(("Delta Coalescing", test_coalescing()))
+    results.append(("v2 Event Stream", test_v2_stream()))
+    results.append(("Stream Resume", test_resume()))
+
+    print("\n" + "=" * 60)
+    print("SSE Protocol Test Results:")
+    print("-" * 60)
+
+    all_passed = True
+    for test_name, passed in results:
+        status = "✓ PASSED" if passed else "✗ FAILED"
+        print(f"{test_name:30} {status}")
+        if not passed:
+            all_passed = False
+
+    print("-" * 60)
+    if all_passed:
+        print("\n✅ SSE protocol tests PASSED")
+    else:
+        print("\n⚠ Some SSE protocol tests failed. Review errors above.")
+
+    return all_passed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
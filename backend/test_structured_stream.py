@@ -0,0 +1,193 @@
+"""
+Test streaming of the policy agent's structured output (offline - no LLM calls).
+
+Checks that the PolicyResponse JSON is rendered to markdown incrementally
+(whatever the chunking, escapes or field order) and adds up to exactly the
+formatted answer, and that v2 streams send the policy answer while it is
+generated, before the orchestrator's final model call.
+
+Usage:
+    python test_structured_stream.py
+"""
+
+import asyncio
+import json
+import random
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from offline_env import use_offline_env
+
+# Fake models and in-memory checkpoints (set before app imports)
+use_offline_env("structured")
+
+from langchain_core.messages import ToolMessage
+
+from app.agents.models import PolicyResponse
+from app.agents.orchestrator import get_orchestrator
+from app.agents.structured_stream import PolicyStreamRenderer, format_policy_response
+from app.api.routes.chat import _v2_events
+from app.core.deadline import Deadline
+from app.core.metrics import get_metrics
+
+print("Testing Structured Output Streaming")
+print("=" * 60)
+
+RESPONSES = [
+    PolicyResponse(
+        friendly_response='Here is our "privacy" policy 🙂',
+        policy_description="We collect:\n\n- Account data\n- Usage data (see \\docs)\tsince 2024",
+        key_points=["Collection", "Retention: 30 días", ""],
+        contact_info="privacy@example.com",
+    ),
+    PolicyResponse(friendly_response="", policy_description="Only a description", key_points=[]),
+    PolicyResponse(friendly_response="Hi!", policy_description="", contact_info=""),
+]
+
+
+def _stream(raw: str, seed: int) -> tuple[PolicyStreamRenderer, str]:
+    """Feed raw JSON in random-sized chunks; returns the renderer and the text it rendered."""
+    rng = random.Random(seed)
+    renderer, parts, i = PolicyStreamRenderer(), [], 0
+    while i < len(raw):
+        size = rng.randint(1, 8)
+        parts.append(renderer.feed(raw[i:i + size]))
+        i += size
+    return renderer, "".join(parts)
+
+
+def _llm_calls() -> float:
+    return sum(get_metrics().snapshot().get("fake_llm_calls_total", {}).get("values", {}).values())
+
+
+def test_incremental_rendering():
+    """Streamed text equals the formatted response for any chunking."""
+    print("\n1. Testing incremental rendering:")
+    try:
+        for response in RESPONSES:
+            expected = format_policy_response(response)
+            for ascii_only in (True, False):
+                raw = json.dumps(response.model_dump(), ensure_ascii=ascii_only)
+                for seed in range(50):
+                    renderer, text = _stream(raw, seed)
+                    assert text == expected, (text, expected)
+                    assert renderer.finish(response) == ""
+        print(f"   ✓ {len(RESPONSES)} responses x 100 chunkings render exactly (escapes, surrogate pairs)")
+
+        raw = json.dumps(RESPONSES[0].model_dump())
+        renderer = PolicyStreamRenderer()
+        cut = raw.index('"policy_description"') + 30
+        first = renderer.feed(raw[:cut])
+        assert first.startswith(RESPONSES[0].friendly_response) and "\n\nWe co" in first, first
+        assert "Key Points" not in first
+        print(f"   ✓ Partial JSON renders the finished fields first ({len(first)} chars)")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_field_order():
+    """Fields arriving out of order wait for earlier ones; finish() completes the answer."""
+    print("\n2. Testing field order and other content:")
+    try:
+        response = RESPONSES[0]
+        fields = response.model_dump()
+        raw = json.dumps({
+            "key_points": fields["key_points"],
+            "extra": {"nested": [1, "}"], "flag": None},
+            "friendly_response": fields["friendly_response"],
+            "contact_info": fields["contact_info"],
+        })
+        renderer = PolicyStreamRenderer()
+        text = "".join(renderer.feed(c) for c in raw)
+        assert text == fields["friendly_response"], "Later fields wait for policy_description"
+        rest = renderer.finish(response)
+        assert text + rest == format_policy_response(response)
+        print("   ✓ Out-of-order fields held back; finish() sends the rest")
+
+        renderer = PolicyStreamRenderer()
+        assert renderer.feed("Let me look that up.") == "", "Prose is not structured output"
+        assert renderer.finish(response) == format_policy_response(response)
+        print("   ✓ Non-JSON content ignored")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_v2_stream():
+    """The policy answer streams before the orchestrator's final model call."""
+    print("\n3. Testing v2 stream of a policy answer:")
+    try:
+        thread_id = "structured_stream_v2"
+        config = {"configurable": {"thread_id": thread_id}}
+
+        async def collect():
+            events, calls_at_first_delta = [], None
+            start = _llm_calls()
+            async for event, data in _v2_events("What is your privacy policy?", thread_id, config, Deadline(None)):
+                if event == "delta" and calls_at_first_delta is None:
+                    calls_at_first_delta = _llm_calls() - start
+                events.append((event, data))
+            return events, calls_at_first_delta, _llm_calls() - start
+
+        events, calls_at_first_delta, calls = asyncio.run(collect())
+        names = [event for event, _ in events]
+        assert names.index("meta") < names.index("delta") and names[-1] == "done", names
+        assert calls_at_first_delta == 3 and calls == 4, (calls_at_first_delta, calls)
+        deltas = names[:names.index("done")].count("delta")
+        assert deltas >= 2, f"Answer arrived in {deltas} delta(s) before done, expected it streamed"
+        print(f"   ✓ First delta after {calls_at_first_delta:.0f} of {calls:.0f} model calls, {deltas} deltas before done")
+
+        text = "".join(data["text"] for event, data in events if event == "delta")
+        messages = get_orchestrator().get_state(config).values["messages"]
+        tool_result = next(m for m in reversed(messages) if isinstance(m, ToolMessage)).content
+        assert text == tool_result and len(text) == events[-1][1]["chars"], (len(text), len(tool_result))
+        assert names.count("status") == 3, names
+        print(f"   ✓ Deltas add up to the policy answer ({len(text)} chars)")
+        return True
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def main():
+    """Run all structured output streaming tests."""
+    results = []
+
+    results.append(("Incremental Rendering", test_incremental_rendering()))
+    results.append(("Field Order", test_field_order()))
+    results.append(("V2 Stream", test_v2_stream()))
+
+    print("\n" + "=" * 60)
+    print("Structured Output Streaming Test Results:")
+    print("-" * 60)
+
+    all_passed = True
+    for test_name, passed in results:
+        status = "✓ PASSED" if passed else "✗ FAILED"
+        print(f"{test_name:30} {status}")
+        if not passed:
+            all_passed = False
+
+    print("-" * 60)
+    if all_passed:
+        print("\n✅ Structured output streaming tests PASSED")
+    else:
+        print("\n⚠ Some structured output streaming tests failed. Review errors above.")
+
+    return all_passed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)